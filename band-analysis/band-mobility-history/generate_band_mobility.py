@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Historical Band Mobility and Crossover Risk
+=============================================
+
+Regenerates the tables in this folder from data-raw/ with the model's band
+mobility engine (`cali_model.band_mobility`):
+
+  - historical_band_mobility.csv — per-Party band movement over the last
+                                   20, 10 and 5 years of UN scales
+  - band_crossover_risk.csv      — distance of each Party's current UN
+                                   share to the nearest band edge
+  - band_transitions.csv         — band-to-band transition counts between
+                                   consecutive scale years, per window
+
+Every assessment year of the UN scale is reclassified under the current
+six-band thresholds (config/un_scale_bands.yaml) in one pass.
+
+Scenario parameters (matching the analysis notes):
+  - Eligible Parties with a positive UN share
+  - Exclude high income (except SIDS)
+  - Band-inversion mode, IUSAF-only baseline
+
+Usage:
+  python3 generate_band_mobility.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+import time
+import pandas as pd
+from pathlib import Path
+from cali_model.band_mobility import (
+    MOBILITY_WINDOWS,
+    band_crossover_risk,
+    band_panel,
+    historical_band_mobility,
+    mobility_matrix,
+    mobility_summary,
+    transition_counts,
+)
+from cali_model.calculator import calculate_shares
+from cali_model.data_loader import CURRENT_SCALE_YEAR, load_base_data
+
+# ── Configuration ────────────────────────────────────────────────────────────
+END_YEAR = int(CURRENT_SCALE_YEAR)
+EXCLUDE_HI = True
+HI_MODE = "exclude_except_sids"
+UN_SCALE = "band_inversion"
+
+OUT_DIR = Path(__file__).resolve().parent
+REPO = OUT_DIR.parent.parent
+
+
+def eligible_parties(base_df: pd.DataFrame) -> pd.Series:
+    """Parties eligible in the IUSAF-only baseline with a positive UN share."""
+    shares = calculate_shares(
+        base_df,
+        exclude_high_income=EXCLUDE_HI,
+        high_income_mode=HI_MODE,
+        tsac_beta=0.0,
+        sosac_gamma=0.0,
+        un_scale_mode=UN_SCALE,
+    ).shares
+    return shares.loc[shares["eligible"] & (shares["un_share"] > 0), "party"]
+
+
+def transition_table(panel: dict) -> pd.DataFrame:
+    """Long table of non-zero band transitions for each mobility window."""
+    counts = transition_counts(panel)
+    frames = []
+    for name, length in MOBILITY_WINDOWS.items():
+        matrix = mobility_matrix(panel, END_YEAR - length + 1, END_YEAR, counts=counts)
+        long = matrix.stack().rename("transitions").reset_index()
+        long.insert(0, "window", name)
+        frames.append(long[long["transitions"] > 0])
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    start = time.perf_counter()
+    base_df = load_base_data(REPO / "data-raw")
+    panel = band_panel(parties=eligible_parties(base_df))
+
+    mobility = historical_band_mobility(panel, END_YEAR)
+    mobility.to_csv(OUT_DIR / "historical_band_mobility.csv", index=False)
+    print(f"  Saved: historical_band_mobility.csv ({len(mobility)} Parties)")
+
+    risk = band_crossover_risk(panel, END_YEAR)
+    risk.to_csv(OUT_DIR / "band_crossover_risk.csv", index=False)
+    print(f"  Saved: band_crossover_risk.csv ({len(risk)} Parties)")
+
+    transitions = transition_table(panel)
+    transitions.to_csv(OUT_DIR / "band_transitions.csv", index=False)
+    print(f"  Saved: band_transitions.csv ({len(transitions)} rows)")
+
+    print()
+    print(mobility_summary(mobility, END_YEAR).to_string(index=False))
+    print(f"\nDone in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
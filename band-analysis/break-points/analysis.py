@@ -22,8 +22,9 @@ import matplotlib.patches as mpatches
 from matplotlib.colors import LinearSegmentedColormap
 from typing import Tuple, Dict, Optional
 
-from cali_model.data_loader import load_data, get_base_data
+from cali_model.data_loader import load_base_data
 from cali_model.calculator import calculate_allocations
+from cali_model import balance_solver
 from cali_model.sensitivity_metrics import compute_gini
 
 
@@ -72,32 +73,28 @@ def compute_spearman_vs_iusaf(current: pd.DataFrame, baseline: pd.DataFrame) ->
 
 def compute_component_ratios(df: pd.DataFrame, beta: float, gamma: float) -> pd.DataFrame:
     """Compute TSAC/IUSAF and SOSAC/IUSAF ratios for each Party."""
-    results = []
-    eligible = df[df['eligible']].copy()
+    eligible = df[df['eligible']]
     
     alpha = 1.0 - beta - gamma
     
-    for _, row in eligible.iterrows():
-        iusaf_amt = alpha * row.get('iusaf_share', 0) * FUND_SIZE / 1_000_000
-        tsac_amt = beta * row.get('tsac_share', 0) * FUND_SIZE / 1_000_000
-        sosac_amt = gamma * row.get('sosac_share', 0) * FUND_SIZE / 1_000_000
-        
-        tsac_iusaf_ratio = tsac_amt / iusaf_amt if iusaf_amt > 0 else float('inf')
-        sosac_iusaf_ratio = sosac_amt / iusaf_amt if iusaf_amt > 0 else float('inf')
-        
-        results.append({
-            'party': row['party'],
-            'is_sids': row.get('is_sids', False),
-            'is_ldc': row.get('is_ldc', False),
-            'iusaf_amt_m': iusaf_amt,
-            'tsac_amt_m': tsac_amt,
-            'sosac_amt_m': sosac_amt,
-            'tsac_iusaf_ratio': tsac_iusaf_ratio,
-            'sosac_iusaf_ratio': sosac_iusaf_ratio,
-            'total_allocation_m': row.get('total_allocation', 0)
-        })
+    iusaf_amt = alpha * eligible['iusaf_share'].to_numpy(dtype=float) * FUND_SIZE / 1_000_000
+    tsac_amt = beta * eligible['tsac_share'].to_numpy(dtype=float) * FUND_SIZE / 1_000_000
+    sosac_amt = gamma * eligible['sosac_share'].to_numpy(dtype=float) * FUND_SIZE / 1_000_000
     
-    return pd.DataFrame(results)
+    def _ratio(numerator):
+        return np.divide(numerator, iusaf_amt, out=np.full(len(iusaf_amt), np.inf), where=iusaf_amt > 0)
+    
+    return pd.DataFrame({
+        'party': eligible['party'].to_numpy(),
+        'is_sids': eligible['is_sids'].to_numpy(),
+        'is_ldc': eligible['is_ldc'].to_numpy(),
+        'iusaf_amt_m': iusaf_amt,
+        'tsac_amt_m': tsac_amt,
+        'sosac_amt_m': sosac_amt,
+        'tsac_iusaf_ratio': _ratio(tsac_amt),
+        'sosac_iusaf_ratio': _ratio(sosac_amt),
+        'total_allocation_m': eligible['total_allocation'].to_numpy(),
+    })
 
 
 def run_scenario(base_df: pd.DataFrame, beta: float, gamma: float, 
@@ -153,88 +150,43 @@ def get_scenario_metrics(results: pd.DataFrame, pure_iusaf_results: pd.DataFrame
 
 
 # ============================================================================
-# Binary Search for Crossover Points
+# Closed-form Crossover Points
 # ============================================================================
 
-def find_tsac_crossover(base_df: pd.DataFrame, target_ratio: float = 1.0,
-                        tolerance: float = 0.001, max_iterations: int = 50) -> Tuple[float, pd.DataFrame]:
+def _balance_scenario(gamma: float) -> dict:
+    return {
+        "exclude_high_income": EXCLUDE_HIGH_INCOME,
+        "un_scale_mode": UN_SCALE_MODE,
+        "sosac_gamma": gamma,
+    }
+
+
+def find_tsac_crossover(base_df: pd.DataFrame, target_ratio: float = 1.0) -> Tuple[Optional[float], Optional[pd.DataFrame]]:
     """
-    Binary search to find TSAC beta where max(TSAC/IUSAF ratio) = target_ratio.
+    TSAC beta where max(TSAC/IUSAF ratio) = target_ratio, solved in closed form.
     
-    Returns: (beta_value, ratios_dataframe)
+    Returns: (beta_value, ratios_dataframe), or (None, None) when no beta reaches the ratio
     """
-    low = 0.0
-    high = 0.15  # 15% upper bound
-    
-    best_beta = None
-    best_ratios = None
-    
-    for iteration in range(max_iterations):
-        mid = (low + high) / 2
-        
-        results = run_scenario(base_df, beta=mid, gamma=SOSAC_GAMMA_DEFAULT, 
-                               scenario_id=f"tsac_search_{mid:.4f}")
-        ratios_df = compute_component_ratios(results, mid, SOSAC_GAMMA_DEFAULT)
-        
-        # Find max TSAC/IUSAF ratio (excluding inf)
-        finite_ratios = ratios_df['tsac_iusaf_ratio'].replace(float('inf'), np.nan).dropna()
-        max_ratio = finite_ratios.max() if len(finite_ratios) > 0 else float('inf')
-        
-        if abs(max_ratio - target_ratio) < tolerance:
-            best_beta = mid
-            best_ratios = ratios_df
-            break
-        
-        if max_ratio < target_ratio:
-            low = mid
-        else:
-            high = mid
-        
-        best_beta = mid
-        best_ratios = ratios_df
-    
-    return best_beta, best_ratios
+    vectors = balance_solver.balance_vectors(base_df, _balance_scenario(SOSAC_GAMMA_DEFAULT))
+    beta = balance_solver.tsac_overturn(vectors, SOSAC_GAMMA_DEFAULT, ratio=target_ratio)["value"]
+    if beta is None:
+        return None, None
+    results = run_scenario(base_df, beta=beta, gamma=SOSAC_GAMMA_DEFAULT, scenario_id=f"tsac_crossover_{beta:.4f}")
+    return beta, compute_component_ratios(results, beta, SOSAC_GAMMA_DEFAULT)
 
 
-def find_sosac_crossover(base_df: pd.DataFrame, target_ratio: float = 1.0,
-                         tolerance: float = 0.001, max_iterations: int = 50) -> Tuple[float, pd.DataFrame]:
+def find_sosac_crossover(base_df: pd.DataFrame, target_ratio: float = 1.0) -> Tuple[Optional[float], Optional[pd.DataFrame]]:
     """
-    Binary search to find SOSAC gamma where max(SOSAC/IUSAF ratio for SIDS) = target_ratio.
+    SOSAC gamma where max(SOSAC/IUSAF ratio for SIDS) = target_ratio, with TSAC off, solved in closed form.
     
-    Returns: (gamma_value, ratios_dataframe)
+    Returns: (gamma_value, ratios_dataframe), or (None, None) when no gamma reaches the ratio
     """
-    low = 0.0
-    high = 0.30  # 30% upper bound (based on analytical estimate of ~17.4%)
-    
-    best_gamma = None
-    best_ratios = None
-    
-    for iteration in range(max_iterations):
-        mid = (low + high) / 2
-        
-        results = run_scenario(base_df, beta=0.0, gamma=mid, 
-                               scenario_id=f"sosac_search_{mid:.4f}")
-        ratios_df = compute_component_ratios(results, 0.0, mid)
-        
-        # Find max SOSAC/IUSAF ratio among SIDS only
-        sids_ratios = ratios_df[ratios_df['is_sids']]['sosac_iusaf_ratio']
-        finite_ratios = sids_ratios.replace(float('inf'), np.nan).dropna()
-        max_ratio = finite_ratios.max() if len(finite_ratios) > 0 else float('inf')
-        
-        if abs(max_ratio - target_ratio) < tolerance:
-            best_gamma = mid
-            best_ratios = ratios_df
-            break
-        
-        if max_ratio < target_ratio:
-            low = mid
-        else:
-            high = mid
-        
-        best_gamma = mid
-        best_ratios = ratios_df
-    
-    return best_gamma, best_ratios
+    vectors = balance_solver.balance_vectors(base_df, _balance_scenario(0.0))
+    gamma = balance_solver.sosac_overturn(vectors, 0.0, ratio=target_ratio)["value"]
+    if gamma is None:
+        return None, None
+    results = run_scenario(base_df, beta=0.0, gamma=gamma, scenario_id=f"sosac_crossover_{gamma:.4f}")
+    return gamma, compute_component_ratios(results, 0.0, gamma)
 
 
 # ============================================================================
@@ -242,7 +194,7 @@ def find_sosac_crossover(base_df: pd.DataFrame, target_ratio: float = 1.0,
 # ============================================================================
 
 def create_break_point_timeline(tsac_sweep_path: str, sosac_sweep_path: str,
-                                 tsac_crossover: float, sosac_crossover: float,
+                                 tsac_crossover: Optional[float], sosac_crossover: Optional[float],
                                  output_path: str):
     """Create visualization showing component ratios vs parameter values."""
     
@@ -265,8 +217,9 @@ def create_break_point_timeline(tsac_sweep_path: str, sosac_sweep_path: str,
     ax1.axvline(x=2.5, color='#378ADD', linestyle='--', linewidth=1.5, alpha=0.8, label='Gini-minimum (2.5%)')
     ax1.axvline(x=3.0, color='#8B5CF6', linestyle='--', linewidth=1.5, alpha=0.8, label='Band-order overturn (3.0%)')
     ax1.axvline(x=3.5, color='#BA7517', linestyle='--', linewidth=1.5, alpha=0.8, label='Bounded (3.5%)')
-    ax1.axvline(x=tsac_crossover * 100, color='#EF4444', linestyle='-', linewidth=2, 
-                label=f'TSAC Overturn ({tsac_crossover*100:.2f}%)')
+    if tsac_crossover is not None:
+        ax1.axvline(x=tsac_crossover * 100, color='#EF4444', linestyle='-', linewidth=2, 
+                    label=f'TSAC Overturn ({tsac_crossover*100:.2f}%)')
     
     # Threshold line
     ax1.axhline(y=1.0, color='#333333', linestyle='-', linewidth=1, alpha=0.5)
@@ -285,8 +238,9 @@ def create_break_point_timeline(tsac_sweep_path: str, sosac_sweep_path: str,
              'o-', color='#378ADD', linewidth=2, markersize=4, label='Max SIDS ratio')
     
     # Crossover line
-    ax2.axvline(x=sosac_crossover * 100, color='#EF4444', linestyle='-', linewidth=2,
-                label=f'SOSAC Overturn ({sosac_crossover*100:.2f}%)')
+    if sosac_crossover is not None:
+        ax2.axvline(x=sosac_crossover * 100, color='#EF4444', linestyle='-', linewidth=2,
+                    label=f'SOSAC Overturn ({sosac_crossover*100:.2f}%)')
     
     # Threshold line
     ax2.axhline(y=1.0, color='#333333', linestyle='-', linewidth=1, alpha=0.5)
@@ -430,10 +384,7 @@ def main():
     print("=" * 60)
     
     # Initialize database and load data
-    import duckdb
-    con = duckdb.connect(database=':memory:')
-    load_data(con)
-    base_df = get_base_data(con)
+    base_df = load_base_data()
     
     print(f"\nLoaded {len(base_df)} Parties")
     
@@ -444,23 +395,31 @@ def main():
     # --- Find TSAC Crossover ---
     print("\n2. Finding TSAC crossover point...")
     tsac_crossover, tsac_ratios = find_tsac_crossover(base_df)
-    print(f"   TSAC Overturn Point: β = {tsac_crossover:.4f} ({tsac_crossover*100:.2f}%)")
-    
-    # Identify which Party is binding
-    max_ratio_idx = tsac_ratios['tsac_iusaf_ratio'].idxmax()
-    binding_party = tsac_ratios.loc[max_ratio_idx, 'party']
-    print(f"   Binding Party: {binding_party}")
+    if tsac_crossover is None:
+        binding_party = None
+        print("   TSAC Overturn Point: no crossover")
+    else:
+        print(f"   TSAC Overturn Point: β = {tsac_crossover:.4f} ({tsac_crossover*100:.2f}%)")
+        
+        # Identify which Party is binding
+        max_ratio_idx = tsac_ratios['tsac_iusaf_ratio'].idxmax()
+        binding_party = tsac_ratios.loc[max_ratio_idx, 'party']
+        print(f"   Binding Party: {binding_party}")
     
     # --- Find SOSAC Crossover ---
     print("\n3. Finding SOSAC crossover point...")
     sosac_crossover, sosac_ratios = find_sosac_crossover(base_df)
-    print(f"   SOSAC Overturn Point: γ = {sosac_crossover:.4f} ({sosac_crossover*100:.2f}%)")
-    
-    # Identify which SIDS Party is binding
-    sids_ratios = sosac_ratios[sosac_ratios['is_sids']]
-    max_sids_idx = sids_ratios['sosac_iusaf_ratio'].idxmax()
-    binding_sids = sosac_ratios.loc[max_sids_idx, 'party']
-    print(f"   Binding SIDS: {binding_sids}")
+    if sosac_crossover is None:
+        binding_sids = None
+        print("   SOSAC Overturn Point: no crossover")
+    else:
+        print(f"   SOSAC Overturn Point: γ = {sosac_crossover:.4f} ({sosac_crossover*100:.2f}%)")
+        
+        # Identify which SIDS Party is binding
+        sids_ratios = sosac_ratios[sosac_ratios['is_sids']]
+        max_sids_idx = sids_ratios['sosac_iusaf_ratio'].idxmax()
+        binding_sids = sosac_ratios.loc[max_sids_idx, 'party']
+        print(f"   Binding SIDS: {binding_sids}")
     
     # --- Generate All Scenarios ---
     print("\n4. Generating scenario allocations...")
@@ -473,6 +432,8 @@ def main():
         'tsac_overturn': (tsac_crossover, 0.03),
         'sosac_overturn': (0.0, sosac_crossover),
     }
+    # Overturn scenarios without a crossover are not run
+    scenarios = {k: v for k, v in scenarios.items() if None not in v}
     
     scenario_results = {}
     scenario_metrics = {}
@@ -535,13 +496,19 @@ def main():
     print("RESULTS SUMMARY")
     print("=" * 60)
     
-    print(f"\nTSAC Overturn Point: β = {tsac_crossover*100:.2f}%")
-    print(f"  - At this point, TSAC component equals IUSAF component for {binding_party}")
-    print(f"  - Beyond this, TSAC becomes the primary allocation driver")
+    if tsac_crossover is None:
+        print("\nTSAC Overturn Point: no crossover (TSAC never overtakes IUSAF)")
+    else:
+        print(f"\nTSAC Overturn Point: β = {tsac_crossover*100:.2f}%")
+        print(f"  - At this point, TSAC component equals IUSAF component for {binding_party}")
+        print(f"  - Beyond this, TSAC becomes the primary allocation driver")
     
-    print(f"\nSOSAC Overturn Point: γ = {sosac_crossover*100:.2f}%")
-    print(f"  - At this point, SOSAC component equals IUSAF component for {binding_sids}")
-    print(f"  - Beyond this, SOSAC dominates allocations for SIDS")
+    if sosac_crossover is None:
+        print("\nSOSAC Overturn Point: no crossover (SOSAC never overtakes IUSAF for SIDS)")
+    else:
+        print(f"\nSOSAC Overturn Point: γ = {sosac_crossover*100:.2f}%")
+        print(f"  - At this point, SOSAC component equals IUSAF component for {binding_sids}")
+        print(f"  - Beyond this, SOSAC dominates allocations for SIDS")
     
     print("\nScenario Comparison:")
     print("-" * 80)
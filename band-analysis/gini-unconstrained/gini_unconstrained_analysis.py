@@ -30,12 +30,12 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
-import duckdb
 import numpy as np
 import pandas as pd
 from pathlib import Path
-from cali_model.data_loader import load_data, get_base_data
-from cali_model.calculator import calculate_allocations
+from cali_model.data_loader import load_base_data
+from cali_model.calculator import calculate_allocations, calculate_allocations_batch
+from cali_model.sensitivity_metrics import compute_metrics_batch
 
 # ── Configuration ────────────────────────────────────────────────────────────
 FUND = 1_000_000_000
@@ -50,80 +50,77 @@ OUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # ── Helper functions ─────────────────────────────────────────────────────────
 
-def gini_coefficient(values):
-    """Compute Gini coefficient from an array of values."""
-    v = np.sort(values)
-    n = len(v)
-    if n == 0 or np.sum(v) == 0:
-        return 0.0
-    idx = np.arange(1, n + 1)
-    return float((2 * np.sum(idx * v) - (n + 1) * np.sum(v)) / (n * np.sum(v)))
-
-
-def compute_scenario(base_df, beta):
-    """Run a single scenario and return key metrics."""
-    df = calculate_allocations(
-        base_df, FUND, IPLC,
+def _scenario(beta, gamma=SOSAC):
+    return dict(
+        fund_size=FUND, iplc_share_pct=IPLC,
         exclude_high_income=EXCLUDE_HI,
         high_income_mode=HI_MODE,
-        tsac_beta=beta, sosac_gamma=SOSAC,
+        tsac_beta=beta, sosac_gamma=gamma,
         equality_mode=False, un_scale_mode=UN_SCALE,
     )
-    el = df[df["eligible"]].copy()
-    alpha = 1 - beta - SOSAC
 
-    # Gini
-    g = gini_coefficient(el["total_allocation"].values)
 
-    # Band metrics
-    b5 = el[el["un_band"].str.startswith("Band 5")]
-    b6 = el[el["un_band"].str.startswith("Band 6")]
-    b5_mean = float(b5["total_allocation"].mean()) if len(b5) > 0 else 0.0
-    b6_mean = float(b6["total_allocation"].mean()) if len(b6) > 0 else 0.0
-    band_preserved = b5_mean > b6_mean if (len(b5) > 0 and len(b6) > 0) else True
-    margin = float((b5_mean - b6_mean) / b5_mean * 100) if b5_mean > 0 else 0.0
-
-    # Spearman vs pure IUSAF
-    df_pure = calculate_allocations(
-        base_df, FUND, IPLC,
-        exclude_high_income=EXCLUDE_HI,
-        high_income_mode=HI_MODE,
-        tsac_beta=0.0, sosac_gamma=0.0,
-        equality_mode=False, un_scale_mode=UN_SCALE,
+def _band_mean(total, mask):
+    """Row-wise mean allocation over `mask` (0.0 where a row has no Party in it)."""
+    count = mask.sum(axis=1)
+    sums = np.where(mask, total, 0.0).sum(axis=1)
+    return np.divide(sums, count, out=np.zeros(len(count)), where=count > 0), count
+
+
+def compute_sweep(base_df, betas):
+    """Run a TSAC sweep (SOSAC fixed) as one batch and return key metrics per point."""
+    betas = list(betas)
+    n = len(betas)
+    batch = calculate_allocations_batch(base_df, [_scenario(b) for b in betas] + [_scenario(0.0, 0.0)])
+    share = batch["final_share"][:n]
+    el = batch["eligible"][:n]
+
+    # Gini and Spearman vs pure IUSAF (the last batch row) for every point at once
+    metrics = compute_metrics_batch(
+        share, np.broadcast_to(batch["final_share"][n], share.shape),
+        eligible=el, baseline_eligible=batch["eligible"][n], fund_size=FUND,
     )
-    el_pure = df_pure[df_pure["eligible"]]
-    merged = el[["party", "final_share"]].merge(
-        el_pure[["party", "final_share"]], on="party", suffixes=("_cur", "_base"))
-    r_cur = merged["final_share_cur"].rank(method="average")
-    r_base = merged["final_share_base"].rank(method="average")
-    spearman = float(r_cur.corr(r_base, method="pearson"))
+
+    total = (share * FUND) / 1_000_000.0
+    iusaf_amt = (batch["alpha"][:n, None] * batch["iusaf_share"][:n] * FUND) / 1_000_000.0
+    tsac_amt = (batch["beta"][:n, None] * batch["tsac_share"][:n] * FUND) / 1_000_000.0
+    sosac_amt = (batch["gamma"][:n, None] * batch["sosac_share"][:n] * FUND) / 1_000_000.0
+
+    # Band metrics
+    un_band = np.array([batch["bases"][j]["un_band"] for j in batch["basis_index"][:n]], dtype=object)
+    b5_mean, b5_count = _band_mean(total, el & np.char.startswith(un_band.astype(str), "Band 5"))
+    b6_mean, b6_count = _band_mean(total, el & np.char.startswith(un_band.astype(str), "Band 6"))
+    band_preserved = np.where((b5_count > 0) & (b6_count > 0), b5_mean > b6_mean, True)
+    margin = np.divide((b5_mean - b6_mean) * 100, b5_mean, out=np.zeros(n), where=b5_mean > 0)
 
     # LDC / SIDS totals
-    ldc_total = float(el[el["is_ldc"]]["total_allocation"].sum())
-    sids_total = float(el[el["is_sids"]]["total_allocation"].sum())
-    ldc_count = int(el["is_ldc"].sum())
-    sids_count = int(el["is_sids"].sum())
+    is_ldc = el & base_df["is_ldc"].to_numpy(dtype=bool)
+    is_sids = el & base_df["is_sids"].to_numpy(dtype=bool)
 
     # Stewardship > IUSAF count
-    n_steward_exceeds = int((el["component_tsac_amt"] + el["component_sosac_amt"] > el["component_iusaf_amt"]).sum())
-
-    return {
-        "tsac_pct": beta * 100,
-        "sosac_pct": SOSAC * 100,
-        "iusaf_pct": alpha * 100,
-        "gini": g,
-        "spearman": spearman,
-        "band_preserved": band_preserved,
-        "b5_mean": b5_mean,
-        "b6_mean": b6_mean,
-        "b5_b6_margin_pct": margin,
-        "ldc_total_m": ldc_total,
-        "ldc_count": ldc_count,
-        "sids_total_m": sids_total,
-        "sids_count": sids_count,
-        "stewardship_exceeds_iusaf": n_steward_exceeds,
-        "n_eligible": len(el),
-    }
+    steward_exceeds = el & (tsac_amt + sosac_amt > iusaf_amt)
+
+    rows = []
+    for k, beta in enumerate(betas):
+        alpha = 1 - beta - SOSAC
+        rows.append({
+            "tsac_pct": beta * 100,
+            "sosac_pct": SOSAC * 100,
+            "iusaf_pct": alpha * 100,
+            "gini": float(metrics["gini_coefficient"][k]),
+            "spearman": float(metrics["spearman_vs_pure_iusaf"][k]),
+            "band_preserved": bool(band_preserved[k]),
+            "b5_mean": float(b5_mean[k]),
+            "b6_mean": float(b6_mean[k]),
+            "b5_b6_margin_pct": float(margin[k]),
+            "ldc_total_m": float(total[k][is_ldc[k]].sum()),
+            "ldc_count": int(is_ldc[k].sum()),
+            "sids_total_m": float(total[k][is_sids[k]].sum()),
+            "sids_count": int(is_sids[k].sum()),
+            "stewardship_exceeds_iusaf": int(steward_exceeds[k].sum()),
+            "n_eligible": int(metrics["n_eligible"][k]),
+        })
+    return pd.DataFrame(rows)
 
 
 def compute_top_recipients(base_df, beta, n=30):
@@ -233,23 +230,15 @@ def compute_concentration(base_df, beta):
 
 def main():
     print("Loading data...")
-    con = duckdb.connect(database=":memory:")
-    load_data(con)
-    base_df = get_base_data(con)
+    base_df = load_base_data()
 
     # ── 1. Full TSAC sweep ────────────────────────────────────────────────
     print("Computing TSAC sweep (0%–20%)...")
-    sweep_rows = []
-    for beta_pct in [0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0,
-                     5.1, 5.2, 5.3, 5.35, 5.4, 5.5, 6.0, 7.0, 8.0, 9.0,
-                     10.0, 12.0, 15.0, 20.0]:
-        beta = beta_pct / 100.0
-        if beta + SOSAC >= 1.0:
-            continue
-        row = compute_scenario(base_df, beta)
-        sweep_rows.append(row)
-
-    sweep_df = pd.DataFrame(sweep_rows)
+    betas = [beta_pct / 100.0
+             for beta_pct in [0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0,
+                              5.1, 5.2, 5.3, 5.35, 5.4, 5.5, 6.0, 7.0, 8.0, 9.0,
+                              10.0, 12.0, 15.0, 20.0]]
+    sweep_df = compute_sweep(base_df, [beta for beta in betas if beta + SOSAC < 1.0])
     sweep_df.to_csv(OUT_DIR / "gini-sweep.csv", index=False, float_format="%.6g")
     print(f"  Saved: gini-sweep.csv ({len(sweep_df)} rows)")
 
@@ -273,19 +262,14 @@ def main():
 
     # ── 5. Balance-point comparison ────────────────────────────────────────
     print("Computing balance-point comparison...")
-    bp_rows = []
     scenarios = [
         ("Strict", 0.015, 0.03),
         ("Gini-minimum (band-preserved)", 0.025, 0.03),
         ("Band-order boundary", 0.03, 0.03),
         ("Unconstrained Gini minimum", 0.0535, 0.03),
     ]
-    for name, beta, gamma in scenarios:
-        row = compute_scenario(base_df, beta)
-        row["name"] = name
-        bp_rows.append(row)
-
-    bp_df = pd.DataFrame(bp_rows)
+    bp_df = compute_sweep(base_df, [beta for _, beta, _ in scenarios])
+    bp_df["name"] = [name for name, _, _ in scenarios]
     # Reorder columns
     cols = ["name", "tsac_pct", "sosac_pct", "iusaf_pct", "gini", "spearman",
             "band_preserved", "b5_mean", "b6_mean", "b5_b6_margin_pct",
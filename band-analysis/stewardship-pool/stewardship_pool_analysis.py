@@ -24,6 +24,10 @@ Balance points:
   - Gini-minimum:    TSAC = 2.5%, SOSAC = 3%
   - Boundary:        TSAC = 3.0%, SOSAC = 3%
 
+The pool volumes are exact percentage splits of the fund. They are
+cross-checked against the calculator, which computes each balance point's
+shares once and monetises them at all six fund sizes in one broadcast.
+
 Usage:
   python3 stewardship_pool_analysis.py
 """
@@ -34,8 +38,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
 import pandas as pd
 from pathlib import Path
-from cali_model.data_loader import load_data, get_base_data
-from cali_model.calculator import calculate_allocations
+from cali_model.data_loader import load_base_data
+from cali_model.calculator import calculate_shares
 
 # ── Configuration ────────────────────────────────────────────────────────────
 FUND_SIZES = [50_000_000, 200_000_000, 500_000_000, 1_000_000_000, 5_000_000_000, 10_000_000_000]
@@ -54,6 +58,7 @@ BALANCE_POINTS = [
 
 OUT_DIR = Path(__file__).resolve().parent
 OUT_DIR.mkdir(parents=True, exist_ok=True)
+REPO = OUT_DIR.parent.parent
 
 
 def compute_pool_volumes(con) -> pd.DataFrame:
@@ -92,6 +97,36 @@ def compute_pool_volumes(con) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 
+def engine_component_totals(base_df: pd.DataFrame) -> pd.DataFrame:
+    """Eligible-Party component totals (USD millions) from the calculator.
+
+    One share computation per balance point; `monetize_many()` scales it to
+    every fund size in a single broadcast multiply.
+    """
+    rows = []
+    for bp_name, beta, gamma in BALANCE_POINTS:
+        shares = calculate_shares(
+            base_df,
+            exclude_high_income=EXCLUDE_HI,
+            high_income_mode=HI_MODE,
+            tsac_beta=beta,
+            sosac_gamma=gamma,
+            un_scale_mode=UN_SCALE,
+        )
+        money = shares.monetize_many(FUND_SIZES, IPLC_PCT)
+        eligible = shares.shares["eligible"].to_numpy(dtype=bool)
+        for k, label in enumerate(FUND_LABELS):
+            rows.append({
+                "balance_point": bp_name,
+                "fund_label": label,
+                "iusaf_m": money["component_iusaf_amt"][k, eligible].sum(),
+                "tsac_m": money["component_tsac_amt"][k, eligible].sum(),
+                "sosac_m": money["component_sosac_amt"][k, eligible].sum(),
+                "total_m": money["total_allocation"][k, eligible].sum(),
+            })
+    return pd.DataFrame(rows)
+
+
 def compute_pool_table(rows_df: pd.DataFrame) -> pd.DataFrame:
     """Generate Table E2: Stewardship pool by balance point and fund size."""
     pivot = rows_df.pivot_table(
@@ -198,6 +233,16 @@ def main():
             assert abs(check - expected) < 0.2, f"Mismatch: {check} != {expected}"
     print("  All checks passed: IUSAF + Pool = Fund size ✓")
 
+    print("\nVerification (calculator component totals = percentage splits):")
+    engine = engine_component_totals(load_base_data(REPO / "data-raw"))
+    merged = rows_df.merge(engine, on=["balance_point", "fund_label"], suffixes=("", "_engine"))
+    for col in ["iusaf_m", "tsac_m", "sosac_m"]:
+        gap = (merged[col] - merged[f"{col}_engine"]).abs().max()
+        assert gap < 0.06, f"{col}: calculator differs by {gap:.3f}m"
+    gap = (merged["fund_size_usd"] / 1_000_000 - merged["total_m"]).abs().max()
+    assert gap < 1e-6, f"Calculator total differs from fund size by {gap}"
+    print("  All checks passed: calculator matches the percentage splits ✓")
+
 
 if __name__ == "__main__":
     main()
@@ -29,7 +29,6 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-import duckdb
 import pandas as pd
 import numpy as np
 from docx import Document
@@ -39,8 +38,8 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import nsdecls
 from docx.oxml import parse_xml
 
-from cali_model.data_loader import load_data, get_base_data
-from cali_model.calculator import calculate_allocations
+from cali_model.data_loader import load_base_data
+from cali_model.calculator import calculate_allocations, calculate_shares
 
 # ── Configuration ────────────────────────────────────────────────────────────
 
@@ -116,8 +115,28 @@ def _gini(values):
     return float((2 * np.sum(idx * v) - (n + 1) * np.sum(v)) / (n * np.sum(v)))
 
 
-def generate_scenario(con, fund_size, scenario):
-    """Generate CSV, MD, and DOCX for one scenario at one fund size."""
+def share_scenario(scenario):
+    """Calculator keyword arguments for one scenario, without the fund size and IPLC split."""
+    return dict(
+        exclude_high_income=EXCLUDE_HI,
+        high_income_mode=HI_MODE,
+        tsac_beta=scenario["beta"],
+        sosac_gamma=scenario["gamma"],
+        equality_mode=False,
+        un_scale_mode=UN_SCALE,
+    )
+
+
+def allocation_scenario(fund_size, scenario):
+    """Calculator keyword arguments for one scenario at one fund size."""
+    return dict(fund_size=fund_size["amount"], iplc_share_pct=IPLC, **share_scenario(scenario))
+
+
+def generate_scenario(base_df, fund_size, scenario, df=None):
+    """Generate CSV, MD, and DOCX for one scenario at one fund size.
+
+    `df` is the scenario's calculator frame when it has already been computed.
+    """
     sid = scenario["id"]
     sname = scenario["name"]
     beta = scenario["beta"]
@@ -126,15 +145,8 @@ def generate_scenario(con, fund_size, scenario):
     fund_label = fund_size["label"]
     fund_display = fund_size["display"]
 
-    base_df = get_base_data(con)
-    df = calculate_allocations(
-        base_df, fund, IPLC,
-        exclude_high_income=EXCLUDE_HI,
-        high_income_mode=HI_MODE,
-        tsac_beta=beta, sosac_gamma=gamma,
-        equality_mode=False,
-        un_scale_mode=UN_SCALE,
-    )
+    if df is None:
+        df = calculate_allocations(base_df, **allocation_scenario(fund_size, scenario))
 
     # Filter to eligible, sort by allocation desc then party name asc
     eligible = df[df['eligible']].copy()
@@ -320,18 +332,20 @@ def generate_scenario(con, fund_size, scenario):
 
 def main():
     print("Generating country annex tables for all fund sizes...")
-    con = duckdb.connect(database=":memory:")
-    load_data(con)
+    base_df = load_base_data()
+
+    # Shares do not depend on the fund size: compute each scenario once and
+    # monetise it at every fund size
+    shares = {scenario["id"]: calculate_shares(base_df, **share_scenario(scenario)) for scenario in SCENARIOS}
 
     for fund_size in FUND_SIZES:
-        fund_label = fund_size["label"]
-        fund_display = fund_size["display"]
         print(f"\n{'='*60}")
-        print(f"Fund size: USD {fund_display}")
+        print(f"Fund size: USD {fund_size['display']}")
         print(f"{'='*60}")
         for scenario in SCENARIOS:
             print(f"\n  {scenario['name']} (beta={scenario['beta']}, gamma={scenario['gamma']})")
-            generate_scenario(con, fund_size, scenario)
+            df = shares[scenario["id"]].monetize(fund_size["amount"], IPLC).to_frame()
+            generate_scenario(base_df, fund_size, scenario, df=df)
 
     print(f"\nDone. All {len(FUND_SIZES)} fund sizes × {len(SCENARIOS)} scenarios generated.")
 
@@ -20,7 +20,6 @@ import matplotlib.ticker as mticker
 import numpy as np
 import os
 import sys
-import duckdb
 from datetime import datetime, timezone
 
 # --- Paths ---
@@ -38,16 +37,12 @@ NAME_MAP_CSV = os.path.join(DATA_RAW, "manual_name_map.csv")
 
 # Use the model's own data loading pipeline for consistency
 sys.path.insert(0, SRC_DIR)
-from cali_model.data_loader import load_data, get_base_data
+from cali_model.data_loader import load_base_data
 
 
 def load_model_data():
     """Load data using the model's own pipeline (ensures consistent Party list)."""
-    con = duckdb.connect()
-    load_data(con)
-    df = get_base_data(con)
-    con.close()
-    return df
+    return load_base_data(DATA_RAW)
 
 
 def build_full_distribution(df):
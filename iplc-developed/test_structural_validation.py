@@ -67,20 +67,16 @@ def _compute_option1(base_df, fund_usd):
 def _compute_option2(base_df, fund_usd):
     """Option 2: banded IUSAF with 9 developed countries made eligible.
 
-    Temporarily override WB Income Group so the 9 pass the exclude_hi filter.
+    Per-Party eligibility overrides let the 9 past the exclude_hi filter
+    without copying the base frame.
     """
-    df = base_df.copy()
-    for country in DEVELOPED_COUNTRIES:
-        mask = df["party"] == country
-        if mask.any():
-            df.loc[mask, "WB Income Group"] = "Upper middle income"
-
     return calculate_allocations(
-        df, fund_usd, IPLC_SHARE_PCT,
+        base_df, fund_usd, IPLC_SHARE_PCT,
         exclude_high_income=True,
         equality_mode=False,
         tsac_beta=0.0, sosac_gamma=0.0,
         un_scale_mode="band_inversion",
+        eligibility_overrides={country: True for country in DEVELOPED_COUNTRIES},
     )
 
 
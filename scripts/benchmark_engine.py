@@ -0,0 +1,299 @@
+"""Micro-benchmarks for the allocation engine hot paths.
+
+Times the vectorised engine paths against the per-row reference paths they
+replaced so regressions show up before they reach the sweep scripts.
+
+Usage:
+    python3 scripts/benchmark_engine.py
+    python3 scripts/benchmark_engine.py --repeat 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+# ── repo root ────────────────────────────────────────────────────────────────
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "src"))
+
+from cali_model.calculator import (
+    assign_un_band,
+    assign_un_bands,
+    calculate_allocations,
+    calculate_allocations_batch,
+    calculate_allocations_batch_cached,
+    clear_component_basis_cache,
+    clear_scenario_cache,
+    get_component_basis,
+    compile_band_table,
+    get_band_table,
+    load_band_config,
+)
+from cali_model.data_loader import get_base_data, load_base_data, load_data
+from cali_model.sensitivity_metrics import (
+    batch_metric_arrays,
+    build_pure_iusaf_comparator,
+    compute_metrics,
+    compute_metrics_arrays,
+    compute_local_stability_batch,
+    compute_local_stability_metrics,
+    compute_metrics_batch,
+)
+from cali_model.sensitivity_scenarios import DEFAULT_BASELINE, get_default_ranges, get_scenario_library, two_way_grid
+
+
+# ── Helpers ──────────────────────────────────────────────────────────────────
+
+def _base_df() -> pd.DataFrame:
+    return load_base_data()
+
+
+def _best_of(fn, number: int, repeat: int) -> float:
+    """Best mean wall time per call in seconds."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def _report(name: str, reference_s: float, engine_s: float) -> None:
+    speedup = reference_s / engine_s if engine_s > 0 else float("inf")
+    print(
+        f"  {name:32s} reference={reference_s * 1e3:9.3f} ms  "
+        f"engine={engine_s * 1e3:9.3f} ms  speedup={speedup:7.1f}x"
+    )
+
+
+# ── Benchmarks ───────────────────────────────────────────────────────────────
+
+def bench_band_assignment(base_df: pd.DataFrame, repeat: int) -> None:
+    """Per-row assign_un_band + .loc writes vs one searchsorted pass."""
+    config = load_band_config()
+    band_table = compile_band_table(config)
+    eligible_idx = base_df.index[base_df["is_cbd_party"] & base_df["un_share"].notna()]
+
+    def reference():
+        frame = base_df.copy()
+        frame["un_band"] = None
+        frame["un_band_weight"] = 1.0
+        for idx in eligible_idx:
+            label, weight = assign_un_band(float(frame.loc[idx, "un_share"]), config)
+            frame.loc[idx, "un_band"] = label
+            frame.loc[idx, "un_band_weight"] = weight
+
+    def engine():
+        frame = base_df.copy()
+        frame["un_band"] = None
+        frame["un_band_weight"] = 1.0
+        labels, weights = assign_un_bands(frame.loc[eligible_idx, "un_share"], band_table)
+        frame.loc[eligible_idx, "un_band"] = labels
+        frame.loc[eligible_idx, "un_band_weight"] = weights
+
+    _report("band assignment", _best_of(reference, 5, repeat), _best_of(engine, 50, repeat))
+
+
+def bench_band_config(repeat: int) -> None:
+    """YAML read + compile on every call vs the mtime-keyed cached table."""
+    get_band_table()
+
+    def reference():
+        compile_band_table(load_band_config())
+
+    _report("band config load", _best_of(reference, 20, repeat), _best_of(get_band_table, 2000, repeat))
+
+
+def bench_component_basis(base_df: pd.DataFrame, repeat: int) -> None:
+    """Component shares rebuilt on every call vs the memoised basis."""
+    kwargs = dict(exclude_high_income=True, un_scale_mode="band_inversion")
+
+    def reference():
+        clear_component_basis_cache()
+        get_component_basis(base_df, **kwargs)
+
+    _report("component basis", _best_of(reference, 50, repeat), _best_of(lambda: get_component_basis(base_df, **kwargs), 500, repeat))
+
+
+def bench_tsac_sosac_grid(base_df: pd.DataFrame, repeat: int) -> None:
+    """176-cell TSAC x SOSAC grid: one calculate_allocations per cell vs one batch."""
+    ranges = get_default_ranges()
+    grid = two_way_grid(DEFAULT_BASELINE, "tsac_beta", ranges["tsac_beta"], "sosac_gamma", ranges["sosac_gamma"])
+    keys = ("fund_size", "iplc_share_pct", "exclude_high_income", "floor_pct", "ceiling_pct",
+            "tsac_beta", "sosac_gamma", "equality_mode", "un_scale_mode")
+    kwargs = [{k: s[k] for k in keys} for s in grid]
+
+    def reference():
+        for kw in kwargs:
+            calculate_allocations(base_df, **kw)
+
+    def engine():
+        calculate_allocations_batch(base_df, grid)
+
+    _report(f"{len(grid)}-cell grid", _best_of(reference, 1, repeat), _best_of(engine, 20, repeat))
+
+
+def bench_floor_ceiling_grid(base_df: pd.DataFrame, repeat: int) -> None:
+    """Floor x Ceiling grid: one calculate_allocations per cell vs one batch."""
+    floors = [0.0, 0.05, 0.10, 0.25, 0.4, 0.5]
+    ceilings = [None, 0.6, 1.0, 2.0, 5.0]
+    grid = two_way_grid(DEFAULT_BASELINE, "floor_pct", floors, "ceiling_pct", ceilings)
+    keys = ("fund_size", "iplc_share_pct", "exclude_high_income", "floor_pct", "ceiling_pct",
+            "tsac_beta", "sosac_gamma", "equality_mode", "un_scale_mode")
+    kwargs = [{k: s[k] for k in keys} for s in grid]
+
+    def reference():
+        for kw in kwargs:
+            calculate_allocations(base_df, **kw)
+
+    def engine():
+        calculate_allocations_batch(base_df, grid)
+
+    _report(f"{len(grid)}-cell floor x ceiling grid", _best_of(reference, 1, repeat), _best_of(engine, 20, repeat))
+
+
+def bench_land_area_overrides(repeat: int) -> None:
+    """get_base_data() with party_master grown by synthetic overrides: iterrows patching vs the SQL COALESCE."""
+    con = duckdb.connect(database=":memory:")
+    load_data(con, base_path=(REPO / "data-raw").as_posix())
+    party_master = con.execute("SELECT * FROM party_master").df()
+
+    def reference():
+        # Pre-v5.1 path: one full-frame mask per override row
+        df = get_base_data(con)
+        pm = con.execute("SELECT party, land_area_km2_override FROM party_master WHERE land_area_km2_override != ''").df()
+        for _, row in pm.iterrows():
+            mask = df["party"] == row["party"]
+            if mask.any():
+                df.loc[mask, "land_area_km2"] = float(row["land_area_km2_override"])
+                df.loc[mask, "has_land_area"] = True
+
+    for extra in (0, 1_000, 10_000):
+        synthetic = party_master.iloc[[0] * extra].copy()
+        synthetic["party"] = [f"Synthetic Party {i}" for i in range(extra)]
+        synthetic["land_area_km2_override"] = "1000"
+        con.register("grown_party_master", pd.concat([party_master, synthetic], ignore_index=True))
+        con.execute("CREATE OR REPLACE TABLE party_master AS SELECT * FROM grown_party_master")
+        con.unregister("grown_party_master")
+
+        _report(
+            f"land-area overrides (+{extra})",
+            _best_of(reference, 1, repeat),
+            _best_of(lambda: get_base_data(con), 1, repeat),
+        )
+
+
+def bench_library_metrics(base_df: pd.DataFrame, repeat: int) -> None:
+    """Scenario-library metrics table: frames + compute_metrics per scenario vs one batch + array kernel."""
+    scenarios = [dict(s, scenario_id=name) for name, s in get_scenario_library().items()]
+    keys = ("fund_size", "iplc_share_pct", "exclude_high_income", "floor_pct", "ceiling_pct",
+            "tsac_beta", "sosac_gamma", "equality_mode", "un_scale_mode")
+    runs = []
+    for s in scenarios:
+        comp = build_pure_iusaf_comparator(s)
+        runs += [s, comp, {**comp, "equality_mode": True}]
+    kwargs = [{k: s[k] for k in keys} for s in runs]
+
+    def reference():
+        for k, s in enumerate(scenarios):
+            frames = [calculate_allocations(base_df, **kw) for kw in kwargs[3 * k:3 * k + 3]]
+            compute_metrics(s, *frames)
+
+    def engine():
+        batch = calculate_allocations_batch(base_df, kwargs)
+        for k, s in enumerate(scenarios):
+            compute_metrics_arrays(s, *(batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3)))
+
+    _report(f"{len(scenarios)}-scenario metrics table", _best_of(reference, 1, repeat), _best_of(engine, 5, repeat))
+
+
+def bench_metrics_surface(base_df: pd.DataFrame, repeat: int) -> None:
+    """10,000-point TSAC x SOSAC x floor surface: array kernel per scenario vs compute_metrics_batch.
+
+    The per-scenario reference is timed on a 200-point sample and scaled up.
+    """
+    surface = [
+        {**DEFAULT_BASELINE, "tsac_beta": t / 100, "sosac_gamma": g / 200, "floor_pct": f * 0.025}
+        for t in range(25) for g in range(20) for f in range(20)
+    ]
+    comparators = [build_pure_iusaf_comparator(s) for s in surface]
+    sample = surface[::len(surface) // 200]
+
+    def reference():
+        runs = []
+        for s in sample:
+            comp = build_pure_iusaf_comparator(s)
+            runs += [s, comp, {**comp, "equality_mode": True}]
+        batch = calculate_allocations_batch(base_df, runs)
+        for k, s in enumerate(sample):
+            compute_metrics_arrays(s, *(batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3)))
+
+    def engine():
+        n = len(surface)
+        batch = calculate_allocations_batch(base_df, surface + comparators)
+        compute_metrics_batch(
+            batch["final_share"][:n],
+            batch["final_share"][n:],
+            eligible=batch["eligible"][:n],
+            baseline_eligible=batch["eligible"][n:],
+            fund_size=batch["fund_size"][:n],
+        )
+
+    reference_s = _best_of(reference, 1, repeat) * len(surface) / len(sample)
+    _report(f"{len(surface)}-point metrics surface", reference_s, _best_of(engine, 1, repeat))
+
+
+def bench_local_stability(base_df: pd.DataFrame, repeat: int) -> None:
+    """Local stability of every library scenario: one frame per neighbour vs one deduplicated (cached) batch."""
+    scenarios = [dict(s, scenario_id=name) for name, s in get_scenario_library().items()]
+    ranges = get_default_ranges()
+    keys = ("fund_size", "iplc_share_pct", "exclude_high_income", "floor_pct", "ceiling_pct",
+            "tsac_beta", "sosac_gamma", "equality_mode", "un_scale_mode")
+
+    def run_scenario(df, s):
+        return calculate_allocations(df, **{k: s[k] for k in keys if k in s})
+
+    def run_batch(df, ss):
+        return calculate_allocations_batch_cached(df, [{k: s[k] for k in keys if k in s} for s in ss])
+
+    def reference():
+        for s in scenarios:
+            compute_local_stability_metrics(s, run_scenario(base_df, s), base_df, run_scenario, ranges)
+
+    def engine():
+        clear_scenario_cache()
+        compute_local_stability_batch(scenarios, base_df, run_batch, ranges)
+
+    def warm():
+        compute_local_stability_batch(scenarios, base_df, run_batch, ranges)
+
+    reference_s = _best_of(reference, 1, repeat)
+    _report(f"{len(scenarios)}-scenario local stability", reference_s, _best_of(engine, 1, repeat))
+    _report("  ... with warm scenario cache", reference_s, _best_of(warm, 5, repeat))
+
+
+# ── main ─────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocation engine micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats (best is reported)")
+    args = parser.parse_args()
+
+    print("Loading base data ...")
+    base_df = _base_df()
+
+    print("Benchmarks:")
+    bench_band_config(args.repeat)
+    bench_band_assignment(base_df, args.repeat)
+    bench_component_basis(base_df, args.repeat)
+    bench_tsac_sosac_grid(base_df, args.repeat)
+    bench_floor_ceiling_grid(base_df, args.repeat)
+    bench_library_metrics(base_df, args.repeat)
+    bench_metrics_surface(base_df, args.repeat)
+    bench_local_stability(base_df, args.repeat)
+    bench_land_area_overrides(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ Usage:
     python3 scripts/calibrate_banded_tsac.py --preset geometric_base_2
     python3 scripts/calibrate_banded_tsac.py --weights 1 2 4 8 16 32
     python3 scripts/calibrate_banded_tsac.py --preset flat geometric_base_1.5
+    python3 scripts/calibrate_banded_tsac.py --backend process --workers 8
+    python3 scripts/calibrate_banded_tsac.py --parquet data-snapshot/calibration_grids   # streamed, resumable
 
 Outputs go to sensitivity-reports/v4-sensitivity-reports/calibration/.
 """
@@ -15,11 +17,11 @@ Outputs go to sensitivity-reports/v4-sensitivity-reports/calibration/.
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 from pathlib import Path
 from typing import Sequence
 
-import duckdb
 import numpy as np
 import pandas as pd
 import plotly.express as px
@@ -30,13 +32,13 @@ sys.path.insert(0, str(REPO / "src"))
 
 from cali_model.calculator import (
     DEFAULT_TSAC_BAND_LOWER_BOUNDS,
-    calculate_allocations,
+    run_scenario_cached,
+    scenario_cache_info,
 )
-from cali_model.data_loader import get_base_data, load_data
+from cali_model.data_loader import load_base_data
 from cali_model.sensitivity_metrics import (
     compute_component_ratios,
     compute_gini,
-    compute_metrics,
     generate_integrity_checks,
 )
 from cali_model.sensitivity_scenarios import (
@@ -44,6 +46,8 @@ from cali_model.sensitivity_scenarios import (
     get_default_ranges,
     two_way_grid,
 )
+from cali_model.sweep_executor import BACKENDS, SweepExecutor, comparator_metrics_chunk
+from cali_model.sweep_store import read_sweep_parquet, write_sweep_parquet
 
 OUTPUT_DIR = REPO / "sensitivity-reports" / "v4-sensitivity-reports" / "calibration"
 
@@ -62,31 +66,30 @@ PRESETS: dict[str, tuple[float, ...]] = {
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
 def _base_df() -> pd.DataFrame:
-    con = duckdb.connect(database=":memory:")
-    load_data(con)
-    df = get_base_data(con)
-    con.close()
-    return df
+    return load_base_data()
 
 
 def _run(base_df: pd.DataFrame, scenario: dict,
          tsac_mode: str = "banded",
          tsac_band_weights: tuple | None = None,
          tsac_band_lower_bounds: tuple | None = None) -> pd.DataFrame:
-    return calculate_allocations(
+    # Served from the shared scenario cache: sample and Gini-minimum reruns hit grid cells
+    return run_scenario_cached(
         base_df,
-        scenario["fund_size"],
-        scenario["iplc_share_pct"],
-        exclude_high_income=scenario["exclude_high_income"],
-        floor_pct=scenario.get("floor_pct", 0.0),
-        ceiling_pct=scenario.get("ceiling_pct"),
-        tsac_beta=scenario["tsac_beta"],
-        sosac_gamma=scenario["sosac_gamma"],
-        equality_mode=scenario.get("equality_mode", False),
-        un_scale_mode=scenario["un_scale_mode"],
-        tsac_mode=tsac_mode,
-        tsac_band_weights=tsac_band_weights,
-        tsac_band_lower_bounds=tsac_band_lower_bounds,
+        dict(
+            fund_size=scenario["fund_size"],
+            iplc_share_pct=scenario["iplc_share_pct"],
+            exclude_high_income=scenario["exclude_high_income"],
+            floor_pct=scenario.get("floor_pct", 0.0),
+            ceiling_pct=scenario.get("ceiling_pct"),
+            tsac_beta=scenario["tsac_beta"],
+            sosac_gamma=scenario["sosac_gamma"],
+            equality_mode=scenario.get("equality_mode", False),
+            un_scale_mode=scenario["un_scale_mode"],
+            tsac_mode=tsac_mode,
+            tsac_band_weights=tsac_band_weights,
+            tsac_band_lower_bounds=tsac_band_lower_bounds,
+        ),
     )
 
 
@@ -94,58 +97,93 @@ def _run_linear(base_df: pd.DataFrame, scenario: dict) -> pd.DataFrame:
     return _run(base_df, scenario, tsac_mode="linear")
 
 
-def _iusaf_comp(scenario: dict) -> dict:
-    s = dict(scenario)
-    s["tsac_beta"] = 0.0
-    s["sosac_gamma"] = 0.0
-    s["equality_mode"] = False
-    return s
-
-
-def _eq_comp(scenario: dict) -> dict:
-    s = _iusaf_comp(scenario)
-    s["equality_mode"] = True
-    return s
+def _with_tsac(scenario: dict,
+               tsac_band_weights: tuple | None,
+               tsac_band_lower_bounds: tuple | None) -> dict:
+    """Scenario dict carrying the TSAC mode arguments for the batch engine."""
+    return {
+        **scenario,
+        "tsac_mode": "banded" if tsac_band_weights is not None else "linear",
+        "tsac_band_weights": tsac_band_weights,
+        "tsac_band_lower_bounds": tsac_band_lower_bounds,
+    }
 
 
 # ── Grid runner ──────────────────────────────────────────────────────────────
 
-def run_coarse_grid(base_df: pd.DataFrame,
-                    tsac_band_weights: tuple | None = None,
-                    tsac_band_lower_bounds: tuple | None = None,
-                    label: str = "banded") -> pd.DataFrame:
-    """Run coarse TSAC×SOSAC two-way grid with banded TSAC and return metrics."""
+def _coarse_grid(label: str) -> list[dict]:
     ranges = get_default_ranges()
-    scenarios = two_way_grid(
+    return two_way_grid(
         DEFAULT_BASELINE,
         "tsac_beta", ranges["tsac_beta"],
         "sosac_gamma", ranges["sosac_gamma"],
         f"calib_{label}",
     )
 
-    is_banded = tsac_band_weights is not None
-    mode = "banded" if is_banded else "linear"
 
-    rows = []
-    for s in scenarios:
-        if is_banded:
-            res = _run(base_df, s, tsac_mode="banded",
-                       tsac_band_weights=tsac_band_weights,
-                       tsac_band_lower_bounds=tsac_band_lower_bounds)
-        else:
-            res = _run_linear(base_df, s)
+def run_coarse_grids(base_df: pd.DataFrame,
+                     configs: Sequence[tuple[str, tuple | None]],
+                     tsac_band_lower_bounds: tuple | None = None,
+                     executor: SweepExecutor | None = None) -> dict[str, pd.DataFrame]:
+    """Run the coarse TSAC×SOSAC grid for every (label, band weights) config.
+
+    All configs × 176 scenarios go through one `SweepExecutor` (serial unless
+    one is passed in), chunked so that each chunk is a single cached batch of
+    the scenarios and their pure-IUSAF and equality comparators. `None`
+    weights mean linear TSAC.
+    """
+    grid_scenarios = {label: _coarse_grid(label) for label, _ in configs}
+    batch_scenarios = []
+    for label, weights in configs:
+        for s in grid_scenarios[label]:
+            batch_scenarios.append(_with_tsac(s, weights, tsac_band_lower_bounds))
+
+    executor = executor if executor is not None else SweepExecutor(base_df, comparator_metrics_chunk)
+    rows = executor.map(batch_scenarios)
+    return {label: pd.DataFrame([next(rows) for _ in grid_scenarios[label]]) for label, _ in configs}
+
+
+def stream_coarse_grids(base_df: pd.DataFrame,
+                        configs: Sequence[tuple[str, tuple | None]],
+                        out_dir: Path,
+                        tsac_band_lower_bounds: tuple | None = None,
+                        executor: SweepExecutor | None = None,
+                        resume: bool = True) -> dict:
+    """`run_coarse_grids()` written to Parquet under `out_dir`, partitioned by config.
+
+    Rows go to disk as they are computed and an interrupted run continues
+    from its checkpoint. Read a config's grid back with
+    `read_coarse_grid()`. Returns the store's checkpoint.
+    """
+    def scenarios():
+        for label, weights in configs:
+            for s in _coarse_grid(label):
+                yield {**_with_tsac(s, weights, tsac_band_lower_bounds), "config": label}
+
+    sweep_id = f"calibration:{list(configs)!r}:{tsac_band_lower_bounds!r}"
+    return write_sweep_parquet(
+        base_df, scenarios(), out_dir, sweep_id,
+        partition_by=("config",),
+        metrics_fn=comparator_metrics_chunk,
+        scenario_columns=("config",),
+        executor=executor,
+        resume=resume,
+    )
+
 
-        iusaf_res = _run(base_df, _iusaf_comp(s), tsac_mode=mode,
-                         tsac_band_weights=tsac_band_weights,
-                         tsac_band_lower_bounds=tsac_band_lower_bounds)
-        eq_res = _run(base_df, _eq_comp(s), tsac_mode=mode,
-                       tsac_band_weights=tsac_band_weights,
-                       tsac_band_lower_bounds=tsac_band_lower_bounds)
-        m = compute_metrics(s, res, iusaf_res, eq_res)
-        rows.append(m)
+def read_coarse_grid(out_dir: Path, label: str) -> pd.DataFrame:
+    """One config's grid from `stream_coarse_grids()`, with the `run_coarse_grids()` columns."""
+    grid = read_sweep_parquet(out_dir, where={"config": label})
+    return grid.drop(columns=["sweep_index", "config"])
 
-    grid_df = pd.DataFrame(rows)
-    return grid_df
+
+def run_coarse_grid(base_df: pd.DataFrame,
+                    tsac_band_weights: tuple | None = None,
+                    tsac_band_lower_bounds: tuple | None = None,
+                    label: str = "banded") -> pd.DataFrame:
+    """Run coarse TSAC×SOSAC two-way grid with banded TSAC and return metrics."""
+    grids = run_coarse_grids(base_df, [(label, tsac_band_weights)], tsac_band_lower_bounds)
+    return grids[label]
 
 
 # ── Headline metrics per config ─────────────────────────────────────────────
@@ -365,6 +403,17 @@ def main():
         "--weights", nargs=6, type=float, default=None,
         help="Explicit band weights (6 floats): W1 W2 W3 W4 W5 W6",
     )
+    parser.add_argument(
+        "--backend", choices=BACKENDS, default=None,
+        help="Grid execution backend (default: process with more than one worker, else serial)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker count (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Scenarios per worker task")
+    parser.add_argument(
+        "--parquet", type=Path, default=None,
+        help="Stream grid rows to partitioned Parquet in this directory, resuming an interrupted run",
+    )
+    parser.add_argument("--no-resume", action="store_true", help="With --parquet: start the grids afresh")
     args = parser.parse_args()
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -393,6 +442,18 @@ def main():
     all_top10 = {}
     all_integrity = []
 
+    # Run every coarse grid as one chunked sweep
+    workers = args.workers or os.cpu_count() or 1
+    backend = args.backend or ("process" if workers > 1 else "serial")
+    print(f"\nRunning coarse grids ({len(configs)} configs × 176 scenarios, {backend} backend, {workers} workers) ...")
+    with SweepExecutor(base_df, comparator_metrics_chunk, backend=backend, workers=workers, chunk_size=args.chunk_size) as executor:
+        if args.parquet is not None:
+            state = stream_coarse_grids(base_df, configs, args.parquet, executor=executor, resume=not args.no_resume)
+            print(f"  {state['completed']} scenarios in {args.parquet}")
+            grids = None
+        else:
+            grids = run_coarse_grids(base_df, configs, executor=executor)
+
     for config_name, band_weights in configs:
         print(f"\n{'=' * 60}")
         print(f"Configuration: {config_name}")
@@ -402,9 +463,7 @@ def main():
             print("  Mode: linear (baseline)")
         print(f"{'=' * 60}")
 
-        # Run coarse grid
-        print("  Running coarse grid (176 scenarios) ...")
-        grid_df = run_coarse_grid(base_df, tsac_band_weights=band_weights, label=config_name)
+        grid_df = grids[config_name] if grids is not None else read_coarse_grid(args.parquet, config_name)
 
         # Save grid
         grid_df.to_csv(OUTPUT_DIR / f"{config_name}_grid.csv", index=False)
@@ -456,7 +515,9 @@ def main():
         )
     print("=" * 80)
 
-    print(f"\nAll outputs in {OUTPUT_DIR}")
+    info = scenario_cache_info()["results"]
+    print(f"\nScenario cache: {info['hits']} hits, {info['misses']} misses")
+    print(f"All outputs in {OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
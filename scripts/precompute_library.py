@@ -0,0 +1,54 @@
+"""Precompute the scenario-library cache read by the sensitivity app.
+
+Evaluates every library scenario at every fund-size anchor (comparator
+metrics, local stability and integrity checks), one process per anchor, and
+writes data-snapshot/library_cache-v<version>-<key>.duckdb. The app starts the
+same warm-up in the background; run this before serving to have the cache in
+place for the first session.
+
+Usage:
+    python3 scripts/precompute_library.py
+    python3 scripts/precompute_library.py --refresh
+    python3 scripts/precompute_library.py --workers 0     # in-process
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# ── repo root ────────────────────────────────────────────────────────────────
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "src"))
+
+from cali_model.data_loader import load_base_data
+from cali_model.library_cache import load_library_cache, precompute_library
+
+
+# ── main ─────────────────────────────────────────────────────────────────────
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the sensitivity app's scenario-library cache")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: one per fund size; 0 = in-process)")
+    parser.add_argument("--refresh", action="store_true", help="Recompute even if a current cache file exists")
+    args = parser.parse_args()
+
+    base_path = REPO / "data-raw"
+    base_df = load_base_data(base_path)
+
+    start = time.perf_counter()
+    path = precompute_library(base_df, workers=args.workers, base_path=base_path, refresh=args.refresh)
+    elapsed = time.perf_counter() - start
+
+    cached = load_library_cache(base_df, base_path=base_path)
+    if cached is None:
+        print(f"Could not write {path}")
+        sys.exit(1)
+    n_rows = sum(len(tables["metrics"]) for tables in cached.values())
+    print(f"{path.relative_to(REPO)}: {len(cached)} fund sizes, {n_rows} scenario rows ({elapsed:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
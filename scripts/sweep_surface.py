@@ -0,0 +1,114 @@
+"""Dense TSAC × SOSAC × floor × fund-size surface, streamed to partitioned Parquet.
+
+Evaluates every grid point (heatmap metrics vs pure IUSAF, optionally the
+per-Party allocations) and writes the rows as they are computed, one Hive
+partition per fund size, under data-snapshot/surface/ by default. An
+interrupted run (Ctrl-C, crash) resumes from its checkpoint when started
+again with the same arguments.
+
+Usage:
+    python3 scripts/sweep_surface.py                          # 0.1% steps, metrics only
+    python3 scripts/sweep_surface.py --step 0.0025 --long     # plus per-Party rows
+    python3 scripts/sweep_surface.py --backend process --workers 8
+    python3 scripts/sweep_surface.py --no-resume              # discard a previous run
+
+Read the result with cali_model.sweep_store.read_sweep_parquet(out_dir)
+or any Parquet reader (e.g. DuckDB's read_parquet with hive_partitioning).
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import sys
+import time
+from pathlib import Path
+
+# ── repo root ────────────────────────────────────────────────────────────────
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO / "src"))
+
+from cali_model.data_loader import SNAPSHOT_DIR_NAME, load_base_data
+from cali_model.sensitivity_scenarios import DEFAULT_BASELINE, get_default_ranges
+from cali_model.sweep_executor import BACKENDS, SweepExecutor
+from cali_model.sweep_store import DEFAULT_FLUSH_EVERY, read_checkpoint, write_sweep_parquet
+
+
+# ── Surface ──────────────────────────────────────────────────────────────────
+
+def _steps(maximum: float, step: float) -> list[float]:
+    return [round(i * step, 6) for i in range(int(round(maximum / step)) + 1)]
+
+
+def surface_scenarios(tsac_values, sosac_values, floor_values, fund_sizes):
+    """Yield the grid scenarios lazily, fund size outermost (one partition at a time)."""
+    for fund_size, floor, beta, gamma in itertools.product(fund_sizes, floor_values, tsac_values, sosac_values):
+        if beta + gamma >= 1.0:
+            continue
+        yield {
+            **DEFAULT_BASELINE,
+            "fund_size": fund_size,
+            "floor_pct": floor,
+            "tsac_beta": beta,
+            "sosac_gamma": gamma,
+            "scenario_id": f"surface_{fund_size:.0f}_f{floor}_t{beta}_s{gamma}",
+        }
+
+
+# ── main ─────────────────────────────────────────────────────────────────────
+
+def main():
+    ranges = get_default_ranges()
+    parser = argparse.ArgumentParser(description="Stream a dense TSAC × SOSAC × floor × fund-size surface to Parquet")
+    parser.add_argument("--step", type=float, default=0.001, help="TSAC and SOSAC step (default 0.001 = 0.1%%)")
+    parser.add_argument("--tsac-max", type=float, default=max(ranges["tsac_beta"]))
+    parser.add_argument("--sosac-max", type=float, default=max(ranges["sosac_gamma"]))
+    parser.add_argument("--floors", nargs="*", type=float, default=ranges["floor_pct"])
+    parser.add_argument("--fund-sizes", nargs="*", type=float, default=ranges["fund_size"])
+    parser.add_argument("--long", action="store_true", help="Also write per-Party rows (about 200× the metric rows)")
+    parser.add_argument("--out", type=Path, default=REPO / SNAPSHOT_DIR_NAME / "surface")
+    parser.add_argument("--backend", choices=BACKENDS, default=None,
+                        help="Execution backend (default: process with more than one worker, else serial)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker count (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Scenarios per worker task")
+    parser.add_argument("--flush-every", type=int, default=DEFAULT_FLUSH_EVERY, help="Scenarios per Parquet part")
+    parser.add_argument("--no-resume", action="store_true", help="Discard an existing run in --out")
+    args = parser.parse_args()
+
+    tsac_values = _steps(args.tsac_max, args.step)
+    sosac_values = _steps(args.sosac_max, args.step)
+    fund_sizes = [float(f) for f in args.fund_sizes]
+    total = len(fund_sizes) * len(args.floors) * sum(1 for b in tsac_values for g in sosac_values if b + g < 1.0)
+    sweep_id = f"surface:step={args.step}:tsac<={args.tsac_max}:sosac<={args.sosac_max}:floors={args.floors}:funds={fund_sizes}"
+
+    base_df = load_base_data(REPO / "data-raw")
+    workers = args.workers or os.cpu_count() or 1
+    backend = args.backend or ("process" if workers > 1 else "serial")
+    print(f"{total} scenarios → {args.out} ({backend} backend, {workers} workers)")
+
+    start = time.perf_counter()
+    try:
+        with SweepExecutor(base_df, backend=backend, workers=workers, chunk_size=args.chunk_size) as executor:
+            state = write_sweep_parquet(
+                base_df,
+                surface_scenarios(tsac_values, sosac_values, args.floors, fund_sizes),
+                args.out,
+                sweep_id,
+                partition_by=("fund_size",),
+                long_format=args.long,
+                executor=executor,
+                flush_every=args.flush_every,
+                resume=not args.no_resume,
+            )
+    except KeyboardInterrupt:
+        state = read_checkpoint(args.out)
+        print(f"\nInterrupted after {state['completed']}/{total} scenarios; rerun the same command to resume")
+        sys.exit(130)
+    elapsed = time.perf_counter() - start
+    status = "complete" if state["complete"] else "incomplete"
+    print(f"{state['completed']}/{total} scenarios ({status}), {state['parts']} parts, {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,9 @@
 import streamlit as st
-import duckdb
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 import numpy as np
-from cali_model.data_loader import load_data, get_base_data
+from cali_model.data_loader import shared_base_data
 from cali_model.calculator import calculate_allocations, aggregate_by_region, aggregate_eu, aggregate_special_groups, aggregate_by_income, add_total_row, get_stewardship_blend_feedback, get_outcome_warning_feedback
 
 st.set_page_config(page_title="Cali Fund Allocation Model (Inverted UN Scale Option)", layout="wide")
@@ -43,11 +42,9 @@ The IPLC component is presented as integral to the formula and is consistent wit
 All figures are illustrative modelling outputs for exploratory purposes. They do not represent entitlements or predetermined disbursements. The model has no formal status.
 """)
 
-# Initialize connection and data
-if 'con' not in st.session_state:
-    st.session_state.con = duckdb.connect(database=':memory:')
-    load_data(st.session_state.con)
-    st.session_state.base_df = get_base_data(st.session_state.con)
+# Initialize data: every session references the same process-wide read-only frame
+if 'base_df' not in st.session_state:
+    st.session_state.base_df = shared_base_data()
 
 # Initialize widget states
 if "fund_size_bn" not in st.session_state:
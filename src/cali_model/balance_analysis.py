@@ -5,11 +5,15 @@ Balance condition: tsac_component_i / iusaf_component_i <= 1.0 for all eligible
 """
 from __future__ import annotations
 
+from itertools import islice
 from typing import Callable
 
 import numpy as np
 import pandas as pd
 
+from cali_model.calculator import batch_scenario_frame
+from cali_model.sensitivity_metrics import compute_metrics_batch
+
 
 # Parameter naming convention
 # ----------------------------
@@ -21,6 +25,9 @@ import pandas as pd
 # Display labels in user-facing surfaces use “TSAC weight” and “SOSAC weight” for clarity.
 
 
+_BATCH_SWEEP_METRICS = ("spearman_vs_pure_iusaf", "gini_coefficient", "pct_below_equality")
+
+
 def _band_mean(eligible_df: pd.DataFrame, band_prefix: str) -> float | None:
     """Mean per-party allocation for a band (e.g. 'Band 5' matches 'Band 5: ...')."""
     if eligible_df.empty or "un_band" not in eligible_df.columns:
@@ -38,7 +45,70 @@ def _band_order_preserved(eligible_df: pd.DataFrame) -> bool | None:
     return b6 < b5
 
 
-def run_fine_sweep(
+def _sweep_row(
+    sweep_param: str,
+    val: float,
+    metrics: dict,
+    ratios: dict,
+    results: pd.DataFrame,
+    iusaf_results: pd.DataFrame,
+) -> dict:
+    eligible = results[results["eligible"]]
+
+    band1_alloc = None
+    b1_pct_change = None
+    if "un_band" in eligible.columns:
+        b1 = eligible[eligible["un_band"].str.startswith("Band 1", na=False)]
+        b1_ref = iusaf_results[
+            iusaf_results["eligible"] & iusaf_results["un_band"].str.startswith("Band 1", na=False)
+        ]
+        if not b1.empty:
+            band1_alloc = float(b1["total_allocation"].mean())
+            if not b1_ref.empty:
+                ref_mean = float(b1_ref["total_allocation"].mean())
+                b1_pct_change = (
+                    (float(b1["total_allocation"].mean()) - ref_mean) / ref_mean * 100
+                    if ref_mean > 0
+                    else None
+                )
+
+    sids_total = (
+        float(eligible.loc[eligible["is_sids"], "total_allocation"].sum())
+        if "is_sids" in eligible.columns
+        else None
+    )
+    if "UN LDC" in eligible.columns:
+        ldc_mask = eligible["UN LDC"].eq("LDC")
+    elif "is_ldc" in eligible.columns:
+        ldc_mask = eligible["is_ldc"]
+    else:
+        ldc_mask = None
+    ldc_total = float(eligible.loc[ldc_mask, "total_allocation"].sum()) if ldc_mask is not None else None
+
+    return {
+        "sweep_param": sweep_param,
+        "sweep_value": val,
+        "spearman_vs_pure_iusaf": metrics.get("spearman_vs_pure_iusaf"),
+        "gini_coefficient": metrics.get("gini_coefficient"),
+        "pct_below_equality": metrics.get("pct_below_equality"),
+        "max_tsac_iusaf_ratio": ratios["max_tsac_iusaf_ratio"],
+        "max_sosac_iusaf_ratio": ratios["max_sosac_iusaf_ratio"],
+        "max_sosac_ratio_parties": ratios["max_sosac_ratio_parties"],
+        "china_tsac_iusaf_ratio": ratios["china_tsac_iusaf_ratio"],
+        "brazil_tsac_iusaf_ratio": ratios["brazil_tsac_iusaf_ratio"],
+        "n_parties_tsac_dominant": ratios["n_parties_tsac_dominant"],
+        "tsac_balance_exceeded": ratios["tsac_balance_exceeded"],
+        "band1_per_party_alloc_m": band1_alloc,
+        "band1_pct_change_vs_iusaf": b1_pct_change,
+        "sids_total_m": sids_total,
+        "ldc_total_m": ldc_total,
+        "band6_mean_alloc_m": _band_mean(eligible, "Band 6"),
+        "band5_mean_alloc_m": _band_mean(eligible, "Band 5"),
+        "band_order_preserved": _band_order_preserved(eligible),
+    }
+
+
+def iter_fine_sweep(
     base_scenario: dict,
     base_df: "pd.DataFrame",
     run_scenario_fn: Callable,
@@ -46,22 +116,61 @@ def run_fine_sweep(
     compute_component_ratios_fn: Callable,
     build_pure_iusaf_fn: Callable,
     sweep_param: str = "tsac_beta",
-    values: list[float] | None = None,
-) -> pd.DataFrame:
+    values=None,
+    run_batch_fn: Callable | None = None,
+    chunk_size: int = 64,
+):
+    """Yield one row of balance diagnostics per value of `sweep_param`.
+
+    `values` may be any iterable, consumed lazily. With
+    `run_batch_fn(base_df, scenarios)` (returning a
+    `calculate_allocations_batch()` result) each `chunk_size` values and their
+    pure-IUSAF comparators run as one batch and the Spearman / Gini /
+    below-equality columns come from `compute_metrics_batch()`;
+    `run_scenario_fn` and `compute_metrics_fn` are then unused.
+    """
     if values is None:
         values = [round(x * 0.005, 3) for x in range(21)]
 
-    rows = []
-    for val in values:
-        s = dict(base_scenario)
-        s[sweep_param] = val
-        s["scenario_id"] = f"{sweep_param}_fine_{val:.3f}"
+    def _sweep():
+        for val in values:
+            s = dict(base_scenario)
+            s[sweep_param] = val
+            s["scenario_id"] = f"{sweep_param}_fine_{val:.3f}"
 
-        if float(s.get("tsac_beta", 0)) + float(s.get("sosac_gamma", 0)) >= 1.0:
-            continue
+            if float(s.get("tsac_beta", 0)) + float(s.get("sosac_gamma", 0)) >= 1.0:
+                continue
+            yield val, s, build_pure_iusaf_fn(s, keep_constraints=True)
 
+    def _ratios(s: dict, results: pd.DataFrame) -> dict:
+        return compute_component_ratios_fn(
+            results,
+            float(s.get("tsac_beta", 0.0)),
+            float(s.get("sosac_gamma", 0.0)),
+            summary_only=True,
+        )
+
+    sweep = _sweep()
+    if run_batch_fn is not None:
+        while chunk := list(islice(sweep, chunk_size)):
+            n = len(chunk)
+            batch = run_batch_fn(base_df, [s for _, s, _ in chunk] + [iusaf_s for _, _, iusaf_s in chunk])
+            batch_metrics = compute_metrics_batch(
+                batch["final_share"][:n],
+                batch["final_share"][n:],
+                eligible=batch["eligible"][:n],
+                baseline_eligible=batch["eligible"][n:],
+                fund_size=batch["fund_size"][:n],
+            )
+            for k, (val, s, _) in enumerate(chunk):
+                results = batch_scenario_frame(base_df, batch, k)
+                iusaf_results = batch_scenario_frame(base_df, batch, n + k)
+                metrics = {key: float(batch_metrics[key][k]) for key in _BATCH_SWEEP_METRICS}
+                yield _sweep_row(sweep_param, val, metrics, _ratios(s, results), results, iusaf_results)
+        return
+
+    for val, s, iusaf_s in sweep:
         results = run_scenario_fn(base_df, s)
-        iusaf_s = build_pure_iusaf_fn(s, keep_constraints=True)
         iusaf_results = run_scenario_fn(base_df, iusaf_s)
         eq_results = run_scenario_fn(
             base_df,
@@ -69,88 +178,32 @@ def run_fine_sweep(
         )
 
         metrics = compute_metrics_fn(s, results, iusaf_results, eq_results)
-        ratios = compute_component_ratios_fn(
-            results,
-            float(s.get("tsac_beta", 0.0)),
-            float(s.get("sosac_gamma", 0.0)),
-        )
+        yield _sweep_row(sweep_param, val, metrics, _ratios(s, results), results, iusaf_results)
 
-        eligible = results[results["eligible"]]
-
-        band1_alloc = None
-        b1_pct_change = None
-        if "un_band" in eligible.columns:
-            b1 = eligible[eligible["un_band"].str.startswith("Band 1", na=False)]
-            b1_ref = iusaf_results[
-                iusaf_results["eligible"] & iusaf_results["un_band"].str.startswith("Band 1", na=False)
-            ]
-            if not b1.empty:
-                band1_alloc = float(b1["total_allocation"].mean())
-                if not b1_ref.empty:
-                    ref_mean = float(b1_ref["total_allocation"].mean())
-                    b1_pct_change = (
-                        (float(b1["total_allocation"].mean()) - ref_mean) / ref_mean * 100
-                        if ref_mean > 0
-                        else None
-                    )
-
-        sids_total = (
-            float(eligible.loc[eligible["is_sids"], "total_allocation"].sum())
-            if "is_sids" in eligible.columns
-            else None
-        )
-        if "UN LDC" in eligible.columns:
-            ldc_mask = eligible["UN LDC"].eq("LDC")
-        elif "is_ldc" in eligible.columns:
-            ldc_mask = eligible["is_ldc"]
-        else:
-            ldc_mask = None
-        ldc_total = float(eligible.loc[ldc_mask, "total_allocation"].sum()) if ldc_mask is not None else None
-
-        max_sosac_ratio = None
-        max_sosac_ratio_parties = None
-        if not ratios["ratio_df"].empty and "sosac_iusaf_ratio" in ratios["ratio_df"].columns:
-            finite_sosac = ratios["ratio_df"]["sosac_iusaf_ratio"].replace(float("inf"), np.nan).dropna()
-            max_sosac_ratio = float(finite_sosac.max()) if not finite_sosac.empty else 0.0
-            if not finite_sosac.empty:
-                top_party_rows = ratios["ratio_df"].loc[
-                    ratios["ratio_df"]["sosac_iusaf_ratio"].replace(float("inf"), np.nan) == max_sosac_ratio,
-                    "party",
-                ]
-                parties = sorted(str(p) for p in top_party_rows.dropna().tolist())
-                max_sosac_ratio_parties = ", ".join(parties) if parties else None
-
-        rows.append(
-            {
-                "sweep_param": sweep_param,
-                "sweep_value": val,
-                "spearman_vs_pure_iusaf": metrics.get("spearman_vs_pure_iusaf"),
-                "gini_coefficient": metrics.get("gini_coefficient"),
-                "pct_below_equality": metrics.get("pct_below_equality"),
-                "max_tsac_iusaf_ratio": ratios["max_tsac_iusaf_ratio"],
-                "max_sosac_iusaf_ratio": max_sosac_ratio,
-                "max_sosac_ratio_parties": max_sosac_ratio_parties,
-                "china_tsac_iusaf_ratio": ratios["china_tsac_iusaf_ratio"],
-                "brazil_tsac_iusaf_ratio": ratios["brazil_tsac_iusaf_ratio"],
-                "n_parties_tsac_dominant": ratios["n_parties_tsac_dominant"],
-                "tsac_balance_exceeded": ratios["tsac_balance_exceeded"],
-                "band1_per_party_alloc_m": band1_alloc,
-                "band1_pct_change_vs_iusaf": b1_pct_change,
-                "sids_total_m": sids_total,
-                "ldc_total_m": ldc_total,
-                "band6_mean_alloc_m": _band_mean(eligible, "Band 6"),
-                "band5_mean_alloc_m": _band_mean(eligible, "Band 5"),
-                "band_order_preserved": _band_order_preserved(eligible),
-            }
-        )
 
-    return pd.DataFrame(rows)
+def run_fine_sweep(
+    base_scenario: dict,
+    base_df: "pd.DataFrame",
+    run_scenario_fn: Callable,
+    compute_metrics_fn: Callable,
+    compute_component_ratios_fn: Callable,
+    build_pure_iusaf_fn: Callable,
+    sweep_param: str = "tsac_beta",
+    values: list[float] | None = None,
+    run_batch_fn: Callable | None = None,
+) -> pd.DataFrame:
+    """`iter_fine_sweep()` collected into a DataFrame, one row per value of `sweep_param`."""
+    return pd.DataFrame(list(iter_fine_sweep(
+        base_scenario, base_df, run_scenario_fn, compute_metrics_fn, compute_component_ratios_fn,
+        build_pure_iusaf_fn, sweep_param=sweep_param, values=values, run_batch_fn=run_batch_fn,
+    )))
 
 
 def identify_balance_points(
     tsac_sweep_df: pd.DataFrame,
     sosac_sweep_df: pd.DataFrame,
     spearman_safety_floor: float = 0.80,
+    analytical: dict | None = None,
 ) -> dict:
     """Identify balance points from sweep data.
 
@@ -158,7 +211,15 @@ def identify_balance_points(
     band-order preservation (Band 6 mean < Band 5 mean) and a Spearman
     safety floor of 0.80. The band-order constraint is expected to bind;
     the Spearman floor is a diagnostic safety check.
+
+    `analytical` is a `balance_solver.solve_balance_points` result; when
+    given, its SOSAC overturn is reported for a SOSAC balance point beyond
+    the sweep range and the strict, modified and SOSAC points carry their
+    exact weight as `exact_value`.
     """
+    analytical = analytical or {}
+    sosac_estimate = (analytical.get("sosac_overturn") or {}).get("value", 0.174)
+
     def _last_row_where(df: pd.DataFrame, col: str, threshold: float):
         if df.empty or col not in df.columns:
             return None
@@ -177,7 +238,7 @@ def identify_balance_points(
                 "value": None,
                 "above_range": True,
                 "max_ratio_at_sweep_limit": float(last_valid[col]),
-                "analytical_estimate": 0.174,
+                "analytical_estimate": sosac_estimate,
                 "metrics": last_valid.to_dict(),
             }
         return _fmt(_last_row_where(valid_df, col, threshold))
@@ -205,11 +266,16 @@ def identify_balance_points(
     def _fmt(row):
         return {"value": float(row["sweep_value"]), "metrics": row.to_dict()} if row is not None else None
 
+    def _exact(point, key):
+        if point is not None and key in analytical:
+            point["exact_value"] = analytical[key]["value"]
+        return point
+
     return {
-        "strict": _fmt(_last_row_where(tsac_sweep_df, "china_tsac_iusaf_ratio", 1.0)),
-        "modified": _fmt(_last_row_where(tsac_sweep_df, "brazil_tsac_iusaf_ratio", 1.0)),
+        "strict": _exact(_fmt(_last_row_where(tsac_sweep_df, "china_tsac_iusaf_ratio", 1.0)), "strict"),
+        "modified": _exact(_fmt(_last_row_where(tsac_sweep_df, "brazil_tsac_iusaf_ratio", 1.0)), "modified"),
         "gini_minimum": _fmt(_min_gini_preserving_band_order(tsac_sweep_df, spearman_safety_floor)),
-        "sosac": _sosac_result(sosac_sweep_df, "max_sosac_iusaf_ratio", 1.0),
+        "sosac": _exact(_sosac_result(sosac_sweep_df, "max_sosac_iusaf_ratio", 1.0), "sosac_overturn"),
     }
 
 
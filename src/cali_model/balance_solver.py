@@ -0,0 +1,204 @@
+"""
+Closed-form balance points from the cached component vectors.
+
+Component amounts are blend weight × normalised component share, so for an
+eligible Party i with IUSAF, TSAC and SOSAC shares u_i, t_i, s_i and
+alpha = 1 - beta - gamma:
+
+    tsac_amt_i / iusaf_amt_i = beta * t_i / (alpha * u_i)
+
+The ratio reaches a target r at beta_i = r(1-gamma)·u_i / (t_i + r·u_i); the
+SOSAC analogue is gamma_i = r(1-beta)·u_i / (s_i + r·u_i). Band means of the
+final share are linear in beta too, so the band-order boundary
+(Band 6 mean = Band 5 mean) is one division. Component amounts are set
+before the floor/ceiling, so only the band boundary needs numeric
+root-finding when those constraints are active.
+"""
+from __future__ import annotations
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from cali_model.calculator import get_component_basis, solve_floor_ceiling_batch
+
+# Scenario keys that select the component basis (as in calculate_allocations)
+_BASIS_KEYS = (
+    "exclude_high_income",
+    "high_income_mode",
+    "un_scale_mode",
+    "band_config",
+    "tsac_mode",
+    "tsac_band_weights",
+    "tsac_band_lower_bounds",
+    "scale_year",
+)
+
+# Grid points scanned for a sign change before bisection (numeric band boundary)
+_BOUNDARY_GRID_POINTS = 201
+
+
+def balance_vectors(base_df: pd.DataFrame, scenario: dict | None = None) -> dict:
+    """Eligibility, component shares and Band 5/6 masks a balance solve reads, from the memoised basis."""
+    scenario = scenario or {}
+    basis = get_component_basis(base_df, **{k: scenario[k] for k in _BASIS_KEYS if k in scenario})
+    eligible = basis["eligible"]
+    band_prefix = np.array([b[:6] if isinstance(b, str) else "" for b in basis["un_band"]])
+    return {
+        "party": base_df["party"].to_numpy(),
+        "eligible": eligible,
+        "iusaf": basis["iusaf_share"],
+        "tsac": basis["tsac_share"],
+        "sosac": basis["sosac_share"],
+        "sids": eligible & (basis["sosac_share"] > 0),
+        "n_sids": basis["n_sids"],
+        "band6": eligible & (band_prefix == "Band 6"),
+        "band5": eligible & (band_prefix == "Band 5"),
+    }
+
+
+def _effective_gamma(vectors: dict, gamma: float) -> float:
+    """SOSAC weight after the no-SIDS fallback, which moves it into IUSAF."""
+    return float(gamma) if vectors["n_sids"] > 0 else 0.0
+
+
+def _crossings(u: np.ndarray, c: np.ndarray, mask: np.ndarray, scale: float, ratio: float) -> np.ndarray:
+    """Weight at which each masked Party's component/IUSAF ratio reaches `ratio`; inf where it never does."""
+    weights = np.full(len(u), np.inf)
+    ok = mask & (u > 0) & (c > 0)
+    weights[ok] = ratio * scale * u[ok] / (c[ok] + ratio * u[ok])
+    return weights
+
+
+def _point(value, party=None, method: str = "closed_form") -> dict:
+    return {"value": None if value is None else float(value), "party": party, "method": method}
+
+
+def _first_crossing(vectors: dict, weights: np.ndarray) -> dict:
+    i = int(np.argmin(weights))
+    if not np.isfinite(weights[i]):
+        return _point(None)
+    return _point(weights[i], str(vectors["party"][i]))
+
+
+def tsac_overturn(vectors: dict, gamma: float = 0.0, ratio: float = 1.0) -> dict:
+    """Lowest TSAC weight at which any eligible Party's TSAC/IUSAF ratio reaches `ratio`, for fixed gamma.
+
+    Parties without an IUSAF share have an infinite ratio at any weight and
+    are left out, as in the finite `max_tsac_iusaf_ratio`.
+    """
+    gamma = _effective_gamma(vectors, gamma)
+    return _first_crossing(
+        vectors, _crossings(vectors["iusaf"], vectors["tsac"], vectors["eligible"], 1.0 - gamma, ratio)
+    )
+
+
+def sosac_overturn(vectors: dict, beta: float = 0.0, ratio: float = 1.0) -> dict:
+    """Lowest SOSAC weight at which any SIDS Party's SOSAC/IUSAF ratio reaches `ratio`, for fixed beta."""
+    if vectors["n_sids"] == 0:
+        return _point(None)
+    return _first_crossing(
+        vectors, _crossings(vectors["iusaf"], vectors["sosac"], vectors["sids"], 1.0 - float(beta), ratio)
+    )
+
+
+def named_balance_point(vectors: dict, fragment: str, gamma: float = 0.0, ratio: float = 1.0) -> dict:
+    """TSAC weight at which the first eligible Party whose name contains `fragment` reaches `ratio`."""
+    pattern = re.compile(fragment, flags=re.IGNORECASE)
+    for i, name in enumerate(vectors["party"]):
+        if vectors["eligible"][i] and isinstance(name, str) and pattern.search(name):
+            gamma = _effective_gamma(vectors, gamma)
+            only = np.zeros(len(vectors["party"]), dtype=bool)
+            only[i] = True
+            weight = _crossings(vectors["iusaf"], vectors["tsac"], only, 1.0 - gamma, ratio)[i]
+            return _point(weight if np.isfinite(weight) else None, name)
+    return _point(None)
+
+
+def _band_gap(vectors: dict, masks, betas: np.ndarray, gamma: float, floor: float, cap: float) -> np.ndarray:
+    """Band 6 mean minus Band 5 mean final share for each beta, after the floor/ceiling."""
+    eligible = vectors["eligible"]
+    alpha = np.where((betas == 0) & (gamma == 0), 1.0, 1.0 - betas - gamma)
+    blended = (
+        alpha[:, None] * vectors["iusaf"][eligible]
+        + betas[:, None] * vectors["tsac"][eligible]
+        + gamma * vectors["sosac"][eligible]
+    )
+    totals = blended.sum(axis=1, keepdims=True)
+    blended = np.divide(blended, totals, out=blended, where=totals > 0)
+    shares = solve_floor_ceiling_batch(blended, floor, cap)
+    b6, b5 = masks[0][eligible], masks[1][eligible]
+    return shares[:, b6].mean(axis=1) - shares[:, b5].mean(axis=1)
+
+
+def band_order_boundary(
+    vectors: dict,
+    gamma: float = 0.0,
+    floor_pct: float = 0.0,
+    ceiling_pct: float | None = None,
+    tol: float = 1e-12,
+) -> dict:
+    """TSAC weight at which the Band 6 mean allocation first reaches the Band 5 mean, for fixed gamma.
+
+    Closed form without a floor or ceiling; with either active, the first
+    sign change on a grid over [0, 1 - gamma) is bisected to `tol`. Returns
+    None when band order does not flip within that range.
+    """
+    if not (vectors["band6"].any() and vectors["band5"].any()):
+        return _point(None)
+    masks = vectors["band6"], vectors["band5"]
+    gamma = _effective_gamma(vectors, gamma)
+    limit = 1.0 - gamma
+    floor = float(floor_pct or 0.0) / 100.0
+
+    if floor <= 0 and ceiling_pct is None:
+        b6, b5 = masks
+
+        def gap(x):
+            return x[b6].mean() - x[b5].mean()
+
+        d_iusaf, d_tsac, d_sosac = gap(vectors["iusaf"]), gap(vectors["tsac"]), gap(vectors["sosac"])
+        slope = d_tsac - d_iusaf
+        if slope == 0:
+            return _point(None)
+        value = -((1.0 - gamma) * d_iusaf + gamma * d_sosac) / slope
+        return _point(value if 0.0 <= value < limit else None)
+
+    cap = 1.0 if ceiling_pct is None else float(ceiling_pct) / 100.0
+    grid = np.linspace(0.0, limit, _BOUNDARY_GRID_POINTS)[:-1]
+    preserved = _band_gap(vectors, masks, grid, gamma, floor, cap) < 0
+    flips = np.flatnonzero(preserved != preserved[0])
+    if not len(flips):
+        return _point(None, method="numeric")
+
+    lo, hi = grid[flips[0] - 1], grid[flips[0]]
+    while hi - lo > tol:
+        mid = 0.5 * (lo + hi)
+        if (_band_gap(vectors, masks, np.array([mid]), gamma, floor, cap)[0] < 0) == preserved[0]:
+            lo = mid
+        else:
+            hi = mid
+    return _point(hi, method="numeric")
+
+
+def solve_balance_points(base_df: pd.DataFrame, scenario: dict | None = None) -> dict:
+    """TSAC/SOSAC overturn, strict and modified balance points and the band-order boundary for a scenario.
+
+    TSAC points hold the scenario's SOSAC weight fixed; the SOSAC overturn
+    holds TSAC at 0, as the SOSAC sweep does. Each entry is a dict with
+    `value` (a weight, or None when not reached), `party` (the binding
+    Party) and `method` ("closed_form" or "numeric").
+    """
+    scenario = scenario or {}
+    vectors = balance_vectors(base_df, scenario)
+    gamma = float(scenario.get("sosac_gamma", 0.0))
+    return {
+        "tsac_overturn": tsac_overturn(vectors, gamma),
+        "sosac_overturn": sosac_overturn(vectors, 0.0),
+        "strict": named_balance_point(vectors, "China", gamma),
+        "modified": named_balance_point(vectors, "Brazil", gamma),
+        "band_order_boundary": band_order_boundary(
+            vectors, gamma, scenario.get("floor_pct", 0.0), scenario.get("ceiling_pct")
+        ),
+    }
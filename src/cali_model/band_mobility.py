@@ -0,0 +1,260 @@
+"""
+Historical UN band mobility and band-crossover risk.
+
+Every assessment year of the UN scale (`load_un_scale_history()`) is
+reclassified under one band table, so the question is: had today's bands
+applied in the past, how often would Parties have crossed them? The history
+is pivoted into a (Parties x years) panel of shares and band positions with
+a single `assign_un_band_positions` call. Window statistics and transition
+counts are then array reductions over that panel, for all Parties and all
+consecutive assessment years at once.
+
+Years are scale years (the columns of `UNGA_scale_of_assessment.csv`, triennial
+since 2003). A window of N years ending at `end_year` holds the scale years
+after `end_year - N`. A Party not assessed in a year has a NaN share and band
+position -1 there, and does not count as a band change.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from cali_model.calculator import assign_un_band_positions, get_band_table
+from cali_model.data_loader import CURRENT_SCALE_YEAR, load_un_scale_history
+
+# Window name -> length in years, as in band-analysis/band-mobility-history/
+MOBILITY_WINDOWS = {"last_20_years": 20, "last_10_years": 10, "last_5_years": 5}
+
+# Percentage change to cross the nearest band edge: bucket label and upper bound
+RISK_BUCKETS = (("<=10%", 10.0), ("<=20%", 20.0))
+# Decimal places of pct_change_to_cross compared when ranking
+_PCT_DECIMALS = 9
+
+
+def band_panel(history: pd.DataFrame | None = None, parties=None, band_config=None) -> dict:
+    """(Parties x years) UN shares and band positions under one band table.
+
+    `history` is a long `party`/`year`/`un_share` table (default
+    `load_un_scale_history()`); `parties` selects and orders the rows (default:
+    every Party in the history). Returns `party` (n), `year` (T, ascending),
+    `un_share` (n x T, NaN when not assessed), `band` (n x T band-table
+    positions, -1 when not assessed) and the `band_table`.
+    """
+    history = load_un_scale_history() if history is None else history
+    band_table = get_band_table(band_config)
+    wide = history.pivot(index="party", columns="year", values="un_share").sort_index(axis=1)
+    if parties is not None:
+        parties = list(parties)
+        missing = [p for p in parties if p not in wide.index]
+        if missing:
+            raise ValueError(f"No UN scale history for: {', '.join(map(str, missing))}")
+        wide = wide.loc[parties]
+    shares = wide.to_numpy(dtype=float)
+    bands = assign_un_band_positions(shares, band_table)
+    bands[np.isnan(shares)] = -1
+    return {
+        "party": wide.index.to_numpy(),
+        "year": wide.columns.to_numpy(dtype=int),
+        "un_share": shares,
+        "band": bands,
+        "band_table": band_table,
+    }
+
+
+def _window_columns(panel: dict, start_year: int, end_year: int) -> np.ndarray:
+    years = panel["year"]
+    return np.flatnonzero((years >= start_year) & (years <= end_year))
+
+
+def transition_counts(panel: dict) -> np.ndarray:
+    """Band transitions between consecutive scale years: (T-1 x B x B) counts.
+
+    Entry [t, i, j] counts Parties in band i in `year[t]` and band j in
+    `year[t + 1]`; Parties not assessed in either year are left out.
+    """
+    bands = panel["band"]
+    n_bands = len(panel["band_table"]["label"])
+    n_pairs = bands.shape[1] - 1
+    if n_pairs < 1:
+        return np.zeros((0, n_bands, n_bands), dtype=int)
+    src, dst = bands[:, :-1], bands[:, 1:]
+    both = (src >= 0) & (dst >= 0)
+    pair = np.broadcast_to(np.arange(n_pairs), src.shape)
+    flat = (pair[both] * n_bands + src[both]) * n_bands + dst[both]
+    return np.bincount(flat, minlength=n_pairs * n_bands * n_bands).reshape(n_pairs, n_bands, n_bands)
+
+
+def mobility_matrix(panel: dict, start_year: int | None = None, end_year: int | None = None,
+                    counts: np.ndarray | None = None) -> pd.DataFrame:
+    """Band-to-band transition counts summed over consecutive scale years in [start_year, end_year].
+
+    Rows are the band held in the earlier year, columns the band in the
+    next; the diagonal counts Parties that stayed. Pass `counts` from
+    `transition_counts()` to reuse it across windows.
+    """
+    counts = transition_counts(panel) if counts is None else counts
+    years = panel["year"]
+    start = years[0] if start_year is None else start_year
+    end = years[-1] if end_year is None else end_year
+    pairs = (years[:-1] >= start) & (years[1:] <= end)
+    labels = pd.Index(panel["band_table"]["label"], name="from_band")
+    return pd.DataFrame(
+        counts[pairs].sum(axis=0), index=labels, columns=pd.Index(labels.copy(), name="to_band")
+    )
+
+
+def _window_stats(panel: dict, cols: np.ndarray) -> dict:
+    """Per-Party statistics of one window of the panel, as arrays."""
+    labels = panel["band_table"]["label"]
+    shares = panel["un_share"][:, cols]
+    bands = panel["band"][:, cols]
+    n, width = bands.shape
+    observed = bands >= 0
+
+    # Position of each Party's previous observed year, to count changes across gaps
+    last_seen = np.where(observed, np.arange(width), -1)
+    last_seen = np.maximum.accumulate(last_seen, axis=1)
+    prev = np.full((n, width), -1)
+    prev[:, 1:] = last_seen[:, :-1]
+    prev_band = np.where(prev >= 0, np.take_along_axis(bands, np.maximum(prev, 0), axis=1), -1)
+    changes = (observed & (prev_band >= 0) & (bands != prev_band)).sum(axis=1)
+
+    # First window column in which each band is seen (width when never)
+    first_seen = np.full((n, len(labels)), width)
+    rows, years = np.nonzero(observed)
+    np.minimum.at(first_seen, (rows, bands[rows, years]), years)
+    seen = first_seen < width
+    order = np.argsort(first_seen, axis=1, kind="stable")
+
+    n_obs = observed.sum(axis=1)
+    any_obs = n_obs > 0
+    first_col = np.argmax(observed, axis=1)
+    last_col = width - 1 - np.argmax(observed[:, ::-1], axis=1)
+    pick = np.arange(n)
+    min_share = np.where(any_obs, np.where(observed, shares, np.inf).min(axis=1), np.nan)
+    max_share = np.where(any_obs, np.where(observed, shares, -np.inf).max(axis=1), np.nan)
+    return {
+        "years_observed": n_obs,
+        "unique_bands": seen.sum(axis=1),
+        "band_changes": changes,
+        "moved_bands": seen.sum(axis=1) > 1,
+        "bands_seen": np.array(
+            ["; ".join(labels[b] for b in order[i] if seen[i, b]) for i in range(n)], dtype=object
+        ),
+        "first_band": np.where(any_obs, labels[bands[pick, first_col]], None),
+        "last_band": np.where(any_obs, labels[bands[pick, last_col]], None),
+        "min_un_share": min_share,
+        "max_un_share": max_share,
+    }
+
+
+def historical_band_mobility(panel: dict, end_year: int | str = CURRENT_SCALE_YEAR,
+                             windows: dict | None = None) -> pd.DataFrame:
+    """Per-Party band mobility over each trailing window ending at `end_year`.
+
+    Columns: `mobility_rank`, `party`, the `end_year` share and band, then per
+    window `<name>_years_observed`, `_unique_bands`, `_band_changes` (between
+    consecutive observed years), `_moved_bands`, `_bands_seen` (in order of
+    first appearance), `_first_band`, `_last_band`, `_min_un_share` and
+    `_max_un_share`. Ranked by distinct bands seen, shortest window first,
+    then by Party name.
+    """
+    end_year = int(end_year)
+    windows = MOBILITY_WINDOWS if windows is None else windows
+    labels = panel["band_table"]["label"]
+    current = np.flatnonzero(panel["year"] == end_year)
+    if not len(current):
+        raise ValueError(f"No scale year {end_year} in the band panel")
+    current_band = panel["band"][:, current[0]]
+
+    table = pd.DataFrame({
+        "party": panel["party"],
+        f"current_un_share_{end_year}": panel["un_share"][:, current[0]],
+        "current_band": np.where(current_band >= 0, labels[current_band], None),
+    })
+    for name, length in windows.items():
+        stats = _window_stats(panel, _window_columns(panel, end_year - length + 1, end_year))
+        for col, values in stats.items():
+            table[f"{name}_{col}"] = values
+
+    by_length = sorted(windows, key=windows.get)
+    table = table.sort_values(
+        [f"{name}_unique_bands" for name in by_length] + ["party"],
+        ascending=[False] * len(by_length) + [True],
+        kind="stable",
+    ).reset_index(drop=True)
+    table.insert(0, "mobility_rank", np.arange(1, len(table) + 1))
+    return table
+
+
+def mobility_summary(mobility: pd.DataFrame, end_year: int | str = CURRENT_SCALE_YEAR,
+                     windows: dict | None = None) -> pd.DataFrame:
+    """Per window: Parties with history, Parties that moved band and their share in percent."""
+    end_year = int(end_year)
+    windows = MOBILITY_WINDOWS if windows is None else windows
+    rows = []
+    for name, length in windows.items():
+        with_history = int((mobility[f"{name}_years_observed"] > 0).sum())
+        moved = int(mobility[f"{name}_moved_bands"].sum())
+        rows.append({
+            "window": name,
+            "years": f"{end_year - length + 1}-{end_year}",
+            "parties_with_history": with_history,
+            "parties_that_moved": moved,
+            "share_that_moved_pct": 100.0 * moved / with_history if with_history else np.nan,
+        })
+    return pd.DataFrame(rows)
+
+
+def band_crossover_risk(panel: dict, year: int | str = CURRENT_SCALE_YEAR) -> pd.DataFrame:
+    """Distance of every Party's `year` share to the nearest edge of its band.
+
+    A band is `min_threshold < un_share <= max_threshold`, so a Party on its
+    upper edge crosses with any increase (`exact_threshold_case`). The lowest
+    band has no lower edge and the highest no upper edge. The nearer edge
+    wins; on a tie the upper edge is kept. `pct_change_to_cross` is the margin
+    as a percentage of the share. Ranked by that, then by the absolute
+    margin, band and Party name.
+    """
+    bt = panel["band_table"]
+    col = np.flatnonzero(panel["year"] == int(year))
+    if not len(col):
+        raise ValueError(f"No scale year {year} in the band panel")
+    share = panel["un_share"][:, col[0]]
+    band = panel["band"][:, col[0]]
+    keep = band >= 0
+    share, band, party = share[keep], band[keep], panel["party"][keep]
+    n_bands = len(bt["label"])
+
+    upper = np.where(band < n_bands - 1, bt["max_threshold"][band] - share, np.inf)
+    lower = np.where(band > 0, share - bt["min_threshold"][band], np.inf)
+    use_upper = upper <= lower
+    margin = np.where(use_upper, upper, lower)
+    threshold = np.where(use_upper, bt["max_threshold"][band], bt["min_threshold"][band])
+    pct = margin / share * 100.0
+    exact = margin == 0.0
+
+    bucket = np.full(len(share), ">20%", dtype=object)
+    for label, bound in reversed(RISK_BUCKETS):
+        bucket[pct <= bound] = label
+    bucket[exact] = "Exact threshold"
+
+    table = pd.DataFrame({
+        "party": party,
+        "un_share": share,
+        "band_id": band + 1,
+        "band_label": bt["label"][band],
+        "nearest_edge": np.where(use_upper, "upper", "lower"),
+        "cross_if_direction": np.where(use_upper, "increase", "decrease"),
+        "nearest_threshold": threshold,
+        "abs_margin": margin,
+        "pct_change_to_cross": pct,
+        "exact_threshold_case": exact,
+        "risk_bucket": bucket,
+    })
+    # Rounded so float noise in the margins cannot reorder equal percentages
+    rank_pct = np.round(pct, _PCT_DECIMALS)
+    order = np.lexsort((table["party"].to_numpy(dtype=str), band, margin, rank_pct))
+    table = table.iloc[order].reset_index(drop=True)
+    table.insert(0, "risk_rank", np.arange(1, len(table) + 1))
+    return table
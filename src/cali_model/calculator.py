@@ -1,14 +1,203 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
 import pandas as pd
 import yaml
-from pathlib import Path
 
-def load_band_config():
-    config_path = Path(__file__).resolve().parent.parent.parent / "config" / "un_scale_bands.yaml"
+from cali_model.data_loader import load_un_scale_history
+
+DEFAULT_BAND_CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / "config" / "un_scale_bands.yaml"
+
+# Compiled band tables: ("path", resolved path) -> (mtime_ns, table), ("config", json) -> table,
+# most recently used last
+BAND_TABLE_CACHE_SIZE = 64
+_BAND_TABLE_CACHE = OrderedDict()
+_BAND_TABLE_LOCK = threading.Lock()
+
+def _cache_band_table(key, entry):
+    with _BAND_TABLE_LOCK:
+        _BAND_TABLE_CACHE[key] = entry
+        _BAND_TABLE_CACHE.move_to_end(key)
+        while len(_BAND_TABLE_CACHE) > BAND_TABLE_CACHE_SIZE:
+            _BAND_TABLE_CACHE.popitem(last=False)
+
+def _cached_band_table(key):
+    with _BAND_TABLE_LOCK:
+        entry = _BAND_TABLE_CACHE.get(key)
+        if entry is not None:
+            _BAND_TABLE_CACHE.move_to_end(key)
+        return entry
+
+def load_band_config(path=None):
+    config_path = Path(path) if path is not None else DEFAULT_BAND_CONFIG_PATH
     if not config_path.exists():
         return None
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
+def validate_band_config(config):
+    """Raise ValueError unless every band has a positive weight and the bands do not overlap.
+
+    Non-overlapping bands make first-match (scalar) and sorted (vectorised)
+    assignment agree.
+    """
+    bands = config.get("bands") if isinstance(config, dict) else None
+    if not isinstance(bands, list) or not bands:
+        raise ValueError("Band config must define a non-empty 'bands' list")
+
+    spans = []
+    for band in bands:
+        min_t = float(band.get("min_threshold", -999999.0))
+        max_t = float(band.get("max_threshold", 999999.0))
+        weight = float(band.get("weight", 1.0))
+        if not min_t < max_t:
+            raise ValueError(f"{band.get('label')}: min_threshold must be below max_threshold")
+        if not (np.isfinite(weight) and weight > 0):
+            raise ValueError(f"{band.get('label')}: weight must be positive and finite")
+        spans.append((max_t, min_t, band.get("label")))
+
+    spans.sort()
+    for (prev_max, _, prev_label), (_, min_t, label) in zip(spans, spans[1:]):
+        if min_t < prev_max:
+            raise ValueError(f"{label} overlaps {prev_label}")
+
+def compile_band_table(config):
+    """Compile a band config into threshold, weight and label arrays sorted by max threshold.
+
+    Bands keep the `(min_threshold, max_threshold]` rule used by `assign_un_band`.
+    The table is read-only. Returns None when the config has no bands.
+    """
+    if config is None or "bands" not in config:
+        return None
+    validate_band_config(config)
+
+    bands = list(config["bands"])
+    min_t = np.array([float(b.get("min_threshold", -999999.0)) for b in bands], dtype=float)
+    max_t = np.array([float(b.get("max_threshold", 999999.0)) for b in bands], dtype=float)
+    weights = np.array([float(b.get("weight", 1.0)) for b in bands], dtype=float)
+    labels = np.array([b.get("label") for b in bands], dtype=object)
+    order = np.argsort(max_t, kind="stable")
+
+    # Zero-share fallback mirrors assign_un_band: Band 1, weight defaulting to 1.50
+    fallback = next((b for b in bands if b.get("id") == 1), None)
+
+    arrays = {
+        "min_threshold": min_t[order],
+        "max_threshold": max_t[order],
+        "weight": weights[order],
+        "label": labels[order],
+    }
+    for arr in arrays.values():
+        arr.setflags(write=False)
+
+    return MappingProxyType({
+        **arrays,
+        "fallback_label": fallback.get("label") if fallback is not None else None,
+        "fallback_weight": float(fallback.get("weight", 1.50)) if fallback is not None else 1.0,
+        "has_fallback": fallback is not None,
+    })
+
+def get_band_table(config=None, path=None):
+    """Return the compiled band table, cached so repeated scenarios skip YAML parsing.
+
+    With `config`, the in-memory config (e.g. a calibration preset) is compiled
+    once per distinct content. Otherwise the YAML at `path` (default
+    `config/un_scale_bands.yaml`) is cached on its path and mtime, so an edited
+    file is picked up on the next call; each call costs one `os.stat`. The
+    cache is thread-safe and keeps the `BAND_TABLE_CACHE_SIZE` most recently
+    used tables.
+    """
+    if config is not None:
+        key = ("config", json.dumps(config, sort_keys=True, default=str))
+        table = _cached_band_table(key)
+        if table is None:
+            table = compile_band_table(config)
+            _cache_band_table(key, table)
+        return table
+
+    config_path = Path(path).resolve() if path is not None else DEFAULT_BAND_CONFIG_PATH
+    try:
+        mtime_ns = os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = ("path", str(config_path))
+    cached = _cached_band_table(key)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    table = compile_band_table(load_band_config(config_path))
+    _cache_band_table(key, (mtime_ns, table))
+    return table
+
+def reload_band_config(path=None):
+    """Drop cached band tables (all of them when `path` is None) and return a fresh table for `path`."""
+    with _BAND_TABLE_LOCK:
+        if path is None:
+            _BAND_TABLE_CACHE.clear()
+        else:
+            _BAND_TABLE_CACHE.pop(("path", str(Path(path).resolve())), None)
+    return get_band_table(path=path)
+
+def assign_un_bands(un_shares, band_table):
+    """Vectorised `assign_un_band`: return (labels, weights) arrays for every share.
+
+    Shares that fall in no band get label None and weight 1.0; a share of exactly
+    0.0 falls back to Band 1 as in the scalar path.
+    """
+    raw = pd.Series(un_shares, dtype=object) if not isinstance(un_shares, pd.Series) else un_shares
+    vals = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=float)
+    # float() on an unparseable value falls back to 0.0 in the scalar path; NaN stays NaN
+    vals = np.where(np.isnan(vals) & raw.notna().to_numpy(), 0.0, vals)
+
+    n = len(vals)
+    labels = np.full(n, None, dtype=object)
+    weights = np.ones(n, dtype=float)
+    if band_table is None or n == 0:
+        return labels, weights
+
+    max_t = band_table["max_threshold"]
+    pos = np.searchsorted(max_t, vals, side="left")
+    in_range = pos < len(max_t)
+    safe_pos = np.where(in_range, pos, 0)
+    matched = in_range & (vals > band_table["min_threshold"][safe_pos])
+
+    labels[matched] = band_table["label"][safe_pos[matched]]
+    weights[matched] = band_table["weight"][safe_pos[matched]]
+
+    if band_table["has_fallback"]:
+        zero = ~matched & (vals == 0.0)
+        labels[zero] = band_table["fallback_label"]
+        weights[zero] = band_table["fallback_weight"]
+
+    return labels, weights
+
+def assign_un_band_positions(un_shares, band_table):
+    """Band-table position of every share in a float array of any shape, -1 outside every band.
+
+    Same rule as `assign_un_bands`, without the label and weight arrays, for
+    (draws x Parties) or (Parties x years) matrices.
+    """
+    un_shares = np.asarray(un_shares, dtype=float)
+    max_t = band_table["max_threshold"]
+    pos = np.searchsorted(max_t, un_shares, side="left")
+    in_range = pos < len(max_t)
+    safe = np.where(in_range, pos, 0)
+    matched = in_range & (un_shares > band_table["min_threshold"][safe])
+    out = np.where(matched, safe, -1)
+    if band_table["has_fallback"]:
+        fallback = np.flatnonzero(band_table["label"] == band_table["fallback_label"])
+        if len(fallback):
+            out = np.where(~matched & (un_shares == 0.0), fallback[0], out)
+    return out
+
 def assign_un_band(un_share, config):
     if config is None or "bands" not in config:
         return None, 1.0
@@ -36,59 +225,487 @@ def assign_un_band(un_share, config):
             
     return None, 1.0
 
-def _apply_floor_ceiling_shares(weights: pd.Series, floor: float, cap: float) -> pd.Series:
-    w = weights.fillna(0.0).clip(lower=0.0)
-    idx = w.index.tolist()
-    n = len(idx)
+# Banded TSAC: land-area band lower bounds (km², inclusive) and per-band weights.
+# Decade bounds reproduce the committed v4 calibration grids; the default
+# weights are the geometric_base_2 calibration preset.
+DEFAULT_TSAC_BAND_LOWER_BOUNDS = (0.0, 10.0, 1_000.0, 10_000.0, 100_000.0, 1_000_000.0)
+DEFAULT_TSAC_BAND_WEIGHTS = (1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+
+def _tsac_band_spec(tsac_mode="linear", tsac_band_weights=None, tsac_band_lower_bounds=None):
+    """Validated (weights, lower_bounds) tuples for banded TSAC, or None for linear TSAC."""
+    if tsac_mode == "linear":
+        return None
+    if tsac_mode != "banded":
+        raise ValueError(f"Unknown tsac_mode {tsac_mode!r}; expected 'linear' or 'banded'")
+
+    weights = tuple(float(w) for w in (DEFAULT_TSAC_BAND_WEIGHTS if tsac_band_weights is None else tsac_band_weights))
+    bounds = tuple(float(b) for b in (DEFAULT_TSAC_BAND_LOWER_BOUNDS if tsac_band_lower_bounds is None else tsac_band_lower_bounds))
+    if len(weights) != len(bounds):
+        raise ValueError(f"tsac_band_weights has {len(weights)} entries but tsac_band_lower_bounds has {len(bounds)}")
+    if any(b2 <= b1 for b1, b2 in zip(bounds, bounds[1:])):
+        raise ValueError("tsac_band_lower_bounds must be strictly increasing")
+    if any(not np.isfinite(w) or w < 0 for w in weights):
+        raise ValueError("tsac_band_weights must be finite and non-negative")
+    return weights, bounds
+
+def assign_tsac_band(land_area_km2, lower_bounds=DEFAULT_TSAC_BAND_LOWER_BOUNDS):
+    """1-based land-area band for each value (band k covers [lower_bounds[k-1], lower_bounds[k])).
+
+    Missing areas and areas below the first bound get band 0.
+    """
+    area = np.asarray(land_area_km2, dtype=float)
+    band = np.searchsorted(np.asarray(lower_bounds, dtype=float), area, side="right")
+    return np.where(np.isnan(area), 0, band)
+
+def banded_tsac_weights(land_area_km2, band_weights=DEFAULT_TSAC_BAND_WEIGHTS, lower_bounds=DEFAULT_TSAC_BAND_LOWER_BOUNDS):
+    """Per-party TSAC weight: the weight of its land-area band (0.0 outside every band)."""
+    band = assign_tsac_band(land_area_km2, lower_bounds)
+    lookup = np.concatenate(([0.0], np.asarray(band_weights, dtype=float)))
+    return lookup[band]
+
+# Shares within this distance of a bound are treated as on the bound
+_FLOOR_CEILING_TOL = 1e-12
+
+def _water_fill(wr, floor, cap):
+    """Exact floor/cap shares for feasible rows: `clip(t * w, floor, cap)` with t set so each row sums to 1.
 
+    The row total is piecewise linear and non-decreasing in t, with
+    breakpoints at floor / w_i (a Party leaves the floor) and cap / w_i (a
+    Party reaches the cap). At any t the floored Parties are the lightest and
+    the capped the heaviest, so the free weight is a difference of prefix
+    sums of the sorted weights. One sort of the 2n breakpoints and a linear
+    solve on the bracketing segment find t: O(n log n) per row. Zero weights
+    sit at the floor; if the positive weights all reach the cap first, the
+    zero weights share the remainder equally. `floor` and `cap` are
+    (rows x 1) columns.
+    """
+    n_rows, n = wr.shape
+    positive = wr > 0
+    prefix = np.zeros((n_rows, n + 1))
+    prefix[:, 1:] = np.cumsum(np.sort(wr, axis=1), axis=1)
+
+    # Breakpoints: floor / w (leaves the floor) then cap / w (reaches the cap); never for w = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_leave = np.where(positive, floor / wr, np.inf)
+        t_cap = np.where(positive, cap / wr, np.inf)
+    t = np.concatenate([t_leave, t_cap], axis=1)
+    order = np.argsort(t, axis=1, kind="stable")
+    t = np.take_along_axis(t, order, axis=1)
+    leaves = order < n
+
+    # Sorted positions [lo, hi) are free after each breakpoint
+    lo = n - np.cumsum(leaves, axis=1)
+    hi = n - np.cumsum(~leaves, axis=1)
+    free_weight = np.take_along_axis(prefix, hi, axis=1) - np.take_along_axis(prefix, lo, axis=1)
+    finite = np.isfinite(t)
+    total = floor * lo + cap * (n - hi) + np.where(finite, t, 0.0) * free_weight
+
+    # First breakpoint whose total reaches 1; t lies on the segment before it
+    reached = finite & (total >= 1.0 - _FLOOR_CEILING_TOL)
+    k = np.argmax(reached, axis=1)
+    prev = np.maximum(k - 1, 0)
+    pick = np.arange(n_rows)
+    seg_lo = np.where(k > 0, lo[pick, prev], n)
+    seg_hi = np.where(k > 0, hi[pick, prev], n)
+    fixed = floor[:, 0] * seg_lo + cap[:, 0] * (n - seg_hi)
+    slope = prefix[pick, seg_hi] - prefix[pick, seg_lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(slope > 0, (1.0 - fixed) / slope, t[pick, k])
+    scale = np.where(np.isfinite(scale), scale, 0.0)
+
+    out = np.clip(scale[:, None] * wr, floor, cap)
+    # Positive weights all capped short of 1: the zero weights share the rest
+    short = ~reached.any(axis=1)
+    if short.any():
+        n_zero = (~positive[short]).sum(axis=1, keepdims=True)
+        rest = (1.0 - cap[short] * positive[short].sum(axis=1, keepdims=True)) / np.maximum(n_zero, 1)
+        out[short] = np.where(positive[short], cap[short], rest)
+    return out
+
+def solve_floor_ceiling_batch(weights, floors, caps):
+    """Apply a per-row floor and cap to each row of a weight matrix, returning shares that sum to 1.
+
+    This is the model's fixed-set rule, not exact water-filling. Each round
+    shares the remainder among the free Parties in proportion to weight.
+    Parties pushed below the floor or above the cap are fixed there and
+    never released, even when a cap fixed later would lift them back above
+    the floor. The result therefore differs from exact water-filling when
+    both bounds bind. The published tables use this rule.
+
+    Rows are sorted once, so the fixed sets are always the lightest and
+    heaviest weights, and each round only moves two boundaries. Every row
+    advances together. A round costs O(n) and a row can take up to n rounds,
+    so the worst case is O(n^2) per row. In practice it takes a handful of
+    rounds.
+
+    If the fixed Parties leave no free Party and do not sum to 1, or
+    overshoot 1, renormalising would break a bound. Those rows are solved
+    by exact water-filling (`_water_fill`) instead. Infeasible floors
+    (floor * n > 1) or caps (cap * n < 1) give an equal split, and a floor
+    above the cap is lowered to the cap.
+    """
+    w = np.nan_to_num(np.asarray(weights, dtype=float), nan=0.0)
+    w = np.atleast_2d(np.clip(w, 0.0, None))
+    n_rows, n = w.shape
     if n == 0:
-        return pd.Series(dtype=float)
+        return np.zeros((n_rows, 0))
+
+    floors = np.broadcast_to(np.maximum(0.0, np.asarray(floors, dtype=float)), (n_rows,))
+    caps = np.broadcast_to(np.minimum(1.0, np.asarray(caps, dtype=float)), (n_rows,))
+    floors = np.minimum(floors, caps)
+
+    shares = np.empty((n_rows, n))
+    infeasible = (floors * n > 1.0) | (caps * n < 1.0)
+    shares[infeasible] = 1.0 / n
+
+    rows = np.flatnonzero(~infeasible)
+    if not len(rows):
+        return shares
+
+    order = np.argsort(w[rows], axis=1, kind="stable")
+    ws = np.take_along_axis(w[rows], order, axis=1)
+    floor = floors[rows][:, None]
+    cap = caps[rows][:, None]
+    positions = np.arange(n)
 
-    floor = max(0.0, float(floor))
-    cap = min(1.0, float(cap))
+    # Free Parties occupy sorted positions [lo, hi)
+    lo = np.zeros(len(rows), dtype=int)
+    hi = np.full(len(rows), n)
+    active = np.ones(len(rows), dtype=bool)
+    sorted_shares = np.zeros_like(ws)
 
-    if floor > cap:
-        floor = cap
+    while active.any():
+        r = np.flatnonzero(active)
+        free = (positions >= lo[r, None]) & (positions < hi[r, None])
+        n_free = hi[r] - lo[r]
+
+        remaining = 1.0 - floor[r, 0] * lo[r] - cap[r, 0] * (n - hi[r])
+        remaining = np.maximum(0.0, remaining)
+        denom = np.where(free, ws[r], 0.0).sum(axis=1)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            proportional = remaining[:, None] * (ws[r] / denom[:, None])
+            equal = (remaining / n_free)[:, None]
+        free_shares = np.where((denom > 0)[:, None], proportional, equal)
+
+        new_low = (free & (free_shares < floor[r] - _FLOOR_CEILING_TOL)).sum(axis=1)
+        new_high = (free & (free_shares > cap[r] + _FLOOR_CEILING_TOL)).sum(axis=1)
+
+        done = (new_low == 0) & (new_high == 0)
+        d = r[done]
+        if len(d):
+            sorted_shares[d] = np.where(
+                positions < lo[d, None],
+                floor[d],
+                np.where(positions >= hi[d, None], cap[d], free_shares[done]),
+            )
+            active[d] = False
+
+        lo[r] += new_low
+        hi[r] -= new_high
+
+    # Back to original party order
+    out = np.empty_like(ws)
+    np.put_along_axis(out, order, sorted_shares, axis=1)
+
+    # A row whose fixed Parties leave nothing free (or overshoot) cannot sum to 1
+    # without breaking a bound when renormalised; solve it exactly instead
+    fixed_total = floor[:, 0] * lo + cap[:, 0] * (n - hi)
+    stuck = ((lo >= hi) & (np.abs(fixed_total - 1.0) > _FLOOR_CEILING_TOL)) | (fixed_total > 1.0 + _FLOOR_CEILING_TOL)
+    if stuck.any():
+        out[stuck] = _water_fill(w[rows][stuck], floor[stuck], cap[stuck])
+
+    # Renormalise (rounding only)
+    totals = out.sum(axis=1)
+    positive = totals > 0
+    out[positive] /= totals[positive, None]
+    shares[rows] = out
+    return shares
+
+def solve_floor_ceiling(weights, floor, cap):
+    """Single-vector `solve_floor_ceiling_batch`."""
+    return solve_floor_ceiling_batch(np.asarray(weights, dtype=float)[None, :], floor, cap)[0]
+
+def _apply_floor_ceiling_shares(weights: pd.Series, floor: float, cap: float) -> pd.Series:
+    if len(weights) == 0:
+        return pd.Series(dtype=float)
+    return pd.Series(solve_floor_ceiling(weights.to_numpy(dtype=float), floor, cap), index=weights.index)
 
-    if floor * n > 1.0:
-        return pd.Series(1.0 / n, index=idx)
+# Keyword defaults of calculate_allocations, applied to batch scenario dicts
+_SCENARIO_DEFAULTS = {
+    "exclude_high_income": False,
+    "floor_pct": 0.0,
+    "ceiling_pct": None,
+    "tsac_beta": 0.15,
+    "sosac_gamma": 0.10,
+    "high_income_mode": "exclude_except_sids",
+    "equality_mode": False,
+    "un_scale_mode": "raw_inversion",
+    "band_config": None,
+    "tsac_mode": "linear",
+    "tsac_band_weights": None,
+    "tsac_band_lower_bounds": None,
+    "eligibility_overrides": None,
+    "attribute_overrides": None,
+    "scale_year": None,
+}
 
-    if cap * n < 1.0:
-        return pd.Series(1.0 / n, index=idx)
+# Memoised component bases, most recently used last
+COMPONENT_BASIS_CACHE_SIZE = 32
+_BASIS_CACHE = OrderedDict()
+_BASIS_CACHE_LOCK = threading.Lock()
 
-    fixed_low = set()
-    fixed_high = set()
+# Base-frame columns a component basis depends on; `attribute_overrides` may patch any of them
+_BASIS_COLUMNS = ("un_share", "land_area_km2", "is_sids", "is_cbd_party", "WB Income Group")
+_BASIS_DTYPES = {"un_share": float, "land_area_km2": float, "is_sids": bool, "is_cbd_party": bool, "WB Income Group": object}
 
-    while True:
-        free = [i for i in idx if i not in fixed_low and i not in fixed_high]
+def _frame_fingerprint(df):
+    """Content hash of the base-frame columns the component basis reads.
 
-        remaining = 1.0 - floor * len(fixed_low) - cap * len(fixed_high)
-        remaining = max(0.0, remaining)
+    Includes `party` in row order: overrides and `scale_year` rates are
+    resolved to rows by Party name.
+    """
+    digest = hashlib.blake2b(str(len(df)).encode(), digest_size=16)
+    for col in ("party",) + _BASIS_COLUMNS:
+        values = df[col].to_numpy()
+        if values.dtype.kind in "biuf":
+            digest.update(values.dtype.str.encode())
+            digest.update(np.ascontiguousarray(values).tobytes())
+        else:
+            digest.update(pd.util.hash_array(values.astype(object)).tobytes())
+    return digest.hexdigest()
 
-        shares = pd.Series(0.0, index=idx)
+def _full_frame_fingerprint(df):
+    """Content hash of the whole base frame: columns, values and index."""
+    digest = hashlib.blake2b(repr(list(df.columns)).encode(), digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
 
-        if fixed_low:
-            shares.loc[list(fixed_low)] = floor
+def _canonical_value(value):
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, float, np.number)):
+        return float(value)
+    return value
 
-        if fixed_high:
-            shares.loc[list(fixed_high)] = cap
+def _override_key(eligibility_overrides, attribute_overrides):
+    """Canonical, hashable form of the override arguments: (eligibility, attributes), None when unset.
 
-        if free:
-            denom = w.loc[free].sum()
-            if denom <= 0:
-                shares.loc[free] = remaining / len(free)
+    `eligibility_overrides` maps Party -> bool. `attribute_overrides` maps a
+    basis column to either one value for every Party or a {Party: value}
+    mapping.
+    """
+    eligibility = None
+    if eligibility_overrides:
+        eligibility = tuple(sorted((str(p), bool(v)) for p, v in dict(eligibility_overrides).items()))
+    attributes = None
+    if attribute_overrides:
+        items = []
+        for col, patch in sorted(dict(attribute_overrides).items()):
+            if col not in _BASIS_COLUMNS:
+                raise ValueError(f"attribute_overrides: {col!r} is not one of {', '.join(_BASIS_COLUMNS)}")
+            if isinstance(patch, Mapping):
+                items.append((col, "parties", tuple(sorted((str(p), _canonical_value(v)) for p, v in patch.items()))))
             else:
-                shares.loc[free] = remaining * (w.loc[free] / denom)
+                items.append((col, "all", _canonical_value(patch)))
+        attributes = tuple(items)
+    return eligibility, attributes
+
+def _party_positions(df, parties):
+    positions = pd.Index(df["party"]).get_indexer(list(parties))
+    if (positions < 0).any():
+        unknown = [p for p, pos in zip(parties, positions) if pos < 0]
+        raise ValueError(f"Unknown Party in overrides: {', '.join(map(str, unknown))}")
+    return positions
+
+def _scale_year_key(scale_year):
+    return None if scale_year is None else int(scale_year)
+
+def _un_share_for_year(df, year):
+    """Each Party's UN assessment rate in `year`, 0.0 when not assessed (as in the base frame)."""
+    history = load_un_scale_history()
+    rows = history[history["year"] == year]
+    if rows.empty:
+        years = ", ".join(str(y) for y in sorted(history["year"].unique()))
+        raise ValueError(f"No UN scale for {year}; scale years: {years}")
+    rates = pd.Series(rows["un_share"].to_numpy(), index=rows["party"].to_numpy())
+    return df["party"].map(rates).fillna(0.0).to_numpy(dtype=float)
+
+def _basis_arrays(df, attributes, scale_year=None):
+    """Basis columns as arrays with the scale year and attribute patches applied; also returns the patched columns alone."""
+    cols = {col: df[col].to_numpy(dtype=_BASIS_DTYPES[col]) for col in _BASIS_COLUMNS}
+    patched = {}
+    if scale_year is not None:
+        cols["un_share"] = patched["un_share"] = _un_share_for_year(df, scale_year)
+    for col, kind, value in attributes or ():
+        arr = cols[col].copy()
+        if kind == "all":
+            arr[:] = value
+        else:
+            arr[_party_positions(df, [p for p, _ in value])] = [v for _, v in value]
+        cols[col] = patched[col] = arr
+    return cols, patched
+
+def _eligibility_mask(cols, exclude_high_income, high_income_mode):
+    # Rule (recommended): If exclude_high_income == True and mode is "exclude_except_sids",
+    # then: Parties are excluded if income_group == "High income" AND is_sids == False.
+    high_income = cols["WB Income Group"] == "High income"
+    if exclude_high_income:
+        if high_income_mode == "exclude_except_sids":
+            return cols["is_cbd_party"] & ~(high_income & ~cols["is_sids"])
+        return cols["is_cbd_party"] & ~high_income  # "exclude_all"
+    return cols["is_cbd_party"].copy()
+
+def _compute_component_basis(df, exclude_high_income, high_income_mode, un_scale_mode, band_table, tsac_spec,
+                             overrides=(None, None), scale_year=None):
+    n = len(df)
+    eligibility, attributes = overrides
+    cols, patched = _basis_arrays(df, attributes, scale_year)
+    eligible = _eligibility_mask(cols, exclude_high_income, high_income_mode)
+    if eligibility:
+        eligible[_party_positions(df, [p for p, _ in eligibility])] = [v for _, v in eligibility]
+    un_share = cols["un_share"]
+
+    iusaf = np.zeros(n)
+    un_band = np.full(n, None, dtype=object)
+    un_band_weight = np.ones(n)
+    inv_weight = None
+    # Include all eligible countries, even if un_share is 0 (for band inversion)
+    if un_scale_mode == "band_inversion":
+        mask = eligible & ~np.isnan(un_share)
+        if mask.any():
+            labels, weights = assign_un_bands(un_share[mask], band_table)
+            un_band[mask] = labels
+            un_band_weight[mask] = weights
+            iusaf[mask] = weights / weights.sum()
+    else:  # raw_inversion
+        mask = eligible & (un_share > 0)
+        inv_weight = np.full(n, np.nan)
+        if mask.any():
+            inv_weight[mask] = 1.0 / (un_share[mask] / 100.0)
+            iusaf[mask] = inv_weight[mask] / inv_weight[mask].sum()
+
+    tsac = np.zeros(n)
+    tsac_band = None
+    land_area = cols["land_area_km2"]
+    tsac_mask = eligible & (land_area > 0)
+    if tsac_spec is None:
+        tsac_weight = np.where(tsac_mask, land_area, 0.0)
+    else:
+        band_weights, lower_bounds = tsac_spec
+        tsac_band = np.where(tsac_mask, assign_tsac_band(land_area, lower_bounds), 0)
+        tsac_weight = np.where(tsac_mask, banded_tsac_weights(land_area, band_weights, lower_bounds), 0.0)
+    tsac_total = tsac_weight[tsac_mask].sum()
+    if tsac_total > 0:
+        tsac[tsac_mask] = tsac_weight[tsac_mask] / tsac_total
+
+    sosac = np.zeros(n)
+    sosac_mask = eligible & cols["is_sids"]
+    n_sids = int(sosac_mask.sum())
+    if n_sids > 0:
+        sosac[sosac_mask] = 1.0 / n_sids
+
+    basis = {
+        "eligible": eligible,
+        "iusaf_share": iusaf,
+        "tsac_share": tsac,
+        "sosac_share": sosac,
+        "un_band": un_band,
+        "un_band_weight": un_band_weight,
+        "inv_weight": inv_weight,
+        "tsac_band": tsac_band,
+    }
+    for arr in [*basis.values(), *patched.values()]:
+        if arr is not None:
+            arr.setflags(write=False)
+    return MappingProxyType({
+        **basis, "n_sids": n_sids, "band_table": band_table, "attributes": MappingProxyType(patched),
+    })
+
+def get_component_basis(
+    df,
+    exclude_high_income=False,
+    high_income_mode="exclude_except_sids",
+    un_scale_mode="raw_inversion",
+    band_config=None,
+    tsac_mode="linear",
+    tsac_band_weights=None,
+    tsac_band_lower_bounds=None,
+    eligibility_overrides=None,
+    attribute_overrides=None,
+    scale_year=None,
+):
+    """Eligibility mask, normalised IUSAF/TSAC/SOSAC share arrays and band labels for a base frame.
+
+    These depend only on eligibility, UN scale mode, band config and TSAC mode,
+    never on the blend weights, fund size or IPLC split, so they are memoised (LRU,
+    `COMPONENT_BASIS_CACHE_SIZE` entries) on a content hash of the base frame.
+    The returned arrays are read-only and aligned with `df` by position. The
+    cache is shared by threads; a basis is computed outside the lock, so two
+    threads missing the same key may both compute it.
+
+    `attribute_overrides` ({column: value} or {column: {Party: value}}) patch
+    the basis columns before the eligibility rule runs, and
+    `eligibility_overrides` ({Party: bool}) then set individual entries of the
+    mask. Both act on arrays, never on `df`; each distinct override set is a
+    separate cache entry, and its patched columns are in `basis["attributes"]`.
 
-        new_low = set(shares.loc[free][shares.loc[free] < floor - 1e-12].index)
-        new_high = set(shares.loc[free][shares.loc[free] > cap + 1e-12].index)
+    `scale_year` (e.g. 2018) first replaces `un_share` with that year's rates
+    from `load_un_scale_history()`, 0.0 for Parties not assessed that year;
+    each year is its own cache entry.
+    """
+    band_table = get_band_table(band_config) if un_scale_mode == "band_inversion" else None
+    tsac_spec = _tsac_band_spec(tsac_mode, tsac_band_weights, tsac_band_lower_bounds)
+    overrides = _override_key(eligibility_overrides, attribute_overrides)
+    key = (
+        _frame_fingerprint(df),
+        bool(exclude_high_income),
+        high_income_mode if exclude_high_income else None,
+        un_scale_mode,
+        id(band_table),
+        tsac_spec,
+        overrides,
+        _scale_year_key(scale_year),
+    )
+    with _BASIS_CACHE_LOCK:
+        basis = _BASIS_CACHE.get(key)
+        # id() can be reused once a table is dropped, so confirm the identity
+        if basis is not None and basis["band_table"] is band_table:
+            _BASIS_CACHE.move_to_end(key)
+            return basis
+
+    basis = _compute_component_basis(
+        df, exclude_high_income, high_income_mode, un_scale_mode, band_table, tsac_spec, overrides,
+        _scale_year_key(scale_year),
+    )
+    with _BASIS_CACHE_LOCK:
+        _BASIS_CACHE[key] = basis
+        _BASIS_CACHE.move_to_end(key)
+        while len(_BASIS_CACHE) > COMPONENT_BASIS_CACHE_SIZE:
+            _BASIS_CACHE.popitem(last=False)
+    return basis
+
+def clear_component_basis_cache():
+    with _BASIS_CACHE_LOCK:
+        _BASIS_CACHE.clear()
 
-        if not new_low and not new_high:
-            s = shares.sum()
-            return shares / s if s > 0 else shares
+def _blend_weights(beta, gamma, n_sids):
+    """Effective (alpha, beta, gamma) arrays, with the no-SIDS fallback of SOSAC into IUSAF.
 
-        fixed_low |= new_low
-        fixed_high |= new_high
+    With beta = gamma = 0 the final share is the IUSAF share (regression check).
+    """
+    beta = np.asarray(beta, dtype=float)
+    gamma = np.asarray(gamma, dtype=float)
+    alpha = 1.0 - beta - gamma
+    if n_sids == 0:
+        alpha = alpha + np.where(gamma > 0, gamma, 0.0)
+        gamma = np.where(gamma > 0, 0.0, gamma)
+
+    pure = (beta == 0.0) & (gamma == 0.0)
+    alpha = np.where(pure, 1.0, alpha)
+    beta = np.where(pure, 0.0, beta)
+    gamma = np.where(pure, 0.0, gamma)
+    return alpha, beta, gamma
 
 def calculate_allocations(
     df,
@@ -102,152 +719,511 @@ def calculate_allocations(
     sosac_gamma=0.10,
     high_income_mode="exclude_except_sids",
     equality_mode=False,
-    un_scale_mode="raw_inversion"
+    un_scale_mode="raw_inversion",
+    band_config=None,
+    tsac_mode="linear",
+    tsac_band_weights=None,
+    tsac_band_lower_bounds=None,
+    eligibility_overrides=None,
+    attribute_overrides=None,
+    scale_year=None,
 ):
-    # Filter out parties with 0 share for inversion logic (except for display later)
-    # But for Cali Fund, we need to invert the non-zero ones.
-    
-    calc_df = df.copy()
-    
-    # Initialize extra columns
-    calc_df["un_band"] = None
-    calc_df["un_band_weight"] = 1.0
+    # Component shares come from the memoised basis; blending, floor/ceiling
+    # and the money split are a one-row batch.
+    scenario = {
+        "fund_size": fund_size,
+        "iplc_share_pct": iplc_share_pct,
+        "exclude_high_income": exclude_high_income,
+        "floor_pct": floor_pct,
+        "ceiling_pct": ceiling_pct,
+        "tsac_beta": tsac_beta,
+        "sosac_gamma": sosac_gamma,
+        "high_income_mode": high_income_mode,
+        "equality_mode": equality_mode,
+        "un_scale_mode": un_scale_mode,
+        "band_config": band_config,
+        "tsac_mode": tsac_mode,
+        "tsac_band_weights": tsac_band_weights,
+        "tsac_band_lower_bounds": tsac_band_lower_bounds,
+        "eligibility_overrides": eligibility_overrides,
+        "attribute_overrides": attribute_overrides,
+        "scale_year": scale_year,
+    }
+    batch = calculate_allocations_batch(df, [scenario])
+    return batch_scenario_frame(df, batch, 0)
 
-    # 1. Define eligibility
-    # Rule (recommended): If exclude_high_income == True and mode is "exclude_except_sids", 
-    # then: Parties are excluded if income_group == "High income" AND is_sids == False.
-    if exclude_high_income:
-        if high_income_mode == "exclude_except_sids":
-             calc_df["eligible"] = calc_df["is_cbd_party"] & ~( (calc_df["WB Income Group"] == "High income") & (calc_df["is_sids"] == False) )
-        else: # "exclude_all"
-             calc_df["eligible"] = calc_df["is_cbd_party"] & (calc_df["WB Income Group"] != "High income")
+def calculate_shares(df, **kwargs):
+    """Share stage of `calculate_allocations`: same keyword arguments minus `fund_size` and `iplc_share_pct`.
+
+    Returns a `ShareFrame`; `calculate_shares(df, **kw).monetize(fund_size,
+    iplc_share_pct).to_frame()` equals `calculate_allocations(df, fund_size,
+    iplc_share_pct, **kw)`. Share rows come from the process-wide scenario
+    cache.
+    """
+    for name in ("fund_size", "iplc_share_pct"):
+        if name in kwargs:
+            raise ValueError(f"{name} belongs to monetize(), not the share stage")
+    unknown = set(kwargs) - set(_SCENARIO_DEFAULTS) - {"show_raw_inversion"}
+    if unknown:
+        raise ValueError(f"Unknown calculate_allocations argument(s): {', '.join(sorted(unknown))}")
+    batch = calculate_allocations_batch_cached(df, [kwargs])
+    return batch_share_frame(df, batch, 0)
+
+def _basis_group_key(s):
+    """Settings of a defaults-filled scenario dict that select its component basis."""
+    return (
+        bool(s["exclude_high_income"]),
+        s["high_income_mode"] if s["exclude_high_income"] else None,
+        s["un_scale_mode"],
+        json.dumps(s["band_config"], sort_keys=True, default=str),
+        _tsac_band_spec(s["tsac_mode"], s["tsac_band_weights"], s["tsac_band_lower_bounds"]),
+        _override_key(s["eligibility_overrides"], s["attribute_overrides"]),
+        _scale_year_key(s["scale_year"]),
+    )
+
+def scenario_fingerprint(scenario, amounts=False):
+    """Canonical key of everything that determines a scenario's share vectors.
+
+    Missing keys take the `calculate_allocations` defaults and numbers are
+    compared as floats, so `{"floor_pct": None}` and `{"floor_pct": 0}` or
+    `tsac_beta=0` and `0.0` give the same key. Labels such as `scenario_id`
+    and `description` are ignored; in equality mode the blend and
+    floor/ceiling settings are too. Fund size and IPLC split only scale the
+    money columns and are added with `amounts=True` (both are then required).
+    """
+    s = {**_SCENARIO_DEFAULTS, **scenario}
+    key = _basis_group_key(s)
+    if s["equality_mode"]:
+        key = key + ("equality",)
     else:
-        calc_df["eligible"] = calc_df["is_cbd_party"]
+        ceiling = s["ceiling_pct"]
+        key = key + (
+            float(s["tsac_beta"]),
+            float(s["sosac_gamma"]),
+            float(s["floor_pct"] or 0.0),
+            None if ceiling is None else float(ceiling),
+        )
+    if amounts:
+        key = key + (float(s["fund_size"]), float(s["iplc_share_pct"]))
+    return key
 
-    # 1b. Equality Mode
-    if equality_mode:
-        final_eligible_mask = calc_df["eligible"]
-        n_eligible = int(final_eligible_mask.sum())
-        calc_df["final_share"] = 0.0
+def calculate_allocations_batch(base_df, scenarios):
+    """Evaluate many scenarios against one base frame as a (scenarios x parties) share matrix.
+
+    Each scenario is a dict of `calculate_allocations` keyword arguments (missing
+    keys take the same defaults; extra keys such as `scenario_id` are ignored).
+    Component shares are built once per distinct eligibility/UN-mode basis and
+    blended for all scenarios in one pass. Money columns are not materialised:
+    use `batch_long_frame()` or `batch_scenario_frame()` for frame output.
+
+    Returns a dict of row-aligned arrays: `final_share`, `eligible`,
+    `iusaf_share`, `tsac_share`, `sosac_share` (S x n), effective `alpha`,
+    `beta`, `gamma`, `fund_size`, `iplc_share_pct` (S), plus `party`,
+    `scenarios` and the per-basis arrays in `bases` / `basis_index`.
+    """
+    scenarios = [{**_SCENARIO_DEFAULTS, **s} for s in scenarios]
+    n_scen, n = len(scenarios), len(base_df)
+
+    final = np.zeros((n_scen, n))
+    iusaf = np.zeros((n_scen, n))
+    tsac = np.zeros((n_scen, n))
+    sosac = np.zeros((n_scen, n))
+    eligible = np.zeros((n_scen, n), dtype=bool)
+    alpha = np.ones(n_scen)
+    beta = np.zeros(n_scen)
+    gamma = np.zeros(n_scen)
+
+    # Group scenarios by the component basis they share
+    groups = {}
+    for i, s in enumerate(scenarios):
+        groups.setdefault(_basis_group_key(s), []).append(i)
+
+    bases = []
+    basis_index = np.zeros(n_scen, dtype=int)
+    for rows in groups.values():
+        first = scenarios[rows[0]]
+        basis = get_component_basis(
+            base_df,
+            exclude_high_income=bool(first["exclude_high_income"]),
+            high_income_mode=first["high_income_mode"],
+            un_scale_mode=first["un_scale_mode"],
+            band_config=first["band_config"],
+            tsac_mode=first["tsac_mode"],
+            tsac_band_weights=first["tsac_band_weights"],
+            tsac_band_lower_bounds=first["tsac_band_lower_bounds"],
+            eligibility_overrides=first["eligibility_overrides"],
+            attribute_overrides=first["attribute_overrides"],
+            scale_year=first["scale_year"],
+        )
+        basis_index[rows] = len(bases)
+        bases.append(basis)
+
+        rows = np.asarray(rows)
+        elig = basis["eligible"]
+        eligible[rows] = elig
+        equality = np.array([bool(scenarios[i]["equality_mode"]) for i in rows])
+
+        # Equality mode: even split across eligible Parties, components zeroed
+        eq_rows = rows[equality]
+        n_eligible = int(elig.sum())
+        if len(eq_rows) and n_eligible > 0:
+            final[np.ix_(eq_rows, elig)] = 1.0 / n_eligible
+            iusaf[eq_rows] = final[eq_rows]
+
+        blend_rows = rows[~equality]
+        if not len(blend_rows):
+            continue
+        a, b, g = _blend_weights(
+            [float(scenarios[i]["tsac_beta"]) for i in blend_rows],
+            [float(scenarios[i]["sosac_gamma"]) for i in blend_rows],
+            basis["n_sids"],
+        )
+        alpha[blend_rows], beta[blend_rows], gamma[blend_rows] = a, b, g
+        iusaf[blend_rows] = basis["iusaf_share"]
+        tsac[blend_rows] = basis["tsac_share"]
+        sosac[blend_rows] = basis["sosac_share"]
+
+        # Fallback if no SIDS: SOSAC weight is reallocated to IUSAF (warning implied in UI)
+        blended = (
+            a[:, None] * basis["iusaf_share"]
+            + b[:, None] * basis["tsac_share"]
+            + g[:, None] * basis["sosac_share"]
+        )
+        # Normalize over eligible Parties
         if n_eligible > 0:
-            calc_df.loc[final_eligible_mask, "final_share"] = 1.0 / n_eligible
-        
-        # Zero out components for display/transparency
-        calc_df["iusaf_share"] = calc_df["final_share"]
-        calc_df["tsac_share"] = 0.0
-        calc_df["sosac_share"] = 0.0
-        effective_alpha = 1.0
-        effective_beta = 0.0
-        effective_gamma = 0.0
-    else:
-        # IUSAF Calculation
-        calc_df["iusaf_share"] = 0.0
-        # Include all eligible countries, even if un_share is 0 (for band inversion)
-        if un_scale_mode == "band_inversion":
-            mask = calc_df["eligible"] & (calc_df['un_share'].notna())
-        else:
-            mask = calc_df["eligible"] & (calc_df['un_share'] > 0) & (calc_df['un_share'].notna())
-        
-        eligible_idx = calc_df.index[mask]
-
-        if len(eligible_idx) > 0:
-            if un_scale_mode == "band_inversion":
-                config = load_band_config()
-                for idx in eligible_idx:
-                    share_val = float(calc_df.loc[idx, "un_share"])
-                    band_label, band_weight = assign_un_band(share_val, config)
-                    calc_df.loc[idx, "un_band"] = band_label
-                    calc_df.loc[idx, "un_band_weight"] = band_weight
-                
-                weights = calc_df.loc[eligible_idx, "un_band_weight"]
-                calc_df.loc[eligible_idx, "iusaf_share"] = weights / weights.sum()
-            else: # raw_inversion
-                calc_df.loc[mask, 'un_share_fraction'] = calc_df.loc[mask, 'un_share'] / 100.0
-                calc_df.loc[mask, 'inv_weight'] = 1.0 / calc_df.loc[mask, 'un_share_fraction']
-                
-                weights = calc_df.loc[eligible_idx, "inv_weight"]
-                calc_df.loc[eligible_idx, "iusaf_share"] = weights / weights.sum()
-
-        # 2. Compute TSAC Share (Land Area)
-        calc_df["tsac_share"] = 0.0
-        tsac_eligible_mask = calc_df["eligible"] & (calc_df["land_area_km2"] > 0)
-        if tsac_eligible_mask.any():
-            la_sum = calc_df.loc[tsac_eligible_mask, "land_area_km2"].sum()
-            calc_df.loc[tsac_eligible_mask, "tsac_share"] = calc_df.loc[tsac_eligible_mask, "land_area_km2"] / la_sum
-
-        # 3. Compute SOSAC Share (SIDS)
-        calc_df["sosac_share"] = 0.0
-        sosac_eligible_mask = calc_df["eligible"] & calc_df["is_sids"]
-        n_sids = int(sosac_eligible_mask.sum())
-        if n_sids > 0:
-            calc_df.loc[sosac_eligible_mask, "sosac_share"] = 1.0 / n_sids
-
-        # 4. Handle Blending and Fallback
-        beta = float(tsac_beta)
-        gamma = float(sosac_gamma)
-        
-        # Regression check: if weights are zero, use old logic (no TSAC/SOSAC component)
-        if beta == 0.0 and gamma == 0.0:
-            calc_df["final_share"] = calc_df["iusaf_share"]
-            effective_alpha = 1.0
-            effective_beta = 0.0
-            effective_gamma = 0.0
-        else:
-            # Fallback if no SIDS
-            effective_beta = beta
-            effective_gamma = gamma
-            effective_alpha = 1.0 - beta - gamma
-            
-            if n_sids == 0 and gamma > 0:
-                # Fallback: reallocate to IUSAF
-                effective_alpha += gamma
-                effective_gamma = 0.0
-                # log warning (implied in UI)
-                
-            # Compute Final Share
-            calc_df["final_share"] = (
-                effective_alpha * calc_df["iusaf_share"] + 
-                effective_beta * calc_df["tsac_share"] + 
-                effective_gamma * calc_df["sosac_share"]
+            totals = blended[:, elig].sum(axis=1)
+            positive = totals > 0
+            blended[np.ix_(positive, elig)] /= totals[positive, None]
+        final[blend_rows] = blended
+
+        # Floor and ceiling on the normalised final share, all constrained rows at once
+        floor_pct = np.array([float(scenarios[i]["floor_pct"] or 0.0) for i in blend_rows])
+        ceiling_pct = [scenarios[i]["ceiling_pct"] for i in blend_rows]
+        constrained = (floor_pct > 0) | np.array([c is not None for c in ceiling_pct])
+        if constrained.any() and n_eligible > 0:
+            c_rows = blend_rows[constrained]
+            caps = np.array([1.0 if c is None else float(c) / 100.0 for c in ceiling_pct])[constrained]
+            final[np.ix_(c_rows, elig)] = solve_floor_ceiling_batch(
+                final[np.ix_(c_rows, elig)], floor_pct[constrained] / 100.0, caps
             )
-        
-        # Normalize
-        final_eligible_mask = calc_df["eligible"]
-        if final_eligible_mask.any():
-            s = calc_df.loc[final_eligible_mask, "final_share"].sum()
-            if s > 0:
-                calc_df.loc[final_eligible_mask, "final_share"] = calc_df.loc[final_eligible_mask, "final_share"] / s
-
-        # 5. Apply Floor and Ceiling to Final Share if enabled
-        if (floor_pct > 0 or ceiling_pct is not None) and final_eligible_mask.any():
-            floor = float(floor_pct) / 100.0
-            cap = 1.0 if ceiling_pct is None else float(ceiling_pct) / 100.0
-            
-            constrained_shares = _apply_floor_ceiling_shares(
-                calc_df.loc[final_eligible_mask, "final_share"],
-                floor=floor,
-                cap=cap
+
+    return {
+        "party": base_df["party"].to_numpy(),
+        "scenarios": scenarios,
+        "final_share": final,
+        "eligible": eligible,
+        "iusaf_share": iusaf,
+        "tsac_share": tsac,
+        "sosac_share": sosac,
+        "alpha": alpha,
+        "beta": beta,
+        "gamma": gamma,
+        "fund_size": np.array([float(s.get("fund_size", np.nan)) for s in scenarios]),
+        "iplc_share_pct": np.array([float(s.get("iplc_share_pct", np.nan)) for s in scenarios]),
+        "bases": bases,
+        "basis_index": basis_index,
+    }
+
+# Share rows of evaluated scenarios, keyed on (base-frame hash, band YAML mtime, scenario_fingerprint),
+# most recently used last
+SCENARIO_CACHE_SIZE = 1024
+_SCENARIO_CACHE = OrderedDict()
+_SCENARIO_CACHE_LOCK = threading.Lock()
+
+# Result frames of run_scenario_cached, keyed on the whole base frame, fund size and IPLC split
+RESULT_CACHE_SIZE = 256
+_RESULT_CACHE = OrderedDict()
+_CACHE_COUNTS = {"row_hits": 0, "row_misses": 0, "result_hits": 0, "result_misses": 0}
+
+_ROW_ARRAYS = ("final_share", "eligible", "iusaf_share", "tsac_share", "sosac_share")
+_ROW_WEIGHTS = ("alpha", "beta", "gamma")
+
+def _band_file_key():
+    """Path and mtime of the default band YAML, or None when it is missing."""
+    try:
+        return (str(DEFAULT_BAND_CONFIG_PATH), os.stat(DEFAULT_BAND_CONFIG_PATH).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+def _scenario_cache_key(frame_key, file_key, scenario, amounts=False):
+    """Cache key of one scenario: frame hash, band file (when the YAML applies) and fingerprint.
+
+    A banded scenario without `band_config` uses the YAML that `get_band_table()`
+    reloads on an mtime change, so its rows must not outlive that file version.
+    """
+    s = {**_SCENARIO_DEFAULTS, **scenario}
+    uses_file = s["un_scale_mode"] == "band_inversion" and s["band_config"] is None
+    return (frame_key, file_key if uses_file else None, scenario_fingerprint(s, amounts=amounts))
+
+def calculate_allocations_batch_cached(base_df, scenarios):
+    """`calculate_allocations_batch()` with rows served from a process-wide cache.
+
+    Rows are cached (LRU, `SCENARIO_CACHE_SIZE` entries) on the base-frame
+    content hash, the band YAML's mtime (for banded scenarios without
+    `band_config`) and `scenario_fingerprint()`, so any caller that evaluates
+    the same settings (library scenarios, their comparators, local
+    neighbours, grid cells, sweeps) shares one evaluation. Only uncached
+    fingerprints are computed, once each and in a single batch. The result
+    has the same keys and values as the uncached call.
+    """
+    frame_key, file_key = _frame_fingerprint(base_df), _band_file_key()
+    keys = [_scenario_cache_key(frame_key, file_key, s) for s in scenarios]
+
+    rows = {}
+    with _SCENARIO_CACHE_LOCK:
+        for key in keys:
+            row = _SCENARIO_CACHE.get(key)
+            if row is not None:
+                _SCENARIO_CACHE.move_to_end(key)
+                rows[key] = row
+
+    first = {}
+    for key, s in zip(keys, scenarios):
+        if key not in rows:
+            first.setdefault(key, s)
+    if first:
+        fresh = calculate_allocations_batch(base_df, list(first.values()))
+        for j, key in enumerate(first):
+            row = {"basis": fresh["bases"][fresh["basis_index"][j]]}
+            for name in _ROW_ARRAYS:
+                row[name] = fresh[name][j].copy()
+                row[name].setflags(write=False)
+            for name in _ROW_WEIGHTS:
+                row[name] = float(fresh[name][j])
+            rows[key] = row
+        with _SCENARIO_CACHE_LOCK:
+            for key in first:
+                _SCENARIO_CACHE[key] = rows[key]
+            while len(_SCENARIO_CACHE) > SCENARIO_CACHE_SIZE:
+                _SCENARIO_CACHE.popitem(last=False)
+    # Repeats of a fingerprint within the call count as hits
+    with _SCENARIO_CACHE_LOCK:
+        _CACHE_COUNTS["row_hits"] += len(keys) - len(first)
+        _CACHE_COUNTS["row_misses"] += len(first)
+
+    ordered = [rows[key] for key in keys]
+    bases, basis_pos = [], {}
+    for row in ordered:
+        if id(row["basis"]) not in basis_pos:
+            basis_pos[id(row["basis"])] = len(bases)
+            bases.append(row["basis"])
+
+    n = len(base_df)
+    batch = {"party": base_df["party"].to_numpy(), "scenarios": [{**_SCENARIO_DEFAULTS, **s} for s in scenarios]}
+    for name in _ROW_ARRAYS:
+        dtype = bool if name == "eligible" else float
+        batch[name] = np.stack([row[name] for row in ordered]) if ordered else np.zeros((0, n), dtype=dtype)
+    for name in _ROW_WEIGHTS:
+        batch[name] = np.array([row[name] for row in ordered], dtype=float)
+    batch["fund_size"] = np.array([float(s.get("fund_size", np.nan)) for s in scenarios])
+    batch["iplc_share_pct"] = np.array([float(s.get("iplc_share_pct", np.nan)) for s in scenarios])
+    batch["bases"] = bases
+    batch["basis_index"] = np.array([basis_pos[id(row["basis"])] for row in ordered], dtype=int)
+    return batch
+
+def run_scenario_cached(base_df, scenario):
+    """`calculate_allocations()` for a scenario dict, memoised on its fingerprint.
+
+    `scenario` holds `calculate_allocations` keyword arguments, including
+    `fund_size` and `iplc_share_pct`; labels such as `scenario_id` are
+    ignored, so a library scenario and an identical comparator share one
+    entry. Frames are kept in an LRU of `RESULT_CACHE_SIZE` entries on top
+    of the share-row cache. They carry every column of `base_df`, so they
+    are keyed on a hash of the whole frame (rows only need the basis
+    columns); each call returns a fresh copy.
+    """
+    key = _scenario_cache_key(_full_frame_fingerprint(base_df), _band_file_key(), scenario, amounts=True)
+    with _SCENARIO_CACHE_LOCK:
+        frame = _RESULT_CACHE.get(key)
+        if frame is not None:
+            _RESULT_CACHE.move_to_end(key)
+            _CACHE_COUNTS["result_hits"] += 1
+    if frame is None:
+        frame = batch_scenario_frame(base_df, calculate_allocations_batch_cached(base_df, [scenario]), 0)
+        with _SCENARIO_CACHE_LOCK:
+            _RESULT_CACHE[key] = frame
+            while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+                _RESULT_CACHE.popitem(last=False)
+            _CACHE_COUNTS["result_misses"] += 1
+    return frame.copy()
+
+def scenario_cache_info():
+    """Hit/miss counts and sizes of the share-row cache (`rows`) and the result-frame cache (`results`)."""
+    with _SCENARIO_CACHE_LOCK:
+        return {
+            "rows": {
+                "hits": _CACHE_COUNTS["row_hits"],
+                "misses": _CACHE_COUNTS["row_misses"],
+                "size": len(_SCENARIO_CACHE),
+                "maxsize": SCENARIO_CACHE_SIZE,
+            },
+            "results": {
+                "hits": _CACHE_COUNTS["result_hits"],
+                "misses": _CACHE_COUNTS["result_misses"],
+                "size": len(_RESULT_CACHE),
+                "maxsize": RESULT_CACHE_SIZE,
+            },
+        }
+
+def clear_scenario_cache():
+    """Empty both scenario caches and reset their counters."""
+    with _SCENARIO_CACHE_LOCK:
+        _SCENARIO_CACHE.clear()
+        _RESULT_CACHE.clear()
+        for name in _CACHE_COUNTS:
+            _CACHE_COUNTS[name] = 0
+
+# Columns `monetize()` derives from the shares, in `calculate_allocations` order
+MONEY_COLUMNS = (
+    "total_allocation",
+    "iplc_component",
+    "state_component",
+    "component_iusaf_amt",
+    "component_tsac_amt",
+    "component_sosac_amt",
+)
+
+def _money_arrays(final_share, iusaf_share, tsac_share, sosac_share, alpha, beta, gamma, fund_size, iplc_share_pct):
+    """Money columns in USD millions; broadcasts over leading fund-size axes."""
+    total = final_share * fund_size
+    iplc = total * (iplc_share_pct / 100.0)
+    return {
+        "total_allocation": total / 1_000_000.0,
+        "iplc_component": iplc / 1_000_000.0,
+        "state_component": (total - iplc) / 1_000_000.0,
+        "component_iusaf_amt": (alpha * iusaf_share * fund_size) / 1_000_000.0,
+        "component_tsac_amt": (beta * tsac_share * fund_size) / 1_000_000.0,
+        "component_sosac_amt": (gamma * sosac_share * fund_size) / 1_000_000.0,
+    }
+
+class ShareFrame:
+    """The fund-size-independent stage of one scenario.
+
+    `shares` holds every `calculate_allocations` column except the
+    `MONEY_COLUMNS`; `alpha`, `beta` and `gamma` are the effective blend
+    weights. `monetize()` attaches a fund size and IPLC split without
+    recomputing anything, so outputs at several fund sizes cost one share
+    computation.
+    """
+
+    def __init__(self, shares, alpha, beta, gamma):
+        self.shares = shares
+        self.alpha = float(alpha)
+        self.beta = float(beta)
+        self.gamma = float(gamma)
+
+    def _share_arrays(self):
+        return tuple(self.shares[col].to_numpy(dtype=float) for col in ("final_share", "iusaf_share", "tsac_share", "sosac_share"))
+
+    def monetize(self, fund_size, iplc_share_pct):
+        """Lazy `MonetizedFrame` at one fund size and IPLC split."""
+        return MonetizedFrame(self, fund_size, iplc_share_pct)
+
+    def monetize_many(self, fund_sizes, iplc_share_pct):
+        """Money columns at every fund size in one broadcast: {column: (len(fund_sizes) x n) array}."""
+        fund = np.asarray(fund_sizes, dtype=float)[:, None]
+        return _money_arrays(*self._share_arrays(), self.alpha, self.beta, self.gamma, fund, float(iplc_share_pct))
+
+class MonetizedFrame:
+    """`calculate_allocations` output as a view over a `ShareFrame`.
+
+    Indexing returns the share columns as they are and derives each money
+    column on first access; `to_frame()` materialises the full frame,
+    identical to `calculate_allocations` at this fund size and IPLC split.
+    """
+
+    def __init__(self, share_frame, fund_size, iplc_share_pct):
+        self.share_frame = share_frame
+        self.fund_size = float(fund_size)
+        self.iplc_share_pct = float(iplc_share_pct)
+        self._money = None
+
+    @property
+    def columns(self):
+        return list(self.share_frame.shares.columns) + list(MONEY_COLUMNS)
+
+    def __contains__(self, col):
+        return col in MONEY_COLUMNS or col in self.share_frame.shares.columns
+
+    def __len__(self):
+        return len(self.share_frame.shares)
+
+    def _money_columns(self):
+        if self._money is None:
+            sf = self.share_frame
+            self._money = _money_arrays(
+                *sf._share_arrays(), sf.alpha, sf.beta, sf.gamma, self.fund_size, self.iplc_share_pct
             )
-            calc_df.loc[final_eligible_mask, "final_share"] = constrained_shares
+        return self._money
+
+    def __getitem__(self, col):
+        if col in MONEY_COLUMNS:
+            return pd.Series(self._money_columns()[col], index=self.share_frame.shares.index, name=col)
+        return self.share_frame.shares[col]
+
+    def to_frame(self, copy=True):
+        """The full frame; `copy=False` adds the money columns to the share frame in place."""
+        frame = self.share_frame.shares.copy() if copy else self.share_frame.shares
+        for col, values in self._money_columns().items():
+            frame[col] = values
+        return frame
+
+def batch_share_frame(base_df, batch, i):
+    """Scenario `i` of a batch as a `ShareFrame` (every column but the money ones)."""
+    calc_df = base_df.copy()
+    basis = batch["bases"][batch["basis_index"][i]]
+    for col, values in basis["attributes"].items():
+        calc_df[col] = values
+
+    equality_mode = batch["scenarios"][i]["equality_mode"]
+
+    if equality_mode:
+        calc_df["un_band"] = None
+        calc_df["un_band_weight"] = 1.0
+    else:
+        calc_df["un_band"] = basis["un_band"].copy()
+        calc_df["un_band_weight"] = basis["un_band_weight"].copy()
+    calc_df["eligible"] = batch["eligible"][i]
+    if equality_mode:
+        calc_df["final_share"] = batch["final_share"][i]
+    calc_df["iusaf_share"] = batch["iusaf_share"][i]
+    if basis["inv_weight"] is not None and not equality_mode:
+        calc_df["un_share_fraction"] = np.where(np.isnan(basis["inv_weight"]), np.nan, calc_df["un_share"] / 100.0)
+        calc_df["inv_weight"] = basis["inv_weight"].copy()
+    if basis["tsac_band"] is not None and not equality_mode:
+        calc_df["tsac_band"] = basis["tsac_band"].copy()
+    calc_df["tsac_share"] = batch["tsac_share"][i]
+    calc_df["sosac_share"] = batch["sosac_share"][i]
+    calc_df["final_share"] = batch["final_share"][i]
 
-    # Rename final_share back to inverted_share for compatibility if needed, 
+    # Rename final_share back to inverted_share for compatibility if needed,
     # but the instruction said to use final_share. Let's provide both.
     calc_df["inverted_share"] = calc_df["final_share"]
-    
-    calc_df['total_allocation'] = calc_df['final_share'] * fund_size
-    calc_df['iplc_component'] = calc_df['total_allocation'] * (iplc_share_pct / 100.0)
-    calc_df['state_component'] = calc_df['total_allocation'] - calc_df['iplc_component']
-    
-    # Component amounts for transparency
-    calc_df['component_iusaf_amt'] = (effective_alpha * calc_df["iusaf_share"] * fund_size) / 1_000_000.0
-    calc_df['component_tsac_amt'] = (effective_beta * calc_df["tsac_share"] * fund_size) / 1_000_000.0
-    calc_df['component_sosac_amt'] = (effective_gamma * calc_df["sosac_share"] * fund_size) / 1_000_000.0
-
-    # Convert to millions for display
-    for col in ['total_allocation', 'iplc_component', 'state_component']:
-        calc_df[col] = calc_df[col] / 1_000_000.0
-        
-    return calc_df
+
+    return ShareFrame(calc_df, batch["alpha"][i], batch["beta"][i], batch["gamma"][i])
+
+def batch_scenario_frame(base_df, batch, i):
+    """Materialise scenario `i` of a batch as the frame `calculate_allocations` would return."""
+    shares = batch_share_frame(base_df, batch, i)
+    return shares.monetize(batch["fund_size"][i], batch["iplc_share_pct"][i]).to_frame(copy=False)
+
+def batch_long_frame(batch):
+    """Long-format frame with one row per (scenario, party): shares and allocations in millions."""
+    n_scen, n = batch["final_share"].shape
+    scenario_ids = [s.get("scenario_id", i) for i, s in enumerate(batch["scenarios"])]
+    total = batch["final_share"] * batch["fund_size"][:, None] / 1_000_000.0
+    iplc = total * (batch["iplc_share_pct"][:, None] / 100.0)
+
+    return pd.DataFrame({
+        "scenario_index": np.repeat(np.arange(n_scen), n),
+        "scenario_id": np.repeat(np.asarray(scenario_ids, dtype=object), n),
+        "party": np.tile(batch["party"], n_scen),
+        "eligible": batch["eligible"].ravel(),
+        "final_share": batch["final_share"].ravel(),
+        "total_allocation": total.ravel(),
+        "iplc_component": iplc.ravel(),
+        "state_component": (total - iplc).ravel(),
+    })
 
 def aggregate_by_region(df, region_col='region'):
     # We count all CBD parties that are eligible for the calculation
@@ -359,6 +1335,20 @@ def get_stewardship_blend_feedback(tsac_beta: float, sosac_gamma: float) -> dict
         "dominance_text": None
     }
 
+# Outcome warning: more than this fraction of eligible Parties below the
+# equality reference, or the median Party below this percent of it
+OUTCOME_WARNING_BELOW_EQUALITY_SHARE = 0.60
+OUTCOME_WARNING_MEDIAN_PCT_OF_EQUALITY = 90.0
+
+
+def outcome_warning_conditions(below_equality_share: float, median_pct_of_equality: float):
+    """(too many below equality, median too low) for the outcome warning."""
+    return (
+        below_equality_share > OUTCOME_WARNING_BELOW_EQUALITY_SHARE,
+        median_pct_of_equality < OUTCOME_WARNING_MEDIAN_PCT_OF_EQUALITY,
+    )
+
+
 def get_outcome_warning_feedback(results_df: pd.DataFrame, fund_size_usd: float):
     eligible_df = results_df[results_df["eligible"]].copy()
     n_eligible = len(eligible_df)
@@ -372,26 +1362,27 @@ def get_outcome_warning_feedback(results_df: pd.DataFrame, fund_size_usd: float)
     below_equality_share = (eligible_df["total_allocation"] < equal_share_m).mean()
     median_pct_of_equality = (eligible_df["total_allocation"].median() / equal_share_m) * 100.0
 
-    cond_a = below_equality_share > 0.60
-    cond_b = median_pct_of_equality < 90.0
+    cond_a, cond_b = outcome_warning_conditions(below_equality_share, median_pct_of_equality)
+    below_pct = f"{OUTCOME_WARNING_BELOW_EQUALITY_SHARE:.0%}"
+    median_pct = f"{OUTCOME_WARNING_MEDIAN_PCT_OF_EQUALITY:.0f}%"
 
     if not cond_a and not cond_b:
         return None
 
     if cond_a and cond_b:
         message = (
-            "Outcome warning: more than 60% of eligible countries are below the equality reference, "
-            "and the median eligible country is receiving less than 90% of the equality reference. "
+            f"Outcome warning: more than {below_pct} of eligible countries are below the equality reference, "
+            f"and the median eligible country is receiving less than {median_pct} of the equality reference. "
             "This suggests the current blend may be politically difficult to defend as broadly fair."
         )
     elif cond_a:
         message = (
-            "Outcome warning: more than 60% of eligible countries are below the equality reference. "
+            f"Outcome warning: more than {below_pct} of eligible countries are below the equality reference. "
             "This suggests the current blend may be politically difficult to defend as broadly fair."
         )
     else:
         message = (
-            "Outcome warning: the median eligible country is receiving less than 90% of the equality reference. "
+            f"Outcome warning: the median eligible country is receiving less than {median_pct} of the equality reference. "
             "This suggests stewardship adjustments may be pulling the model away from a broadly acceptable sovereign baseline."
         )
 
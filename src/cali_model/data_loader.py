@@ -1,15 +1,101 @@
+import hashlib
+import os
+import threading
+
 import duckdb
+import numpy as np
 import pandas as pd
 from pathlib import Path
 
+CONFIG_PATH = Path(__file__).resolve().parent.parent.parent / "config"
+DATA_RAW_PATH = CONFIG_PATH.parent / "data-raw"
+
+# Assessment year whose UN scale column get_base_data() reads by default
+CURRENT_SCALE_YEAR = "2027"
+UN_SCALE_FILE = "UNGA_scale_of_assessment.csv"
+
+# Base-data snapshot: get_base_data() output stored as Parquet in a directory
+# next to data-raw/, named by a hash of every ETL input.
+SNAPSHOT_DIR_NAME = "data-snapshot"
+LAND_AREA_FILE = "API_AG.LND.TOTL.K2_DS2_en_csv_v2_749/API_AG.LND.TOTL.K2_DS2_en_csv_v2_749.csv"
+ETL_INPUT_FILES = (
+    UN_SCALE_FILE,
+    "unsd_region_useme.csv",
+    "world_bank_income_class.csv",
+    "eu27.csv",
+    "manual_name_map.csv",
+    LAND_AREA_FILE,
+    "cbd_cop16_budget_table.csv",
+)
+
+_snapshot_con = None
+_snapshot_lock = threading.Lock()
+
+# Process-wide read-only base frames, one per resolved data-raw path
+_shared_base = {}
+_shared_lock = threading.Lock()
+
+# Process-wide read-only UN scale histories, keyed on resolved path and input mtimes
+_scale_history = {}
+
+# Rows of the UNGA scale CSV that are Member States with a positive rate (not totals, footnotes or dates)
+_UN_SCALE_ROWS = r"""
+          party_name IS NOT NULL
+          AND party_name != 'Total'
+          AND un_share IS NOT NULL
+          AND un_share > 0
+          AND party_name NOT LIKE 'a/%'
+          AND party_name NOT LIKE 'b/%'
+          AND party_name NOT LIKE 'c/%'
+          AND party_name NOT LIKE 'd/%'
+          AND party_name NOT LIKE 'e/%'
+          AND party_name NOT LIKE 'f/%'
+          AND party_name NOT LIKE 'g/%'
+          AND party_name NOT LIKE 'h/%'
+          AND party_name NOT LIKE 'i/%'
+          AND party_name NOT LIKE 'j/%'
+          AND party_name NOT LIKE 'k/%'
+          AND party_name NOT LIKE 'c:\%'
+          AND party_name !~ '^\d{2}/\d{2}/\d{4}$'
+"""
+
+
+def latest_indicator_value(df, year_cols):
+    """Most recent non-missing value of a wide World Bank indicator, per row.
+
+    `year_cols` are the year columns in chronological order (as in the WB
+    CSV layout); non-numeric cells such as ".." count as missing. Returns a
+    frame on `df.index` with `value` and `year` (both float, NaN for rows
+    with no data in any year).
+    """
+    if not year_cols:
+        return pd.DataFrame({"value": np.nan, "year": np.nan}, index=df.index)
+    block = df[year_cols]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in block.dtypes):
+        block = block.apply(pd.to_numeric, errors="coerce")
+    values = block.to_numpy(dtype=float)
+    years = np.array([int(str(c).strip()) for c in year_cols], dtype=float)
 
-def load_data(con):
+    valid = ~np.isnan(values)
+    has_value = valid.any(axis=1)
+    # Last valid column = first hit when scanning the reversed columns
+    last = len(year_cols) - 1 - np.argmax(valid[:, ::-1], axis=1)
+    rows = np.arange(len(values))
+    return pd.DataFrame(
+        {
+            "value": np.where(has_value, values[rows, last], np.nan),
+            "year": np.where(has_value, years[last], np.nan),
+        },
+        index=df.index,
+    )
+
+
+def load_data(con, base_path="data-raw"):
     # Base paths
-    base_path = "data-raw"
-    config_path = Path(__file__).resolve().parent.parent.parent / "config"
+    config_path = CONFIG_PATH
     
     # 1. Load UN Scale of Assessment
-    con.execute(f"CREATE TABLE un_scale AS SELECT * FROM read_csv_auto('{base_path}/UNGA_scale_of_assessment.csv')")
+    con.execute(f"CREATE TABLE un_scale AS SELECT * FROM read_csv_auto('{base_path}/{UN_SCALE_FILE}')")
     
     # 2. Load UNSD Regions
     con.execute(f"CREATE TABLE unsd_regions AS SELECT * FROM read_csv_auto('{base_path}/unsd_region_useme.csv')")
@@ -36,15 +122,12 @@ def load_data(con):
     # 7. Load Land Area (World Bank)
     # Name concordance handled via party_master: we keep raw WB Country Names as-is
     # and SQL JOINs use party_master.wb_land_area_name as the bridge.
-    land_area_path = f"{base_path}/API_AG.LND.TOTL.K2_DS2_en_csv_v2_749/API_AG.LND.TOTL.K2_DS2_en_csv_v2_749.csv"
+    land_area_path = f"{base_path}/{LAND_AREA_FILE}"
     land_df = pd.read_csv(land_area_path, skiprows=4)
     year_cols = [c for c in land_df.columns if str(c).strip().isdigit()]
-    numeric_land = land_df[year_cols].apply(pd.to_numeric, errors="coerce")
-    land_df["land_area_km2"] = numeric_land.ffill(axis=1).iloc[:, -1]
-    land_df["land_area_year"] = numeric_land.apply(
-        lambda row: next((int(col) for col in reversed(year_cols) if pd.notna(row[col])), None),
-        axis=1,
-    )
+    latest = latest_indicator_value(land_df, year_cols)
+    land_df["land_area_km2"] = latest["value"]
+    land_df["land_area_year"] = latest["year"]
     land_area_latest_df = land_df[["Country Name", "Country Code", "land_area_km2", "land_area_year"]].copy()
     # Ensure string columns use object dtype (DuckDB doesn't recognise pandas StringDtype)
     for col in land_area_latest_df.select_dtypes(include=["object"]).columns:
@@ -69,45 +152,40 @@ def load_data(con):
         LEFT JOIN name_map m ON c.party_raw = m.party_raw
     """)
 
-def get_base_data(con):
+def _scale_year_column(con, scale_year):
+    """Validated UN scale column name for an assessment year."""
+    year = str(int(scale_year))
+    columns = {row[0] for row in con.execute("DESCRIBE un_scale").fetchall()}
+    if year not in columns:
+        years = sorted(c for c in columns if c.isdigit())
+        raise ValueError(f"No UN scale column for {year}; scale years: {', '.join(years)}")
+    return year
+
+
+def get_base_data(con, scale_year=CURRENT_SCALE_YEAR):
     # Combine and clean data
     # Key change: land area and income joins now route through party_master
     # name concordance, eliminating manual df.loc patches and LAND_AREA_NAME_MAP.
+    year = _scale_year_column(con, scale_year)
     sql = r"""
     WITH raw_scale AS (
         SELECT 
             TRIM(REPLACE("Member State", '\n', ' ')) as party_name, 
             CASE 
-                WHEN "2027" = '-' OR "2027" = 'NA' THEN 0.0 
-                ELSE TRY_CAST("2027" AS DOUBLE) 
+                WHEN "__YEAR__" = '-' OR "__YEAR__" = 'NA' THEN 0.0 
+                ELSE TRY_CAST("__YEAR__" AS DOUBLE) 
             END as un_share
         FROM un_scale
     ),
-    scale_2027 AS (
+    scale_year AS (
         SELECT * FROM raw_scale
-        WHERE party_name IS NOT NULL
-          AND party_name != 'Total'
-          AND un_share IS NOT NULL
-          AND un_share > 0
-          AND party_name NOT LIKE 'a/%'
-          AND party_name NOT LIKE 'b/%'
-          AND party_name NOT LIKE 'c/%'
-          AND party_name NOT LIKE 'd/%'
-          AND party_name NOT LIKE 'e/%'
-          AND party_name NOT LIKE 'f/%'
-          AND party_name NOT LIKE 'g/%'
-          AND party_name NOT LIKE 'h/%'
-          AND party_name NOT LIKE 'i/%'
-          AND party_name NOT LIKE 'j/%'
-          AND party_name NOT LIKE 'k/%'
-          AND party_name NOT LIKE 'c:\%'
-          AND party_name !~ '^\d{2}/\d{2}/\d{4}$'
+        WHERE __UN_SCALE_ROWS__
     ),
     mapped_scale AS (
         SELECT 
             COALESCE(m.party_mapped, s.party_name) as party,
             s.un_share
-        FROM scale_2027 s
+        FROM scale_year s
         LEFT JOIN name_map m ON s.party_name = m.party_raw
     ),
     joined AS (
@@ -136,8 +214,14 @@ def get_base_data(con):
                 ELSE e.is_eu27 IS NOT NULL
             END as is_eu_ms,
             c.Party IS NOT NULL OR s.party = 'European Union' as is_cbd_party,
-            -- Land area: join via party_master name concordance, then direct name fallback
-            COALESCE(pm_la.land_area_km2, la_direct.land_area_km2, 0.0) as land_area_km2,
+            -- Land area: party_master override (Monaco, Cook Islands, Niue, Palestine, EU),
+            -- then party_master name concordance, then direct name fallback
+            COALESCE(
+                TRY_CAST(NULLIF(pm.land_area_km2_override, '') AS DOUBLE),
+                pm_la.land_area_km2,
+                la_direct.land_area_km2,
+                0.0
+            ) as land_area_km2,
             CASE
                 WHEN pm.land_area_km2_override IS NOT NULL THEN True
                 WHEN pm_la.land_area_km2 IS NOT NULL THEN True
@@ -163,19 +247,219 @@ def get_base_data(con):
         LEFT JOIN land_area_latest la_direct ON COALESCE(s.party, c.Party) = la_direct."Country Name"
     )
     SELECT * FROM joined
-    """
+    """.replace("__YEAR__", year).replace("__UN_SCALE_ROWS__", _UN_SCALE_ROWS)
     df = con.execute(sql).df()
-    
-    # Apply land_area_km2 overrides from party_master (Monaco, Cook Islands, Niue, Palestine, EU)
-    pm = con.execute("SELECT party, land_area_km2_override FROM party_master WHERE land_area_km2_override IS NOT NULL AND land_area_km2_override != ''").df()
-    for _, row in pm.iterrows():
-        mask = df['party'] == row['party']
-        if mask.any():
-            val = float(row['land_area_km2_override'])
-            df.loc[mask, 'land_area_km2'] = val
-            df.loc[mask, 'has_land_area'] = True
 
     # Clean up NA strings to "Not Available"
     df['WB Income Group'] = df['WB Income Group'].replace('NA', 'Not Available')
 
     return df
+
+
+def get_un_scale_history(con):
+    """Every assessment year of the UN scale as one long table: `party`, `year`, `un_share`.
+
+    Reads all year columns of `un_scale` in one UNPIVOT, with the row filter
+    and `name_map` concordance of `get_base_data()`. A Party has a row only
+    for the years it was assessed a positive rate ('-' and 'NA' are dropped),
+    so the `CURRENT_SCALE_YEAR` rows equal the base frame's positive
+    `un_share` values.
+    """
+    sql = r"""
+    WITH wide AS (
+        SELECT TRIM(REPLACE("Member State", '\n', ' ')) AS party_name, COLUMNS('^\d{4}$')::VARCHAR
+        FROM un_scale
+    ),
+    long_scale AS (
+        UNPIVOT wide ON COLUMNS('^\d{4}$') INTO NAME year VALUE raw_share
+    ),
+    raw_scale AS (
+        SELECT party_name, CAST(year AS INTEGER) AS year, TRY_CAST(raw_share AS DOUBLE) AS un_share
+        FROM long_scale
+    )
+    SELECT COALESCE(m.party_mapped, s.party_name) AS party, s.year, s.un_share
+    FROM raw_scale s
+    LEFT JOIN name_map m ON s.party_name = m.party_raw
+    WHERE __UN_SCALE_ROWS__
+    ORDER BY party, year
+    """.replace("__UN_SCALE_ROWS__", _UN_SCALE_ROWS)
+    df = con.execute(sql).df()
+    df["year"] = df["year"].astype("int64")
+    return df
+
+
+def load_un_scale_history(base_path=DATA_RAW_PATH):
+    """Process-wide, read-only `get_un_scale_history()` table for `base_path`.
+
+    Only the UN scale and name-map CSVs are read; the table is rebuilt when
+    either file changes.
+    """
+    base_path = Path(base_path).resolve()
+    inputs = (base_path / UN_SCALE_FILE, base_path / "manual_name_map.csv")
+    key = (base_path, tuple(os.stat(path).st_mtime_ns for path in inputs))
+    with _shared_lock:
+        history = _scale_history.get(key)
+        if history is None:
+            con = duckdb.connect(database=":memory:")
+            try:
+                con.execute(f"CREATE TABLE un_scale AS SELECT * FROM read_csv_auto('{inputs[0].as_posix()}')")
+                con.execute(f"CREATE TABLE name_map AS SELECT * FROM read_csv_auto('{inputs[1].as_posix()}')")
+                history = _freeze_frame(get_un_scale_history(con))
+            finally:
+                con.close()
+            _scale_history[key] = history
+        return history
+
+
+def etl_input_hash(base_path="data-raw"):
+    """Hash of every file the ETL reads, plus this module's source (so ETL changes rebuild)."""
+    digest = hashlib.blake2b(digest_size=16)
+    inputs = [Path(base_path) / name for name in ETL_INPUT_FILES]
+    inputs += [CONFIG_PATH / "party_master.csv", Path(__file__)]
+    for path in inputs:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _snapshot_cursor():
+    global _snapshot_con
+    with _snapshot_lock:
+        if _snapshot_con is None:
+            _snapshot_con = duckdb.connect(database=":memory:")
+        return _snapshot_con.cursor()
+
+
+def _read_snapshot(path):
+    columns = _snapshot_cursor().execute("SELECT * FROM read_parquet(?)", [str(path)]).fetchnumpy()
+    frame = {}
+    for name, values in columns.items():
+        if isinstance(values, np.ma.MaskedArray):
+            if values.dtype != object:
+                # Typed columns with NULLs: let DuckDB apply its own pandas conversion
+                return _snapshot_cursor().execute("SELECT * FROM read_parquet(?)", [str(path)]).df()
+            data = values.data.copy()
+            data[values.mask] = None
+            values = data
+        frame[name] = values
+    return pd.DataFrame(frame)
+
+
+def _write_snapshot(df, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    cur = _snapshot_cursor()
+    cur.register("base_df", df)
+    cur.execute(f"COPY base_df TO '{tmp.as_posix()}' (FORMAT PARQUET)")
+    cur.unregister("base_df")
+    os.replace(tmp, path)
+
+    # Drop snapshots of superseded inputs
+    for stale in path.parent.glob("base_data-*.parquet"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def load_base_data(base_path="data-raw", snapshot_dir=None, refresh=False):
+    """`get_base_data()` output, read from a Parquet snapshot when the ETL inputs are unchanged.
+
+    The snapshot lives in `data-snapshot/` next to `base_path` and is keyed
+    on `etl_input_hash()`; any change to an input file (or to this module)
+    triggers a full DuckDB ETL and a fresh snapshot. `refresh=True` forces
+    the rebuild.
+    """
+    base_path = Path(base_path)
+    snapshot_dir = Path(snapshot_dir) if snapshot_dir is not None else base_path.parent / SNAPSHOT_DIR_NAME
+    path = snapshot_dir / f"base_data-{etl_input_hash(base_path)}.parquet"
+
+    if path.exists() and not refresh:
+        try:
+            return _read_snapshot(path)
+        except duckdb.Error:
+            pass  # unreadable snapshot: rebuild below
+
+    con = duckdb.connect(database=":memory:")
+    try:
+        load_data(con, base_path=base_path.as_posix())
+        df = get_base_data(con)
+    finally:
+        con.close()
+    try:
+        _write_snapshot(df, path)
+    except OSError:
+        pass  # read-only checkout: serve the fresh frame without caching
+    return df
+
+
+class _ReadOnlyIndexer:
+    """`.loc`/`.iloc`/`.at`/`.iat` of a `_FrozenFrame`: reads pass through, assignment raises."""
+
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        _FrozenFrame._read_only()
+
+    def __getattr__(self, name):
+        return getattr(self._indexer, name)
+
+
+class _FrozenFrame(pd.DataFrame):
+    """DataFrame whose values and columns cannot be assigned, added or removed.
+
+    Derived frames (`.copy()`, slices, arithmetic) are plain, editable
+    DataFrames.
+    """
+
+    @property
+    def _constructor(self):
+        return pd.DataFrame
+
+    @staticmethod
+    def _read_only(*args, **kwargs):
+        raise ValueError("shared base data is read-only: .copy() before editing")
+
+    # _update_inplace backs every `inplace=True` method (drop, rename, fillna, ...)
+    __setitem__ = __delitem__ = insert = isetitem = pop = update = _update_inplace = _read_only
+
+    loc = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.loc.__get__(self)))
+    iloc = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.iloc.__get__(self)))
+    at = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.at.__get__(self)))
+    iat = property(lambda self: _ReadOnlyIndexer(pd.DataFrame.iat.__get__(self)))
+
+    def __setattr__(self, name, value):
+        if name in ("columns", "index") or name in self.columns:
+            self._read_only()
+        super().__setattr__(name, value)
+
+
+def _freeze_frame(df):
+    """Copy of `df` that rejects column assignment and whose arrays are read-only.
+
+    Both in-place value edits and column assignment raise ValueError.
+    """
+    columns = {}
+    for name in df.columns:
+        values = df[name].to_numpy(copy=True)
+        values.flags.writeable = False
+        columns[name] = values
+    return _FrozenFrame(columns, index=df.index, copy=False)
+
+
+def shared_base_data(base_path="data-raw", refresh=False):
+    """Process-wide, read-only base frame for the Streamlit apps.
+
+    The first call in a process loads `load_base_data()` once; every later
+    call (any browser session, any thread) gets the same object, so sessions
+    hold only a reference. Values and columns are read-only (ValueError):
+    `.copy()` before editing. `refresh=True` reloads from the snapshot/ETL.
+    """
+    key = Path(base_path).resolve()
+    with _shared_lock:
+        if refresh or key not in _shared_base:
+            _shared_base[key] = _freeze_frame(load_base_data(base_path, refresh=refresh))
+        return _shared_base[key]
+
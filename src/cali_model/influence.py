@@ -0,0 +1,184 @@
+"""
+Leave-one-out Party influence: every Party's removal evaluated in one pass.
+
+Each component share is a Party weight over the eligible total,
+u_i = w_i / W. Removing Party j changes only the normaliser, so for every
+other eligible Party
+
+    u_i(-j) = w_i / (W - w_j) = u_i / (1 - u_j)
+
+and likewise for TSAC and SOSAC (whose weight is 1/n_sids for each SIDS).
+Stacking one row per removed Party gives the leave-one-out component
+matrices as rank-one rescales of the cached basis vectors. Removing the last
+SIDS triggers the engine's SOSAC-to-IUSAF fallback for that row. The blend,
+the renormalisation and the floor/ceiling run on the whole stack at once.
+`solve_floor_ceiling_batch` re-derives each row's binding set, so rows where
+the removal frees or binds a floor or cap are exact as well. Rows match
+`calculate_allocations(..., eligibility_overrides={j: False})`.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from cali_model.calculator import _blend_weights, calculate_allocations_batch, solve_floor_ceiling_batch
+
+# Component shares at or below this when left over are treated as an emptied component
+_EMPTY_TOL = 1e-12
+# Distance from the floor or cap at which a Party counts as bound
+_BINDING_TOL = 1e-12
+
+
+def leave_one_out(base_df: pd.DataFrame, scenario: dict | None = None, parties=None) -> dict:
+    """Final shares of `scenario` with each Party in `parties` (default: every eligible Party) removed.
+
+    `scenario` holds `calculate_allocations` keyword arguments (overrides
+    included). Returns `party` and `eligible` (n), the full-scenario `base_share` (n), the
+    `removed` Party names (m) and their positions `removed_index`, the
+    leave-one-out `final_share` matrix (m x n, zero for ineligible and
+    removed Parties) and the merged `scenario`.
+    """
+    batch = calculate_allocations_batch(base_df, [scenario or {}])
+    s, basis = batch["scenarios"][0], batch["bases"][0]
+    party = batch["party"]
+    idx = np.flatnonzero(basis["eligible"])
+
+    if parties is None:
+        removed = idx
+    else:
+        parties = list(parties)
+        removed = pd.Index(party).get_indexer(parties)
+        if (removed < 0).any():
+            raise ValueError(f"Unknown Party: {', '.join(str(p) for p, r in zip(parties, removed) if r < 0)}")
+        if not basis["eligible"][removed].all():
+            ineligible = [str(party[r]) for r in removed if not basis["eligible"][r]]
+            raise ValueError(f"Not eligible in this scenario: {', '.join(ineligible)}")
+
+    m, n_el = len(removed), len(idx)
+    final = np.zeros((m, len(party)))
+    if m and n_el > 1:
+        # keep[k] drops removed Party k from the eligible columns
+        keep = np.ones((m, n_el), dtype=bool)
+        keep[np.arange(m), np.searchsorted(idx, removed)] = False
+
+        if s["equality_mode"]:
+            shares = np.full((m, n_el - 1), 1.0 / (n_el - 1))
+        else:
+            shares = _blended_rows(s, basis, idx, removed, keep)
+
+        out = np.zeros((m, n_el))
+        out[keep] = shares.ravel()
+        final[:, idx] = out
+
+    return {
+        "party": party,
+        "eligible": basis["eligible"],
+        "base_share": batch["final_share"][0],
+        "removed": party[removed],
+        "removed_index": removed,
+        "final_share": final,
+        "scenario": s,
+    }
+
+
+def _blended_rows(s: dict, basis, idx: np.ndarray, removed: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    """Blended, renormalised and constrained shares over the remaining eligible Parties (m x n_el-1)."""
+    m, n_el = keep.shape
+
+    def rescaled(share):
+        rest = 1.0 - share[removed]
+        others = np.broadcast_to(share[idx], (m, n_el))[keep].reshape(m, n_el - 1)
+        return np.divide(others, rest[:, None], out=np.zeros_like(others), where=(rest > _EMPTY_TOL)[:, None])
+
+    iusaf = rescaled(basis["iusaf_share"])
+    tsac = rescaled(basis["tsac_share"])
+    sosac = rescaled(basis["sosac_share"])
+
+    beta, gamma = float(s["tsac_beta"]), float(s["sosac_gamma"])
+    n_sids = basis["n_sids"] - (basis["sosac_share"][removed] > 0)
+    # Rows that removed the last SIDS take the no-SIDS fallback
+    a, b, g = (
+        np.where(n_sids > 0, float(with_sids), float(without))
+        for with_sids, without in zip(_blend_weights(beta, gamma, 1), _blend_weights(beta, gamma, 0))
+    )
+
+    blended = a[:, None] * iusaf + b[:, None] * tsac + g[:, None] * sosac
+    totals = blended.sum(axis=1)
+    positive = totals > 0
+    blended[positive] /= totals[positive, None]
+
+    floor = float(s["floor_pct"] or 0.0) / 100.0
+    ceiling = s["ceiling_pct"]
+    if floor > 0 or ceiling is not None:
+        blended = solve_floor_ceiling_batch(blended, floor, 1.0 if ceiling is None else float(ceiling) / 100.0)
+    return blended
+
+
+def influence_matrix(loo: dict) -> pd.DataFrame:
+    """Change in every Party's final share (columns) when each Party (rows) is removed.
+
+    The diagonal is minus the removed Party's own share; each row sums to zero.
+    """
+    delta = loo["final_share"] - loo["base_share"][None, :]
+    return pd.DataFrame(
+        delta,
+        index=pd.Index(loo["removed"], name="removed_party"),
+        columns=pd.Index(loo["party"], name="party"),
+    )
+
+
+def _binding_status(shares: np.ndarray, floor: float, cap: float | None) -> np.ndarray:
+    """-1 at the floor, +1 at the cap, 0 otherwise."""
+    status = np.zeros(shares.shape, dtype=int)
+    if floor > 0:
+        status[np.abs(shares - floor) <= _BINDING_TOL] = -1
+    if cap is not None:
+        status[np.abs(shares - cap) <= _BINDING_TOL] = 1
+    return status
+
+
+def marginal_effect_table(loo: dict) -> pd.DataFrame:
+    """Per removed Party: how its share is redistributed among the other eligible Parties.
+
+    Columns: `base_share`; the largest single gain (`top_gainer`,
+    `top_gain`); the mean and maximum relative uplift of the others' shares
+    (`mean_uplift_pct`, `max_uplift_pct`, over others with a positive
+    share); `n_losers`, others whose share falls; and `binding_changes`,
+    others that move onto or off the floor or cap. With a fund size in the
+    scenario, `allocation_m` and `top_gain_m` give the same in USD millions.
+    """
+    s = loo["scenario"]
+    base, final, removed = loo["base_share"], loo["final_share"], loo["removed_index"]
+    m = len(removed)
+    others = np.broadcast_to(loo["eligible"], final.shape).copy()
+    others[np.arange(m), removed] = False
+
+    delta = np.where(others, final - base[None, :], 0.0)
+    top = np.argmax(np.where(others, delta, -np.inf), axis=1) if m else np.zeros(0, dtype=int)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        uplift = np.where(others & (base > 0), delta / base[None, :], np.nan) * 100.0
+    valid = ~np.isnan(uplift).all(axis=1)
+    mean_uplift = np.full(m, np.nan)
+    max_uplift = np.full(m, np.nan)
+    mean_uplift[valid] = np.nanmean(uplift[valid], axis=1)
+    max_uplift[valid] = np.nanmax(uplift[valid], axis=1)
+
+    floor = float(s["floor_pct"] or 0.0) / 100.0
+    cap = None if s["ceiling_pct"] is None else float(s["ceiling_pct"]) / 100.0
+    flips = _binding_status(final, floor, cap) != _binding_status(base, floor, cap)[None, :]
+
+    table = pd.DataFrame({
+        "party": loo["removed"],
+        "base_share": base[removed],
+        "top_gainer": loo["party"][top],
+        "top_gain": delta[np.arange(m), top],
+        "mean_uplift_pct": mean_uplift,
+        "max_uplift_pct": max_uplift,
+        "n_losers": (others & (delta < -_BINDING_TOL)).sum(axis=1),
+        "binding_changes": (others & flips).sum(axis=1),
+    })
+    fund_size = float(s.get("fund_size", np.nan))
+    if np.isfinite(fund_size):
+        table.insert(2, "allocation_m", table["base_share"] * fund_size / 1_000_000.0)
+        table.insert(5, "top_gain_m", table["top_gain"] * fund_size / 1_000_000.0)
+    return table
@@ -0,0 +1,223 @@
+"""
+Precomputed scenario-library metrics for the sensitivity app.
+
+`get_scenario_library()` is fixed, so the library's comparator metrics, local
+stability and integrity checks depend only on the base frame and the fund-size
+anchor. `precompute_library()` evaluates every library scenario at every
+anchor (one process per anchor) and stores the stacked tables in a DuckDB file
+`data-snapshot/library_cache-v<version>-<key>.duckdb`. The key hashes the base
+frame, the library, the default ranges, the band config and the engine
+sources, so any change that could move a metric selects a new file.
+"""
+from __future__ import annotations
+
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+
+from cali_model.calculator import (
+    DEFAULT_BAND_CONFIG_PATH,
+    batch_scenario_frame,
+    calculate_allocations_batch_cached,
+)
+from cali_model.data_loader import SNAPSHOT_DIR_NAME, shared_base_data
+from cali_model.sensitivity_metrics import (
+    batch_metric_arrays,
+    build_pure_iusaf_comparator,
+    compute_local_stability_batch,
+    compute_metrics_arrays,
+    generate_integrity_checks,
+)
+from cali_model.sensitivity_scenarios import get_default_ranges, get_scenario_library
+
+# Bump when the stored tables change shape or meaning
+LIBRARY_CACHE_VERSION = 1
+LIBRARY_CACHE_PREFIX = "library_cache"
+
+# Modules whose code determines the stored metrics
+_ENGINE_SOURCES = ("calculator.py", "sensitivity_metrics.py", "sensitivity_scenarios.py", "library_cache.py")
+_TABLES = ("metrics", "integrity_checks")
+_ANCHOR_COLUMN = "library_fund_size"
+
+# Loaded cache files, one per path (the files are immutable once written)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def library_scenarios(fund_size: float, scenario_library: dict | None = None) -> list[dict]:
+    """The scenario library at one fund-size anchor, each scenario carrying its `scenario_id`."""
+    scenario_library = scenario_library if scenario_library is not None else get_scenario_library()
+    scenarios = []
+    for name, s in scenario_library.items():
+        scenario = dict(s)
+        scenario["fund_size"] = fund_size
+        scenario["scenario_id"] = name
+        scenarios.append(scenario)
+    return scenarios
+
+
+def _run_batch(base_df: pd.DataFrame, scenarios: list[dict]) -> dict:
+    return calculate_allocations_batch_cached(base_df, scenarios)
+
+
+def compute_library_metrics(base_df: pd.DataFrame, fund_size: float, ranges: dict | None = None) -> dict:
+    """Comparator metrics (with local stability) and integrity checks for every library scenario at `fund_size`.
+
+    Rows 3k, 3k+1 and 3k+2 of one cached batch are scenario k, its pure-IUSAF
+    comparator (constraints kept) and its equality comparator, as in the app.
+    Returns {"metrics": DataFrame, "integrity_checks": DataFrame}.
+    """
+    ranges = ranges if ranges is not None else get_default_ranges()
+    scenarios = library_scenarios(fund_size)
+    runs = []
+    for s in scenarios:
+        comp = build_pure_iusaf_comparator(s, keep_constraints=True)
+        runs += [s, comp, {**comp, "equality_mode": True}]
+    batch = _run_batch(base_df, runs)
+    local = [m for m, _ in compute_local_stability_batch(scenarios, base_df, _run_batch, ranges=ranges)]
+
+    metrics, integrity = [], []
+    for k, s in enumerate(scenarios):
+        current, iusaf_ref, eq_ref = (batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3))
+        metrics.append(compute_metrics_arrays(s, current, iusaf_ref, eq_ref, local_stability=local[k]))
+        integrity.append(
+            generate_integrity_checks(
+                scenario_id=s["scenario_id"],
+                scenario_params=s,
+                results_df=batch_scenario_frame(base_df, batch, 3 * k),
+                fund_size=float(fund_size),
+            )
+        )
+    return {"metrics": pd.DataFrame(metrics), "integrity_checks": pd.DataFrame(integrity)}
+
+
+def library_cache_key(base_df: pd.DataFrame) -> str:
+    """Hash of everything the stored metrics depend on: base frame, library, ranges, band config and engine code."""
+    digest = hashlib.blake2b(str(LIBRARY_CACHE_VERSION).encode(), digest_size=16)
+    digest.update(pd.util.hash_pandas_object(base_df, index=False).to_numpy().tobytes())
+    digest.update(repr(list(base_df.columns)).encode())
+    digest.update(repr(sorted(get_scenario_library().items())).encode())
+    digest.update(repr(sorted(get_default_ranges().items())).encode())
+    if DEFAULT_BAND_CONFIG_PATH.exists():
+        digest.update(DEFAULT_BAND_CONFIG_PATH.read_bytes())
+    here = Path(__file__).resolve().parent
+    for name in _ENGINE_SOURCES:
+        digest.update((here / name).read_bytes())
+    return digest.hexdigest()
+
+
+def library_cache_path(base_df: pd.DataFrame, base_path="data-raw", cache_dir=None) -> Path:
+    """Cache file for `base_df`: in `cache_dir`, else `data-snapshot/` next to `base_path`."""
+    cache_dir = Path(cache_dir) if cache_dir is not None else Path(base_path).parent / SNAPSHOT_DIR_NAME
+    return cache_dir / f"{LIBRARY_CACHE_PREFIX}-v{LIBRARY_CACHE_VERSION}-{library_cache_key(base_df)}.duckdb"
+
+
+def _fund_size_task(base_df: pd.DataFrame, fund_size: float) -> dict:
+    # Process-pool entry point: the base frame is small enough to ship with the task
+    return compute_library_metrics(base_df, fund_size)
+
+
+def _write_cache(results: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.unlink(missing_ok=True)
+    con = duckdb.connect(str(tmp))
+    try:
+        for table in _TABLES:
+            stacked = pd.concat(
+                [frames[table].assign(**{_ANCHOR_COLUMN: fund_size}) for fund_size, frames in results.items()],
+                ignore_index=True,
+            )
+            con.register("stacked", stacked)
+            con.execute(f"CREATE TABLE {table} AS SELECT * FROM stacked")
+            con.unregister("stacked")
+    finally:
+        con.close()
+    os.replace(tmp, path)
+
+    # Drop caches of superseded inputs or versions
+    for stale in path.parent.glob(f"{LIBRARY_CACHE_PREFIX}-*.duckdb"):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+
+
+def precompute_library(
+    base_df: pd.DataFrame | None = None,
+    fund_sizes=None,
+    workers: int | None = None,
+    base_path="data-raw",
+    cache_dir=None,
+    refresh: bool = False,
+) -> Path:
+    """Evaluate the library at every fund-size anchor and write the cache file; returns its path.
+
+    Anchors run in a spawn-context process pool (`workers` processes, default
+    one per anchor up to the CPU count); `workers=0` runs them in this
+    process, as does a pool that cannot start. An existing file for the same
+    key is kept unless `refresh=True`.
+    """
+    base_df = base_df if base_df is not None else shared_base_data(base_path)
+    path = library_cache_path(base_df, base_path, cache_dir)
+    if path.exists() and not refresh:
+        return path
+
+    fund_sizes = [float(f) for f in (fund_sizes if fund_sizes is not None else get_default_ranges()["fund_size"])]
+    if workers is None:
+        workers = min(len(fund_sizes), os.cpu_count() or 1)
+
+    results = None
+    if workers > 0:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                results = dict(zip(fund_sizes, pool.map(_fund_size_task, [base_df] * len(fund_sizes), fund_sizes)))
+        except (OSError, BrokenProcessPool):
+            results = None  # no subprocesses here: evaluate in-process below
+    if results is None:
+        results = {fund_size: compute_library_metrics(base_df, fund_size) for fund_size in fund_sizes}
+
+    try:
+        _write_cache(results, path)
+    except OSError:
+        return path  # read-only checkout: nothing persisted
+    with _loaded_lock:
+        _loaded.pop(path, None)
+    return path
+
+
+def load_library_cache(base_df: pd.DataFrame, base_path="data-raw", cache_dir=None) -> dict | None:
+    """Precomputed library tables for `base_df` as {fund_size: {"metrics", "integrity_checks"}}, or None.
+
+    None when no cache file matches the current key (not yet precomputed, or
+    stale). Each file is read once per process; callers get the same frames,
+    so copy before editing.
+    """
+    path = library_cache_path(base_df, base_path, cache_dir)
+    with _loaded_lock:
+        if path in _loaded:
+            return _loaded[path]
+    if not path.exists():
+        return None
+    try:
+        con = duckdb.connect(str(path), read_only=True)
+    except duckdb.Error:
+        return None  # unreadable or being replaced: treat as missing
+    try:
+        tables = {table: con.execute(f"SELECT * FROM {table}").df() for table in _TABLES}
+    finally:
+        con.close()
+
+    cached = {}
+    for table, stacked in tables.items():
+        for fund_size, rows in stacked.groupby(_ANCHOR_COLUMN, sort=False):
+            frame = rows.drop(columns=_ANCHOR_COLUMN).reset_index(drop=True)
+            cached.setdefault(float(fund_size), {})[table] = frame
+    with _loaded_lock:
+        _loaded[path] = cached
+    return cached
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import math
+import re
+from functools import lru_cache
 from typing import Any
 
 import numpy as np
@@ -16,7 +18,7 @@ import pandas as pd
 # (Final_share = (1-β-γ)·IUSAF + β·TSAC + γ·SOSAC).
 # Display labels in user-facing surfaces use “TSAC weight” and “SOSAC weight” for clarity.
 
-from cali_model.calculator import get_outcome_warning_feedback, get_stewardship_blend_feedback
+from cali_model.calculator import get_stewardship_blend_feedback, outcome_warning_conditions, scenario_fingerprint
 from cali_model.sensitivity_scenarios import generate_local_neighbor_scenarios as _generate_local_neighbor_scenarios
 
 
@@ -44,24 +46,31 @@ def _safe_float(value, default: float = 0.0) -> float:
         return default
 
 
-def _gini(values: pd.Series) -> float:
-    x = values.fillna(0.0).astype(float)
+def _gini(ascending: np.ndarray) -> float:
+    """Gini of shares already sorted ascending (negative values shift the distribution to zero)."""
+    x = ascending
+    if np.isnan(x).any():
+        x = np.sort(np.nan_to_num(x, nan=0.0))
     if len(x) == 0:
         return 0.0
     if (x < 0).any():
         x = x - x.min()
-    x = x.sort_values().reset_index(drop=True)
     n = len(x)
     total = x.sum()
     if total <= 0:
         return 0.0
-    weighted_sum = ((x.index + 1) * x).sum()
+    weighted_sum = (np.arange(1, n + 1) * x).sum()
     return float((2 * weighted_sum) / (n * total) - (n + 1) / n)
 
 
-def _hhi(shares: pd.Series) -> float:
-    s = shares.fillna(0.0).astype(float)
-    return float((s**2).sum())
+def _allocation_gini(ascending: np.ndarray) -> float:
+    """`compute_gini()` for allocations already sorted ascending."""
+    a = ascending[ascending >= 0]
+    n = len(a)
+    if n == 0 or a.sum() == 0:
+        return 0.0
+    idx = np.arange(1, n + 1)
+    return float((2 * (idx * a).sum()) / (n * a.sum()) - (n + 1) / n)
 
 
 def compute_gini(allocations: "pd.Series") -> float:
@@ -75,95 +84,195 @@ def compute_gini(allocations: "pd.Series") -> float:
     return float((2 * (idx * a).sum()) / (n * a.sum()) - (n + 1) / n)
 
 
+_COMPONENT_AMOUNT_COLUMNS = ("component_iusaf_amt", "component_tsac_amt", "component_sosac_amt")
+
+
 def compute_component_ratios(
     results_df: "pd.DataFrame",
     beta: float,
     gamma: float,
+    summary_only: bool = False,
 ) -> dict:
-    eligible = results_df[results_df["eligible"]].copy()
-
-    _safe_default = {
-        "ratio_df": pd.DataFrame(),
-        "max_tsac_iusaf_ratio": 0.0,
-        "n_parties_tsac_dominant": 0,
-        "china_tsac_iusaf_ratio": None,
-        "brazil_tsac_iusaf_ratio": None,
-        "tsac_balance_exceeded": False,
-        "sosac_balance_exceeded": False,
+    """Per-Party TSAC/IUSAF and SOSAC/IUSAF ratios and the balance flags built on them.
+
+    `ratio_df` lists eligible Parties by descending TSAC/IUSAF ratio. With
+    `summary_only=True` it is not built and only the scalar outputs are
+    returned (the maxima, Parties at the SOSAC maximum, China/Brazil ratios
+    and the balance flags).
+    """
+    arrays = {
+        "party": results_df["party"].to_numpy(),
+        "eligible": results_df["eligible"].to_numpy(dtype=bool),
     }
+    for col in _COMPONENT_AMOUNT_COLUMNS:
+        if col in results_df.columns:
+            arrays[col] = results_df[col].to_numpy(dtype=float)
+    if "is_sids" in results_df.columns:
+        arrays["is_sids"] = results_df["is_sids"].to_numpy(dtype=bool)
+
+    summary = _component_ratio_summary(arrays, beta, gamma)
+    if summary_only:
+        return summary
 
-    required = {"component_iusaf_amt", "component_tsac_amt", "component_sosac_amt"}
     # Keep this as `(beta == 0 and gamma == 0)`, not `beta == 0` alone,
     # so pure-SOSAC scenarios still compute SOSAC/IUSAF ratios.
-    if not required.issubset(eligible.columns) or (beta == 0 and gamma == 0):
-        return _safe_default
+    if not all(col in arrays for col in _COMPONENT_AMOUNT_COLUMNS) or (beta == 0 and gamma == 0):
+        return {"ratio_df": pd.DataFrame(), **summary}
+
+    eligible = arrays["eligible"]
+    iusaf = arrays["component_iusaf_amt"]
+    df = results_df.loc[eligible, ["party", *_COMPONENT_AMOUNT_COLUMNS]].copy()
+    df["tsac_iusaf_ratio"] = _safe_ratio(arrays["component_tsac_amt"], iusaf)[eligible]
+    df["sosac_iusaf_ratio"] = _safe_ratio(arrays["component_sosac_amt"], iusaf)[eligible]
+    df["tsac_dominant"] = df["tsac_iusaf_ratio"] > 1.0
+    return {"ratio_df": df.sort_values("tsac_iusaf_ratio", ascending=False), **summary}
 
-    df = eligible[["party", "component_iusaf_amt", "component_tsac_amt", "component_sosac_amt"]].copy()
 
-    def _ratio(numerator: float, denominator: float) -> float:
-        return (numerator / denominator) if denominator > 0 else float("inf")
+def _eligible(results_df: pd.DataFrame) -> pd.DataFrame:
+    return results_df[results_df["eligible"]].copy()
+
 
-    df["tsac_iusaf_ratio"] = df.apply(
-        lambda r: _ratio(r["component_tsac_amt"], r["component_iusaf_amt"]), axis=1
-    )
-    df["sosac_iusaf_ratio"] = df.apply(
-        lambda r: _ratio(r["component_sosac_amt"], r["component_iusaf_amt"]), axis=1
+# ── Array metrics kernel ─────────────────────────────────────────────────────
+# calculate_allocations() and calculate_allocations_batch() keep the base
+# frame's party order, so a scenario and its comparators are compared
+# position by position on NumPy arrays: no per-metric filtering, merges or
+# nlargest calls. Each eligible final_share / total_allocation vector is
+# sorted once and every order statistic is read off that sort.
+
+_METRIC_VALUE_COLUMNS = (
+    "final_share",
+    "total_allocation",
+    "state_component",
+    "iplc_component",
+    "component_iusaf_amt",
+    "component_tsac_amt",
+    "component_sosac_amt",
+)
+_METRIC_FLAG_COLUMNS = ("is_sids", "is_ldc")
+_METRIC_GROUP_COLUMNS = {"region": "region", "WB Income Group": "income"}
+
+
+def _band1_mask(un_band: np.ndarray) -> np.ndarray:
+    return np.fromiter(
+        (isinstance(band, str) and band.startswith("Band 1") for band in un_band), dtype=bool, count=len(un_band)
     )
-    df["tsac_dominant"] = df["tsac_iusaf_ratio"] > 1.0
-
-    def _named_ratio(fragment: str):
-        mask = df["party"].str.contains(fragment, case=False, na=False)
-        return float(df.loc[mask, "tsac_iusaf_ratio"].iloc[0]) if mask.any() else None
 
-    china_ratio = _named_ratio("China")
-    brazil_ratio = _named_ratio("Brazil")
 
-    if "is_sids" in eligible.columns:
-        sids_rows = eligible[eligible["is_sids"]].copy()
+def metric_arrays(results_df: pd.DataFrame) -> dict[str, np.ndarray]:
+    """Aligned NumPy columns of a results frame, as read by `compute_metrics_arrays()`."""
+    arrays = {
+        "party": results_df["party"].to_numpy(),
+        "eligible": results_df["eligible"].to_numpy(dtype=bool),
+    }
+    for col in _METRIC_VALUE_COLUMNS:
+        if col in results_df.columns:
+            arrays[col] = results_df[col].to_numpy(dtype=float)
+    for col in _METRIC_FLAG_COLUMNS:
+        if col in results_df.columns:
+            arrays[col] = results_df[col].to_numpy(dtype=bool)
+    for col in _METRIC_GROUP_COLUMNS:
+        if col in results_df.columns:
+            arrays[col] = results_df[col].to_numpy(dtype=object)
+    if "un_band" in results_df.columns:
+        arrays["band1"] = _band1_mask(results_df["un_band"].to_numpy(dtype=object))
+    return arrays
+
+
+def batch_metric_arrays(base_df: pd.DataFrame, batch: dict, i: int) -> dict[str, np.ndarray]:
+    """`metric_arrays()` for scenario `i` of a `calculate_allocations_batch()` result, without building its frame.
+
+    Uses the same arithmetic as `batch_scenario_frame()`, so metrics match
+    the frame path exactly.
+    """
+    basis = batch["bases"][batch["basis_index"][i]]
+    fund_size = batch["fund_size"][i]
+    final_share = batch["final_share"][i]
+    total = final_share * fund_size
+    iplc = total * (batch["iplc_share_pct"][i] / 100.0)
+
+    arrays = {
+        "party": batch["party"],
+        "eligible": batch["eligible"][i],
+        "final_share": final_share,
+        "total_allocation": total / 1_000_000.0,
+        "state_component": (total - iplc) / 1_000_000.0,
+        "iplc_component": iplc / 1_000_000.0,
+        "component_iusaf_amt": (batch["alpha"][i] * batch["iusaf_share"][i] * fund_size) / 1_000_000.0,
+        "component_tsac_amt": (batch["beta"][i] * batch["tsac_share"][i] * fund_size) / 1_000_000.0,
+        "component_sosac_amt": (batch["gamma"][i] * batch["sosac_share"][i] * fund_size) / 1_000_000.0,
+    }
+    for col in _METRIC_FLAG_COLUMNS:
+        if col in base_df.columns:
+            arrays[col] = base_df[col].to_numpy(dtype=bool)
+    for col in _METRIC_GROUP_COLUMNS:
+        if col in base_df.columns:
+            arrays[col] = base_df[col].to_numpy(dtype=object)
+    if batch["scenarios"][i]["equality_mode"]:
+        arrays["band1"] = np.zeros(len(final_share), dtype=bool)
     else:
-        sids_rows = eligible[eligible["component_sosac_amt"] > 0].copy()
+        arrays["band1"] = _band1_mask(basis["un_band"])
+    return arrays
 
-    sosac_exceeded = False
-    if not sids_rows.empty and "component_iusaf_amt" in sids_rows.columns:
-        sids_ratios = sids_rows.apply(
-            lambda r: _ratio(r["component_sosac_amt"], r["component_iusaf_amt"]), axis=1
-        )
-        sosac_exceeded = bool((sids_ratios > 1.0).any())
-
-    ratio_df = df[
-        [
-            "party",
-            "component_iusaf_amt",
-            "component_tsac_amt",
-            "component_sosac_amt",
-            "tsac_iusaf_ratio",
-            "sosac_iusaf_ratio",
-            "tsac_dominant",
-        ]
-    ].sort_values("tsac_iusaf_ratio", ascending=False)
-
-    finite_ratios = df["tsac_iusaf_ratio"].replace(float("inf"), 0)
 
+def _eligible_view(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Eligible Parties only, with final_share in stable descending order and allocations ascending."""
+    eligible = arrays["eligible"]
+    share = arrays["final_share"][eligible]
+    total = arrays["total_allocation"][eligible] if "total_allocation" in arrays else None
+    # Stable sort on -share: ties keep frame order, as DataFrame.nlargest(keep="first")
+    desc = np.argsort(-share, kind="stable")
     return {
-        "ratio_df": ratio_df,
-        "max_tsac_iusaf_ratio": float(finite_ratios.max()),
-        "n_parties_tsac_dominant": int(df["tsac_dominant"].sum()),
-        "china_tsac_iusaf_ratio": china_ratio,
-        "brazil_tsac_iusaf_ratio": brazil_ratio,
-        "tsac_balance_exceeded": bool((df["tsac_iusaf_ratio"] > 1.0).any()),
-        "sosac_balance_exceeded": sosac_exceeded,
+        "party": arrays["party"][eligible],
+        "share": share,
+        "share_desc": share[desc],
+        "total": total,
+        "total_asc": np.sort(total) if total is not None else None,
+        "desc": desc,
     }
 
 
-def _top_turnover(current: pd.DataFrame, baseline: pd.DataFrame, n: int = 20) -> float:
-    cur_top = set(current.nlargest(min(n, len(current)), "final_share")["party"].tolist())
-    base_top = set(baseline.nlargest(min(n, len(baseline)), "final_share")["party"].tolist())
-    universe = max(1, min(n, len(cur_top | base_top)))
-    return float(len(cur_top.symmetric_difference(base_top)) / universe)
+def _aligned(arrays: dict[str, np.ndarray], party: np.ndarray) -> dict[str, np.ndarray]:
+    """`arrays` re-ordered onto `party`; Parties it lacks become ineligible (an inner join on party)."""
+    if arrays["party"] is party or np.array_equal(arrays["party"], party):
+        return arrays
+    pos = pd.Index(arrays["party"]).get_indexer(party)
+    found = pos >= 0
+    take = np.where(found, pos, 0)
+    return {
+        "party": party,
+        "eligible": arrays["eligible"][take] & found,
+        "final_share": np.where(found, arrays["final_share"][take], np.nan),
+    }
 
 
-def _eligible(results_df: pd.DataFrame) -> pd.DataFrame:
-    return results_df[results_df["eligible"]].copy()
+def _average_ranks(values: np.ndarray) -> tuple[np.ndarray, int]:
+    """Average ranks (ties share their mean rank, as `Series.rank()`) and the number of distinct values."""
+    order = np.argsort(values, kind="stable")
+    ordered = values[order]
+    starts = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    ends = np.append(starts[1:], len(values))
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return ranks, len(starts)
+
+
+def _spearman(current: np.ndarray, baseline: np.ndarray) -> float:
+    """Spearman rank correlation of two share vectors over the same Parties."""
+    if len(current) == 0:
+        return float("nan")
+    r_cur, n_cur = _average_ranks(current)
+    r_base, n_base = _average_ranks(baseline)
+    if n_cur <= 1 or n_base <= 1:
+        same_distribution = np.array_equal(np.round(current, 12), np.round(baseline, 12), equal_nan=True)
+        return 1.0 if same_distribution else 0.0
+    return float(np.corrcoef(r_cur, r_base)[0, 1])
+
+
+def _top_turnover(current: dict[str, np.ndarray], baseline: dict[str, np.ndarray], n: int = 20) -> float:
+    cur_top = set(current["party"][current["desc"][:n]].tolist())
+    base_top = set(baseline["party"][baseline["desc"][:n]].tolist())
+    universe = max(1, min(n, len(cur_top | base_top)))
+    return float(len(cur_top.symmetric_difference(base_top)) / universe)
 
 
 def _spearman_by_party(current: pd.DataFrame, baseline: pd.DataFrame) -> float:
@@ -178,76 +287,124 @@ def _spearman_by_party(current: pd.DataFrame, baseline: pd.DataFrame) -> float:
     merged = cur_elig[["party", "final_share"]].merge(
         base_elig[["party", "final_share"]], on="party", how="inner", suffixes=("_cur", "_base")
     )
-    if merged.empty:
-        return float("nan")
-    r_cur = merged["final_share_cur"].rank(method="average")
-    r_base = merged["final_share_base"].rank(method="average")
-    if r_cur.nunique() <= 1 or r_base.nunique() <= 1:
-        same_distribution = merged["final_share_cur"].round(12).equals(merged["final_share_base"].round(12))
-        return 1.0 if same_distribution else 0.0
-    return float(r_cur.corr(r_base, method="pearson"))
+    return _spearman(merged["final_share_cur"].to_numpy(dtype=float), merged["final_share_base"].to_numpy(dtype=float))
 
 
-def _group_totals(eligible_df: pd.DataFrame, group_col: str) -> dict[str, float]:
-    if group_col not in eligible_df.columns:
-        return {}
-    grouped = eligible_df.groupby(group_col, dropna=False)["total_allocation"].sum().to_dict()
-    out = {}
-    for key, value in grouped.items():
-        label = "NA" if pd.isna(key) else str(key)
-        out[label] = float(value)
+def _group_totals(labels: np.ndarray, totals: np.ndarray) -> dict[str, float]:
+    """Eligible allocation per group, keyed as `groupby(dropna=False)` would order them (missing → "NA")."""
+    codes, uniques = pd.factorize(labels, sort=True)
+    n_groups = len(uniques)
+    sums = np.bincount(codes[codes >= 0], weights=totals[codes >= 0], minlength=n_groups)
+    out = {str(key): float(value) for key, value in zip(uniques, sums)}
+    if (codes < 0).any():
+        out["NA"] = float(totals[codes < 0].sum())
     return out
 
 
-def _band1_pct_change(
-    results_df: "pd.DataFrame",
-    iusaf_results_df: "pd.DataFrame",
-) -> "float | None":
-    try:
-        col = "un_band"
-        if col not in results_df.columns:
-            return None
-        b1 = results_df[
-            results_df["eligible"] & results_df[col].str.startswith("Band 1", na=False)
-        ]["total_allocation"].mean()
-        b1_ref = iusaf_results_df[
-            iusaf_results_df["eligible"] & iusaf_results_df[col].str.startswith("Band 1", na=False)
-        ]["total_allocation"].mean()
-        return float((b1 - b1_ref) / b1_ref * 100) if b1_ref and b1_ref > 0 else None
-    except Exception:
+def _band1_pct_change(current: dict[str, np.ndarray], iusaf: dict[str, np.ndarray]) -> "float | None":
+    if "band1" not in current or "band1" not in iusaf:
         return None
 
+    def _mean(arrays):
+        values = arrays["total_allocation"][arrays["eligible"] & arrays["band1"]]
+        return values.mean() if len(values) else float("nan")
 
-def build_pure_iusaf_comparator(scenario: dict, keep_constraints: bool = True) -> dict:
-    comparator = dict(scenario)
-    comparator["scenario_id"] = f"{scenario.get('scenario_id', 'scenario')}_pure_iusaf_comp"
-    comparator["tsac_beta"] = 0.0
-    comparator["sosac_gamma"] = 0.0
-    comparator["equality_mode"] = False
-    if not keep_constraints:
-        comparator["floor_pct"] = 0.0
-        comparator["ceiling_pct"] = None
-    return comparator
+    b1 = _mean(current)
+    b1_ref = _mean(iusaf)
+    return float((b1 - b1_ref) / b1_ref * 100) if b1_ref and b1_ref > 0 else None
 
 
-def compute_departure_from_pure_iusaf(current_results_df: pd.DataFrame, pure_iusaf_results_df: pd.DataFrame) -> dict[str, Any]:
-    cur = _eligible(current_results_df)
-    pure = _eligible(pure_iusaf_results_df)
-    merged = cur[["party", "final_share"]].merge(
-        pure[["party", "final_share"]],
-        on="party",
-        how="inner",
-        suffixes=("_cur", "_pure"),
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """numerator / denominator, +inf where the denominator is not positive."""
+    return np.divide(
+        numerator, denominator, out=np.full(np.shape(numerator), np.inf), where=denominator > 0
     )
-    if merged.empty:
+
+
+@lru_cache(maxsize=32)
+def _name_positions(parties: tuple, fragment: str) -> np.ndarray:
+    """Positions of the Parties whose name contains `fragment` (case-insensitive), cached per party list."""
+    pattern = re.compile(fragment, flags=re.IGNORECASE)
+    positions = np.flatnonzero([isinstance(name, str) and pattern.search(name) is not None for name in parties])
+    positions.setflags(write=False)
+    return positions
+
+
+def _named_ratio(party: np.ndarray, eligible: np.ndarray, ratios: np.ndarray, fragment: str):
+    """Ratio of the first eligible Party whose name contains `fragment`, or None."""
+    positions = _name_positions(tuple(party), fragment)
+    positions = positions[eligible[positions]]
+    return float(ratios[positions[0]]) if len(positions) else None
+
+
+def _component_ratio_summary(arrays: dict[str, np.ndarray], beta: float, gamma: float) -> dict:
+    """The scalar outputs of `compute_component_ratios()` (no `ratio_df`)."""
+    if not all(col in arrays for col in _COMPONENT_AMOUNT_COLUMNS) or (beta == 0 and gamma == 0):
+        return {
+            "max_tsac_iusaf_ratio": 0.0,
+            "n_parties_tsac_dominant": 0,
+            "china_tsac_iusaf_ratio": None,
+            "brazil_tsac_iusaf_ratio": None,
+            "tsac_balance_exceeded": False,
+            "sosac_balance_exceeded": False,
+            "max_sosac_iusaf_ratio": None,
+            "max_sosac_ratio_parties": None,
+        }
+
+    party = arrays["party"]
+    eligible = arrays["eligible"]
+    iusaf = arrays["component_iusaf_amt"]
+    sosac = arrays["component_sosac_amt"]
+    tsac_ratio = _safe_ratio(arrays["component_tsac_amt"], iusaf)
+    sosac_ratio = _safe_ratio(sosac, iusaf)
+    tsac_dominant = eligible & (tsac_ratio > 1.0)
+
+    sids = arrays["is_sids"] if "is_sids" in arrays else sosac > 0
+    sosac_exceeded = bool((eligible & sids & (sosac_ratio > 1.0)).any())
+
+    finite = np.where(np.isposinf(tsac_ratio), 0.0, tsac_ratio)[eligible]
+    finite = finite[~np.isnan(finite)]
+
+    # SOSAC maximum over finite ratios, with every Party that attains it
+    max_sosac = max_sosac_parties = None
+    if eligible.any():
+        finite_sosac = eligible & np.isfinite(sosac_ratio)
+        max_sosac = float(sosac_ratio[finite_sosac].max()) if finite_sosac.any() else 0.0
+        at_max = party[finite_sosac & (sosac_ratio == max_sosac)]
+        names = sorted(str(name) for name in at_max if not pd.isna(name))
+        max_sosac_parties = ", ".join(names) if names else None
+
+    return {
+        "max_tsac_iusaf_ratio": float(finite.max()) if len(finite) else float("nan"),
+        "n_parties_tsac_dominant": int(tsac_dominant.sum()),
+        "china_tsac_iusaf_ratio": _named_ratio(party, eligible, tsac_ratio, "China"),
+        "brazil_tsac_iusaf_ratio": _named_ratio(party, eligible, tsac_ratio, "Brazil"),
+        "tsac_balance_exceeded": bool(tsac_dominant.any()),
+        "sosac_balance_exceeded": sosac_exceeded,
+        "max_sosac_iusaf_ratio": max_sosac,
+        "max_sosac_ratio_parties": max_sosac_parties,
+    }
+
+
+def _departure(
+    current: dict[str, np.ndarray],
+    pure: dict[str, np.ndarray],
+    current_view: dict[str, np.ndarray],
+    pure_view: dict[str, np.ndarray],
+) -> dict[str, Any]:
+    pure = _aligned(pure, current["party"])
+    both = current["eligible"] & pure["eligible"]
+    if not both.any():
         spearman = float("nan")
         turnover = 0.0
         mean_abs = 0.0
         max_abs = 0.0
     else:
-        spearman = _spearman_by_party(cur, pure)
-        turnover = _top_turnover(cur, pure, n=20)
-        abs_delta = (merged["final_share_cur"] - merged["final_share_pure"]).abs()
+        cur_share = current["final_share"][both]
+        pure_share = pure["final_share"][both]
+        spearman = _spearman(cur_share, pure_share)
+        turnover = _top_turnover(current_view, pure_view, n=20)
+        abs_delta = np.abs(cur_share - pure_share)
         mean_abs = float(abs_delta.mean())
         max_abs = float(abs_delta.max())
 
@@ -271,6 +428,28 @@ def compute_departure_from_pure_iusaf(current_results_df: pd.DataFrame, pure_ius
     }
 
 
+def build_pure_iusaf_comparator(scenario: dict, keep_constraints: bool = True) -> dict:
+    comparator = dict(scenario)
+    comparator["scenario_id"] = f"{scenario.get('scenario_id', 'scenario')}_pure_iusaf_comp"
+    comparator["tsac_beta"] = 0.0
+    comparator["sosac_gamma"] = 0.0
+    comparator["equality_mode"] = False
+    if not keep_constraints:
+        comparator["floor_pct"] = 0.0
+        comparator["ceiling_pct"] = None
+    return comparator
+
+
+def compute_departure_from_pure_iusaf(current_results_df: pd.DataFrame, pure_iusaf_results_df: pd.DataFrame) -> dict[str, Any]:
+    current = metric_arrays(current_results_df)
+    pure = metric_arrays(pure_iusaf_results_df)
+    return _departure(current, pure, _eligible_view(current), _eligible_view(pure))
+
+
+# Parameters stepped by the local neighbour scan, in reporting order
+_LOCAL_PARAMETERS = ("tsac_beta", "sosac_gamma", "iplc_share_pct", "floor_pct", "ceiling_pct")
+
+
 def generate_local_neighbor_scenarios(base_scenario: dict, ranges: dict[str, list] | None = None) -> list[dict]:
     return _generate_local_neighbor_scenarios(base_scenario, ranges=ranges)
 
@@ -283,39 +462,44 @@ def compute_local_stability_metrics(
     ranges: dict[str, list] | None = None,
 ) -> tuple[dict[str, Any], pd.DataFrame]:
     neighbors = generate_local_neighbor_scenarios(base_scenario, ranges=ranges)
-    base_eligible = _eligible(base_results_df)
+    base = metric_arrays(base_results_df)
+    base_view = _eligible_view(base)
     rows = []
 
     for n in neighbors:
-        n_results = run_scenario_fn(base_df, n)
-        n_eligible = _eligible(n_results)
-        merged = base_eligible[["party", "final_share"]].merge(
-            n_eligible[["party", "final_share"]],
-            on="party",
-            how="inner",
-            suffixes=("_base", "_neighbor"),
-        )
-        abs_delta = (merged["final_share_base"] - merged["final_share_neighbor"]).abs() if not merged.empty else pd.Series(dtype=float)
-
-        changed_params = []
-        for key in ["tsac_beta", "sosac_gamma", "iplc_share_pct", "floor_pct", "ceiling_pct"]:
-            if n.get(key) != base_scenario.get(key):
-                changed_params.append((key, n.get(key)))
-        param_changed, new_value = changed_params[0] if changed_params else ("none", None)
+        neighbor = _aligned(metric_arrays(run_scenario_fn(base_df, n)), base["party"])
+        both = base["eligible"] & neighbor["eligible"]
+        base_share = base["final_share"][both]
+        neighbor_share = neighbor["final_share"][both]
+        abs_delta = np.abs(base_share - neighbor_share)
+        param_changed, new_value = _changed_parameter(n, base_scenario)
 
         rows.append(
             {
                 "scenario_id": n.get("scenario_id"),
                 "parameter_changed": param_changed,
                 "new_value": new_value,
-                "spearman_vs_baseline": _spearman_by_party(n_eligible, base_eligible),
-                "top20_turnover_vs_baseline": _top_turnover(n_eligible, base_eligible, n=20),
+                "spearman_vs_baseline": _spearman(neighbor_share, base_share),
+                "top20_turnover_vs_baseline": _top_turnover(_eligible_view(neighbor), base_view, n=20),
                 "mean_abs_share_delta_vs_baseline": float(abs_delta.mean()) if len(abs_delta) else 0.0,
                 "max_abs_share_delta_vs_baseline": float(abs_delta.max()) if len(abs_delta) else 0.0,
             }
         )
 
     table = pd.DataFrame(rows)
+    return _local_stability_summary(table), table
+
+
+def _changed_parameter(neighbor: dict, base_scenario: dict) -> tuple[str, Any]:
+    """First local-sweep parameter in which a neighbour differs from its base, with its new value."""
+    for key in _LOCAL_PARAMETERS:
+        if neighbor.get(key) != base_scenario.get(key):
+            return key, neighbor.get(key)
+    return "none", None
+
+
+def _local_stability_summary(table: pd.DataFrame) -> dict[str, Any]:
+    """Stability label and instability flag from a local neighbour table."""
     if table.empty:
         out = {
             "local_min_spearman_vs_baseline": 1.0,
@@ -325,7 +509,7 @@ def compute_local_stability_metrics(
             "local_stability_label": "stable",
             "local_blended_instability_flag": False,
         }
-        return out, table
+        return out
 
     min_spearman = float(table["spearman_vs_baseline"].min())
     max_turnover = float(table["top20_turnover_vs_baseline"].max())
@@ -355,7 +539,75 @@ def compute_local_stability_metrics(
         "local_stability_label": label,
         "local_blended_instability_flag": instability,
     }
-    return out, table
+    return out
+
+
+def compute_local_stability_batch(
+    base_scenarios: list[dict],
+    base_df: pd.DataFrame,
+    run_batch_fn,
+    ranges: dict[str, list] | None = None,
+) -> list[tuple[dict[str, Any], pd.DataFrame]]:
+    """`compute_local_stability_metrics()` for several base scenarios from one allocation batch.
+
+    The base scenarios and all their neighbours are deduplicated on
+    `scenario_fingerprint()` and evaluated with a single
+    ``run_batch_fn(base_df, scenarios)`` call (a `calculate_allocations_batch()`
+    or its cached variant). Neighbours only move blend or constraint settings,
+    so they share their base's component basis, and neighbours that leave the
+    shares unchanged (IPLC split) reuse the base row. Scoring is row-wise.
+    Returns one ``(summary, table)`` pair per base scenario, as the
+    per-scenario function.
+    """
+    runs, index = [], {}
+
+    def _row(scenario: dict) -> int:
+        key = scenario_fingerprint(scenario)
+        if key not in index:
+            index[key] = len(runs)
+            runs.append(scenario)
+        return index[key]
+
+    plans = []
+    for base_scenario in base_scenarios:
+        neighbors = generate_local_neighbor_scenarios(base_scenario, ranges=ranges)
+        plans.append((base_scenario, _row(base_scenario), neighbors, [_row(n) for n in neighbors]))
+    batch = run_batch_fn(base_df, runs) if runs else None
+
+    out = []
+    for base_scenario, b, neighbors, rows in plans:
+        rows = np.asarray(rows, dtype=int)
+        share, eligible = batch["final_share"][rows], batch["eligible"][rows]
+        base_share = np.broadcast_to(batch["final_share"][b], share.shape)
+        base_eligible = batch["eligible"][b][None, :]
+        both = eligible & base_eligible
+        n_both = both.sum(axis=1)
+
+        desc, _, in_range = _row_sorted(share, eligible, descending=True)
+        base_desc, _, base_in_range = _row_sorted(base_share[:1], base_eligible, descending=True)
+        cur_top = _row_top_members(desc, in_range, 20)
+        base_top = _row_top_members(base_desc, base_in_range, 20)
+        universe = np.clip((cur_top | base_top).sum(axis=1), 1, 20)
+
+        abs_delta = np.where(both, np.abs(share - base_share), 0.0)
+        changed = [_changed_parameter(n, base_scenario) for n in neighbors]
+        table = pd.DataFrame(
+            {
+                "scenario_id": [n.get("scenario_id") for n in neighbors],
+                "parameter_changed": [c[0] for c in changed],
+                "new_value": [c[1] for c in changed],
+                "spearman_vs_baseline": _row_spearman(share, base_share, both),
+                "top20_turnover_vs_baseline": (cur_top ^ base_top).sum(axis=1) / universe,
+                "mean_abs_share_delta_vs_baseline": np.divide(
+                    abs_delta.sum(axis=1), n_both, out=np.zeros(len(rows)), where=n_both > 0
+                ),
+                "max_abs_share_delta_vs_baseline": abs_delta.max(axis=1, initial=0.0),
+            }
+        )
+        if table.empty:
+            table = pd.DataFrame()
+        out.append((_local_stability_summary(table), table))
+    return out
 
 
 def structural_break_flag(metrics: dict[str, Any]) -> bool:
@@ -378,50 +630,75 @@ def compute_metrics(
     equality_baseline_df: pd.DataFrame,
     local_stability: dict[str, Any] | None = None,
 ) -> dict[str, Any]:
-    eligible_df = _eligible(results_df)
-    iusaf_eligible = _eligible(iusaf_baseline_df)
-    equality_eligible = _eligible(equality_baseline_df)
+    return compute_metrics_arrays(
+        scenario,
+        metric_arrays(results_df),
+        metric_arrays(iusaf_baseline_df),
+        metric_arrays(equality_baseline_df),
+        local_stability=local_stability,
+    )
 
-    n_eligible = int(len(eligible_df))
-    n_sids_eligible = int(eligible_df["is_sids"].sum()) if "is_sids" in eligible_df else 0
+
+def compute_metrics_arrays(
+    scenario: dict,
+    current: dict[str, np.ndarray],
+    iusaf_baseline: dict[str, np.ndarray],
+    equality_baseline: dict[str, np.ndarray],
+    local_stability: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """`compute_metrics()` on aligned arrays from `metric_arrays()` / `batch_metric_arrays()`."""
+    eligible = current["eligible"]
+    view = _eligible_view(current)
+    iusaf_view = _eligible_view(iusaf_baseline)
+    share_desc = view["share_desc"]
+    total = view["total"]
+    total_asc = view["total_asc"]
+
+    n_eligible = int(len(total))
+    n_sids_eligible = int(current["is_sids"][eligible].sum()) if "is_sids" in current else 0
     fund_size = float(scenario["fund_size"])
     total_m = fund_size / 1_000_000.0
-    _ratios = compute_component_ratios(
-        results_df,
-        float(scenario.get("tsac_beta", 0.0)),
-        float(scenario.get("sosac_gamma", 0.0)),
-    )
-    allocation_gini = compute_gini(results_df.loc[results_df["eligible"], "total_allocation"])
-    _b1_change = _band1_pct_change(results_df, iusaf_baseline_df)
+    beta = float(scenario.get("tsac_beta", 0.0))
+    gamma = float(scenario.get("sosac_gamma", 0.0))
+    _ratios = _component_ratio_summary(current, beta, gamma)
+    allocation_gini = _allocation_gini(total_asc)
+    _b1_change = _band1_pct_change(current, iusaf_baseline)
 
     eq_ref = (fund_size / n_eligible / 1_000_000.0) if n_eligible > 0 else 0.0
+    if n_eligible:
+        mid = n_eligible // 2
+        median_alloc = total_asc[mid] if n_eligible % 2 else total_asc[mid - 1 : mid + 1].mean()
+        p10, p90 = np.percentile(total_asc, [10.0, 90.0])
     if eq_ref > 0 and n_eligible > 0:
-        pct_below_eq = float((eligible_df["total_allocation"] < eq_ref).mean() * 100.0)
-        median_pct_eq = float((eligible_df["total_allocation"].median() / eq_ref) * 100.0)
+        below_eq_share = (total < eq_ref).mean()
+        pct_below_eq = float(below_eq_share * 100.0)
+        median_pct_eq = float((median_alloc / eq_ref) * 100.0)
+        outcome_warning = any(outcome_warning_conditions(below_eq_share, median_pct_eq))
     else:
         pct_below_eq = 0.0
         median_pct_eq = 100.0
+        outcome_warning = False
 
     floor_threshold = float(scenario.get("floor_pct") or 0.0) / 100.0
     ceiling_raw = scenario.get("ceiling_pct")
     ceiling_threshold = None if ceiling_raw is None else float(ceiling_raw) / 100.0
 
     if floor_threshold > 0:
-        floor_binding_count = int((eligible_df["final_share"] <= floor_threshold + 1e-9).sum())
+        floor_binding_count = int((view["share"] <= floor_threshold + 1e-9).sum())
     else:
         floor_binding_count = 0
 
     if ceiling_threshold is not None:
-        ceiling_binding_count = int((eligible_df["final_share"] >= ceiling_threshold - 1e-9).sum())
+        ceiling_binding_count = int((view["share"] >= ceiling_threshold - 1e-9).sum())
     else:
         ceiling_binding_count = 0
 
-    stewardship_feedback = get_stewardship_blend_feedback(
-        float(scenario.get("tsac_beta", 0.0)), float(scenario.get("sosac_gamma", 0.0))
-    )
-    outcome_feedback = get_outcome_warning_feedback(results_df, fund_size)
+    stewardship_feedback = get_stewardship_blend_feedback(beta, gamma)
 
-    departure = compute_departure_from_pure_iusaf(results_df, iusaf_baseline_df)
+    departure = _departure(current, iusaf_baseline, view, iusaf_view)
+    equality_baseline = _aligned(equality_baseline, current["party"])
+    both_eq = eligible & equality_baseline["eligible"]
+    spearman_vs_equality = _spearman(current["final_share"][both_eq], equality_baseline["final_share"][both_eq])
     local = local_stability or {
         "local_min_spearman_vs_baseline": float("nan"),
         "local_max_top20_turnover_vs_baseline": float("nan"),
@@ -431,41 +708,41 @@ def compute_metrics(
         "local_blended_instability_flag": False,
     }
 
+    if n_eligible:
+        negative_count = sum(
+            int((current[col][eligible] < 0).sum())
+            for col in ("final_share", "total_allocation", "state_component", "iplc_component")
+        )
+
     metrics = {
         "scenario_id": scenario.get("scenario_id", "scenario"),
         "fund_size": fund_size,
         "un_scale_mode": scenario.get("un_scale_mode"),
         "exclude_hi": bool(scenario.get("exclude_high_income", False)),
         "iplc_share": float(scenario.get("iplc_share_pct", 50)),
-        "tsac_beta": float(scenario.get("tsac_beta", 0.0)),
-        "sosac_gamma": float(scenario.get("sosac_gamma", 0.0)),
+        "tsac_beta": beta,
+        "sosac_gamma": gamma,
         "floor_pct": float(scenario.get("floor_pct", 0.0) or 0.0),
         "ceiling_pct": None if ceiling_raw is None else float(ceiling_raw),
         "n_eligible": n_eligible,
         "n_sids_eligible": n_sids_eligible,
         "floor_binding_count": floor_binding_count,
         "ceiling_binding_count": ceiling_binding_count,
-        "sum_final_share": float(eligible_df["final_share"].sum()) if n_eligible else 0.0,
-        "sum_total_allocation": float(eligible_df["total_allocation"].sum()) if n_eligible else 0.0,
-        "negative_count": int((eligible_df[["final_share", "total_allocation", "state_component", "iplc_component"]] < 0).sum().sum())
-        if n_eligible
-        else 0,
-        "top10_share": float(eligible_df.nlargest(min(10, n_eligible), "final_share")["final_share"].sum()) if n_eligible else 0.0,
-        "top20_share": float(eligible_df.nlargest(min(20, n_eligible), "final_share")["final_share"].sum()) if n_eligible else 0.0,
-        "mean_alloc": float(eligible_df["total_allocation"].mean()) if n_eligible else 0.0,
-        "median_alloc": float(eligible_df["total_allocation"].median()) if n_eligible else 0.0,
-        "p90_p10_ratio": float(
-            eligible_df["total_allocation"].quantile(0.90) / max(eligible_df["total_allocation"].quantile(0.10), 1e-9)
-        )
-        if n_eligible
-        else 0.0,
-        "hhi": _hhi(eligible_df["final_share"]) if n_eligible else 0.0,
-        "gini": _gini(eligible_df["final_share"]) if n_eligible else 0.0,
+        "sum_final_share": float(view["share"].sum()) if n_eligible else 0.0,
+        "sum_total_allocation": float(total.sum()) if n_eligible else 0.0,
+        "negative_count": negative_count if n_eligible else 0,
+        "top10_share": float(share_desc[:10].sum()) if n_eligible else 0.0,
+        "top20_share": float(share_desc[:20].sum()) if n_eligible else 0.0,
+        "mean_alloc": float(total.mean()) if n_eligible else 0.0,
+        "median_alloc": float(median_alloc) if n_eligible else 0.0,
+        "p90_p10_ratio": float(p90 / max(p10, 1e-9)) if n_eligible else 0.0,
+        "hhi": float((np.nan_to_num(view["share"], nan=0.0) ** 2).sum()) if n_eligible else 0.0,
+        "gini": _gini(share_desc[::-1]) if n_eligible else 0.0,
         "gini_coefficient": allocation_gini,
         "pct_below_equality": pct_below_eq,
         "median_pct_of_equality": median_pct_eq,
         "spearman_vs_iusaf": departure["spearman_vs_pure_iusaf"],
-        "spearman_vs_equality": _spearman_by_party(eligible_df, equality_eligible),
+        "spearman_vs_equality": spearman_vs_equality,
         "top20_turnover_vs_iusaf": departure["top20_turnover_vs_pure_iusaf"],
         "spearman_vs_pure_iusaf": departure["spearman_vs_pure_iusaf"],
         "top20_turnover_vs_pure_iusaf": departure["top20_turnover_vs_pure_iusaf"],
@@ -486,25 +763,203 @@ def compute_metrics(
         "local_max_abs_share_delta": _safe_float(local.get("local_max_abs_share_delta"), float("nan")),
         "local_stability_label": local.get("local_stability_label", "not_evaluated"),
         "local_blended_instability_flag": bool(local.get("local_blended_instability_flag", False)),
-        "ldc_total": float(eligible_df[eligible_df["is_ldc"]]["total_allocation"].sum()) if "is_ldc" in eligible_df else 0.0,
-        "sids_total": float(eligible_df[eligible_df["is_sids"]]["total_allocation"].sum()) if "is_sids" in eligible_df else 0.0,
+        "ldc_total": float(current["total_allocation"][eligible & current["is_ldc"]].sum()) if "is_ldc" in current else 0.0,
+        "sids_total": float(current["total_allocation"][eligible & current["is_sids"]].sum()) if "is_sids" in current else 0.0,
         "stewardship_warning_level": stewardship_feedback.get("warning_level", "none"),
-        "outcome_warning_flag": bool(outcome_feedback),
+        "outcome_warning_flag": outcome_warning,
         "dominance_flag": bool((scenario.get("tsac_beta", 0.0) + scenario.get("sosac_gamma", 0.0)) > 0.20),
         "expected_total_allocation": total_m,
     }
 
     metrics["structural_break_flag"] = structural_break_flag(metrics)
 
-    for group, value in _group_totals(eligible_df, "region").items():
-        metrics[f"region_{group}"] = value
+    for col, prefix in _METRIC_GROUP_COLUMNS.items():
+        if col in current:
+            for group, value in _group_totals(current[col][eligible], total).items():
+                metrics[f"{prefix}_{group}"] = value
+
+    return metrics
+
+
+# ── Batch metrics ────────────────────────────────────────────────────────────
+# The same statistics as `compute_metrics_arrays()`, for every row of a
+# (scenarios × parties) share matrix at once. Each row is sorted along axis 1
+# with its ineligible Parties pushed past the end; per-row eligible counts
+# then say how much of each sorted row is real. Ties keep column order, as
+# the single-scenario kernel does.
+
+
+def _row_sorted(values: np.ndarray, mask: np.ndarray, descending: bool = False) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stable per-row sort of the masked entries: (order, sorted values, in-range mask)."""
+    key = -values if descending else values
+    order = np.argsort(np.where(mask, key, np.inf), axis=1, kind="stable")
+    in_range = np.arange(values.shape[1]) < mask.sum(axis=1)[:, None]
+    return order, np.take_along_axis(values, order, axis=1), in_range
+
+
+def _row_gini(ascending: np.ndarray, in_range: np.ndarray) -> np.ndarray:
+    """Gini of each row's in-range prefix, already sorted ascending."""
+    n = in_range.sum(axis=1)
+    x = np.where(in_range, ascending, 0.0)
+    total = x.sum(axis=1)
+    weighted = (x * np.arange(1, x.shape[1] + 1)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gini = (2 * weighted) / (n * total) - (n + 1) / n
+    return np.where((n > 0) & (total > 0), gini, 0.0)
+
+
+def _row_average_ranks(values: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Row-wise `_average_ranks()` over the masked entries (0 elsewhere) and each row's distinct count."""
+    n_cols = values.shape[1]
+    order, ordered, in_range = _row_sorted(values, mask)
+    pos = np.arange(n_cols)
+    starts_group = np.ones(ordered.shape, dtype=bool)
+    starts_group[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    ends_group = np.ones(ordered.shape, dtype=bool)
+    ends_group[:, :-1] = starts_group[:, 1:]
+    # Each position's group start (running max) and exclusive end (reversed running min)
+    start = np.maximum.accumulate(np.where(starts_group, pos, 0), axis=1)
+    end = np.minimum.accumulate(np.where(ends_group, pos + 1, n_cols)[:, ::-1], axis=1)[:, ::-1]
+    ranks = np.empty(ordered.shape)
+    np.put_along_axis(ranks, order, np.where(in_range, (start + end + 1) / 2.0, 0.0), axis=1)
+    return ranks, (starts_group & in_range).sum(axis=1)
+
+
+def _row_spearman(current: np.ndarray, baseline: np.ndarray, both: np.ndarray) -> np.ndarray:
+    """Row-wise `_spearman()` over the Parties in `both`."""
+    m = both.sum(axis=1)
+    r_cur, n_cur = _row_average_ranks(current, both)
+    r_base, n_base = _row_average_ranks(baseline, both)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d_cur = np.where(both, r_cur - r_cur.sum(axis=1, keepdims=True) / m[:, None], 0.0)
+        d_base = np.where(both, r_base - r_base.sum(axis=1, keepdims=True) / m[:, None], 0.0)
+        rho = (d_cur * d_base).sum(axis=1) / (
+            np.sqrt((d_cur**2).sum(axis=1)) * np.sqrt((d_base**2).sum(axis=1))
+        )
+    rho = np.clip(rho, -1.0, 1.0)
+
+    constant = (n_cur <= 1) | (n_base <= 1)
+    same = np.where(both, np.round(current, 12) == np.round(baseline, 12), True).all(axis=1)
+    rho = np.where(constant, np.where(same, 1.0, 0.0), rho)
+    return np.where(m > 0, rho, np.nan)
+
+
+def _row_top_members(order: np.ndarray, in_range: np.ndarray, n: int) -> np.ndarray:
+    """Boolean (scenarios × parties) membership of each row's first `n` in-range entries of a descending sort."""
+    members = np.zeros(order.shape, dtype=bool)
+    np.put_along_axis(members, order[:, :n], in_range[:, :n], axis=1)
+    return members
+
+
+def compute_metrics_batch(
+    share_matrix: np.ndarray,
+    baseline_matrix: np.ndarray,
+    eligible: np.ndarray | None = None,
+    baseline_eligible: np.ndarray | None = None,
+    fund_size: float | np.ndarray = 1_000_000_000,
+    top_k: tuple[int, ...] = (10, 20),
+) -> dict[str, np.ndarray]:
+    """Distribution and departure metrics for every row of a (scenarios × parties) share matrix.
+
+    Row ``i`` of ``baseline_matrix`` is the pure-IUSAF comparator of row ``i``
+    of ``share_matrix``; both use the same party columns (as the rows of one
+    `calculate_allocations_batch()` result do). Eligibility masks may be
+    per row or one ``(parties,)`` vector; they default to all eligible.
+
+    Returns one array per metric, under the `compute_metrics()` key names:
+    ``n_eligible``, ``gini``, ``gini_coefficient``, ``hhi``, ``top{k}_share``,
+    ``spearman_vs_pure_iusaf``, ``top20_turnover_vs_pure_iusaf`` and
+    ``pct_below_equality``.
+    """
+    share = np.atleast_2d(np.asarray(share_matrix, dtype=float))
+    baseline = np.atleast_2d(np.asarray(baseline_matrix, dtype=float))
+    if baseline.shape != share.shape:
+        raise ValueError(f"baseline_matrix shape {baseline.shape} does not match share_matrix {share.shape}")
+    eligible = np.broadcast_to(True if eligible is None else np.asarray(eligible, dtype=bool), share.shape)
+    baseline_eligible = np.broadcast_to(
+        True if baseline_eligible is None else np.asarray(baseline_eligible, dtype=bool), share.shape
+    )
+    fund = np.broadcast_to(np.asarray(fund_size, dtype=float), share.shape[:1])
+
+    n_eligible = eligible.sum(axis=1)
+    clean = np.nan_to_num(share, nan=0.0)
+    total = (share * fund[:, None]) / 1_000_000.0
+
+    # Share Gini: shift rows with negative shares to zero, as `_gini()`
+    _, share_asc, in_range = _row_sorted(clean, eligible)
+    low = np.where(n_eligible > 0, share_asc[:, 0], 0.0)
+    share_asc = share_asc - np.where(low < 0, low, 0.0)[:, None]
+
+    allocated = eligible & (total >= 0)
+    _, total_asc, total_in_range = _row_sorted(total, allocated)
+
+    desc, share_desc, desc_in_range = _row_sorted(share, eligible, descending=True)
+    share_desc = np.where(desc_in_range, share_desc, 0.0)
 
-    for group, value in _group_totals(eligible_df, "WB Income Group").items():
-        metrics[f"income_{group}"] = value
+    eq_ref = np.divide(fund / 1_000_000.0, n_eligible, out=np.zeros(len(fund)), where=n_eligible > 0)
+    below = (eligible & (total < eq_ref[:, None])).sum(axis=1)
+    pct_below = np.divide(below * 100.0, n_eligible, out=np.zeros(len(fund)), where=eq_ref > 0)
 
+    both = eligible & baseline_eligible
+    base_desc, _, base_in_range = _row_sorted(baseline, baseline_eligible, descending=True)
+    cur_top = _row_top_members(desc, desc_in_range, 20)
+    base_top = _row_top_members(base_desc, base_in_range, 20)
+    universe = np.clip((cur_top | base_top).sum(axis=1), 1, 20)
+    turnover = np.where(both.any(axis=1), (cur_top ^ base_top).sum(axis=1) / universe, 0.0)
+
+    metrics = {
+        "n_eligible": n_eligible,
+        "gini": _row_gini(share_asc, in_range),
+        "gini_coefficient": _row_gini(total_asc, total_in_range),
+        "hhi": np.where(eligible, clean**2, 0.0).sum(axis=1),
+    }
+    for k in top_k:
+        metrics[f"top{k}_share"] = share_desc[:, :k].sum(axis=1)
+    metrics["spearman_vs_pure_iusaf"] = _row_spearman(share, baseline, both)
+    metrics["top20_turnover_vs_pure_iusaf"] = turnover
+    metrics["pct_below_equality"] = pct_below
     return metrics
 
 
+def batch_metrics_frame(base_df: pd.DataFrame, batch: dict, rows, baseline_rows) -> pd.DataFrame:
+    """`compute_metrics_batch()` for rows of a `calculate_allocations_batch()` result, one frame row per scenario.
+
+    ``baseline_rows[j]`` is the pure-IUSAF comparator of ``rows[j]``. Adds the
+    eligible ``sids_total`` / ``ldc_total`` and ``max_tsac_iusaf_ratio`` (as
+    `compute_component_ratios()`), which the sensitivity grids also plot.
+    """
+    rows = np.asarray(rows, dtype=int)
+    baseline_rows = np.asarray(baseline_rows, dtype=int)
+    eligible = batch["eligible"][rows]
+    share = batch["final_share"][rows]
+    fund = batch["fund_size"][rows]
+    out = pd.DataFrame(
+        compute_metrics_batch(
+            share,
+            batch["final_share"][baseline_rows],
+            eligible=eligible,
+            baseline_eligible=batch["eligible"][baseline_rows],
+            fund_size=fund,
+        )
+    )
+
+    total = (share * fund[:, None]) / 1_000_000.0
+    for col, key in (("is_sids", "sids_total"), ("is_ldc", "ldc_total")):
+        flag = base_df[col].to_numpy(dtype=bool) if col in base_df.columns else np.zeros(share.shape[1], dtype=bool)
+        out[key] = np.where(eligible & flag, total, 0.0).sum(axis=1)
+
+    iusaf_amt = (batch["alpha"][rows][:, None] * batch["iusaf_share"][rows] * fund[:, None]) / 1_000_000.0
+    tsac_amt = (batch["beta"][rows][:, None] * batch["tsac_share"][rows] * fund[:, None]) / 1_000_000.0
+    # Non-positive IUSAF amounts give an infinite ratio, which the maximum ignores
+    ratio = np.divide(tsac_amt, iusaf_amt, out=np.zeros(share.shape), where=iusaf_amt > 0)
+    counted = eligible & ~np.isnan(ratio)
+    max_ratio = np.where(counted, ratio, -np.inf).max(axis=1, initial=-np.inf)
+    max_ratio = np.where(counted.any(axis=1), max_ratio, np.nan)
+    no_stewardship = (batch["beta"][rows] == 0) & (batch["gamma"][rows] == 0)
+    out["max_tsac_iusaf_ratio"] = np.where(no_stewardship, 0.0, max_ratio)
+    return out
+
+
 def compute_country_deltas(current_df: pd.DataFrame, baseline_df: pd.DataFrame) -> pd.DataFrame:
     cur = current_df[["party", "eligible", "final_share", "total_allocation"]].rename(
         columns={"final_share": "current_share", "total_allocation": "current_allocation_m"}
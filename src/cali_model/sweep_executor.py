@@ -0,0 +1,188 @@
+"""
+Chunked sweep execution on serial, thread or process backends.
+
+`one_way_sweep()` and `two_way_grid()` return plain scenario lists.
+`SweepExecutor.map()` splits a list (or any iterable) into chunks and hands
+each chunk to a chunk function `fn(base_df, scenarios) -> sequence`, which
+returns one result per scenario. Results stream back in input order with at
+most a few chunks in flight. Process workers receive the base frame once,
+through the pool initializer, and keep their own scenario and basis caches.
+The chunk functions below cover the sweeps in this repo. Any other function
+must be importable at module level so that the process backend can pickle
+it.
+"""
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+
+import pandas as pd
+
+from cali_model.calculator import batch_scenario_frame, calculate_allocations_batch_cached
+from cali_model.sensitivity_metrics import (
+    batch_metric_arrays,
+    batch_metrics_frame,
+    build_pure_iusaf_comparator,
+    compute_metrics_arrays,
+)
+
+BACKENDS = ("serial", "thread", "process")
+DEFAULT_CHUNK_SIZE = 64
+
+# Chunks submitted ahead of the one being consumed, per worker
+_PREFETCH_PER_WORKER = 2
+
+
+# ── Chunk functions ──────────────────────────────────────────────────────────
+
+def comparator_metrics_chunk(base_df: pd.DataFrame, scenarios: list[dict]) -> list[dict]:
+    """`compute_metrics()` rows for each scenario against its pure-IUSAF and equality comparators (constraints kept).
+
+    Rows 3k, 3k+1 and 3k+2 of one cached batch are scenario k and its two
+    comparators.
+    """
+    runs = []
+    for s in scenarios:
+        comp = build_pure_iusaf_comparator(s, keep_constraints=True)
+        runs += [s, comp, {**comp, "equality_mode": True}]
+    batch = calculate_allocations_batch_cached(base_df, runs)
+    return [
+        compute_metrics_arrays(s, *(batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3)))
+        for k, s in enumerate(scenarios)
+    ]
+
+
+def grid_metrics_chunk(base_df: pd.DataFrame, scenarios: list[dict]) -> list[dict]:
+    """`batch_metrics_frame()` rows (row-wise heatmap metrics vs pure IUSAF) for each scenario."""
+    comparators = [build_pure_iusaf_comparator(s, keep_constraints=True) for s in scenarios]
+    batch = calculate_allocations_batch_cached(base_df, scenarios + comparators)
+    n = len(scenarios)
+    return batch_metrics_frame(base_df, batch, range(n), range(n, 2 * n)).to_dict("records")
+
+
+def allocation_frames_chunk(base_df: pd.DataFrame, scenarios: list[dict]) -> list[pd.DataFrame]:
+    """Full `calculate_allocations` frame for each scenario, from one cached batch."""
+    batch = calculate_allocations_batch_cached(base_df, scenarios)
+    return [batch_scenario_frame(base_df, batch, k) for k in range(len(scenarios))]
+
+
+# ── Worker side ──────────────────────────────────────────────────────────────
+
+_worker_base_df = None
+
+
+def _init_worker(base_df: pd.DataFrame) -> None:
+    global _worker_base_df
+    _worker_base_df = base_df
+
+
+def _run_chunk(fn, scenarios: list[dict]) -> list:
+    return list(fn(_worker_base_df, scenarios))
+
+
+def _chunks(scenarios, size: int):
+    it = iter(scenarios)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+# ── Executor ─────────────────────────────────────────────────────────────────
+
+class SweepExecutor:
+    """Evaluate scenario sweeps chunk by chunk on a serial, thread or process backend.
+
+    The pool starts on the first `map()` and is reused until `close()` (or the
+    end of a `with` block). `cancel()`, from any thread, stops the running
+    `map()` after the current chunk and drops the chunks still queued.
+    """
+
+    def __init__(
+        self,
+        base_df: pd.DataFrame,
+        chunk_fn=comparator_metrics_chunk,
+        backend: str = "serial",
+        workers: int | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.base_df = base_df
+        self.chunk_fn = chunk_fn
+        self.backend = backend
+        self.workers = max(1, workers if workers is not None else (os.cpu_count() or 1))
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._cancel = threading.Event()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self):
+        if self._pool is None:
+            if self.backend == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sweep")
+            else:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.base_df,),
+                )
+        return self._pool
+
+    def _submit(self, pool, chunk):
+        if self.backend == "thread":
+            return pool.submit(self.chunk_fn, self.base_df, chunk)
+        return pool.submit(_run_chunk, self.chunk_fn, chunk)
+
+    def map(self, scenarios):
+        """Yield one chunk-function result per scenario, in input order.
+
+        `scenarios` may be a generator; it is consumed one chunk at a time,
+        so only the chunks in flight are held in memory.
+        """
+        self._cancel.clear()
+        chunks = _chunks(scenarios, self.chunk_size)
+        if self.backend == "serial":
+            for chunk in chunks:
+                if self.cancelled:
+                    return
+                yield from self.chunk_fn(self.base_df, chunk)
+            return
+
+        pool = self._executor()
+        pending = deque()
+        try:
+            for chunk in islice(chunks, self.workers * _PREFETCH_PER_WORKER):
+                pending.append(self._submit(pool, chunk))
+            while pending and not self.cancelled:
+                results = pending.popleft().result()
+                if not self.cancelled:
+                    for chunk in islice(chunks, 1):
+                        pending.append(self._submit(pool, chunk))
+                yield from results
+        finally:
+            # Cancelled, closed early by the consumer, or failed: drop what has not started
+            for future in pending:
+                future.cancel()
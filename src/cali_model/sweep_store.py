@@ -0,0 +1,368 @@
+"""
+Streaming sweep results to partitioned Parquet with a resumable checkpoint.
+
+`iter_sweep_rows()` evaluates a scenario stream through a `SweepExecutor` and
+yields one `(metrics_row, long_rows)` pair per scenario, so a sweep never
+holds more than the chunks in flight. `write_sweep_parquet()` buffers those
+pairs, writes them every `flush_every` scenarios as Parquet parts under
+`out_dir/metrics/` and (with `long_format=True`) `out_dir/long/`, optionally
+Hive-partitioned on scenario columns such as `fund_size`, and then records the
+number of completed scenarios in `out_dir/_checkpoint.json`. Rerunning the
+same sweep on the same directory skips the completed scenarios and drops any
+part written after the last checkpoint. `read_sweep_parquet()` reads a table
+back in sweep order.
+"""
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+from itertools import islice
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from cali_model.calculator import DEFAULT_BAND_CONFIG_PATH, calculate_allocations_batch_cached
+from cali_model.sweep_executor import SweepExecutor, grid_metrics_chunk
+
+SWEEP_STORE_VERSION = 1
+CHECKPOINT_NAME = "_checkpoint.json"
+TABLES = ("metrics", "long")
+DEFAULT_FLUSH_EVERY = 2_000
+
+# Per-party columns of the long table (amounts in millions, as `batch_long_frame()`)
+LONG_COLUMNS = ("party", "eligible", "final_share", "total_allocation", "iplc_component", "state_component")
+
+# Engine modules whose source is part of the sweep key, as in library_cache
+_ENGINE_SOURCES = ("calculator.py", "sensitivity_metrics.py", "sweep_executor.py", "sweep_store.py")
+
+_PART_RE = re.compile(r"^part-(\d+)_\d+\.parquet$")
+
+
+# ── Row streams ──────────────────────────────────────────────────────────────
+
+def _scenario_columns(scenario: dict, columns=None) -> dict:
+    if columns is not None:
+        return {k: scenario.get(k) for k in columns}
+    # Scalar scenario settings; tuples (band weights) and the description stay out of the table
+    return {
+        k: v for k, v in scenario.items()
+        if k != "description" and (v is None or isinstance(v, (str, bool, int, float, np.generic)))
+    }
+
+
+def _long_rows(batch: dict, k: int) -> dict:
+    total = batch["final_share"][k] * batch["fund_size"][k] / 1_000_000.0
+    iplc = total * (batch["iplc_share_pct"][k] / 100.0)
+    return {
+        "party": batch["party"],
+        "eligible": batch["eligible"][k],
+        "final_share": batch["final_share"][k],
+        "total_allocation": total,
+        "iplc_component": iplc,
+        "state_component": total - iplc,
+    }
+
+
+def sweep_rows_chunk(
+    base_df: pd.DataFrame,
+    scenarios: list[dict],
+    metrics_fn=grid_metrics_chunk,
+    long_format: bool = False,
+    scenario_columns=None,
+) -> list[tuple[dict, dict | None]]:
+    """`(metrics_row, long_rows)` for each scenario: its settings plus `metrics_fn` metrics, and optional per-party arrays.
+
+    The settings are `scenario_columns` (default: every scalar entry but the
+    description), placed before the metric columns. `long_rows` maps `LONG_COLUMNS` to one array per column (None unless
+    `long_format`). The scenario rows come from the same cached batch the
+    metrics used.
+    """
+    metrics = metrics_fn(base_df, scenarios)
+    batch = calculate_allocations_batch_cached(base_df, scenarios) if long_format else None
+    out = []
+    for k, (s, m) in enumerate(zip(scenarios, metrics)):
+        row = _scenario_columns(s, scenario_columns)
+        row.update(m)
+        out.append((row, _long_rows(batch, k) if long_format else None))
+    return out
+
+
+def iter_sweep_rows(base_df: pd.DataFrame, scenarios, executor: SweepExecutor | None = None,
+                    metrics_fn=grid_metrics_chunk, long_format: bool = False, scenario_columns=None):
+    """Yield `sweep_rows_chunk()` pairs for a scenario iterable, in input order.
+
+    Uses `executor`'s backend, workers and chunk size (serial when None);
+    its own chunk function is replaced for the duration of the stream.
+    `metrics_fn` must be importable at module level for the process backend.
+    """
+    chunk_fn = functools.partial(
+        sweep_rows_chunk, metrics_fn=metrics_fn, long_format=long_format, scenario_columns=scenario_columns
+    )
+    if executor is None:
+        with SweepExecutor(base_df, chunk_fn) as own:
+            yield from own.map(scenarios)
+        return
+    previous = executor.chunk_fn
+    executor.chunk_fn = chunk_fn
+    try:
+        yield from executor.map(scenarios)
+    finally:
+        executor.chunk_fn = previous
+
+
+# ── Checkpoint ───────────────────────────────────────────────────────────────
+
+def sweep_store_key(base_df: pd.DataFrame, sweep_id: str, partition_by=(), long_format: bool = False,
+                    metrics_fn=grid_metrics_chunk, scenario_columns=None) -> str:
+    """Hash identifying one sweep: base frame, caller's `sweep_id`, layout, metric function, band config and engine code.
+
+    `sweep_id` must change whenever the scenario stream does (ranges, steps,
+    baseline); a checkpoint only resumes under the same key. Editing the band
+    YAML, the engine modules or the module defining `metrics_fn` changes the
+    key, so parts computed by older code are never resumed.
+    """
+    digest = hashlib.blake2b(str(SWEEP_STORE_VERSION).encode(), digest_size=16)
+    digest.update(pd.util.hash_pandas_object(base_df, index=False).to_numpy().tobytes())
+    columns = None if scenario_columns is None else tuple(scenario_columns)
+    digest.update(repr((sweep_id, tuple(partition_by), bool(long_format), columns)).encode())
+    digest.update(f"{metrics_fn.__module__}.{metrics_fn.__qualname__}".encode())
+    if DEFAULT_BAND_CONFIG_PATH.exists():
+        digest.update(DEFAULT_BAND_CONFIG_PATH.read_bytes())
+    here = Path(__file__).resolve().parent
+    sources = [here / name for name in _ENGINE_SOURCES]
+    try:
+        sources.append(Path(inspect.getsourcefile(metrics_fn)))
+    except TypeError:
+        pass  # no source file (builtin or C function): name only
+    for path in sources:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def read_checkpoint(out_dir) -> dict | None:
+    """The sweep directory's checkpoint, or None when nothing has been written."""
+    path = Path(out_dir) / CHECKPOINT_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_checkpoint(out_dir: Path, state: dict) -> None:
+    path = out_dir / CHECKPOINT_NAME
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+
+def _part_files(out_dir: Path):
+    for table in TABLES:
+        for path in (out_dir / table).rglob("part-*.parquet"):
+            match = _PART_RE.match(path.name)
+            if match:
+                yield path, int(match.group(1))
+
+
+def _drop_parts_after(out_dir: Path, seq: int) -> None:
+    # Parts written after the last checkpoint belong to an interrupted flush
+    for path, part_seq in _part_files(out_dir):
+        if part_seq > seq:
+            path.unlink()
+
+
+# ── Parquet parts ────────────────────────────────────────────────────────────
+
+def _metrics_frame(rows: list[dict], first_index: int) -> pd.DataFrame:
+    frame = pd.DataFrame(rows)
+    for col in frame.columns[frame.isna().all()]:
+        frame[col] = frame[col].astype(float)  # all-None settings (no ceiling) as NaN, not NULL-typed
+    frame.insert(0, "sweep_index", np.arange(first_index, first_index + len(rows)))
+    return frame
+
+
+def _long_frame(rows: list[dict], long_parts: list[dict], first_index: int, carry: tuple) -> pd.DataFrame:
+    sizes = [len(p["party"]) for p in long_parts]
+    frame = {"sweep_index": np.repeat(np.arange(first_index, first_index + len(rows)), sizes)}
+    for col in ("scenario_id",) + tuple(c for c in carry if c != "scenario_id"):
+        frame[col] = np.repeat(np.asarray([r.get(col) for r in rows], dtype=object), sizes)
+    for col in LONG_COLUMNS:
+        frame[col] = np.concatenate([p[col] for p in long_parts])
+    return pd.DataFrame(frame)
+
+
+def _copy_part(con, frame: pd.DataFrame, table_dir: Path, seq: int, schema: dict, partition_by) -> None:
+    con.register("part_rows", frame)
+    try:
+        select = ", ".join(f'CAST("{col}" AS {schema[col]}) AS "{col}"' for col in schema)
+        options = ["FORMAT PARQUET"]
+        if partition_by:
+            cols = ", ".join(f'"{c}"' for c in partition_by)
+            options += [f"PARTITION_BY ({cols})", f"FILENAME_PATTERN 'part-{seq:06d}_{{i}}'", "OVERWRITE_OR_IGNORE true"]
+            target = table_dir
+        else:
+            target = table_dir / f"part-{seq:06d}_0.parquet"
+        table_dir.mkdir(parents=True, exist_ok=True)
+        con.execute(f"COPY (SELECT {select} FROM part_rows) TO '{target}' ({', '.join(options)})")
+    finally:
+        con.unregister("part_rows")
+
+
+def _schema(con, frame: pd.DataFrame) -> dict:
+    con.register("part_rows", frame)
+    try:
+        return {name: dtype for name, dtype, *_ in con.execute("DESCRIBE SELECT * FROM part_rows").fetchall()}
+    finally:
+        con.unregister("part_rows")
+
+
+def write_sweep_parquet(
+    base_df: pd.DataFrame,
+    scenarios,
+    out_dir,
+    sweep_id: str,
+    partition_by=("fund_size",),
+    long_format: bool = False,
+    metrics_fn=grid_metrics_chunk,
+    scenario_columns=None,
+    executor: SweepExecutor | None = None,
+    flush_every: int = DEFAULT_FLUSH_EVERY,
+    resume: bool = True,
+) -> dict:
+    """Stream a sweep into Parquet parts under `out_dir`; returns the final checkpoint.
+
+    `scenarios` is any iterable (a generator keeps even dense surfaces out of
+    memory) and must yield the same sequence on every run with the same
+    `sweep_id`. Rows carry `scenario_columns` (see `sweep_rows_chunk()`),
+    which must include the `partition_by` columns. Every `flush_every`
+    scenarios the buffered rows are written as one part per table (per
+    partition) and the checkpoint advances. The first part fixes each table's
+    columns; a later part with other columns raises ValueError. With
+    `resume=True` an existing checkpoint for the same sweep is continued; a
+    checkpoint for a different sweep raises ValueError. `resume=False` clears
+    the directory's parts first. An interrupted run (including Ctrl-C, which
+    flushes the buffer first) or a cancelled executor leaves a checkpoint
+    that the next call picks up.
+    """
+    if flush_every < 1:
+        raise ValueError("flush_every must be at least 1")
+    out_dir = Path(out_dir)
+    partition_by = tuple(partition_by or ())
+    key = sweep_store_key(base_df, sweep_id, partition_by, long_format, metrics_fn, scenario_columns)
+
+    state = read_checkpoint(out_dir)
+    if state is not None and resume and state["key"] != key:
+        raise ValueError(
+            f"{out_dir} holds a different sweep (checkpoint key {state['key'][:12]}…); "
+            "use a new directory or resume=False to overwrite it"
+        )
+    if state is None or not resume:
+        state = {
+            "version": SWEEP_STORE_VERSION,
+            "key": key,
+            "sweep_id": sweep_id,
+            "partition_by": list(partition_by),
+            "long_format": bool(long_format),
+            "completed": 0,
+            "parts": 0,
+            "complete": False,
+            "schema": {},
+        }
+        _drop_parts_after(out_dir, -1)
+    else:
+        _drop_parts_after(out_dir, state["parts"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    _write_checkpoint(out_dir, state)
+
+    con = duckdb.connect()
+    rows, long_parts = [], []
+
+    def flush():
+        if not rows:
+            return
+        first = state["completed"]
+        frames = {"metrics": _metrics_frame(rows, first)}
+        if long_format:
+            frames["long"] = _long_frame(rows, long_parts, first, partition_by)
+        seq = state["parts"] + 1
+        for table, frame in frames.items():
+            missing = [c for c in partition_by if c not in frame.columns]
+            if missing:
+                raise ValueError(f"Partition column(s) {missing} not in the sweep rows")
+            schema = state["schema"].setdefault(table, _schema(con, frame))
+            if set(frame.columns) != set(schema):
+                added = [c for c in frame.columns if c not in schema]
+                dropped = [c for c in schema if c not in frame.columns]
+                raise ValueError(
+                    f"Sweep rows no longer match the {table} schema written so far "
+                    f"(new: {added}, missing: {dropped}); use a new sweep_id or resume=False"
+                )
+            _copy_part(con, frame, out_dir / table, seq, schema, partition_by)
+        state["parts"] = seq
+        state["completed"] = first + len(rows)
+        _write_checkpoint(out_dir, state)
+        rows.clear()
+        long_parts.clear()
+
+    stream = iter_sweep_rows(
+        base_df, islice(scenarios, state["completed"], None), executor, metrics_fn, long_format, scenario_columns
+    )
+    try:
+        for row, long_rows in stream:
+            rows.append(row)
+            if long_format:
+                long_parts.append(long_rows)
+            if len(rows) >= flush_every:
+                flush()
+        cancelled = executor is not None and executor.cancelled
+        flush()
+        state["complete"] = not cancelled
+        _write_checkpoint(out_dir, state)
+    except KeyboardInterrupt:
+        flush()
+        raise
+    finally:
+        stream.close()
+        con.close()
+    return state
+
+
+def read_sweep_parquet(out_dir, table: str = "metrics", where: dict | None = None) -> pd.DataFrame:
+    """A sweep table in sweep order, with the written column order and types.
+
+    `where` filters on equality ({"fund_size": 1e9}); on partition columns
+    only the matching directories are read.
+    """
+    if table not in TABLES:
+        raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(TABLES)}")
+    out_dir = Path(out_dir)
+    state = read_checkpoint(out_dir)
+    schema = (state or {}).get("schema", {}).get(table)
+    if schema is None or not any((out_dir / table).rglob("part-*.parquet")):
+        return pd.DataFrame(columns=list(schema or []))
+
+    partition_by = state["partition_by"]
+    hive_types = ", ".join(f"'{c}': '{schema[c]}'" for c in partition_by)
+    source = (
+        f"read_parquet('{out_dir / table}/**/*.parquet', hive_partitioning = true, "
+        f"hive_types = {{{hive_types}}}, file_row_number = true)"
+        if partition_by else
+        f"read_parquet('{out_dir / table}/*.parquet', file_row_number = true)"
+    )
+    columns = ", ".join(f'"{c}"' for c in schema)
+    params = []
+    clause = ""
+    if where:
+        clause = "WHERE " + " AND ".join(f'"{c}" = ?' for c in where)
+        params = list(where.values())
+    con = duckdb.connect()
+    try:
+        return con.execute(
+            f"SELECT {columns} FROM {source} {clause} ORDER BY sweep_index, file_row_number", params
+        ).df()
+    finally:
+        con.close()
@@ -0,0 +1,360 @@
+"""
+Monte Carlo uncertainty in land area and UN assessment shares.
+
+Each draw multiplies every Party's `land_area_km2` and `un_share` by a random
+factor. The factor is lognormal (median 1), normal or uniform around 1, with
+a configurable relative scale and a seeded stream per column. The draw is
+then pushed through the batch allocation path in matrix form. Draws are
+processed in chunks of `chunk_size` rows, (chunk x Parties), and the chunk
+repeats what `calculate_allocations_batch` does for one scenario:
+  - UN bands are reassigned, and IUSAF and TSAC are renormalised.
+  - SOSAC and eligibility are taken from the cached basis.
+  - The effective blend weights are applied.
+  - `solve_floor_ceiling_batch` runs on the eligible columns.
+
+Only running summaries are kept between chunks:
+  - share sums and extremes;
+  - a per-Party histogram of log(share / point share) on a fixed grid, for
+    quantiles. The grid is sized from the perturbation spec; zero shares and
+    draws beyond the grid have their own bins, and a requested quantile that
+    falls beyond the grid raises ValueError instead of being clamped;
+  - per-Party counts over UN bands and over ranks.
+Memory is therefore bounded by the chunk size and the histogram grid, not by
+the number of draws. Each chunk draws from the same per-column streams, so
+results do not depend on `chunk_size`.
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from cali_model.calculator import (
+    _tsac_band_spec,
+    assign_un_band_positions,
+    banded_tsac_weights,
+    calculate_allocations_batch,
+    get_band_table,
+    solve_floor_ceiling_batch,
+)
+
+DISTRIBUTIONS = ("lognormal", "normal", "uniform")
+PERTURBED_COLUMNS = ("un_share", "land_area_km2")
+
+# Relative scale of each column's factor: lognormal sigma, normal sd, uniform half-width
+DEFAULT_PERTURBATIONS = {
+    "un_share": {"dist": "lognormal", "scale": 0.10},
+    "land_area_km2": {"dist": "lognormal", "scale": 0.02},
+}
+DEFAULT_QUANTILES = (0.05, 0.5, 0.95)
+DEFAULT_CHUNK_SIZE = 2_000
+
+# Share-quantile histogram: bins of `resolution` in log(share / point share) over +/- a half-width
+# sized from the spec (`histogram_half_width`), at least MAX_LOG_RATIO and at most MAX_LOG_RATIO_LIMIT
+DEFAULT_RESOLUTION = 1e-3
+MAX_LOG_RATIO = 1.0
+MAX_LOG_RATIO_LIMIT = 20.0
+# Standard deviations of a normal or lognormal factor the grid covers
+TAIL_SIGMAS = 5.0
+
+
+def _validate_perturbations(perturbations: dict | None) -> dict:
+    spec = {**DEFAULT_PERTURBATIONS, **(perturbations or {})}
+    unknown = set(spec) - set(PERTURBED_COLUMNS)
+    if unknown:
+        raise ValueError(f"Cannot perturb {', '.join(sorted(unknown))}; expected {', '.join(PERTURBED_COLUMNS)}")
+    for col, s in spec.items():
+        if s is None:
+            continue
+        if s.get("dist") not in DISTRIBUTIONS:
+            raise ValueError(f"{col}: unknown distribution {s.get('dist')!r}; expected one of {', '.join(DISTRIBUTIONS)}")
+        if not float(s.get("scale", 0.0)) >= 0.0:
+            raise ValueError(f"{col}: scale must be non-negative")
+    return spec
+
+
+def draw_factors(rng: np.random.Generator, spec: dict | None, shape: tuple) -> np.ndarray:
+    """Multiplicative perturbation factors (non-negative), ones when `spec` is None."""
+    if spec is None or float(spec.get("scale", 0.0)) == 0.0:
+        return np.ones(shape)
+    scale = float(spec["scale"])
+    if spec["dist"] == "lognormal":
+        return np.exp(scale * rng.standard_normal(shape))
+    if spec["dist"] == "normal":
+        return np.maximum(1.0 + scale * rng.standard_normal(shape), 0.0)
+    return np.maximum(1.0 + scale * rng.uniform(-1.0, 1.0, shape), 0.0)
+
+
+def _log_spread(spec: dict | None) -> float:
+    """Largest |log factor| a column's perturbation reaches within `TAIL_SIGMAS` (the full range for uniform)."""
+    if spec is None:
+        return 0.0
+    scale = float(spec.get("scale", 0.0))
+    if spec["dist"] == "lognormal":
+        return TAIL_SIGMAS * scale
+    width = scale if spec["dist"] == "uniform" else TAIL_SIGMAS * scale
+    # Normal and uniform factors are clipped at zero: the log spread is unbounded below
+    low = 1.0 - width
+    return max(np.log1p(width), -np.log(low) if low > 0 else np.inf)
+
+
+def histogram_half_width(perturbations: dict | None) -> float:
+    """Half-width in log(share / point share) of the quantile histogram for a perturbation spec.
+
+    A Party's share moves with its own factor and with the renormalisation
+    over every other Party, so twice the widest column spread is covered,
+    within [MAX_LOG_RATIO, MAX_LOG_RATIO_LIMIT].
+    """
+    spec = _validate_perturbations(perturbations)
+    spread = 2.0 * max(_log_spread(s) for s in spec.values())
+    return float(np.clip(spread, MAX_LOG_RATIO, MAX_LOG_RATIO_LIMIT))
+
+
+def uncertainty_vectors(base_df: pd.DataFrame, scenario: dict | None = None) -> dict:
+    """Point values, eligibility, SOSAC shares and effective blend weights a Monte Carlo chunk reads."""
+    batch = calculate_allocations_batch(base_df, [scenario or {}])
+    s, basis = batch["scenarios"][0], batch["bases"][0]
+    attributes = basis["attributes"]
+    point = {
+        col: attributes[col] if col in attributes else base_df[col].to_numpy(dtype=float)
+        for col in PERTURBED_COLUMNS
+    }
+    floor = float(s["floor_pct"] or 0.0) / 100.0
+    return {
+        "party": batch["party"],
+        "scenario": s,
+        "eligible": basis["eligible"],
+        "un_share": point["un_share"],
+        "land_area_km2": point["land_area_km2"],
+        "sosac_share": basis["sosac_share"],
+        # Bands are reported under raw inversion too, where the basis carries no table
+        "band_table": get_band_table(s["band_config"]),
+        "tsac_spec": _tsac_band_spec(s["tsac_mode"], s["tsac_band_weights"], s["tsac_band_lower_bounds"]),
+        "alpha": float(batch["alpha"][0]),
+        "beta": float(batch["beta"][0]),
+        "gamma": float(batch["gamma"][0]),
+        "floor": floor,
+        "cap": None if s["ceiling_pct"] is None else float(s["ceiling_pct"]) / 100.0,
+        "point_share": batch["final_share"][0],
+    }
+
+
+def _normalise_rows(weights: np.ndarray) -> np.ndarray:
+    totals = weights.sum(axis=1)
+    out = np.zeros_like(weights)
+    positive = totals > 0
+    out[positive] = weights[positive] / totals[positive, None]
+    return out
+
+
+def chunk_shares(vectors: dict, un_share: np.ndarray, land_area: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Final shares (draws x Parties) and UN band positions for perturbed `un_share` / `land_area_km2` rows."""
+    s, eligible = vectors["scenario"], vectors["eligible"]
+    n_draws, n = un_share.shape
+    band_table = vectors["band_table"]
+    bands = assign_un_band_positions(un_share, band_table) if band_table is not None else np.full((n_draws, n), -1)
+    final = np.zeros((n_draws, n))
+    if not eligible.any():
+        return final, bands
+
+    if s["equality_mode"]:
+        final[:, eligible] = 1.0 / eligible.sum()
+        return final, bands
+
+    if s["un_scale_mode"] == "band_inversion":
+        mask = eligible & ~np.isnan(un_share)
+        if band_table is not None:
+            band_weight = np.where(bands >= 0, band_table["weight"][np.maximum(bands, 0)], 1.0)
+        else:
+            band_weight = np.ones((n_draws, n))
+        iusaf = _normalise_rows(np.where(mask, band_weight, 0.0))
+    else:  # raw_inversion
+        mask = eligible & (un_share > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            iusaf = _normalise_rows(np.where(mask, 1.0 / (un_share / 100.0), 0.0))
+
+    tsac_mask = eligible & (land_area > 0)
+    if vectors["tsac_spec"] is None:
+        tsac_weight = np.where(tsac_mask, land_area, 0.0)
+    else:
+        band_weights, lower_bounds = vectors["tsac_spec"]
+        tsac_weight = np.where(tsac_mask, banded_tsac_weights(land_area, band_weights, lower_bounds), 0.0)
+    tsac = _normalise_rows(tsac_weight)
+
+    blended = vectors["alpha"] * iusaf + vectors["beta"] * tsac + vectors["gamma"] * vectors["sosac_share"]
+    blended = _normalise_rows(np.where(eligible, blended, 0.0))
+    if vectors["floor"] > 0 or vectors["cap"] is not None:
+        cap = 1.0 if vectors["cap"] is None else vectors["cap"]
+        blended[:, eligible] = solve_floor_ceiling_batch(blended[:, eligible], vectors["floor"], cap)
+    return blended, bands
+
+
+def _min_ranks(shares: np.ndarray) -> np.ndarray:
+    """Descending rank of each column per row (1 = largest share), tied shares sharing the best rank."""
+    order = np.argsort(-shares, axis=1, kind="stable")
+    ordered = np.take_along_axis(shares, order, axis=1)
+    positions = np.arange(shares.shape[1])
+    new_value = np.ones(ordered.shape, dtype=bool)
+    new_value[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    start = np.maximum.accumulate(np.where(new_value, positions, 0), axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, start + 1, axis=1)
+    return ranks
+
+
+def _histogram_quantile_bins(counts: np.ndarray, quantiles) -> np.ndarray:
+    """Bin at which each row's cumulative count first reaches q * total (rows x quantiles)."""
+    cumulative = np.cumsum(counts, axis=1)
+    totals = cumulative[:, -1:]
+    out = np.empty((len(counts), len(quantiles)), dtype=int)
+    for j, q in enumerate(quantiles):
+        idx = (cumulative < np.maximum(q * totals, 1)).sum(axis=1)
+        out[:, j] = np.minimum(idx, counts.shape[1] - 1)
+    return out
+
+
+def _histogram_quantiles(counts: np.ndarray, quantiles, centres: np.ndarray) -> np.ndarray:
+    """Bin centre at which each row's cumulative count first reaches q * total (rows x quantiles)."""
+    return centres[_histogram_quantile_bins(counts, quantiles)]
+
+
+def _q_label(q: float) -> str:
+    return f"p{q * 100:g}"
+
+
+def run_monte_carlo(
+    base_df: pd.DataFrame,
+    scenario: dict | None = None,
+    n_draws: int = 100_000,
+    perturbations: dict | None = None,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    quantiles=DEFAULT_QUANTILES,
+    resolution: float = DEFAULT_RESOLUTION,
+    max_log_ratio: float | None = None,
+) -> dict:
+    """Propagate land-area and UN-share uncertainty through `scenario`, streaming `n_draws` draws in chunks.
+
+    `perturbations` updates `DEFAULT_PERTURBATIONS` per column; None for a
+    column holds it at its point value. Returns three per-Party frames:
+      - `allocations`: point, mean, sd, min, max and quantile shares, plus
+        USD millions when the scenario has a `fund_size`. Quantiles come from
+        a log-ratio histogram with bins of `resolution` over
+        +/- `max_log_ratio` (default `histogram_half_width(perturbations)`);
+        a quantile beyond that range raises ValueError.
+      - `bands`: point UN band, probability of ending in another band (also
+        split into lower and higher bands), and the probability of each band
+        (`p_band_1` ... in band-table order).
+      - `ranks`: point rank among eligible Parties and rank quantiles.
+    Also returns `n_draws` and the resolved `perturbations`.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    if n_draws < 1:
+        raise ValueError("n_draws must be at least 1")
+    spec = _validate_perturbations(perturbations)
+    vectors = uncertainty_vectors(base_df, scenario)
+    eligible = vectors["eligible"]
+    point = vectors["point_share"]
+    n, n_el = len(point), int(eligible.sum())
+    band_table = vectors["band_table"]
+    n_bands = 0 if band_table is None else len(band_table["label"])
+
+    if max_log_ratio is None:
+        max_log_ratio = histogram_half_width(spec)
+    half = int(round(max_log_ratio / resolution))
+    # Bins: zero share, below the grid, the grid (-half ... half), above the grid
+    n_bins = 2 * half + 4
+    share_counts = np.zeros(n * n_bins, dtype=np.int64)
+    band_counts = np.zeros(n * (n_bands + 1), dtype=np.int64)
+    rank_counts = np.zeros(n_el * n_el, dtype=np.int64)
+    total = np.zeros(n)
+    total_sq = np.zeros(n)
+    lowest = np.full(n, np.inf)
+    highest = np.full(n, -np.inf)
+
+    un_rng, land_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(2))
+    positive = point > 0
+    log_point = np.log(np.where(positive, point, 1.0))
+    done = 0
+    while done < n_draws:
+        c = min(chunk_size, n_draws - done)
+        un = vectors["un_share"] * draw_factors(un_rng, spec["un_share"], (c, n))
+        land = vectors["land_area_km2"] * draw_factors(land_rng, spec["land_area_km2"], (c, n))
+        shares, bands = chunk_shares(vectors, un, land)
+
+        total += shares.sum(axis=0)
+        total_sq += (shares ** 2).sum(axis=0)
+        lowest = np.minimum(lowest, shares.min(axis=0))
+        highest = np.maximum(highest, shares.max(axis=0))
+
+        with np.errstate(divide="ignore"):
+            log_ratio = np.log(shares) - log_point
+        steps = np.clip(np.rint(log_ratio / resolution), -half - 1, half + 1)
+        bins = np.where(shares > 0, steps + half + 2, 0).astype(int)
+        share_counts += np.bincount((np.arange(n) * n_bins + bins).ravel(), minlength=len(share_counts))
+        band_counts += np.bincount((np.arange(n) * (n_bands + 1) + bands + 1).ravel(), minlength=len(band_counts))
+        if n_el:
+            ranks = _min_ranks(shares[:, eligible]) - 1
+            rank_counts += np.bincount((np.arange(n_el) * n_el + ranks).ravel(), minlength=len(rank_counts))
+        done += c
+
+    s = vectors["scenario"]
+    quantiles = tuple(float(q) for q in quantiles)
+    mean = total / n_draws
+    sd = np.sqrt(np.maximum(total_sq / n_draws - mean ** 2, 0.0))
+    q_bins = _histogram_quantile_bins(share_counts.reshape(n, n_bins), quantiles)
+    outside = positive[:, None] & ((q_bins == 1) | (q_bins == n_bins - 1))
+    if outside.any():
+        raise ValueError(
+            f"{int(outside.any(axis=1).sum())} Party quantile(s) fall beyond the histogram range "
+            f"(log ratio +/-{half * resolution:g}); pass a larger max_log_ratio"
+        )
+    ratio_q = (q_bins - half - 2) * resolution
+    share_q = np.where(positive[:, None] & (q_bins > 0), point[:, None] * np.exp(ratio_q), 0.0)
+    share_q = np.clip(share_q, lowest[:, None], highest[:, None])
+
+    allocations = pd.DataFrame({
+        "party": vectors["party"],
+        "eligible": eligible,
+        "point_share": point,
+        "mean_share": mean,
+        "sd_share": sd,
+        "min_share": lowest,
+        "max_share": highest,
+        **{f"share_{_q_label(q)}": share_q[:, j] for j, q in enumerate(quantiles)},
+    })
+    fund_size = float(s.get("fund_size", np.nan))
+    if np.isfinite(fund_size):
+        money = {"point_allocation_m": "point_share", "mean_allocation_m": "mean_share"}
+        money.update({f"allocation_{_q_label(q)}_m": f"share_{_q_label(q)}" for q in quantiles})
+        for col, share_col in money.items():
+            allocations[col] = allocations[share_col] * fund_size / 1_000_000.0
+
+    band_prob = band_counts.reshape(n, n_bands + 1)[:, 1:] / n_draws
+    labels = [] if band_table is None else list(band_table["label"])
+    point_band = (
+        assign_un_band_positions(vectors["un_share"], band_table) if band_table is not None else np.full(n, -1)
+    )
+    band_index = np.arange(n_bands)
+    stay = np.where(point_band >= 0, band_prob[np.arange(n), np.maximum(point_band, 0)], np.nan)
+    bands = pd.DataFrame({
+        "party": vectors["party"],
+        "eligible": eligible,
+        "un_share": vectors["un_share"],
+        "point_band": [labels[b] if b >= 0 else None for b in point_band],
+        "switch_probability": 1.0 - stay,
+        "p_lower_band": (band_prob * (band_index[None, :] < point_band[:, None])).sum(axis=1),
+        "p_higher_band": (band_prob * (band_index[None, :] > point_band[:, None])).sum(axis=1),
+        **{f"p_band_{k + 1}": band_prob[:, k] for k in range(n_bands)},
+    })
+
+    rank_centres = np.arange(1, n_el + 1, dtype=float)
+    rank_q = _histogram_quantiles(rank_counts.reshape(n_el, n_el), quantiles, rank_centres)
+    point_rank = _min_ranks(point[eligible][None, :])[0]
+    ranks = pd.DataFrame({
+        "party": vectors["party"][eligible],
+        "point_rank": point_rank,
+        **{f"rank_{_q_label(q)}": rank_q[:, j].astype(int) for j, q in enumerate(quantiles)},
+        "p_point_rank": rank_counts.reshape(n_el, n_el)[np.arange(n_el), point_rank - 1] / n_draws,
+    })
+    return {"allocations": allocations, "bands": bands, "ranks": ranks, "n_draws": n_draws, "perturbations": spec}
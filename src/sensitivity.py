@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-import duckdb
+import threading
+from collections import OrderedDict
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -11,8 +13,15 @@ from cali_model.balance_analysis import (
     identify_balance_points,
     run_fine_sweep,
 )
-from cali_model.calculator import calculate_allocations
-from cali_model.data_loader import get_base_data, load_data
+from cali_model.balance_solver import solve_balance_points
+from cali_model.calculator import (
+    calculate_allocations_batch_cached,
+    run_scenario_cached,
+    scenario_cache_info,
+    scenario_fingerprint,
+)
+from cali_model.data_loader import shared_base_data
+from cali_model.library_cache import compute_library_metrics, load_library_cache, precompute_library
 from cali_model.reporting import (
     generate_comparative_report,
     generate_local_stability_markdown,
@@ -24,13 +33,13 @@ from cali_model.sensitivity_metrics import (
     build_pure_iusaf_comparator,
     compute_component_ratios,
     compute_country_deltas,
-    generate_integrity_checks,
-    compute_local_stability_metrics,
+    compute_local_stability_batch,
     compute_metrics,
     run_invariant_checks,
     summarize_group_totals,
 )
 from cali_model.sensitivity_scenarios import DEFAULT_BASELINE, get_default_ranges, get_scenario_library, one_way_sweep, two_way_grid
+from cali_model.sweep_executor import SweepExecutor, comparator_metrics_chunk, grid_metrics_chunk
 
 
 # Parameter naming convention
@@ -58,16 +67,8 @@ PARAM_LABELS = {
 st.set_page_config(page_title="Cali Sensitivity Testing", layout="wide")
 
 
-@st.cache_resource
-def load_base_df() -> pd.DataFrame:
-    con = duckdb.connect(database=":memory:")
-    load_data(con)
-    return get_base_data(con)
-
-
-def run_scenario(base_df: pd.DataFrame, scenario: dict) -> pd.DataFrame:
-    return calculate_allocations(
-        base_df,
+def scenario_kwargs(scenario: dict) -> dict:
+    return dict(
         fund_size=float(scenario["fund_size"]),
         iplc_share_pct=float(scenario["iplc_share_pct"]),
         exclude_high_income=bool(scenario["exclude_high_income"]),
@@ -80,6 +81,22 @@ def run_scenario(base_df: pd.DataFrame, scenario: dict) -> pd.DataFrame:
     )
 
 
+def run_scenario(base_df: pd.DataFrame, scenario: dict) -> pd.DataFrame:
+    return run_scenario_cached(base_df, scenario_kwargs(scenario))
+
+
+def run_batch(base_df: pd.DataFrame, scenarios: list[dict]) -> dict:
+    # Rows are shared across reruns and sessions through the process-wide scenario cache
+    return calculate_allocations_batch_cached(base_df, [scenario_kwargs(s) for s in scenarios])
+
+
+def grid_metrics(base_df: pd.DataFrame, scenarios: list[dict]) -> pd.DataFrame:
+    """Heatmap metrics for a grid: scenarios and pure-IUSAF comparators batched per chunk, scored row-wise."""
+    # Serial backend: a grid is one or two cached batches, well below the cost of starting a pool
+    metrics = pd.DataFrame(list(SweepExecutor(base_df, grid_metrics_chunk).map(scenarios)))
+    return pd.concat([pd.DataFrame(scenarios), metrics], axis=1)
+
+
 def with_id(scenario: dict, scenario_id: str) -> dict:
     s = dict(scenario)
     s["scenario_id"] = scenario_id
@@ -90,9 +107,114 @@ def csv_bytes(df: pd.DataFrame) -> bytes:
     return df.to_csv(index=False).encode("utf-8")
 
 
-base_df = load_base_df()
+# ── Lazy view evaluation ──
+# Each view's heavy computation runs only when that view is shown and is
+# memoised per session on the scenario fingerprint, so a slider move
+# recomputes just what the visible view needs.
+
+VIEWS = [
+    "Parameter Sweep",
+    "Robustness Diagnostics",
+    "Thresholds and Tipping Points",
+    "Attack Surface Report",
+    "Balance Point Analysis",
+    "Data Exports",
+]
+VIEW_CACHE_SIZE = 64
+
+
+def view_key(scenario: dict) -> tuple:
+    # Equality mode drops the blend weights from the fingerprint, but metrics and neighbours still echo them
+    return scenario_fingerprint(scenario_kwargs(scenario), amounts=True) + (
+        scenario.get("scenario_id"),
+        float(scenario.get("tsac_beta", 0.0)),
+        float(scenario.get("sosac_gamma", 0.0)),
+    )
+
+
+def lazy_view(section: str, key, compute):
+    """Return `compute()` for (section, key), evaluated once per session and kept in a small LRU."""
+    cache = st.session_state.setdefault("view_cache", OrderedDict())
+    full_key = (section, key)
+    if full_key in cache:
+        cache.move_to_end(full_key)
+        return cache[full_key]
+    value = compute()
+    cache[full_key] = value
+    while len(cache) > VIEW_CACHE_SIZE:
+        cache.popitem(last=False)
+    return value
+
+
+def evaluate_current(base_df: pd.DataFrame, scenario: dict, pure_iusaf: dict, equality: dict, ranges: dict) -> dict:
+    """Current scenario, its comparators, local stability and headline metrics."""
+    results = run_scenario(base_df, scenario)
+    iusaf_results = run_scenario(base_df, pure_iusaf)
+    equality_results = run_scenario(base_df, equality)
+    (local_metrics, local_table), = compute_local_stability_batch([scenario], base_df, run_batch, ranges=ranges)
+    return {
+        "results": results,
+        "iusaf_results": iusaf_results,
+        "local_stability_table": local_table,
+        "metrics": compute_metrics(scenario, results, iusaf_results, equality_results, local_stability=local_metrics),
+    }
+
+
+def evaluate_deltas(current: dict) -> dict:
+    country_deltas = compute_country_deltas(current["results"], current["iusaf_results"])
+    eligible = country_deltas[country_deltas["eligible"]]
+    return {
+        "country_deltas": country_deltas,
+        "group_summary": summarize_group_totals(current["results"]),
+        "top_gainers": eligible.nlargest(5, "allocation_delta_m")[["party", "allocation_delta_m"]],
+        "top_losers": eligible.nsmallest(5, "allocation_delta_m")[["party", "allocation_delta_m"]],
+    }
+
+
+def evaluate_invariants(base_df: pd.DataFrame, scenario: dict, results: pd.DataFrame) -> pd.DataFrame:
+    # Same scenario with SIDS status switched off, patched on the cached basis rather than a frame copy
+    no_sids_results = run_scenario_cached(base_df, {**scenario_kwargs(scenario), "attribute_overrides": {"is_sids": False}})
+    return run_invariant_checks(scenario, results, no_sids_results_df=no_sids_results)
+
+
+def evaluate_library(base_df: pd.DataFrame, fund_size: float, ranges: dict) -> dict:
+    """Library metrics and integrity checks at one fund size: precomputed when the warm-up has finished, else computed here."""
+    cached = load_library_cache(base_df)
+    if cached is not None and fund_size in cached:
+        return cached[fund_size]
+    return compute_library_metrics(base_df, fund_size, ranges)
+
+
+@st.cache_resource(show_spinner=False)
+def start_library_precompute(_base_df: pd.DataFrame) -> threading.Thread:
+    """Warm the library cache file once per server process, in the background (a process per fund-size anchor)."""
+    thread = threading.Thread(target=precompute_library, kwargs={"base_df": _base_df}, name="library-precompute", daemon=True)
+    thread.start()
+    return thread
+
+
+def evaluate_one_way(base_df: pd.DataFrame, scenario: dict, param: str, ranges: dict) -> pd.DataFrame:
+    one_way_scenarios = one_way_sweep(scenario, param, ranges[param])
+    return pd.DataFrame(list(SweepExecutor(base_df, comparator_metrics_chunk).map(one_way_scenarios)))
+
+
+GRIDS = {
+    "TSAC × SOSAC": ("tsac_beta", "sosac_gamma", "tsac_sosac"),
+    "Floor × Ceiling": ("floor_pct", "ceiling_pct", "floor_ceiling"),
+    "UN mode × TSAC": ("un_scale_mode", "tsac_beta", "unmode_tsac"),
+    "UN mode × SOSAC": ("un_scale_mode", "sosac_gamma", "unmode_sosac"),
+    "Exclude-HI × TSAC": ("exclude_high_income", "tsac_beta", "exclude_tsac"),
+}
+
+
+def evaluate_grid(base_df: pd.DataFrame, scenario: dict, grid_choice: str, ranges: dict) -> pd.DataFrame:
+    x_col, y_col, prefix = GRIDS[grid_choice]
+    return grid_metrics(base_df, two_way_grid(scenario, x_col, ranges[x_col], y_col, ranges[y_col], prefix))
+
+base_df = shared_base_data()
 scenario_library = get_scenario_library()
 ranges = get_default_ranges()
+start_library_precompute(base_df)
 
 st.title("Cali Fund Sensitivity Testing and Reporting")
 st.caption("Robustness diagnostics and analytical reporting app using the same model logic as the main calculator.")
@@ -116,7 +238,6 @@ if scenario["tsac_beta"] + scenario["sosac_gamma"] >= 1.0:
     st.stop()
 
 scenario = with_id(scenario, library_choice)
-current_results = run_scenario(base_df, scenario)
 
 pure_iusaf = with_id(build_pure_iusaf_comparator({**DEFAULT_BASELINE, **scenario}, keep_constraints=True), "pure_iusaf_benchmark")
 equality = with_id(
@@ -128,67 +249,37 @@ equality = with_id(
     "equality_benchmark",
 )
 
-iusaf_results = run_scenario(base_df, pure_iusaf)
-equality_results = run_scenario(base_df, equality)
+scenario_key = view_key(scenario)
+library_key = float(scenario["fund_size"])
 
-local_stability_metrics, local_stability_table = compute_local_stability_metrics(
-    base_scenario=scenario,
-    base_results_df=current_results,
-    base_df=base_df,
-    run_scenario_fn=run_scenario,
-    ranges=ranges,
-)
 
-current_metrics = compute_metrics(scenario, current_results, iusaf_results, equality_results, local_stability=local_stability_metrics)
-country_deltas = compute_country_deltas(current_results, iusaf_results)
-group_summary = summarize_group_totals(current_results)
-no_sids_df = base_df.copy()
-no_sids_df["is_sids"] = False
-no_sids_results = run_scenario(no_sids_df, scenario)
-invariant_checks_df = run_invariant_checks(scenario, current_results, no_sids_results_df=no_sids_results)
-
-top_gainers = country_deltas[country_deltas["eligible"]].nlargest(5, "allocation_delta_m")[["party", "allocation_delta_m"]]
-top_losers = country_deltas[country_deltas["eligible"]].nsmallest(5, "allocation_delta_m")[["party", "allocation_delta_m"]]
-
-library_metrics = []
-integrity_rows = []
-for name, s in scenario_library.items():
-    scenario_i = dict(s)
-    scenario_i["fund_size"] = scenario["fund_size"]
-    scenario_i["scenario_id"] = name
-    res = run_scenario(base_df, scenario_i)
-    comp_s = build_pure_iusaf_comparator(scenario_i, keep_constraints=True)
-    baseline_iusaf = run_scenario(base_df, comp_s)
-    baseline_eq = run_scenario(base_df, {**comp_s, "equality_mode": True, "scenario_id": f"{name}_eq"})
-    local_i, _ = compute_local_stability_metrics(
-        base_scenario=scenario_i,
-        base_results_df=res,
-        base_df=base_df,
-        run_scenario_fn=run_scenario,
-        ranges=ranges,
-    )
-    library_metrics.append(compute_metrics(scenario_i, res, baseline_iusaf, baseline_eq, local_stability=local_i))
-    integrity_rows.append(
-        generate_integrity_checks(
-            scenario_id=scenario_i["scenario_id"],
-            scenario_params=scenario_i,
-            results_df=res,
-            fund_size=float(scenario_i.get("fund_size", 1_000_000_000)),
-        )
-    )
+def current_view() -> dict:
+    return lazy_view("current", scenario_key, lambda: evaluate_current(base_df, scenario, pure_iusaf, equality, ranges))
 
-library_metrics_df = pd.DataFrame(library_metrics)
-integrity_checks_df = pd.DataFrame(integrity_rows)
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "Parameter Sweep",
-    "Robustness Diagnostics",
-    "Thresholds and Tipping Points",
-    "Attack Surface Report",
-    "Balance Point Analysis",
-])
+def deltas_view() -> dict:
+    return lazy_view("deltas", scenario_key, lambda: evaluate_deltas(current_view()))
+
+
+def library_view() -> dict:
+    return lazy_view("library", library_key, lambda: evaluate_library(base_df, library_key, ranges))
+
+
+def one_way_view(param: str) -> pd.DataFrame:
+    return lazy_view(("one_way", param), scenario_key, lambda: evaluate_one_way(base_df, scenario, param, ranges))
+
+
+# The one-way parameter is chosen in the Parameter Sweep view and reused by the threshold and report views
+if "one_way_param_value" not in st.session_state:
+    st.session_state["one_way_param_value"] = next(iter(PARAM_LABELS))
+
+view = st.radio("View", options=VIEWS, horizontal=True, key="view", label_visibility="collapsed")
+
+if view == "Parameter Sweep":
+    current = current_view()
+    current_metrics = current["metrics"]
+    local_stability_table = current["local_stability_table"]
 
-with tab1:
     st.subheader("Single Scenario")
     box1, box2 = st.columns(2)
     with box1:
@@ -234,50 +325,23 @@ with tab1:
         "Parameter",
         options=list(PARAM_LABELS.keys()),
         format_func=lambda k: PARAM_LABELS[k],
-        index=0,
+        index=list(PARAM_LABELS).index(st.session_state["one_way_param_value"]),
     )
-    one_way_values = ranges[one_way_param]
-    one_way_scenarios = one_way_sweep(scenario, one_way_param, one_way_values)
-    one_way_metrics = []
-    for s in one_way_scenarios:
-        res = run_scenario(base_df, s)
-        comp_s = build_pure_iusaf_comparator(s, keep_constraints=True)
-        iusaf_ref = run_scenario(base_df, comp_s)
-        eq_ref = run_scenario(base_df, {**comp_s, "equality_mode": True, "scenario_id": f"{s.get('scenario_id')}_eq"})
-        one_way_metrics.append(compute_metrics(s, res, iusaf_ref, eq_ref))
-    one_way_df = pd.DataFrame(one_way_metrics)
+    st.session_state["one_way_param_value"] = one_way_param
+    one_way_df = one_way_view(one_way_param)
     st.dataframe(one_way_df[["scenario_id", "spearman_vs_pure_iusaf", "top20_turnover_vs_pure_iusaf", "overlay_strength_label", "departure_from_pure_iusaf_flag"]])
 
     tornado_df = one_way_df[["scenario_id", "spearman_vs_pure_iusaf"]].copy()
     tornado_df["impact"] = (1 - tornado_df["spearman_vs_pure_iusaf"]).abs()
-    st.plotly_chart(px.bar(tornado_df, x="scenario_id", y="impact", title="Tornado-style one-way impact (1 - Spearman)") , use_container_width=True)
+    # Graph objects rather than plotly express: these two charts redraw on every slider move
+    tornado_fig = go.Figure(go.Bar(x=tornado_df["scenario_id"], y=tornado_df["impact"]))
+    tornado_fig.update_layout(title="Tornado-style one-way impact (1 - Spearman)", xaxis_title="scenario_id", yaxis_title="impact")
+    st.plotly_chart(tornado_fig, use_container_width=True)
 
     st.subheader("Two-way Grid Sweep")
-    grid_choice = st.selectbox("Grid", options=["TSAC × SOSAC", "Floor × Ceiling", "UN mode × TSAC", "UN mode × SOSAC", "Exclude-HI × TSAC"])
-    if grid_choice == "TSAC × SOSAC":
-        grid_scenarios = two_way_grid(scenario, "tsac_beta", ranges["tsac_beta"], "sosac_gamma", ranges["sosac_gamma"], "tsac_sosac")
-        x_col, y_col = "tsac_beta", "sosac_gamma"
-    elif grid_choice == "Floor × Ceiling":
-        grid_scenarios = two_way_grid(scenario, "floor_pct", ranges["floor_pct"], "ceiling_pct", ranges["ceiling_pct"], "floor_ceiling")
-        x_col, y_col = "floor_pct", "ceiling_pct"
-    elif grid_choice == "UN mode × TSAC":
-        grid_scenarios = two_way_grid(scenario, "un_scale_mode", ranges["un_scale_mode"], "tsac_beta", ranges["tsac_beta"], "unmode_tsac")
-        x_col, y_col = "un_scale_mode", "tsac_beta"
-    elif grid_choice == "UN mode × SOSAC":
-        grid_scenarios = two_way_grid(scenario, "un_scale_mode", ranges["un_scale_mode"], "sosac_gamma", ranges["sosac_gamma"], "unmode_sosac")
-        x_col, y_col = "un_scale_mode", "sosac_gamma"
-    else:
-        grid_scenarios = two_way_grid(scenario, "exclude_high_income", ranges["exclude_high_income"], "tsac_beta", ranges["tsac_beta"], "exclude_tsac")
-        x_col, y_col = "exclude_high_income", "tsac_beta"
-
-    grid_metrics = []
-    for s in grid_scenarios:
-        res = run_scenario(base_df, s)
-        comp_s = build_pure_iusaf_comparator(s, keep_constraints=True)
-        iusaf_ref = run_scenario(base_df, comp_s)
-        eq_ref = run_scenario(base_df, {**comp_s, "equality_mode": True, "scenario_id": f"{s.get('scenario_id')}_eq"})
-        grid_metrics.append(compute_metrics(s, res, iusaf_ref, eq_ref))
-    grid_df = pd.DataFrame(grid_metrics)
+    grid_choice = st.selectbox("Grid", options=list(GRIDS))
+    x_col, y_col, _ = GRIDS[grid_choice]
+    grid_df = lazy_view(("grid", grid_choice), scenario_key, lambda: evaluate_grid(base_df, scenario, grid_choice, ranges))
 
     heat_metric = st.selectbox(
         "Heatmap metric",
@@ -294,15 +358,18 @@ with tab1:
     )
     pivot = grid_df.pivot_table(index=y_col, columns=x_col, values=heat_metric, aggfunc="mean")
     st.plotly_chart(
-        px.imshow(
-            pivot,
-            aspect="auto",
-            title=f"{grid_choice} heatmap: {heat_metric}",
-            labels={
-                "x": PARAM_LABELS.get(x_col, x_col),
-                "y": PARAM_LABELS.get(y_col, y_col),
-                "color": heat_metric,
-            },
+        go.Figure(
+            go.Heatmap(
+                z=pivot.to_numpy(),
+                x=[str(v) for v in pivot.columns],
+                y=[str(v) for v in pivot.index],
+                colorbar=dict(title=heat_metric),
+            ),
+            layout=dict(
+                title=f"{grid_choice} heatmap: {heat_metric}",
+                xaxis=dict(title=PARAM_LABELS.get(x_col, x_col), type="category"),
+                yaxis=dict(title=PARAM_LABELS.get(y_col, y_col), type="category"),
+            ),
         ),
         use_container_width=True,
     )
@@ -321,9 +388,12 @@ with tab1:
         "Departure from pure IUSAF should not be read as fragility unless local instability diagnostics also indicate excessive sensitivity."
     )
 
-with tab2:
+if view == "Robustness Diagnostics":
+    current = current_view()
+    current_metrics = current["metrics"]
+
     st.subheader("Invariant and Edge-case Diagnostics")
-    st.dataframe(invariant_checks_df)
+    st.dataframe(lazy_view("invariants", scenario_key, lambda: evaluate_invariants(base_df, scenario, current["results"])))
 
     binding_df = pd.DataFrame(
         {
@@ -347,7 +417,10 @@ with tab2:
         "Mechanical validity is necessary but not sufficient for robustness conclusions."
     )
 
-with tab3:
+if view == "Thresholds and Tipping Points":
+    library_metrics_df = library_view()["metrics"]
+    one_way_df = one_way_view(st.session_state["one_way_param_value"])
+
     st.subheader("Threshold and Tipping Point Analysis")
     threshold_df = library_metrics_df[["scenario_id", "tsac_beta", "sosac_gamma", "spearman_vs_pure_iusaf", "top20_turnover_vs_pure_iusaf", "pct_below_equality", "departure_from_pure_iusaf_flag", "local_blended_instability_flag"]].copy()
     threshold_df["stewardship_total"] = threshold_df["tsac_beta"] + threshold_df["sosac_gamma"]
@@ -383,7 +456,13 @@ with tab3:
         "A strong overlay can still be locally stable; avoid conflating these two diagnostics."
     )
 
-with tab4:
+if view == "Attack Surface Report":
+    current = current_view()
+    current_metrics = current["metrics"]
+    deltas = deltas_view()
+    library_metrics_df = library_view()["metrics"]
+    one_way_df = one_way_view(st.session_state["one_way_param_value"])
+
     st.subheader("Attack Surface Analysis")
     attack_rows = []
     attack_rows.append(
@@ -421,11 +500,11 @@ with tab4:
     )
     st.dataframe(pd.DataFrame(attack_rows))
 
-    scenario_brief_md = generate_scenario_brief(current_metrics, top_gainers, top_losers)
+    scenario_brief_md = generate_scenario_brief(current_metrics, deltas["top_gainers"], deltas["top_losers"])
     sweep_summary_md = generate_sweep_summary("one-way sweep", one_way_df, "spearman_vs_pure_iusaf")
     comparative_md = generate_comparative_report(library_metrics_df, baseline_id="gini_minimum_point")
     annex_md = generate_technical_annex()
-    local_stability_md = generate_local_stability_markdown(current_metrics, local_stability_table)
+    local_stability_md = generate_local_stability_markdown(current_metrics, current["local_stability_table"])
 
     st.markdown("## Interpretation")
     st.markdown(
@@ -450,7 +529,10 @@ with tab4:
         st.download_button("Download Comparative Report (.md)", comparative_md, file_name="comparative_report.md")
         st.download_button("Download Technical Annex (.md)", annex_md, file_name="technical_annex.md")
 
-with tab5:
+if view == "Balance Point Analysis":
+    # Component ratios only need the scenario itself, not its comparators or neighbours
+    current_results = run_scenario(base_df, scenario)
+
     st.subheader("Balance Point Analysis")
     st.markdown(
         "Identifies the TSAC and SOSAC weights at which the IUSAF equity base remains "
@@ -497,6 +579,35 @@ with tab5:
     else:
         st.success("Balance condition satisfied: IUSAF is dominant for all Parties.")
 
+    exact_points = solve_balance_points(base_df, scenario)
+    st.markdown("#### Exact balance points for the current scenario")
+    st.caption(
+        "Solved in closed form from the component shares (SOSAC overturn with TSAC at 0). "
+        "The band-order boundary is found numerically when a floor or ceiling is active."
+    )
+    exact_labels = {
+        "tsac_overturn": "TSAC overturn (any Party)",
+        "strict": "Strict (China = 1.0)",
+        "modified": "Modified (Brazil = 1.0)",
+        "band_order_boundary": "Band order (Band 6 mean = Band 5 mean)",
+        "sosac_overturn": "SOSAC overturn (any SIDS)",
+    }
+    st.dataframe(
+        pd.DataFrame(
+            [
+                {
+                    "Balance point": label,
+                    "Weight": f"{exact_points[key]['value']:.3%}" if exact_points[key]["value"] is not None else "Not reached",
+                    "Binding Party": exact_points[key]["party"] or "",
+                    "Method": exact_points[key]["method"].replace("_", " "),
+                }
+                for key, label in exact_labels.items()
+            ]
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
+
     if not current_ratios["ratio_df"].empty:
         st.dataframe(
             current_ratios["ratio_df"].head(20),
@@ -512,7 +623,7 @@ with tab5:
     st.divider()
 
     st.markdown("### Fine-grained sweep (0.5 pp intervals, 0–10%)")
-    st.caption("21 TSAC scenarios + 21 SOSAC scenarios. May take 30–60 seconds.")
+    st.caption("21 TSAC scenarios + 21 SOSAC scenarios, each run as one batch.")
 
     if "bp_tsac_sweep" not in st.session_state:
         st.session_state["bp_tsac_sweep"] = None
@@ -532,6 +643,7 @@ with tab5:
                 build_pure_iusaf_fn=build_pure_iusaf_comparator,
                 sweep_param="tsac_beta",
                 values=ranges.get("tsac_beta_fine"),
+                run_batch_fn=run_batch,
             )
         with st.spinner("SOSAC sweep…"):
             sosac_base = {**scenario, "tsac_beta": 0.0}
@@ -544,11 +656,13 @@ with tab5:
                 build_pure_iusaf_fn=build_pure_iusaf_comparator,
                 sweep_param="sosac_gamma",
                 values=ranges.get("sosac_gamma_fine"),
+                run_batch_fn=run_batch,
             )
         with st.spinner("Identifying balance points…"):
             st.session_state["bp_results"] = identify_balance_points(
                 tsac_sweep_df=st.session_state["bp_tsac_sweep"],
                 sosac_sweep_df=st.session_state["bp_sosac_sweep"],
+                analytical=exact_points,
             )
         st.success("Sweep complete.")
 
@@ -625,7 +739,10 @@ with tab5:
                     bp_rows.append(
                         {
                             "Balance point": label,
-                            "Value": f"{point['value']:.1%}",
+                            "Value": f"{point['value']:.1%}"
+                            if point["value"] is not None
+                            else f"> 10% (≈{point['analytical_estimate']:.1%})",
+                            "Exact": f"{point['exact_value']:.2%}" if point.get("exact_value") is not None else "n/a",
                             "China ratio": _f("china_tsac_iusaf_ratio", "{:.2f}×"),
                             "Brazil ratio": _f("brazil_tsac_iusaf_ratio", "{:.2f}×"),
                             "Gini": _f("gini_coefficient", "{:.4f}"),
@@ -642,65 +759,77 @@ with tab5:
             st.dataframe(tsac_df, use_container_width=True)
             st.dataframe(sosac_df, use_container_width=True)
 
-st.divider()
-st.subheader("Data Exports")
-e1, e2, e3, e4, e5, e6, e7 = st.columns(7)
-with e1:
-    st.download_button("Scenario metrics CSV", csv_bytes(library_metrics_df), file_name="scenario_metrics.csv", mime="text/csv")
-with e2:
-    st.download_button("Country results CSV", csv_bytes(current_results), file_name="country_results.csv", mime="text/csv")
-with e3:
-    st.download_button("Country deltas CSV", csv_bytes(country_deltas), file_name="country_deltas.csv", mime="text/csv")
-with e4:
-    st.download_button("Group summary CSV", csv_bytes(group_summary), file_name="group_summary.csv", mime="text/csv")
-with e5:
-    st.download_button("Local stability checks CSV", csv_bytes(local_stability_table), file_name="local_stability_checks.csv", mime="text/csv")
-with e6:
-    st.download_button("Download Integrity checks CSV", csv_bytes(integrity_checks_df), file_name="integrity_checks.csv", mime="text/csv")
-with e7:
-    if st.session_state.get("bp_results") is not None and st.session_state.get("bp_tsac_sweep") is not None:
-        balance_point_rows = []
-        for key, payload in st.session_state["bp_results"].items():
-            row = {"balance_point": key}
-            if payload is not None:
-                row.update(
-                    {
-                        "value": payload.get("value"),
-                        "above_range": payload.get("above_range", False),
-                        "max_ratio_at_sweep_limit": payload.get("max_ratio_at_sweep_limit"),
-                        "analytical_estimate": payload.get("analytical_estimate"),
-                    }
-                )
-                row.update(payload.get("metrics", {}) or {})
-            balance_point_rows.append(row)
-        balance_points_df = pd.DataFrame(balance_point_rows)
-        bp_md = generate_balance_point_summary(
-            balance_points=st.session_state["bp_results"],
-            tsac_sweep_df=st.session_state["bp_tsac_sweep"],
-            sosac_sweep_df=st.session_state["bp_sosac_sweep"],
-        )
-        st.download_button(
-            "Balance Points CSV",
-            csv_bytes(balance_points_df),
-            file_name="balance_points.csv",
-            mime="text/csv",
-        )
-        st.download_button(
-            "Balance Point Summary (.md)",
-            bp_md.encode("utf-8"),
-            file_name="balance_point_summary.md",
-        )
-        st.download_button(
-            "TSAC Fine Sweep (.csv)",
-            csv_bytes(st.session_state["bp_tsac_sweep"]),
-            file_name="tsac_fine_sweep.csv",
-            mime="text/csv",
-        )
-        st.download_button(
-            "SOSAC Fine Sweep (.csv)",
-            csv_bytes(st.session_state["bp_sosac_sweep"]),
-            file_name="sosac_fine_sweep.csv",
-            mime="text/csv",
-        )
-    else:
-        st.caption("Run balance-point sweep to enable these exports.")
+if view == "Data Exports":
+    current = current_view()
+    deltas = deltas_view()
+    library = library_view()
+
+    st.subheader("Data Exports")
+    e1, e2, e3, e4, e5, e6, e7 = st.columns(7)
+    with e1:
+        st.download_button("Scenario metrics CSV", csv_bytes(library["metrics"]), file_name="scenario_metrics.csv", mime="text/csv")
+    with e2:
+        st.download_button("Country results CSV", csv_bytes(current["results"]), file_name="country_results.csv", mime="text/csv")
+    with e3:
+        st.download_button("Country deltas CSV", csv_bytes(deltas["country_deltas"]), file_name="country_deltas.csv", mime="text/csv")
+    with e4:
+        st.download_button("Group summary CSV", csv_bytes(deltas["group_summary"]), file_name="group_summary.csv", mime="text/csv")
+    with e5:
+        st.download_button("Local stability checks CSV", csv_bytes(current["local_stability_table"]), file_name="local_stability_checks.csv", mime="text/csv")
+    with e6:
+        st.download_button("Download Integrity checks CSV", csv_bytes(library["integrity_checks"]), file_name="integrity_checks.csv", mime="text/csv")
+    with e7:
+        if st.session_state.get("bp_results") is not None and st.session_state.get("bp_tsac_sweep") is not None:
+            balance_point_rows = []
+            for key, payload in st.session_state["bp_results"].items():
+                row = {"balance_point": key}
+                if payload is not None:
+                    row.update(
+                        {
+                            "value": payload.get("value"),
+                            "above_range": payload.get("above_range", False),
+                            "max_ratio_at_sweep_limit": payload.get("max_ratio_at_sweep_limit"),
+                            "analytical_estimate": payload.get("analytical_estimate"),
+                            "exact_value": payload.get("exact_value"),
+                        }
+                    )
+                    row.update(payload.get("metrics", {}) or {})
+                balance_point_rows.append(row)
+            balance_points_df = pd.DataFrame(balance_point_rows)
+            bp_md = generate_balance_point_summary(
+                balance_points=st.session_state["bp_results"],
+                tsac_sweep_df=st.session_state["bp_tsac_sweep"],
+                sosac_sweep_df=st.session_state["bp_sosac_sweep"],
+            )
+            st.download_button(
+                "Balance Points CSV",
+                csv_bytes(balance_points_df),
+                file_name="balance_points.csv",
+                mime="text/csv",
+            )
+            st.download_button(
+                "Balance Point Summary (.md)",
+                bp_md.encode("utf-8"),
+                file_name="balance_point_summary.md",
+            )
+            st.download_button(
+                "TSAC Fine Sweep (.csv)",
+                csv_bytes(st.session_state["bp_tsac_sweep"]),
+                file_name="tsac_fine_sweep.csv",
+                mime="text/csv",
+            )
+            st.download_button(
+                "SOSAC Fine Sweep (.csv)",
+                csv_bytes(st.session_state["bp_sosac_sweep"]),
+                file_name="sosac_fine_sweep.csv",
+                mime="text/csv",
+            )
+        else:
+            st.caption("Run balance-point sweep to enable these exports.")
+
+# Process-wide scenario cache, shared by every session of this app
+cache_info = scenario_cache_info()
+st.sidebar.caption(
+    f"Scenario cache: {cache_info['results']['hits']} frame hits / {cache_info['results']['misses']} misses, "
+    f"{cache_info['rows']['hits']} row hits / {cache_info['rows']['misses']} misses."
+)
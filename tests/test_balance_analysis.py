@@ -8,9 +8,10 @@ import pytest
 from cali_model.balance_analysis import (
     generate_balance_point_summary,
     identify_balance_points,
+    iter_fine_sweep,
     run_fine_sweep,
 )
-from cali_model.calculator import calculate_allocations
+from cali_model.calculator import calculate_allocations, calculate_allocations_batch
 from cali_model.data_loader import get_base_data, load_data
 from cali_model.sensitivity_metrics import (
     build_pure_iusaf_comparator,
@@ -44,9 +45,8 @@ def _run(base_df, **overrides):
     return calculate_allocations(base_df, **params)
 
 
-def _run_scenario(base_df, scenario):
-    return calculate_allocations(
-        base_df,
+def _scenario_kwargs(scenario):
+    return dict(
         fund_size=float(scenario["fund_size"]),
         iplc_share_pct=float(scenario["iplc_share_pct"]),
         exclude_high_income=bool(scenario["exclude_high_income"]),
@@ -59,6 +59,14 @@ def _run_scenario(base_df, scenario):
     )
 
 
+def _run_scenario(base_df, scenario):
+    return calculate_allocations(base_df, **_scenario_kwargs(scenario))
+
+
+def _run_batch(base_df, scenarios):
+    return calculate_allocations_batch(base_df, [_scenario_kwargs(s) for s in scenarios])
+
+
 class TestComputeGini:
     def test_perfect_equality(self):
         assert compute_gini(pd.Series([100.0] * 10)) == pytest.approx(0.0, abs=1e-6)
@@ -116,6 +124,29 @@ class TestComputeComponentRatios:
         for col in ["party", "tsac_iusaf_ratio", "tsac_dominant"]:
             assert col in r["ratio_df"].columns
 
+    def test_summary_only_matches_ratio_df(self, base_df):
+        results = _run(base_df, tsac_beta=0.0, sosac_gamma=0.1)
+        full = compute_component_ratios(results, beta=0.0, gamma=0.1)
+        summary = compute_component_ratios(results, beta=0.0, gamma=0.1, summary_only=True)
+        assert "ratio_df" not in summary
+        assert summary == {k: v for k, v in full.items() if k != "ratio_df"}
+
+        df = full["ratio_df"]
+        assert summary["max_sosac_iusaf_ratio"] == df["sosac_iusaf_ratio"].max()
+        top = df.loc[df["sosac_iusaf_ratio"] == df["sosac_iusaf_ratio"].max(), "party"]
+        assert summary["max_sosac_ratio_parties"] == ", ".join(sorted(top))
+
+    def test_zero_iusaf_gives_infinite_ratio(self, base_df):
+        results = _run(base_df, tsac_beta=0.05, sosac_gamma=0.03)
+        china = results["party"].str.contains("China")
+        results.loc[china, "component_iusaf_amt"] = 0.0
+        r = compute_component_ratios(results, beta=0.05, gamma=0.03)
+        assert r["china_tsac_iusaf_ratio"] == float("inf")
+        assert r["ratio_df"]["tsac_iusaf_ratio"].iloc[0] == float("inf")
+        # Infinite ratios count as dominant but not towards the finite maximum
+        assert r["max_tsac_iusaf_ratio"] < float("inf")
+        assert r["tsac_balance_exceeded"] is True
+
 
 def _sweep_row(val, china, brazil, gini, spearman, band_order=True, band6_mean=None, band5_mean=None):
     row = {
@@ -210,6 +241,23 @@ class TestIdentifyBalancePoints:
         assert bp["sosac"]["value"] is None
         assert bp["sosac"]["max_ratio_at_sweep_limit"] == pytest.approx(0.5277, abs=1e-4)
 
+    def test_analytical_points_replace_estimate(self):
+        rows = [
+            _sweep_row(0.015, 0.83, 0.39, 0.09, 0.95),
+            _sweep_row(0.100, 0.0, 0.0, 0.14, 0.87),
+        ]
+        df = pd.DataFrame(rows)
+        df["max_sosac_iusaf_ratio"] = [0.0239, 0.5277]
+        analytical = {
+            "strict": {"value": 0.0180, "party": "China", "method": "closed_form"},
+            "sosac_overturn": {"value": 0.1739, "party": "Cuba", "method": "closed_form"},
+        }
+        bp = identify_balance_points(df, df, analytical=analytical)
+        assert bp["strict"]["exact_value"] == 0.0180
+        assert bp["sosac"]["analytical_estimate"] == 0.1739
+        assert bp["sosac"]["exact_value"] == 0.1739
+        assert "exact_value" not in (bp["modified"] or {})
+
 
 class TestGenerateBalancePointSummary:
     def _bp(self):
@@ -317,3 +365,45 @@ class TestRunFineSweep:
         assert len(sweep) == 3
         for col in ["gini_coefficient", "china_tsac_iusaf_ratio", "band1_per_party_alloc_m"]:
             assert col in sweep.columns
+
+    @pytest.mark.parametrize(
+        "sweep_param, overrides",
+        [("tsac_beta", {}), ("sosac_gamma", {"tsac_beta": 0.0, "floor_pct": 0.3, "ceiling_pct": 2.0})],
+    )
+    def test_batch_path_matches_per_scenario_path(self, base_df, sweep_param, overrides):
+        kwargs = dict(
+            base_scenario={**DEFAULT_BASELINE, **overrides},
+            base_df=base_df,
+            run_scenario_fn=_run_scenario,
+            compute_metrics_fn=compute_metrics,
+            compute_component_ratios_fn=compute_component_ratios,
+            build_pure_iusaf_fn=build_pure_iusaf_comparator,
+            sweep_param=sweep_param,
+        )
+        expected = run_fine_sweep(**kwargs)
+        got = run_fine_sweep(**kwargs, run_batch_fn=_run_batch)
+        pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-12, atol=1e-15)
+
+    def test_iter_fine_sweep_streams_chunked_batches(self, base_df):
+        calls = []
+
+        def counting_batch(df, scenarios):
+            calls.append(len(scenarios))
+            return _run_batch(df, scenarios)
+
+        kwargs = dict(
+            base_scenario=dict(DEFAULT_BASELINE),
+            base_df=base_df,
+            run_scenario_fn=_run_scenario,
+            compute_metrics_fn=compute_metrics,
+            compute_component_ratios_fn=compute_component_ratios,
+            build_pure_iusaf_fn=build_pure_iusaf_comparator,
+        )
+        rows = iter_fine_sweep(**kwargs, values=iter(get_default_ranges()["tsac_beta_fine"]),
+                               run_batch_fn=counting_batch, chunk_size=8)
+        first = next(rows)
+        assert calls == [16]
+        got = pd.DataFrame([first, *rows])
+        assert calls == [16, 16, 10]
+        expected = run_fine_sweep(**kwargs, run_batch_fn=_run_batch)
+        pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-12, atol=1e-15)
@@ -0,0 +1,85 @@
+"""Tests for the closed-form balance-point solver."""
+from __future__ import annotations
+
+import duckdb
+import pytest
+
+from cali_model.balance_analysis import _band_mean
+from cali_model.balance_solver import balance_vectors, band_order_boundary, solve_balance_points
+from cali_model.calculator import calculate_allocations
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_metrics import compute_component_ratios
+from cali_model.sensitivity_scenarios import get_scenario_library
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+@pytest.fixture(scope="module")
+def scenario():
+    s = get_scenario_library()["gini_minimum_point"]
+    return {k: v for k, v in s.items() if k not in ("scenario_id", "description")}
+
+
+def _ratios(base_df, scenario, **overrides):
+    s = {**scenario, **overrides}
+    results = calculate_allocations(base_df, **s)
+    return compute_component_ratios(results, s["tsac_beta"], s["sosac_gamma"], summary_only=True)
+
+
+def _band_gap(base_df, scenario, beta):
+    results = calculate_allocations(base_df, **{**scenario, "tsac_beta": beta})
+    eligible = results[results["eligible"]]
+    return _band_mean(eligible, "Band 6") - _band_mean(eligible, "Band 5")
+
+
+def test_overturn_points_hit_unit_ratio(base_df, scenario):
+    points = solve_balance_points(base_df, scenario)
+    assert points["tsac_overturn"]["party"] == "China"
+    assert points["strict"]["value"] == points["tsac_overturn"]["value"]
+    assert points["sosac_overturn"]["party"] == "Cuba"
+
+    ratios = _ratios(base_df, scenario, tsac_beta=points["tsac_overturn"]["value"])
+    assert ratios["max_tsac_iusaf_ratio"] == pytest.approx(1.0, rel=1e-12)
+    ratios = _ratios(base_df, scenario, tsac_beta=points["modified"]["value"])
+    assert ratios["brazil_tsac_iusaf_ratio"] == pytest.approx(1.0, rel=1e-12)
+    ratios = _ratios(base_df, scenario, tsac_beta=0.0, sosac_gamma=points["sosac_overturn"]["value"])
+    assert ratios["max_sosac_iusaf_ratio"] == pytest.approx(1.0, rel=1e-12)
+
+
+def test_overturn_points_agree_with_fine_sweep_bracket(base_df, scenario):
+    # The sweep reports the last 0.5 pp step with the ratio at or below 1.0
+    points = solve_balance_points(base_df, scenario)
+    assert 0.015 < points["strict"]["value"] < 0.020
+    assert 0.035 < points["modified"]["value"] < 0.040
+    assert 0.17 < points["sosac_overturn"]["value"] < 0.18
+
+
+@pytest.mark.parametrize("floor_pct,ceiling_pct", [(0.0, None), (0.3, None), (0.3, 2.0)])
+def test_band_order_boundary_is_a_sign_change(base_df, scenario, floor_pct, ceiling_pct):
+    s = {**scenario, "floor_pct": floor_pct, "ceiling_pct": ceiling_pct}
+    point = solve_balance_points(base_df, s)["band_order_boundary"]
+    assert point["method"] == ("closed_form" if floor_pct == 0 and ceiling_pct is None else "numeric")
+
+    beta = point["value"]
+    assert _band_gap(base_df, s, beta - 1e-6) < 0 < _band_gap(base_df, s, beta + 1e-6)
+
+
+def test_numeric_boundary_matches_closed_form_when_constraints_slack(base_df, scenario):
+    vectors = balance_vectors(base_df, scenario)
+    gamma = scenario["sosac_gamma"]
+    exact = band_order_boundary(vectors, gamma)["value"]
+    # A 100% ceiling never binds, but routes through the numeric path
+    numeric = band_order_boundary(vectors, gamma, ceiling_pct=100.0)
+    assert numeric["method"] == "numeric"
+    assert numeric["value"] == pytest.approx(exact, abs=1e-10)
+
+
+def test_band_boundary_needs_bands(base_df, scenario):
+    raw = solve_balance_points(base_df, {**scenario, "un_scale_mode": "raw_inversion"})
+    assert raw["band_order_boundary"]["value"] is None
+    assert raw["tsac_overturn"]["value"] is not None
@@ -0,0 +1,102 @@
+import os
+
+import duckdb
+import numpy as np
+import pytest
+import yaml
+from cali_model.data_loader import load_data, get_base_data
+from cali_model.calculator import (
+    calculate_allocations,
+    calculate_shares,
+    get_band_table,
+    load_band_config,
+    reload_band_config,
+)
+
+TWO_BANDS = {
+    "bands": [
+        {"id": 1, "min_threshold": -0.0001, "max_threshold": 0.01, "weight": 2.0, "label": "Small"},
+        {"id": 2, "min_threshold": 0.01, "weight": 1.0, "label": "Large"},
+    ]
+}
+
+def _write_config(path, config, mtime_ns):
+    path.write_text(yaml.safe_dump(config))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_band_table_is_cached_and_read_only():
+    table = get_band_table()
+    assert get_band_table() is table
+    assert not table["weight"].flags.writeable
+    with pytest.raises(TypeError):
+        table["has_fallback"] = False
+
+def test_band_table_reloads_when_file_changes(tmp_path):
+    path = tmp_path / "bands.yaml"
+    _write_config(path, TWO_BANDS, 1_000_000_000)
+    first = get_band_table(path=path)
+    assert list(first["label"]) == ["Small", "Large"]
+
+    # Unchanged mtime: no re-read
+    assert get_band_table(path=path) is first
+
+    edited = {"bands": [dict(b, weight=b["weight"] * 3) for b in TWO_BANDS["bands"]]}
+    _write_config(path, edited, 2_000_000_000)
+    second = get_band_table(path=path)
+    assert list(second["weight"]) == [6.0, 3.0]
+
+    assert reload_band_config(path) is not second
+
+def test_in_memory_config_matches_yaml_config():
+    base_config = load_band_config()
+    assert get_band_table(config=base_config) is get_band_table(config=base_config)
+
+    con = duckdb.connect(database=':memory:')
+    load_data(con)
+    df = get_base_data(con)
+    from_file = calculate_allocations(df, 1_000_000_000, 50, un_scale_mode="band_inversion")
+    injected = calculate_allocations(df, 1_000_000_000, 50, un_scale_mode="band_inversion", band_config=base_config)
+    assert np.allclose(from_file["final_share"], injected["final_share"])
+
+    preset = calculate_allocations(df, 1_000_000_000, 50, un_scale_mode="band_inversion", band_config=TWO_BANDS)
+    assert set(preset["un_band"].dropna()) <= {"Small", "Large"}
+
+def test_invalid_band_config_is_rejected():
+    overlapping = {
+        "bands": [
+            {"id": 1, "min_threshold": 0.0, "max_threshold": 0.5, "weight": 1.0, "label": "A"},
+            {"id": 2, "min_threshold": 0.1, "weight": 1.0, "label": "B"},
+        ]
+    }
+    with pytest.raises(ValueError, match="overlaps"):
+        get_band_table(config=overlapping)
+
+    with pytest.raises(ValueError, match="weight"):
+        get_band_table(config={"bands": [{"id": 1, "weight": 0.0, "label": "A"}]})
+
+def test_band_table_cache_is_bounded(monkeypatch):
+    from cali_model import calculator
+    monkeypatch.setattr(calculator, "BAND_TABLE_CACHE_SIZE", 3)
+    configs = [{"bands": [dict(b, weight=b["weight"] + k) for b in TWO_BANDS["bands"]]} for k in range(5)]
+    tables = [get_band_table(config=c) for c in configs]
+    assert len(calculator._BAND_TABLE_CACHE) == 3
+    assert get_band_table(config=configs[-1]) is tables[-1]
+    assert get_band_table(config=configs[0]) is not tables[0]
+
+def test_cached_rows_follow_an_edited_default_config(tmp_path, monkeypatch):
+    from cali_model import calculator
+    path = tmp_path / "un_scale_bands.yaml"
+    _write_config(path, load_band_config(), 1_000_000_000)
+    monkeypatch.setattr(calculator, "DEFAULT_BAND_CONFIG_PATH", path)
+
+    con = duckdb.connect(database=':memory:')
+    load_data(con)
+    df = get_base_data(con)
+    before = calculate_shares(df, un_scale_mode="band_inversion").shares
+    assert not set(before["un_band"].dropna()) & {"Small", "Large"}
+
+    _write_config(path, TWO_BANDS, 2_000_000_000)
+    after = calculate_shares(df, un_scale_mode="band_inversion").shares
+    expected = calculate_shares(df, un_scale_mode="band_inversion", band_config=TWO_BANDS).shares
+    assert set(after["un_band"].dropna()) <= {"Small", "Large"}
+    assert np.allclose(after["final_share"], expected["final_share"])
@@ -1,7 +1,14 @@
 import duckdb
+import numpy as np
 import pandas as pd
 from cali_model.data_loader import load_data, get_base_data
-from cali_model.calculator import calculate_allocations
+from cali_model.calculator import (
+    assign_un_band,
+    assign_un_bands,
+    calculate_allocations,
+    compile_band_table,
+    load_band_config,
+)
 
 def test_band_inversion_completeness():
     con = duckdb.connect(database=':memory:')
@@ -57,8 +64,43 @@ def test_band_inversion_hi_exclusion():
     assert belarus['eligible'] == True
     assert belarus['total_allocation'] > 0
 
+def test_vectorised_band_assignment_matches_scalar_path():
+    config = load_band_config()
+    table = compile_band_table(config)
+
+    # Exact thresholds exercise the (min, max] boundaries
+    shares = [0.0, 0.0005, 0.001, 0.0010001, 0.01, 0.05, 0.1, 0.5, 1.0, 1.3, 10.0, 20.0, -0.0001, -1.0, np.nan]
+    labels, weights = assign_un_bands(shares, table)
+
+    for share, label, weight in zip(shares, labels, weights):
+        exp_label, exp_weight = assign_un_band(share, config)
+        assert label == exp_label, f"label mismatch for {share}"
+        assert weight == exp_weight, f"weight mismatch for {share}"
+
+def test_vectorised_band_assignment_zero_share_fallback():
+    # Band 1 excludes 0.0 here, so only the explicit fallback can catch it
+    config = {
+        "bands": [
+            {"id": 1, "min_threshold": 0.0, "max_threshold": 0.01, "weight": 2.0, "label": "Band 1"},
+            {"id": 2, "min_threshold": 0.01, "weight": 1.0, "label": "Band 2"},
+        ]
+    }
+    labels, weights = assign_un_bands([0.0, 0.005, 5.0], compile_band_table(config))
+
+    assert list(labels) == ["Band 1", "Band 1", "Band 2"]
+    assert list(weights) == [2.0, 2.0, 1.0]
+    assert assign_un_band(0.0, config) == ("Band 1", 2.0)
+
+def test_vectorised_band_assignment_without_config():
+    labels, weights = assign_un_bands([0.5, 2.0], compile_band_table(None))
+    assert list(labels) == [None, None]
+    assert list(weights) == [1.0, 1.0]
+
 if __name__ == "__main__":
     test_band_inversion_completeness()
     test_band_inversion_values()
     test_band_inversion_hi_exclusion()
+    test_vectorised_band_assignment_matches_scalar_path()
+    test_vectorised_band_assignment_zero_share_fallback()
+    test_vectorised_band_assignment_without_config()
     print("Band inversion tests passed!")
@@ -0,0 +1,110 @@
+"""Tests for the multi-year UN scale loader, the scale_year scenario parameter and band mobility."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from cali_model.band_mobility import (
+    MOBILITY_WINDOWS,
+    band_crossover_risk,
+    band_panel,
+    historical_band_mobility,
+    mobility_matrix,
+    transition_counts,
+)
+from cali_model.calculator import assign_un_bands, calculate_shares, get_band_table
+from cali_model.data_loader import get_base_data, load_data, load_un_scale_history
+
+MOBILITY_DIR = Path(__file__).resolve().parent.parent / "band-analysis" / "band-mobility-history"
+BASELINE = dict(exclude_high_income=True, un_scale_mode="band_inversion", tsac_beta=0.0, sosac_gamma=0.0)
+
+
+@pytest.fixture(scope="module")
+def con():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return con
+
+
+@pytest.fixture(scope="module")
+def base_df(con):
+    return get_base_data(con)
+
+
+@pytest.fixture(scope="module")
+def panel(base_df):
+    shares = calculate_shares(base_df, **BASELINE).shares
+    return band_panel(parties=shares.loc[shares["eligible"] & (shares["un_share"] > 0), "party"])
+
+
+def test_history_matches_single_year_loader(con, base_df):
+    history = load_un_scale_history()
+    assert history is load_un_scale_history()
+    assert not history.duplicated(["party", "year"]).any()
+    for year, frame in ((2027, base_df), (2018, get_base_data(con, 2018))):
+        rows = history[history["year"] == year].set_index("party")["un_share"]
+        positive = frame[frame["un_share"] > 0].set_index("party")["un_share"]
+        pd.testing.assert_series_equal(rows.sort_index(), positive.sort_index(), check_names=False)
+    with pytest.raises(ValueError, match="No UN scale column for 2026"):
+        get_base_data(con, 2026)
+
+
+def test_scale_year_selects_that_years_un_share(base_df):
+    default = calculate_shares(base_df, **BASELINE).shares
+    current = calculate_shares(base_df, **BASELINE, scale_year=2027).shares
+    pd.testing.assert_frame_equal(current, default)
+
+    history = load_un_scale_history()
+    rates = history[history["year"] == 2009].set_index("party")["un_share"]
+    patched = {"un_share": base_df["party"].map(rates).fillna(0.0).set_axis(base_df["party"]).to_dict()}
+    past = calculate_shares(base_df, **BASELINE, scale_year=2009).shares
+    expected = calculate_shares(base_df, **BASELINE, attribute_overrides=patched).shares
+    pd.testing.assert_frame_equal(past, expected)
+    assert (past["un_band"] != default["un_band"]).any()
+
+    with pytest.raises(ValueError, match="No UN scale for 2010"):
+        calculate_shares(base_df, scale_year=2010)
+
+
+def test_panel_bands_match_assign_un_bands(panel):
+    band_table = get_band_table()
+    for col in range(0, len(panel["year"]), 5):
+        observed = ~np.isnan(panel["un_share"][:, col])
+        labels, _ = assign_un_bands(panel["un_share"][observed, col], band_table)
+        assert list(band_table["label"][panel["band"][observed, col]]) == list(labels)
+        assert (panel["band"][~observed, col] == -1).all()
+
+
+def test_transitions_agree_with_window_band_changes(panel):
+    counts = transition_counts(panel)
+    both = (panel["band"][:, :-1] >= 0) & (panel["band"][:, 1:] >= 0)
+    np.testing.assert_array_equal(counts.sum(axis=(1, 2)), both.sum(axis=0))
+
+    # Without gaps in the record, off-diagonal transitions are the band changes
+    for name, length in MOBILITY_WINDOWS.items():
+        window = panel["year"] > 2027 - length
+        full = (panel["band"][:, window] >= 0).all(axis=1)
+        sub = band_panel(parties=panel["party"][full])
+        matrix = mobility_matrix(sub, 2027 - length + 1, 2027).to_numpy()
+        changes = historical_band_mobility(sub)[f"{name}_band_changes"].sum()
+        assert matrix.sum() - np.trace(matrix) == changes
+
+
+@pytest.mark.parametrize("name", ["historical_band_mobility", "band_crossover_risk"])
+def test_reproduces_committed_tables(panel, name):
+    build = historical_band_mobility if name == "historical_band_mobility" else band_crossover_risk
+    expected = pd.read_csv(MOBILITY_DIR / f"{name}.csv")
+    pd.testing.assert_frame_equal(build(panel, 2027), expected, check_dtype=False)
+
+
+def test_crossing_the_nearest_edge_changes_band(panel):
+    risk = band_crossover_risk(panel)
+    step = np.where(risk["cross_if_direction"] == "increase", 1.0, -1.0)
+    moved = risk["un_share"] + step * (risk["abs_margin"] + 1e-9)
+    labels, _ = assign_un_bands(moved, get_band_table())
+    assert (labels != risk["band_label"].to_numpy()).all()
+    assert (risk["exact_threshold_case"] == (risk["risk_bucket"] == "Exact threshold")).all()
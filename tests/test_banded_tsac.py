@@ -0,0 +1,97 @@
+"""Tests for the banded TSAC mode."""
+from __future__ import annotations
+
+import duckdb
+import numpy as np
+import pytest
+
+from cali_model.calculator import (
+    DEFAULT_TSAC_BAND_LOWER_BOUNDS,
+    assign_tsac_band,
+    banded_tsac_weights,
+    calculate_allocations,
+    calculate_allocations_batch,
+)
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_scenarios import DEFAULT_BASELINE
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def _run(base_df, **overrides):
+    params = dict(
+        fund_size=1_000_000_000,
+        iplc_share_pct=50,
+        exclude_high_income=True,
+        tsac_beta=0.14,
+        sosac_gamma=0.0,
+        un_scale_mode="band_inversion",
+    )
+    params.update(overrides)
+    return calculate_allocations(base_df, **params)
+
+
+def test_assign_tsac_band_boundaries():
+    areas = [np.nan, 0.0, 9.9, 10.0, 999.0, 1_000.0, 99_999.0, 100_000.0, 1_000_000.0, 17e6]
+    assert list(assign_tsac_band(areas)) == [0, 1, 1, 2, 2, 3, 4, 5, 6, 6]
+    assert list(banded_tsac_weights([5.0, 50_000.0, 2e6], (1, 2, 3, 4, 5, 6))) == [1.0, 4.0, 6.0]
+
+
+def test_banded_tsac_shares(base_df):
+    res = _run(base_df, tsac_mode="banded")
+    eligible = res[res["eligible"]]
+
+    assert eligible["tsac_share"].sum() == pytest.approx(1.0)
+    assert eligible["final_share"].sum() == pytest.approx(1.0)
+    # Parties in the same land-area band receive identical TSAC shares
+    assert eligible.groupby("tsac_band")["tsac_share"].nunique().max() == 1
+
+    # geometric_base_2 top band at the calibration Gini-minimum: 32 / 2008 (1.5936%)
+    top = eligible.loc[eligible["tsac_band"] == len(DEFAULT_TSAC_BAND_LOWER_BOUNDS), "tsac_share"]
+    assert top.iloc[0] == pytest.approx(0.015936, abs=5e-7)
+
+
+def test_linear_mode_is_default(base_df):
+    default = _run(base_df)
+    linear = _run(base_df, tsac_mode="linear", tsac_band_weights=(1, 2, 4, 8, 16, 32))
+    np.testing.assert_array_equal(default["final_share"], linear["final_share"])
+    assert "tsac_band" not in linear.columns
+
+
+def test_flat_band_weights_split_tsac_evenly(base_df):
+    res = _run(base_df, tsac_mode="banded", tsac_band_weights=(1, 1, 1, 1, 1, 1))
+    eligible = res[res["eligible"] & (res["land_area_km2"] > 0)]
+    assert np.allclose(eligible["tsac_share"], 1.0 / len(eligible))
+
+
+def test_banded_tsac_validation(base_df):
+    with pytest.raises(ValueError, match="tsac_mode"):
+        _run(base_df, tsac_mode="log")
+    with pytest.raises(ValueError, match="entries"):
+        _run(base_df, tsac_mode="banded", tsac_band_weights=(1, 2, 3))
+    with pytest.raises(ValueError, match="increasing"):
+        _run(base_df, tsac_mode="banded", tsac_band_weights=(1, 2), tsac_band_lower_bounds=(0, 0))
+
+
+def test_batch_mixes_tsac_presets(base_df):
+    presets = [None, (1, 1, 1, 1, 1, 1), (1, 2, 4, 8, 16, 32), (1, 3, 9, 27, 81, 243)]
+    scenarios = []
+    for weights in presets:
+        for beta in (0.0, 0.05, 0.15):
+            scenarios.append({
+                **DEFAULT_BASELINE,
+                "tsac_beta": beta,
+                "tsac_mode": "linear" if weights is None else "banded",
+                "tsac_band_weights": weights,
+            })
+
+    batch = calculate_allocations_batch(base_df, scenarios)
+    assert len(batch["bases"]) == len(presets)
+    for i, s in enumerate(scenarios):
+        expected = calculate_allocations(base_df, **{k: v for k, v in s.items() if k != "scenario_id"})
+        np.testing.assert_allclose(batch["final_share"][i], expected["final_share"], rtol=1e-12)
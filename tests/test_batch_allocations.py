@@ -0,0 +1,409 @@
+"""Tests for the batch allocation path against calculate_allocations."""
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from cali_model import calculator
+from cali_model.calculator import (
+    MONEY_COLUMNS,
+    batch_long_frame,
+    batch_scenario_frame,
+    calculate_allocations,
+    calculate_allocations_batch,
+    calculate_allocations_batch_cached,
+    calculate_shares,
+    clear_component_basis_cache,
+    clear_scenario_cache,
+    get_component_basis,
+    run_scenario_cached,
+    scenario_cache_info,
+    scenario_fingerprint,
+)
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_metrics import build_pure_iusaf_comparator
+from cali_model.sensitivity_scenarios import get_scenario_library
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def _scenario_grid():
+    scenarios = []
+    for exclude_hi, hi_mode, un_mode, beta, gamma, floor, ceiling in itertools.product(
+        [False, True],
+        ["exclude_except_sids", "exclude_all"],
+        ["raw_inversion", "band_inversion"],
+        [0.0, 0.025, 0.15],
+        [0.0, 0.03],
+        [0.0, 0.3],
+        [None, 2.0],
+    ):
+        scenarios.append(dict(
+            fund_size=1_000_000_000,
+            iplc_share_pct=50,
+            exclude_high_income=exclude_hi,
+            high_income_mode=hi_mode,
+            un_scale_mode=un_mode,
+            tsac_beta=beta,
+            sosac_gamma=gamma,
+            floor_pct=floor,
+            ceiling_pct=ceiling,
+        ))
+    return scenarios
+
+
+def _kwargs(scenario):
+    return {k: v for k, v in scenario.items() if k not in ("scenario_id", "description")}
+
+
+def test_batch_matches_single_scenario_engine(base_df):
+    scenarios = _scenario_grid()
+    batch = calculate_allocations_batch(base_df, scenarios)
+    assert batch["final_share"].shape == (len(scenarios), len(base_df))
+
+    for i, scenario in enumerate(scenarios):
+        expected = calculate_allocations(base_df, **scenario)
+        np.testing.assert_allclose(batch["final_share"][i], expected["final_share"], rtol=1e-12, atol=1e-15)
+        np.testing.assert_array_equal(batch["eligible"][i], expected["eligible"])
+
+
+def test_batch_scenario_frame_matches_library(base_df):
+    scenarios = list(get_scenario_library().values())
+    batch = calculate_allocations_batch(base_df, scenarios)
+
+    for i, scenario in enumerate(scenarios):
+        expected = calculate_allocations(base_df, **_kwargs(scenario))
+        got = batch_scenario_frame(base_df, batch, i)
+        pd.testing.assert_frame_equal(expected, got, check_like=True, check_dtype=False, rtol=1e-12)
+
+
+def test_batch_no_sids_fallback(base_df):
+    no_sids = base_df.copy()
+    no_sids["is_sids"] = False
+    batch = calculate_allocations_batch(no_sids, [dict(tsac_beta=0.05, sosac_gamma=0.03)])
+
+    assert batch["gamma"][0] == 0.0
+    assert batch["alpha"][0] == pytest.approx(0.95)
+    expected = calculate_allocations(no_sids, 1_000_000_000, 50, tsac_beta=0.05, sosac_gamma=0.03)
+    np.testing.assert_allclose(batch["final_share"][0], expected["final_share"], rtol=1e-12)
+
+
+def test_batch_long_frame(base_df):
+    scenarios = [
+        dict(scenario_id="a", fund_size=1_000_000_000, iplc_share_pct=50, un_scale_mode="band_inversion"),
+        dict(scenario_id="b", fund_size=200_000_000, iplc_share_pct=70, un_scale_mode="band_inversion"),
+    ]
+    long_df = batch_long_frame(calculate_allocations_batch(base_df, scenarios))
+
+    assert len(long_df) == 2 * len(base_df)
+    totals = long_df.groupby("scenario_id")["total_allocation"].sum()
+    assert totals["a"] == pytest.approx(1000.0)
+    assert totals["b"] == pytest.approx(200.0)
+
+    b_rows = long_df[long_df["scenario_id"] == "b"]
+    assert (b_rows["iplc_component"] - 0.7 * b_rows["total_allocation"]).abs().max() < 1e-12
+
+
+def test_empty_batch(base_df):
+    batch = calculate_allocations_batch(base_df, [])
+    assert batch["final_share"].shape == (0, len(base_df))
+    assert batch_long_frame(batch).empty
+
+
+def test_component_basis_is_memoised(base_df):
+    clear_component_basis_cache()
+    basis = get_component_basis(base_df, exclude_high_income=True, un_scale_mode="band_inversion")
+
+    # Same content in a different frame object hits the cache
+    assert get_component_basis(base_df.copy(), exclude_high_income=True, un_scale_mode="band_inversion") is basis
+    # high_income_mode is irrelevant when high-income Parties are kept
+    assert get_component_basis(base_df, high_income_mode="exclude_all") is get_component_basis(base_df)
+
+    assert not basis["iusaf_share"].flags.writeable
+    assert basis["iusaf_share"].sum() == pytest.approx(1.0)
+    assert basis["tsac_share"].sum() == pytest.approx(1.0)
+
+
+def test_component_basis_tracks_frame_content(base_df):
+    basis = get_component_basis(base_df, un_scale_mode="band_inversion")
+    edited = base_df.copy()
+    edited.loc[edited["party"] == "Brazil", "land_area_km2"] *= 2
+    edited_basis = get_component_basis(edited, un_scale_mode="band_inversion")
+
+    assert edited_basis is not basis
+    brazil = (base_df["party"] == "Brazil").to_numpy()
+    assert edited_basis["tsac_share"][brazil][0] > basis["tsac_share"][brazil][0]
+
+
+def test_component_basis_tracks_party_labels(base_df):
+    # Same basis columns, Party labels of the first two rows swapped
+    relabelled = base_df.copy()
+    relabelled.loc[[0, 1], "party"] = base_df.loc[[1, 0], "party"].to_numpy()
+    party = relabelled.loc[0, "party"]
+    overrides = {"eligibility_overrides": {party: False}}
+    get_component_basis(base_df, **overrides)
+    assert get_component_basis(relabelled, **overrides) is not get_component_basis(base_df, **overrides)
+
+    calculate_allocations(base_df, 1e9, 50, **overrides)
+    results = calculate_allocations(relabelled, 1e9, 50, **overrides)
+    assert not results.loc[results["party"] == party, "eligible"].any()
+
+
+def test_component_basis_lru_eviction(base_df, monkeypatch):
+    monkeypatch.setattr(calculator, "COMPONENT_BASIS_CACHE_SIZE", 2)
+    clear_component_basis_cache()
+    raw = get_component_basis(base_df)
+    get_component_basis(base_df, un_scale_mode="band_inversion")
+    get_component_basis(base_df, exclude_high_income=True)
+
+    assert len(calculator._BASIS_CACHE) == 2
+    assert get_component_basis(base_df) is not raw
+
+
+def test_component_basis_cache_is_thread_safe(base_df, monkeypatch):
+    # Distinct override sets through a tiny cache keep evicting under the readers
+    monkeypatch.setattr(calculator, "COMPONENT_BASIS_CACHE_SIZE", 2)
+    parties = list(base_df["party"][:8])
+
+    def worker(k):
+        for i in range(40):
+            party = parties[(k + i) % len(parties)]
+            basis = get_component_basis(base_df, eligibility_overrides={party: False})
+            assert not basis["eligible"][(base_df["party"] == party).to_numpy()][0]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(worker, range(4)))
+    assert len(calculator._BASIS_CACHE) <= 2
+
+
+def test_results_do_not_share_cached_arrays(base_df):
+    first = calculate_allocations(base_df, 1_000_000_000, 50, un_scale_mode="band_inversion")
+    first["un_band_weight"] = 0.0
+    first.loc[:, "iusaf_share"] = 0.0
+
+    second = calculate_allocations(base_df, 1_000_000_000, 50, un_scale_mode="band_inversion")
+    assert second["un_band_weight"].gt(0).all()
+    assert second["iusaf_share"].sum() == pytest.approx(1.0)
+
+
+def test_scenario_fingerprint_is_canonical():
+    base = dict(fund_size=1e9, iplc_share_pct=50, un_scale_mode="band_inversion", tsac_beta=0.05, sosac_gamma=0.03)
+    same = dict(base, fund_size=5e8, iplc_share_pct=30, floor_pct=None, tsac_beta=0.05, scenario_id="x")
+    assert scenario_fingerprint(base) == scenario_fingerprint(same)
+    assert scenario_fingerprint(dict(base, sosac_gamma=0)) == scenario_fingerprint(dict(base, sosac_gamma=0.0))
+    assert scenario_fingerprint(dict(base, equality_mode=True)) == scenario_fingerprint(
+        dict(base, equality_mode=True, tsac_beta=0.1, ceiling_pct=2.0)
+    )
+    assert scenario_fingerprint(base) != scenario_fingerprint(dict(base, ceiling_pct=2.0))
+    assert scenario_fingerprint(base) != scenario_fingerprint(dict(base, exclude_high_income=True))
+
+
+def test_cached_batch_matches_uncached(base_df):
+    scenarios = _scenario_grid()[::5]
+    expected = calculate_allocations_batch(base_df, scenarios)
+    clear_scenario_cache()
+    calculate_allocations_batch_cached(base_df, scenarios[::3])
+    got = calculate_allocations_batch_cached(base_df, scenarios + [dict(scenarios[0], fund_size=2e9)])
+
+    # Row sums vectorise differently with batch size, so shares agree to rounding, not bit for bit
+    for key in ("final_share", "iusaf_share", "tsac_share", "sosac_share", "alpha", "beta", "gamma"):
+        np.testing.assert_allclose(got[key][:-1], expected[key], rtol=1e-13, atol=1e-16, err_msg=key)
+    np.testing.assert_array_equal(got["eligible"][:-1], expected["eligible"])
+    assert got["fund_size"][-1] == 2e9
+    for i in (0, len(scenarios) - 1):
+        pd.testing.assert_frame_equal(batch_scenario_frame(base_df, got, i), batch_scenario_frame(base_df, expected, i), rtol=1e-12)
+    assert got["final_share"].flags.writeable
+
+
+def test_cached_batch_evaluates_each_fingerprint_once(base_df, monkeypatch):
+    clear_scenario_cache()
+    calls = []
+
+    def counting(df, scenarios):
+        calls.append(len(scenarios))
+        return calculate_allocations_batch(df, scenarios)
+
+    monkeypatch.setattr(calculator, "calculate_allocations_batch", counting)
+    s = dict(fund_size=1e9, iplc_share_pct=50, un_scale_mode="band_inversion", tsac_beta=0.05)
+    calculate_allocations_batch_cached(base_df, [s, dict(s, iplc_share_pct=30), dict(s, tsac_beta=0.1)])
+    calculate_allocations_batch_cached(base_df, [dict(s, fund_size=2e9), dict(s, tsac_beta=0.1)])
+    assert calls == [2]
+
+    monkeypatch.setattr(calculator, "SCENARIO_CACHE_SIZE", 1)
+    calculate_allocations_batch_cached(base_df, [dict(s, tsac_beta=0.2)])
+    assert len(calculator._SCENARIO_CACHE) == 1
+
+
+def test_run_scenario_cached_matches_engine_and_counts(base_df):
+    clear_scenario_cache()
+    library = get_scenario_library()
+    pure = library["pure_iusaf_band"]
+    comparator = build_pure_iusaf_comparator(library["gini_minimum_point"])
+    assert scenario_fingerprint(pure, amounts=True) == scenario_fingerprint(comparator, amounts=True)
+
+    first = run_scenario_cached(base_df, pure)
+    pd.testing.assert_frame_equal(first, calculate_allocations(base_df, **_kwargs(pure)))
+    first.loc[:, "final_share"] = 0.0
+    second = run_scenario_cached(base_df, comparator)
+    assert second["final_share"].sum() == pytest.approx(1.0)
+
+    # A different fund size is a new frame but reuses the share row
+    run_scenario_cached(base_df, dict(pure, fund_size=2_000_000_000))
+    info = scenario_cache_info()
+    assert info["results"] == {"hits": 1, "misses": 2, "size": 2, "maxsize": calculator.RESULT_CACHE_SIZE}
+    assert (info["rows"]["hits"], info["rows"]["misses"]) == (1, 1)
+
+    clear_scenario_cache()
+    assert scenario_cache_info()["results"]["hits"] == 0
+
+
+
+def test_run_scenario_cached_carries_the_callers_columns(base_df):
+    scenario = dict(fund_size=1e9, iplc_share_pct=50, un_scale_mode="band_inversion", tsac_beta=0.05)
+    first = run_scenario_cached(base_df, scenario)
+    # Only a non-basis column differs
+    edited = base_df.copy()
+    edited["is_ldc"] = ~edited["is_ldc"].astype(bool)
+    second = run_scenario_cached(edited, scenario)
+    pd.testing.assert_frame_equal(second, calculate_allocations(edited, **scenario))
+    assert (second["is_ldc"] != first["is_ldc"]).all()
+    pd.testing.assert_series_equal(second["final_share"], first["final_share"])
+
+
+def test_run_scenario_cached_follows_an_edited_default_config(base_df, tmp_path, monkeypatch):
+    path = tmp_path / "un_scale_bands.yaml"
+    config = calculator.load_band_config()
+    path.write_text(yaml.safe_dump(config))
+    os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    monkeypatch.setattr(calculator, "DEFAULT_BAND_CONFIG_PATH", path)
+    scenario = dict(fund_size=1e9, iplc_share_pct=50, un_scale_mode="band_inversion", tsac_beta=0.05)
+    before = run_scenario_cached(base_df, scenario)
+
+    # Band 1 weight doubled
+    edited = {"bands": [dict(b, weight=b["weight"] * (2 if b["id"] == 1 else 1)) for b in config["bands"]]}
+    path.write_text(yaml.safe_dump(edited))
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    after = run_scenario_cached(base_df, scenario)
+    expected = calculate_allocations(base_df, **dict(scenario, band_config=edited))
+    pd.testing.assert_frame_equal(after, expected)
+    assert not np.allclose(after["final_share"], before["final_share"])
+
+
+@pytest.mark.parametrize("fund_size, iplc_share_pct", [(50_000_000, 50), (1_000_000_000, 70), (123_456_789, 0)])
+def test_monetized_shares_match_engine_exactly(base_df, fund_size, iplc_share_pct):
+    for scenario in _scenario_grid()[::7]:
+        kwargs = {k: v for k, v in scenario.items() if k not in ("fund_size", "iplc_share_pct")}
+        expected = calculate_allocations(base_df, fund_size, iplc_share_pct, **kwargs)
+        got = calculate_shares(base_df, **kwargs).monetize(fund_size, iplc_share_pct).to_frame()
+        pd.testing.assert_frame_equal(got, expected, check_exact=True)
+
+
+def test_monetized_view_derives_money_columns_on_access(base_df):
+    shares = calculate_shares(base_df, un_scale_mode="band_inversion", tsac_beta=0.025, sosac_gamma=0.03)
+    assert not set(MONEY_COLUMNS) & set(shares.shares.columns)
+
+    view = shares.monetize(200_000_000, 60)
+    assert view._money is None
+    assert view["final_share"] is shares.shares["final_share"]
+    assert view.columns[-len(MONEY_COLUMNS):] == list(MONEY_COLUMNS) and "iplc_component" in view
+    assert view["total_allocation"].sum() == pytest.approx(200.0)
+    np.testing.assert_allclose(view["iplc_component"], 0.6 * view["total_allocation"], rtol=1e-15)
+    # The view never writes into the shared share frame
+    view.to_frame()
+    assert "total_allocation" not in shares.shares.columns
+
+    many = shares.monetize_many([50_000_000, 200_000_000, 1_000_000_000], 60)
+    assert many["total_allocation"].shape == (3, len(base_df))
+    for col in MONEY_COLUMNS:
+        np.testing.assert_array_equal(many[col][1], view[col].to_numpy())
+    np.testing.assert_allclose(many["component_tsac_amt"][2], 5 * many["component_tsac_amt"][1], rtol=1e-14)
+
+
+def test_share_stage_rejects_money_arguments(base_df):
+    with pytest.raises(ValueError, match="monetize"):
+        calculate_shares(base_df, fund_size=1_000_000_000)
+    with pytest.raises(ValueError, match="Unknown"):
+        calculate_shares(base_df, tsac_weight=0.1)
+
+
+HIGH_INCOME_OPTED_IN = ["Australia", "Canada", "Denmark", "Finland", "Japan", "New Zealand", "Norway", "Sweden"]
+
+
+def test_overrides_match_patched_frame_copies(base_df):
+    before = base_df.copy()
+    kwargs = dict(exclude_high_income=True, tsac_beta=0.05, sosac_gamma=0.03, un_scale_mode="band_inversion")
+
+    # What-if inclusion set: high-income Parties made eligible one by one
+    opted_in = base_df.copy()
+    opted_in.loc[opted_in["party"].isin(HIGH_INCOME_OPTED_IN), "WB Income Group"] = "Upper middle income"
+    expected = calculate_allocations(opted_in, 1_000_000_000, 50, **kwargs)
+    got = calculate_allocations(
+        base_df, 1_000_000_000, 50, eligibility_overrides={p: True for p in HIGH_INCOME_OPTED_IN}, **kwargs
+    )
+    pd.testing.assert_frame_equal(got.drop(columns="WB Income Group"), expected.drop(columns="WB Income Group"))
+    assert got["eligible"].sum() == calculate_shares(base_df, **kwargs).shares["eligible"].sum() + len(HIGH_INCOME_OPTED_IN)
+
+    # Attribute patch for every Party: the invariant checks' no-SIDS run
+    no_sids = base_df.copy()
+    no_sids["is_sids"] = False
+    pd.testing.assert_frame_equal(
+        calculate_allocations(base_df, 1_000_000_000, 50, attribute_overrides={"is_sids": False}, **kwargs),
+        calculate_allocations(no_sids, 1_000_000_000, 50, **kwargs),
+    )
+    pd.testing.assert_frame_equal(base_df, before)
+
+
+def test_overrides_follow_reordered_and_relabelled_frames(base_df):
+    kwargs = dict(exclude_high_income=True, tsac_beta=0.05, sosac_gamma=0.03, un_scale_mode="band_inversion")
+    relabelled = base_df.copy()
+    relabelled.loc[[0, 1], "party"] = base_df.loc[[1, 0], "party"].to_numpy()
+    frames = [base_df, base_df.iloc[::-1].reset_index(drop=True), relabelled]
+    excluded = [base_df.loc[0, "party"], "Brazil", "India"]
+
+    for frame in frames:
+        got = calculate_allocations(frame, 1_000_000_000, 50, eligibility_overrides={p: False for p in excluded}, **kwargs)
+        patched = frame.copy()
+        patched.loc[patched["party"].isin(excluded), "is_cbd_party"] = False
+        expected = calculate_allocations(patched, 1_000_000_000, 50, **kwargs)
+        pd.testing.assert_frame_equal(got.drop(columns="is_cbd_party"), expected.drop(columns="is_cbd_party"))
+        assert not got.loc[got["party"].isin(excluded), "eligible"].any()
+
+
+def test_overrides_are_separate_cache_entries(base_df):
+    clear_component_basis_cache()
+    plain = get_component_basis(base_df, exclude_high_income=True)
+    patched = get_component_basis(base_df, exclude_high_income=True, eligibility_overrides={"Canada": True})
+    assert patched is not plain
+    assert patched is get_component_basis(base_df, exclude_high_income=True, eligibility_overrides={"Canada": 1})
+    assert plain["attributes"] == {} and not patched["attributes"]
+
+    no_sids = get_component_basis(base_df, attribute_overrides={"is_sids": False})
+    assert not no_sids["attributes"]["is_sids"].any() and not no_sids["attributes"]["is_sids"].flags.writeable
+    assert scenario_fingerprint({"attribute_overrides": {"is_sids": False}}) != scenario_fingerprint({})
+
+    # Scenarios with and without overrides share one batch
+    scenarios = [dict(exclude_high_income=True), dict(exclude_high_income=True, eligibility_overrides={"Canada": True})]
+    batch = calculate_allocations_batch(base_df, scenarios)
+    canada = base_df.index[base_df["party"] == "Canada"][0]
+    assert batch["final_share"][0][canada] == 0.0 and batch["final_share"][1][canada] > 0.0
+
+
+def test_overrides_reject_unknown_parties_and_columns(base_df):
+    with pytest.raises(ValueError, match="Unknown Party"):
+        calculate_shares(base_df, eligibility_overrides={"Atlantis": True})
+    with pytest.raises(ValueError, match="Unknown Party"):
+        calculate_shares(base_df, attribute_overrides={"is_sids": {"Atlantis": True}})
+    with pytest.raises(ValueError, match="not one of"):
+        calculate_shares(base_df, attribute_overrides={"region": "Europe"})
@@ -0,0 +1,59 @@
+"""Tests for the ETL helpers and party_master overrides in data_loader."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from cali_model.data_loader import CONFIG_PATH, LAND_AREA_FILE, get_base_data, latest_indicator_value, load_data
+
+
+def test_latest_indicator_value_picks_last_valid_year():
+    df = pd.DataFrame({
+        "Country Name": ["A", "B", "C", "D"],
+        "2020": [1.0, np.nan, np.nan, 4.0],
+        "2021": [2.0, 5.0, np.nan, ".."],
+        "2022": [np.nan, np.nan, np.nan, 6.0],
+    }, index=[10, 11, 12, 13])
+    latest = latest_indicator_value(df, ["2020", "2021", "2022"])
+
+    assert list(latest.index) == [10, 11, 12, 13]
+    assert latest["value"].tolist()[:2] == [2.0, 5.0]
+    assert latest["year"].tolist()[:2] == [2021.0, 2021.0]
+    assert np.isnan(latest.loc[12, "value"]) and np.isnan(latest.loc[12, "year"])
+    assert (latest.loc[13, "value"], latest.loc[13, "year"]) == (6.0, 2022.0)
+
+
+def test_latest_indicator_value_matches_row_scan_on_land_area():
+    land_df = pd.read_csv(Path("data-raw") / LAND_AREA_FILE, skiprows=4)
+    year_cols = [c for c in land_df.columns if str(c).strip().isdigit()]
+    numeric = land_df[year_cols].apply(pd.to_numeric, errors="coerce")
+    expected_year = numeric.apply(
+        lambda row: next((int(col) for col in reversed(year_cols) if pd.notna(row[col])), None),
+        axis=1,
+    )
+
+    latest = latest_indicator_value(land_df, year_cols)
+    np.testing.assert_array_equal(latest["year"], expected_year)
+    np.testing.assert_array_equal(latest["value"], numeric.ffill(axis=1).iloc[:, -1])
+
+
+def test_latest_indicator_value_without_year_columns():
+    latest = latest_indicator_value(pd.DataFrame({"x": [1, 2]}), [])
+    assert latest["value"].isna().all()
+    assert latest["year"].isna().all()
+
+
+def test_party_master_land_area_overrides_applied():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    df = get_base_data(con).set_index("party")
+
+    pm = pd.read_csv(CONFIG_PATH / "party_master.csv", dtype=str)
+    overrides = pm.dropna(subset=["land_area_km2_override"])
+    assert len(overrides) > 0
+    for party, value in zip(overrides["party"], overrides["land_area_km2_override"]):
+        assert df.loc[party, "land_area_km2"] == float(value)
+        assert df.loc[party, "has_land_area"]
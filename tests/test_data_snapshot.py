@@ -0,0 +1,112 @@
+"""Tests for the content-hashed base-data snapshot and the shared base-data provider."""
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pytest
+
+from cali_model import data_loader
+from cali_model.data_loader import (
+    ETL_INPUT_FILES,
+    etl_input_hash,
+    get_base_data,
+    load_base_data,
+    load_data,
+    shared_base_data,
+)
+
+
+@pytest.fixture(scope="module")
+def etl_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+@pytest.fixture
+def raw_copy(tmp_path):
+    """Private copy of the ETL inputs so tests can edit them."""
+    raw = tmp_path / "data-raw"
+    for name in ETL_INPUT_FILES:
+        (raw / name).parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(Path("data-raw") / name, raw / name)
+    return raw
+
+
+def test_snapshot_matches_etl(etl_df, tmp_path):
+    built = load_base_data(snapshot_dir=tmp_path)
+    assert len(list(tmp_path.glob("base_data-*.parquet"))) == 1
+
+    served = load_base_data(snapshot_dir=tmp_path)
+    pd.testing.assert_frame_equal(built, etl_df)
+    pd.testing.assert_frame_equal(served, etl_df)
+
+
+def test_snapshot_skips_etl_when_inputs_unchanged(tmp_path, monkeypatch):
+    load_base_data(snapshot_dir=tmp_path)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("ETL should not run")
+
+    monkeypatch.setattr(data_loader, "load_data", fail)
+    assert len(load_base_data(snapshot_dir=tmp_path)) > 0
+
+
+def test_snapshot_rebuilds_when_input_changes(raw_copy, tmp_path):
+    snapshots = tmp_path / "snapshots"
+    first_hash = etl_input_hash(raw_copy)
+    before = load_base_data(raw_copy, snapshot_dir=snapshots)
+
+    eu27 = raw_copy / "eu27.csv"
+    eu27.write_text(eu27.read_text() + "\n")
+    assert etl_input_hash(raw_copy) != first_hash
+
+    after = load_base_data(raw_copy, snapshot_dir=snapshots)
+    pd.testing.assert_frame_equal(before, after)
+    # The superseded snapshot is removed
+    assert [p.name for p in snapshots.glob("base_data-*.parquet")] == [f"base_data-{etl_input_hash(raw_copy)}.parquet"]
+
+
+def test_unreadable_snapshot_is_rebuilt(etl_df, tmp_path):
+    path = tmp_path / f"base_data-{etl_input_hash()}.parquet"
+    path.write_bytes(b"not parquet")
+    pd.testing.assert_frame_equal(load_base_data(snapshot_dir=tmp_path), etl_df)
+
+
+def test_shared_base_data_is_one_read_only_frame(etl_df):
+    shared = shared_base_data()
+    assert shared_base_data() is shared
+    pd.testing.assert_frame_equal(shared, etl_df)
+
+    with pytest.raises(ValueError, match="read-only"):
+        shared.loc[0, "un_share"] = 1.0
+    edited = shared.copy()
+    edited.loc[0, "un_share"] = 1.0
+
+    assert shared_base_data(refresh=True) is not shared
+
+
+def test_session_cannot_change_shared_base_data(etl_df):
+    shared = shared_base_data()
+    edits = [
+        lambda df: df.__setitem__("un_share", 0.0),
+        lambda df: df.__setitem__("new_column", 1.0),
+        lambda df: df.loc.__setitem__((slice(None), "un_share"), 0.0),
+        lambda df: df.iloc.__setitem__((slice(None), 1), 0.0),
+        lambda df: df.drop(columns="un_share", inplace=True),
+        lambda df: setattr(df, "columns", range(df.shape[1])),
+    ]
+    for edit in edits:
+        with pytest.raises(ValueError, match="read-only"):
+            edit(shared)
+    assert shared_base_data() is shared
+    pd.testing.assert_frame_equal(shared, etl_df)
+
+    # A session's copy is an ordinary frame
+    edited = shared.copy()
+    edited["un_share"] = 0.0
+    edited["new_column"] = 1.0
+    pd.testing.assert_frame_equal(shared, etl_df)
@@ -1,8 +1,14 @@
 import pytest
+import numpy as np
 import pandas as pd
 import duckdb
 from cali_model.data_loader import load_data, get_base_data
-from cali_model.calculator import calculate_allocations, _apply_floor_ceiling_shares
+from cali_model.calculator import (
+    calculate_allocations,
+    _apply_floor_ceiling_shares,
+    solve_floor_ceiling,
+    solve_floor_ceiling_batch,
+)
 
 @pytest.fixture
 def mock_con():
@@ -50,6 +56,49 @@ def test_floor_ceiling_helper_both():
     assert pytest.approx(shares[1], 1e-12) == 0.4
     assert pytest.approx(shares.sum(), 1e-12) == 1.0
 
+def test_floor_ceiling_fully_fixed_row_keeps_its_bounds():
+    # Round 1 fixes 0.01, 0.02, 0.07 at the floor and 0.9 at the cap, leaving nothing
+    # free at a total of 0.7; renormalising would lift 0.9 to 4/7, over the cap, so
+    # the row is water-filled: clip(t * w, 0.1, 0.4) with t = 50/9
+    shares = solve_floor_ceiling([0.01, 0.02, 0.07, 0.9], 0.1, 0.4)
+    np.testing.assert_allclose(shares, [0.1, 1 / 9, 7 / 18, 0.4], rtol=1e-12)
+
+def test_floor_ceiling_never_breaks_feasible_bounds():
+    rng = np.random.default_rng(11)
+    weights = rng.lognormal(0.0, 3.0, size=(2000, 12))
+    weights[rng.random(weights.shape) < 0.1] = 0.0
+    floors = rng.uniform(0.0, 1 / 12, size=2000)
+    caps = rng.uniform(1 / 12, 0.6, size=2000)
+
+    shares = solve_floor_ceiling_batch(weights, floors, caps)
+    assert (shares >= floors[:, None] - 1e-12).all()
+    assert (shares <= caps[:, None] + 1e-12).all()
+    np.testing.assert_allclose(shares.sum(axis=1), 1.0, atol=1e-12)
+
+def test_floor_ceiling_edge_cases():
+    # Infeasible floor or cap: equal split
+    np.testing.assert_allclose(solve_floor_ceiling([0.1, 0.2, 0.7], 0.5, 1.0), [1 / 3] * 3)
+    np.testing.assert_allclose(solve_floor_ceiling([0.1, 0.2, 0.7], 0.0, 0.2), [1 / 3] * 3)
+    # Missing and zero weights
+    shares = solve_floor_ceiling([np.nan, 0.0, 1.0, 3.0], 0.1, 1.0)
+    np.testing.assert_allclose(shares, [0.1, 0.1, 0.2, 0.6], rtol=1e-12)
+    # Tied weights stay tied
+    shares = solve_floor_ceiling([1.0, 1.0, 1.0, 5.0], 0.0, 0.4)
+    np.testing.assert_allclose(shares, [0.2, 0.2, 0.2, 0.4], rtol=1e-12)
+    assert solve_floor_ceiling([], 0.1, 0.5).shape == (0,)
+
+def test_floor_ceiling_batch_matches_single_rows():
+    rng = np.random.default_rng(7)
+    weights = rng.lognormal(0.0, 2.0, size=(40, 150))
+    floors = rng.uniform(0.0, 0.006, size=40)
+    caps = np.where(rng.random(40) < 0.5, 1.0, rng.uniform(0.007, 0.05, size=40))
+
+    batch = solve_floor_ceiling_batch(weights, floors, caps)
+    for i in range(len(weights)):
+        single = solve_floor_ceiling(weights[i], floors[i], caps[i])
+        np.testing.assert_allclose(batch[i], single, rtol=1e-12, atol=1e-15)
+        assert batch[i].sum() == pytest.approx(1.0, abs=1e-12)
+
 def test_integration_floor_ceiling(mock_con):
     base_df = get_base_data(mock_con)
     fund_size = 1_000_000_000 # 1bn
@@ -0,0 +1,75 @@
+"""Tests for leave-one-out Party influence against the engine with one Party made ineligible."""
+from __future__ import annotations
+
+import duckdb
+import numpy as np
+import pytest
+
+from cali_model.calculator import calculate_shares
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.influence import influence_matrix, leave_one_out, marginal_effect_table
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def _engine_without(base_df, scenario, party):
+    kwargs = {k: v for k, v in scenario.items() if k not in ("fund_size", "iplc_share_pct")}
+    return calculate_shares(base_df, **kwargs, eligibility_overrides={party: False}).shares["final_share"].to_numpy()
+
+
+SCENARIOS = [
+    {},
+    dict(exclude_high_income=True, un_scale_mode="raw_inversion", tsac_beta=0.05, sosac_gamma=0.03),
+    dict(exclude_high_income=True, tsac_beta=0.05, sosac_gamma=0.03, floor_pct=0.3, ceiling_pct=2.0),
+    dict(tsac_mode="banded", tsac_beta=0.1, sosac_gamma=0.05, ceiling_pct=1.0),
+    dict(equality_mode=True),
+]
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_leave_one_out_matches_engine(base_df, scenario):
+    loo = leave_one_out(base_df, scenario)
+    assert len(loo["removed"]) == loo["eligible"].sum()
+    # Every tenth removal against a full engine run
+    for k in range(0, len(loo["removed"]), 10):
+        expected = _engine_without(base_df, scenario, loo["removed"][k])
+        np.testing.assert_allclose(loo["final_share"][k], expected, rtol=1e-12, atol=1e-15)
+
+
+def test_removing_the_last_sids_takes_the_fallback(base_df):
+    only_fiji = {"is_sids": {p: p == "Fiji" for p in base_df["party"]}}
+    scenario = dict(tsac_beta=0.1, sosac_gamma=0.05, floor_pct=0.5, attribute_overrides=only_fiji)
+    loo = leave_one_out(base_df, scenario, parties=["Fiji", "Brazil"])
+    for k, party in enumerate(["Fiji", "Brazil"]):
+        np.testing.assert_allclose(loo["final_share"][k], _engine_without(base_df, scenario, party), rtol=1e-12, atol=1e-15)
+
+
+def test_influence_matrix_and_marginal_effects(base_df):
+    scenario = dict(exclude_high_income=True, tsac_beta=0.05, sosac_gamma=0.03, floor_pct=0.3, ceiling_pct=2.0,
+                    fund_size=1_000_000_000)
+    loo = leave_one_out(base_df, scenario)
+    matrix = influence_matrix(loo)
+    assert matrix.shape == (loo["eligible"].sum(), len(base_df))
+    np.testing.assert_allclose(matrix.sum(axis=1), 0.0, atol=1e-14)
+    assert (np.diag(matrix[matrix.index].to_numpy()) == -loo["base_share"][loo["removed_index"]]).all()
+
+    table = marginal_effect_table(loo).set_index("party")
+    assert table["allocation_m"].sum() == pytest.approx(1000.0)
+    assert (table["n_losers"] == 0).all()
+    brazil = matrix.loc["Brazil"].drop("Brazil")
+    assert table.loc["Brazil", "top_gainer"] == brazil.idxmax()
+    assert table.loc["Brazil", "top_gain_m"] == pytest.approx(brazil.max() * 1000.0)
+    # Removals move some Parties onto or off the floor or cap
+    assert table["binding_changes"].max() > 0
+
+
+def test_rejects_unknown_and_ineligible_parties(base_df):
+    with pytest.raises(ValueError, match="Unknown Party"):
+        leave_one_out(base_df, {}, parties=["Atlantis"])
+    with pytest.raises(ValueError, match="Not eligible"):
+        leave_one_out(base_df, dict(exclude_high_income=True, high_income_mode="exclude_all"), parties=["Norway"])
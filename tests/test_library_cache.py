@@ -0,0 +1,72 @@
+"""Tests for the precomputed scenario-library cache."""
+from __future__ import annotations
+
+import duckdb
+import pandas as pd
+import pytest
+
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.library_cache import (
+    compute_library_metrics,
+    library_cache_key,
+    library_cache_path,
+    load_library_cache,
+    precompute_library,
+)
+from cali_model.sensitivity_scenarios import get_scenario_library
+
+FUND_SIZES = [50_000_000.0, 1_000_000_000.0]
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def test_library_metrics_cover_the_library(base_df):
+    tables = compute_library_metrics(base_df, 200_000_000.0)
+    ids = list(get_scenario_library())
+    assert tables["metrics"]["scenario_id"].tolist() == ids
+    assert tables["integrity_checks"]["scenario_id"].tolist() == ids
+    assert (tables["metrics"]["fund_size"] == 200_000_000.0).all()
+    assert "local_stability_label" in tables["metrics"]
+    assert (tables["integrity_checks"]["all_checks_pass"] == "PASS").all()
+
+
+def test_cache_round_trips_exactly(base_df, tmp_path):
+    path = precompute_library(base_df, fund_sizes=FUND_SIZES, workers=0, cache_dir=tmp_path)
+    assert path == library_cache_path(base_df, cache_dir=tmp_path)
+    assert path.name.startswith("library_cache-v1-")
+
+    cached = load_library_cache(base_df, cache_dir=tmp_path)
+    assert sorted(cached) == FUND_SIZES
+    for fund_size in FUND_SIZES:
+        expected = compute_library_metrics(base_df, fund_size)
+        for table in ("metrics", "integrity_checks"):
+            pd.testing.assert_frame_equal(cached[fund_size][table], expected[table])
+
+
+def test_existing_cache_is_kept_and_stale_files_dropped(base_df, tmp_path):
+    path = precompute_library(base_df, fund_sizes=FUND_SIZES[:1], workers=0, cache_dir=tmp_path)
+    mtime = path.stat().st_mtime_ns
+    assert precompute_library(base_df, fund_sizes=FUND_SIZES[:1], workers=0, cache_dir=tmp_path) == path
+    assert path.stat().st_mtime_ns == mtime
+
+    # Any base-data change selects a new key; the old file is replaced on the next write
+    edited = base_df.copy()
+    edited.loc[edited.index[0], "un_share"] *= 1.01
+    assert library_cache_key(edited) != library_cache_key(base_df)
+    assert load_library_cache(edited, cache_dir=tmp_path) is None
+    new_path = precompute_library(edited, fund_sizes=FUND_SIZES[:1], workers=0, cache_dir=tmp_path)
+    assert new_path != path and new_path.exists() and not path.exists()
+
+
+def test_process_pool_matches_in_process(base_df, tmp_path):
+    pooled = load_library_cache(
+        base_df, cache_dir=precompute_library(base_df, fund_sizes=FUND_SIZES, workers=2, cache_dir=tmp_path).parent
+    )
+    for fund_size in FUND_SIZES:
+        expected = compute_library_metrics(base_df, fund_size)
+        pd.testing.assert_frame_equal(pooled[fund_size]["metrics"], expected["metrics"])
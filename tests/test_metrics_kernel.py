@@ -0,0 +1,192 @@
+"""Tests for the array metrics kernel behind compute_metrics."""
+from __future__ import annotations
+
+import math
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from cali_model.calculator import calculate_allocations, calculate_allocations_batch, calculate_allocations_batch_cached
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_metrics import (
+    batch_metric_arrays,
+    batch_metrics_frame,
+    build_pure_iusaf_comparator,
+    compute_gini,
+    compute_local_stability_batch,
+    compute_local_stability_metrics,
+    compute_metrics,
+    compute_metrics_arrays,
+    compute_metrics_batch,
+)
+from cali_model.sensitivity_scenarios import get_default_ranges, get_scenario_library
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def _kwargs(scenario):
+    return {k: v for k, v in scenario.items() if k not in ("scenario_id", "description")}
+
+
+def _with_comparators(base_df, scenario):
+    comp = build_pure_iusaf_comparator(scenario)
+    return [calculate_allocations(base_df, **_kwargs(s)) for s in (scenario, comp, {**comp, "equality_mode": True})]
+
+
+def _assert_metrics_equal(expected, got):
+    assert list(expected) == list(got)
+    for key, value in expected.items():
+        if isinstance(value, float) and math.isnan(value):
+            assert math.isnan(got[key]), key
+        elif isinstance(value, float):
+            assert got[key] == pytest.approx(value, rel=1e-12, abs=1e-15), key
+        else:
+            assert got[key] == value, key
+
+
+def test_batch_arrays_match_frame_metrics(base_df):
+    scenarios = [dict(s, scenario_id=name) for name, s in get_scenario_library().items()]
+    runs = []
+    for s in scenarios:
+        comp = build_pure_iusaf_comparator(s)
+        runs += [s, comp, {**comp, "equality_mode": True}]
+    batch = calculate_allocations_batch(base_df, [_kwargs(s) for s in runs])
+
+    for k, s in enumerate(scenarios):
+        expected = compute_metrics(s, *_with_comparators(base_df, s))
+        arrays = [batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3)]
+        _assert_metrics_equal(expected, compute_metrics_arrays(s, *arrays))
+
+
+def test_kernel_matches_pandas_reference_statistics(base_df):
+    scenario = dict(get_scenario_library()["gini_minimum_point"], floor_pct=0.3, ceiling_pct=2.0)
+    results, iusaf, equality = _with_comparators(base_df, scenario)
+    metrics = compute_metrics(scenario, results, iusaf, equality)
+
+    eligible = results[results["eligible"]]
+    assert metrics["gini_coefficient"] == pytest.approx(compute_gini(eligible["total_allocation"]), rel=1e-12)
+    assert metrics["top20_share"] == pytest.approx(eligible.nlargest(20, "final_share")["final_share"].sum(), rel=1e-12)
+    assert metrics["p90_p10_ratio"] == pytest.approx(
+        eligible["total_allocation"].quantile(0.9) / eligible["total_allocation"].quantile(0.1), rel=1e-12
+    )
+
+    merged = eligible[["party", "final_share"]].merge(iusaf[iusaf["eligible"]][["party", "final_share"]], on="party")
+    ranks = merged[["final_share_x", "final_share_y"]].rank()
+    assert metrics["spearman_vs_pure_iusaf"] == pytest.approx(ranks["final_share_x"].corr(ranks["final_share_y"]), rel=1e-12)
+
+    regions = eligible.groupby("region", dropna=False)["total_allocation"].sum()
+    region_keys = [k for k in metrics if k.startswith("region_")]
+    assert region_keys == [f"region_{'NA' if pd.isna(k) else k}" for k in regions.index]
+
+
+def test_top20_ties_follow_frame_order(base_df):
+    # Equality mode: every eligible Party ties, so the top 20 are the first 20 in frame order
+    scenario = dict(get_scenario_library()["gini_minimum_point"], equality_mode=True)
+    results, iusaf, equality = _with_comparators(base_df, scenario)
+    metrics = compute_metrics(scenario, results, iusaf, equality)
+
+    eligible = results[results["eligible"]]
+    cur_top = set(eligible.nlargest(20, "final_share")["party"])
+    base_top = set(iusaf[iusaf["eligible"]].nlargest(20, "final_share")["party"])
+    assert metrics["top20_turnover_vs_pure_iusaf"] == len(cur_top ^ base_top) / 20
+    assert metrics["spearman_vs_equality"] == 1.0
+
+
+def test_comparators_are_aligned_by_party(base_df):
+    scenario = get_scenario_library()["gini_minimum_point"]
+    results, iusaf, equality = _with_comparators(base_df, scenario)
+    shuffled = iusaf.sample(frac=1.0, random_state=7).reset_index(drop=True)
+    assert not np.array_equal(shuffled["party"], results["party"])
+
+    expected = compute_metrics(scenario, results, iusaf, equality)
+    got = compute_metrics(scenario, results, shuffled, equality)
+    # Top-20 ties are broken by each frame's own row order (as nlargest), so turnover may differ
+    turnover_keys = ("top20_turnover_vs_iusaf", "top20_turnover_vs_pure_iusaf", "overlay_strength_label", "departure_from_pure_iusaf_flag", "structural_break_flag")
+    _assert_metrics_equal(
+        {k: v for k, v in expected.items() if k not in turnover_keys},
+        {k: v for k, v in got.items() if k not in turnover_keys},
+    )
+
+    cur_top = set(results[results["eligible"]].nlargest(20, "final_share")["party"])
+    base_top = set(shuffled[shuffled["eligible"]].nlargest(20, "final_share")["party"])
+    assert got["top20_turnover_vs_pure_iusaf"] == len(cur_top ^ base_top) / 20
+
+
+def test_metrics_batch_matches_kernel_rows(base_df):
+    base = get_scenario_library()["gini_minimum_point"]
+    scenarios = [
+        dict(base, tsac_beta=beta, sosac_gamma=gamma, floor_pct=floor, ceiling_pct=ceiling, exclude_high_income=exclude, equality_mode=equality)
+        for beta in (0.0, 0.05, 0.15)
+        for gamma in (0.0, 0.1)
+        for floor, ceiling in ((0.0, None), (0.3, 1.0))
+        for exclude in (False, True)
+        for equality in (False, True)
+    ]
+    runs = []
+    for s in scenarios:
+        comp = build_pure_iusaf_comparator(s)
+        runs += [s, comp, {**comp, "equality_mode": True}]
+    batch = calculate_allocations_batch(base_df, [_kwargs(s) for s in runs])
+
+    rows = np.arange(len(scenarios)) * 3
+    frame = batch_metrics_frame(base_df, batch, rows, rows + 1)
+    for k, s in enumerate(scenarios):
+        expected = compute_metrics_arrays(s, *[batch_metric_arrays(base_df, batch, 3 * k + j) for j in range(3)])
+        for key in frame.columns:
+            assert frame[key][k] == pytest.approx(expected[key], rel=1e-12, abs=1e-12, nan_ok=True), (k, key)
+
+
+def test_metrics_batch_ties_and_empty_rows():
+    share = np.array([
+        [0.4, 0.2, 0.2, 0.1, 0.1],
+        [0.2, 0.2, 0.2, 0.2, 0.2],
+        [0.5, 0.5, 0.0, 0.0, 0.0],
+    ])
+    baseline = np.array([
+        [0.1, 0.2, 0.2, 0.3, 0.2],
+        [0.2, 0.2, 0.2, 0.2, 0.2],
+        [0.1, 0.2, 0.3, 0.2, 0.2],
+    ])
+    eligible = np.array([
+        [True, True, True, True, False],
+        [True, True, True, True, True],
+        [False, False, False, False, False],
+    ])
+    m = compute_metrics_batch(share, baseline, eligible=eligible, baseline_eligible=[True] * 5, fund_size=1e6)
+
+    ranks = pd.DataFrame({"cur": share[0, :4], "base": baseline[0, :4]}).rank()
+    assert m["spearman_vs_pure_iusaf"][0] == pytest.approx(ranks["cur"].corr(ranks["base"]), rel=1e-12)
+    assert m["spearman_vs_pure_iusaf"][1] == 1.0
+    assert math.isnan(m["spearman_vs_pure_iusaf"][2])
+
+    assert m["n_eligible"].tolist() == [4, 5, 0]
+    assert m["gini"][1] == 0.0 and m["gini"][2] == 0.0
+    assert m["top10_share"][0] == pytest.approx(0.9)
+    # Row 0's baseline also ranks its ineligible fifth Party: one of five top Parties differs
+    assert m["top20_turnover_vs_pure_iusaf"].tolist() == [0.2, 0.0, 0.0]
+    # Equality reference is 0.25 for the four eligible Parties of row 0
+    assert m["pct_below_equality"].tolist() == [75.0, 0.0, 0.0]
+
+
+
+@pytest.mark.parametrize("run_batch", [calculate_allocations_batch, calculate_allocations_batch_cached])
+def test_local_stability_batch_matches_per_scenario(base_df, run_batch):
+    scenarios = [dict(s, scenario_id=name) for name, s in get_scenario_library().items()]
+    scenarios.append(dict(scenarios[3], floor_pct=0.3, ceiling_pct=2.0, scenario_id="constrained"))
+
+    def run_scenario(df, s):
+        return calculate_allocations(df, **_kwargs(s))
+
+    ranges = get_default_ranges()
+    got = compute_local_stability_batch(scenarios, base_df, lambda df, ss: run_batch(df, [_kwargs(s) for s in ss]), ranges)
+    for s, (summary, table) in zip(scenarios, got):
+        exp_summary, exp_table = compute_local_stability_metrics(s, run_scenario(base_df, s), base_df, run_scenario, ranges)
+        _assert_metrics_equal(exp_summary, summary)
+        pd.testing.assert_frame_equal(table, exp_table, check_exact=False, rtol=1e-12, atol=1e-15)
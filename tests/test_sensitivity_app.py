@@ -0,0 +1,62 @@
+"""Tests for lazy view evaluation in the sensitivity app."""
+from __future__ import annotations
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP = "src/sensitivity.py"
+
+
+def _sections(at):
+    return {section if isinstance(section, str) else section[0] for section, _ in at.session_state["view_cache"]}
+
+
+@pytest.fixture(scope="module")
+def app():
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    assert not at.exception
+    return at
+
+
+def test_first_paint_evaluates_only_the_parameter_sweep(app):
+    assert app.radio[0].value == "Parameter Sweep"
+    assert _sections(app) == {"current", "one_way", "grid"}
+
+
+def test_slider_move_on_balance_view_skips_other_views():
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.session_state["view"] = "Balance Point Analysis"
+    at.run()
+    at.sidebar.slider[0].set_value(0.07)
+    at.run()
+    assert not at.exception
+    assert "view_cache" not in at.session_state or not _sections(at)
+
+
+@pytest.mark.parametrize(
+    "view",
+    [
+        "Robustness Diagnostics",
+        "Thresholds and Tipping Points",
+        "Attack Surface Report",
+        "Balance Point Analysis",
+        "Data Exports",
+    ],
+)
+def test_every_view_renders(app, view):
+    app.radio[0].set_value(view)
+    app.run()
+    assert not app.exception
+
+
+def test_views_reuse_cached_sections(app):
+    app.radio[0].set_value("Data Exports")
+    app.run()
+    before = dict(app.session_state["view_cache"])
+    app.radio[0].set_value("Attack Surface Report")
+    app.run()
+    # Same scenario: every section the report needs was already evaluated
+    for key, value in before.items():
+        assert app.session_state["view_cache"][key] is value
+    assert "library" in _sections(app) and "deltas" in _sections(app)
@@ -1,6 +1,8 @@
 import pandas as pd
 
+from cali_model import calculator
 from cali_model.calculator import get_stewardship_blend_feedback, get_outcome_warning_feedback
+from cali_model.sensitivity_metrics import compute_metrics
 
 
 def test_stewardship_feedback_thresholds():
@@ -58,3 +60,23 @@ def test_outcome_warning_combined():
     assert feedback is not None
     assert "more than 60% of eligible countries are below the equality reference" in feedback["message"]
     assert "median eligible country is receiving less than 90%" in feedback["message"]
+
+
+def test_sensitivity_outcome_flag_uses_the_same_thresholds(monkeypatch):
+    # 70% below equality, median at 95%: warns only through the 60% share rule
+    df = pd.DataFrame({
+        "party": [f"P{i}" for i in range(10)],
+        "eligible": [True] * 10,
+        "total_allocation": [95.0] * 7 + [111.6666666667] * 3,
+    })
+    df["final_share"] = df["total_allocation"] / df["total_allocation"].sum()
+    df["state_component"] = df["iplc_component"] = df["total_allocation"] / 2
+    scenario = {"fund_size": 1_000_000_000}
+
+    def flags():
+        metrics = compute_metrics(scenario, df, df, df)
+        return metrics["outcome_warning_flag"], get_outcome_warning_feedback(df, 1_000_000_000) is not None
+
+    assert flags() == (True, True)
+    monkeypatch.setattr(calculator, "OUTCOME_WARNING_BELOW_EQUALITY_SHARE", 0.75)
+    assert flags() == (False, False)
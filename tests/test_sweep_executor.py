@@ -0,0 +1,111 @@
+"""Tests for chunked sweep execution on serial, thread and process backends."""
+from __future__ import annotations
+
+import threading
+
+import duckdb
+import pandas as pd
+import pytest
+
+from cali_model.calculator import calculate_allocations
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_scenarios import DEFAULT_BASELINE, get_default_ranges, two_way_grid
+from cali_model.sweep_executor import (
+    SweepExecutor,
+    allocation_frames_chunk,
+    comparator_metrics_chunk,
+    grid_metrics_chunk,
+)
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+@pytest.fixture(scope="module")
+def grid():
+    ranges = get_default_ranges()
+    return two_way_grid(DEFAULT_BASELINE, "tsac_beta", ranges["tsac_beta"], "floor_pct", ranges["floor_pct"], "exec")
+
+
+def _kwargs(scenario):
+    return {k: v for k, v in scenario.items() if k not in ("scenario_id", "description")}
+
+
+@pytest.mark.parametrize("backend,workers", [("serial", 1), ("thread", 3), ("process", 2)])
+def test_backends_stream_results_in_order(base_df, grid, backend, workers):
+    expected = pd.DataFrame(comparator_metrics_chunk(base_df, grid))
+    with SweepExecutor(base_df, comparator_metrics_chunk, backend=backend, workers=workers, chunk_size=7) as executor:
+        got = pd.DataFrame(list(executor.map(iter(grid))))
+    pd.testing.assert_frame_equal(got, expected, check_exact=False, rtol=1e-12, atol=1e-15)
+
+
+def test_chunk_functions_match_engine(base_df, grid):
+    sample = grid[:5]
+    for scenario, frame in zip(sample, allocation_frames_chunk(base_df, sample)):
+        expected = calculate_allocations(base_df, **_kwargs(scenario))
+        pd.testing.assert_frame_equal(frame, expected, check_exact=False, rtol=1e-12, atol=1e-12)
+
+    rows = grid_metrics_chunk(base_df, sample)
+    assert len(rows) == len(sample)
+    metrics = pd.DataFrame(comparator_metrics_chunk(base_df, sample))
+    assert [r["gini"] for r in rows] == pytest.approx(metrics["gini_coefficient"].tolist(), rel=1e-12)
+
+
+def _recording_chunk(calls):
+    def fn(base_df, scenarios):
+        calls.append(len(scenarios))
+        return [s["scenario_id"] for s in scenarios]
+    return fn
+
+
+def test_serial_map_consumes_generators_lazily(base_df, grid):
+    calls = []
+    executor = SweepExecutor(base_df, _recording_chunk(calls), chunk_size=4)
+    results = executor.map(s for s in grid)
+    assert calls == []
+    assert [next(results) for _ in range(5)] == [s["scenario_id"] for s in grid[:5]]
+    assert calls == [4, 4]
+
+
+@pytest.mark.parametrize("backend", ["serial", "thread"])
+def test_cancel_stops_after_current_chunk(base_df, grid, backend):
+    calls = []
+    executor = SweepExecutor(base_df, _recording_chunk(calls), backend=backend, workers=1, chunk_size=3)
+    seen = []
+    with executor:
+        for scenario_id in executor.map(grid):
+            seen.append(scenario_id)
+            if len(seen) == 2:
+                executor.cancel()
+    assert executor.cancelled
+    assert seen == [s["scenario_id"] for s in grid[:3]]
+    assert len(calls) < len(grid) // 3
+
+
+def test_closing_the_stream_drops_queued_chunks(base_df, grid):
+    release = threading.Event()
+    calls = []
+
+    def slow(base_df, scenarios):
+        release.wait(5)
+        calls.append(len(scenarios))
+        return scenarios
+
+    with SweepExecutor(base_df, slow, backend="thread", workers=1, chunk_size=2) as executor:
+        stream = executor.map(grid)
+        release.set()
+        next(stream)
+        stream.close()
+    # One worker prefetches two chunks; nothing beyond the third is ever started
+    assert len(calls) <= 3
+
+
+def test_rejects_unknown_backend(base_df):
+    with pytest.raises(ValueError, match="Unknown backend"):
+        SweepExecutor(base_df, backend="gpu")
+    with pytest.raises(ValueError, match="chunk_size"):
+        SweepExecutor(base_df, chunk_size=0)
@@ -0,0 +1,142 @@
+"""Tests for streaming sweeps to partitioned Parquet with resumable checkpoints."""
+from __future__ import annotations
+
+import duckdb
+import pandas as pd
+import pytest
+
+from cali_model.calculator import batch_long_frame, calculate_allocations_batch
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.sensitivity_scenarios import DEFAULT_BASELINE
+from cali_model import sweep_store
+from cali_model.sweep_executor import SweepExecutor, grid_metrics_chunk
+from cali_model.sweep_store import (
+    read_checkpoint,
+    read_sweep_parquet,
+    sweep_rows_chunk,
+    sweep_store_key,
+    write_sweep_parquet,
+)
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+def _surface(stop_after=None):
+    """TSAC × fund-size surface as a generator; raises KeyboardInterrupt once `stop_after` scenarios are drawn."""
+    n = 0
+    for fund_size in (50_000_000.0, 1_000_000_000.0):
+        for step in range(20):
+            if n == stop_after:
+                raise KeyboardInterrupt
+            n += 1
+            beta = step / 200
+            yield {**DEFAULT_BASELINE, "fund_size": fund_size, "tsac_beta": beta,
+                   "scenario_id": f"surface_{fund_size:.0f}_{beta:.3f}"}
+
+
+def _expected_metrics(base_df):
+    frame = pd.DataFrame([row for row, _ in sweep_rows_chunk(base_df, list(_surface()))])
+    frame["ceiling_pct"] = frame["ceiling_pct"].astype(float)
+    frame.insert(0, "sweep_index", range(len(frame)))
+    return frame
+
+
+def test_round_trip_matches_direct_evaluation(base_df, tmp_path):
+    state = write_sweep_parquet(base_df, _surface(), tmp_path, "surface", long_format=True, flush_every=7)
+    assert state["complete"] and state["completed"] == 40 and state["parts"] == 6
+    assert {p.parent.name for p in (tmp_path / "metrics").rglob("*.parquet")} == {
+        "fund_size=50000000.0", "fund_size=1000000000.0"
+    }
+
+    got = read_sweep_parquet(tmp_path)
+    pd.testing.assert_frame_equal(got, _expected_metrics(base_df), check_dtype=False)
+
+    long = read_sweep_parquet(tmp_path, "long", where={"fund_size": 1_000_000_000.0})
+    batch = calculate_allocations_batch(base_df, list(_surface())[20:])
+    expected = batch_long_frame(batch)
+    assert long["sweep_index"].tolist() == (expected["scenario_index"] + 20).tolist()
+    for col in ("scenario_id", "party", "eligible"):
+        assert long[col].tolist() == expected[col].tolist()
+    for col in ("final_share", "total_allocation", "iplc_component", "state_component"):
+        assert long[col].to_numpy() == pytest.approx(expected[col].to_numpy(), rel=1e-12, abs=1e-15)
+
+
+def test_interrupted_sweep_resumes_from_checkpoint(base_df, tmp_path):
+    executor = SweepExecutor(base_df, chunk_size=5)
+    with pytest.raises(KeyboardInterrupt):
+        write_sweep_parquet(base_df, _surface(stop_after=27), tmp_path, "surface", executor=executor, flush_every=10)
+    state = read_checkpoint(tmp_path)
+    # Scenarios 20-24 were evaluated before the interrupt and flushed on the way out
+    assert state["completed"] == 25 and not state["complete"]
+
+    state = write_sweep_parquet(base_df, _surface(), tmp_path, "surface", executor=executor, flush_every=10)
+    # Only the remaining 15 scenarios are evaluated: two more parts
+    assert state["complete"] and state["completed"] == 40 and state["parts"] == 5
+    pd.testing.assert_frame_equal(read_sweep_parquet(tmp_path), _expected_metrics(base_df), check_dtype=False)
+
+
+def test_resume_drops_parts_after_checkpoint(base_df, tmp_path):
+    write_sweep_parquet(base_df, _surface(), tmp_path, "surface", partition_by=(), flush_every=15)
+    parts = sorted(p.name for p in (tmp_path / "metrics").glob("*.parquet"))
+    assert parts == ["part-000001_0.parquet", "part-000002_0.parquet", "part-000003_0.parquet"]
+
+    # A part left by a flush that never reached its checkpoint
+    orphan = tmp_path / "metrics" / "part-000004_0.parquet"
+    orphan.write_bytes((tmp_path / "metrics" / parts[0]).read_bytes())
+    state = write_sweep_parquet(base_df, _surface(), tmp_path, "surface", partition_by=(), flush_every=15)
+    assert state["parts"] == 3 and not orphan.exists()
+    assert len(read_sweep_parquet(tmp_path)) == 40
+
+
+def test_cancelled_executor_leaves_resumable_checkpoint(base_df, tmp_path):
+    executor = SweepExecutor(base_df, chunk_size=4)
+
+    def cancelling():
+        for k, s in enumerate(_surface()):
+            if k == 10:
+                executor.cancel()
+            yield s
+
+    state = write_sweep_parquet(base_df, cancelling(), tmp_path, "surface", executor=executor, flush_every=100)
+    assert not state["complete"] and state["completed"] == 8
+    state = write_sweep_parquet(base_df, _surface(), tmp_path, "surface", executor=executor)
+    assert state["complete"] and len(read_sweep_parquet(tmp_path)) == 40
+
+
+def test_checkpoint_for_another_sweep_is_rejected(base_df, tmp_path):
+    scenarios = list(_surface())[:3]
+    write_sweep_parquet(base_df, scenarios, tmp_path, "surface")
+    with pytest.raises(ValueError, match="different sweep"):
+        write_sweep_parquet(base_df, scenarios, tmp_path, "other")
+    with pytest.raises(ValueError, match="flush_every"):
+        write_sweep_parquet(base_df, scenarios, tmp_path, "surface", flush_every=0)
+
+    state = write_sweep_parquet(base_df, scenarios[:2], tmp_path, "other", resume=False)
+    assert state["sweep_id"] == "other" and len(read_sweep_parquet(tmp_path)) == 2
+
+
+def _metrics_with_late_column(base_df, scenarios):
+    rows = grid_metrics_chunk(base_df, scenarios)
+    return [dict(m, late=1.0) if s["tsac_beta"] > 0.05 else m for s, m in zip(scenarios, rows)]
+
+
+def test_new_metric_columns_are_rejected(base_df, tmp_path):
+    with pytest.raises(ValueError, match=r"new: \['late'\]"):
+        write_sweep_parquet(base_df, _surface(), tmp_path, "surface", metrics_fn=_metrics_with_late_column, flush_every=7)
+    # Nothing past the last consistent part was checkpointed
+    assert read_checkpoint(tmp_path)["completed"] == 7
+
+
+def test_sweep_key_tracks_band_config(base_df, tmp_path, monkeypatch):
+    path = tmp_path / "un_scale_bands.yaml"
+    path.write_text("bands: []\n")
+    monkeypatch.setattr(sweep_store, "DEFAULT_BAND_CONFIG_PATH", path)
+    key = sweep_store_key(base_df, "surface")
+    assert sweep_store_key(base_df, "surface") == key
+    path.write_text("bands: [{id: 1, weight: 2.0}]\n")
+    assert sweep_store_key(base_df, "surface") != key
@@ -0,0 +1,126 @@
+"""Tests for the streamed Monte Carlo of land-area and UN-share uncertainty."""
+from __future__ import annotations
+
+import duckdb
+import numpy as np
+import pandas as pd
+import pytest
+
+from cali_model.calculator import assign_un_bands, calculate_shares
+from cali_model.data_loader import get_base_data, load_data
+from cali_model.uncertainty import (
+    DEFAULT_PERTURBATIONS,
+    TAIL_SIGMAS,
+    chunk_shares,
+    draw_factors,
+    histogram_half_width,
+    run_monte_carlo,
+    uncertainty_vectors,
+)
+
+
+@pytest.fixture(scope="module")
+def base_df():
+    con = duckdb.connect(database=":memory:")
+    load_data(con)
+    return get_base_data(con)
+
+
+SCENARIO = dict(exclude_high_income=True, tsac_beta=0.05, sosac_gamma=0.03, floor_pct=0.3, un_scale_mode="band_inversion")
+
+
+@pytest.mark.parametrize("scenario", [
+    SCENARIO,
+    dict(exclude_high_income=True, un_scale_mode="raw_inversion", tsac_beta=0.05, sosac_gamma=0.03, ceiling_pct=2.0),
+    dict(tsac_mode="banded", tsac_beta=0.1, sosac_gamma=0.05, un_scale_mode="band_inversion"),
+])
+def test_chunk_matches_engine_on_perturbed_frames(base_df, scenario):
+    vectors = uncertainty_vectors(base_df, scenario)
+    rng = np.random.default_rng(7)
+    un = vectors["un_share"] * np.exp(0.3 * rng.standard_normal((3, len(base_df))))
+    land = vectors["land_area_km2"] * np.exp(0.3 * rng.standard_normal((3, len(base_df))))
+    shares, bands = chunk_shares(vectors, un, land)
+
+    parties = base_df["party"]
+    for k in range(3):
+        overrides = {"un_share": dict(zip(parties, un[k])), "land_area_km2": dict(zip(parties, land[k]))}
+        expected = calculate_shares(base_df, **scenario, attribute_overrides=overrides).shares
+        np.testing.assert_allclose(shares[k], expected["final_share"], rtol=1e-12, atol=1e-15)
+        labels, _ = assign_un_bands(un[k], vectors["band_table"])
+        assert [vectors["band_table"]["label"][b] if b >= 0 else None for b in bands[k]] == list(labels)
+
+
+def test_results_are_seeded_and_independent_of_chunk_size(base_df):
+    a = run_monte_carlo(base_df, SCENARIO, n_draws=300, seed=3, chunk_size=300)
+    b = run_monte_carlo(base_df, SCENARIO, n_draws=300, seed=3, chunk_size=64)
+    for table in ("allocations", "bands", "ranks"):
+        pd.testing.assert_frame_equal(a[table], b[table], rtol=1e-12)
+    c = run_monte_carlo(base_df, SCENARIO, n_draws=300, seed=4, chunk_size=64)
+    assert not a["allocations"]["mean_share"].equals(c["allocations"]["mean_share"])
+
+
+def test_quantiles_match_full_draw_matrix(base_df):
+    n_draws, resolution = 400, 1e-4
+    result = run_monte_carlo(base_df, SCENARIO, n_draws=n_draws, seed=11, resolution=resolution,
+                             quantiles=(0.1, 0.5, 0.9))
+
+    # The same draws, held in memory
+    vectors = uncertainty_vectors(base_df, SCENARIO)
+    un_rng, land_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(11).spawn(2))
+    shape = (n_draws, len(base_df))
+    un = vectors["un_share"] * draw_factors(un_rng, DEFAULT_PERTURBATIONS["un_share"], shape)
+    land = vectors["land_area_km2"] * draw_factors(land_rng, DEFAULT_PERTURBATIONS["land_area_km2"], shape)
+    shares, bands = chunk_shares(vectors, un, land)
+
+    alloc = result["allocations"]
+    np.testing.assert_allclose(alloc["mean_share"], shares.mean(axis=0), rtol=1e-12, atol=1e-15)
+    exact = np.quantile(shares, [0.1, 0.5, 0.9], axis=0, method="inverted_cdf").T
+    got = alloc[["share_p10", "share_p50", "share_p90"]].to_numpy()
+    np.testing.assert_allclose(got, exact, rtol=resolution)
+
+    labels = list(vectors["band_table"]["label"])
+    point_band = np.array([labels.index(b) if b else -1 for b in result["bands"]["point_band"]])
+    np.testing.assert_allclose(result["bands"]["switch_probability"], (bands != point_band).mean(axis=0))
+
+
+def test_wide_perturbation_quantiles_are_not_clamped(base_df):
+    scenario = dict(exclude_high_income=True, un_scale_mode="raw_inversion", tsac_beta=0.05, sosac_gamma=0.03)
+    wide = {"un_share": {"dist": "lognormal", "scale": 1.0}}
+    assert histogram_half_width(wide) == pytest.approx(2 * TAIL_SIGMAS)
+    n_draws = 400
+    result = run_monte_carlo(base_df, scenario, n_draws=n_draws, seed=5, perturbations=wide)
+
+    vectors = uncertainty_vectors(base_df, scenario)
+    un_rng, land_rng = (np.random.default_rng(s) for s in np.random.SeedSequence(5).spawn(2))
+    shape = (n_draws, len(base_df))
+    un = vectors["un_share"] * draw_factors(un_rng, wide["un_share"], shape)
+    land = vectors["land_area_km2"] * draw_factors(land_rng, DEFAULT_PERTURBATIONS["land_area_km2"], shape)
+    shares, _ = chunk_shares(vectors, un, land)
+    exact = np.quantile(shares, [0.05, 0.5, 0.95], axis=0, method="inverted_cdf").T
+    got = result["allocations"][["share_p5", "share_p50", "share_p95"]].to_numpy()
+    np.testing.assert_allclose(got, exact, rtol=1e-3)
+
+    # The old fixed +/-1 grid cannot hold these draws
+    with pytest.raises(ValueError, match="beyond the histogram range"):
+        run_monte_carlo(base_df, scenario, n_draws=n_draws, seed=5, perturbations=wide, max_log_ratio=1.0)
+
+
+def test_zero_perturbation_reproduces_point_estimate(base_df):
+    result = run_monte_carlo(base_df, {**SCENARIO, "fund_size": 1_000_000_000}, n_draws=50,
+                             perturbations={"un_share": None, "land_area_km2": {"dist": "normal", "scale": 0.0}})
+    alloc = result["allocations"]
+    for col in ("mean_share", "share_p5", "share_p95", "min_share", "max_share"):
+        np.testing.assert_allclose(alloc[col], alloc["point_share"], rtol=1e-12, atol=1e-15)
+    assert alloc["point_allocation_m"].sum() == pytest.approx(1000.0)
+    assert (result["bands"]["switch_probability"].fillna(0.0) == 0.0).all()
+    ranks = result["ranks"]
+    assert (ranks["rank_p5"] == ranks["point_rank"]).all() and (ranks["p_point_rank"] == 1.0).all()
+
+
+def test_rejects_bad_perturbations(base_df):
+    with pytest.raises(ValueError, match="Cannot perturb"):
+        run_monte_carlo(base_df, n_draws=10, perturbations={"is_sids": {"dist": "normal", "scale": 0.1}})
+    with pytest.raises(ValueError, match="unknown distribution"):
+        run_monte_carlo(base_df, n_draws=10, perturbations={"un_share": {"dist": "cauchy", "scale": 0.1}})
+    with pytest.raises(ValueError, match="chunk_size"):
+        run_monte_carlo(base_df, n_draws=10, chunk_size=0)